@@ -1,6 +1,7 @@
 """aet_cells.py
 Defines AETCellsData and ETCell classes
-Defines seasonal_ctetdata, crop_percents, calculate_ratios,
+Defines seasonal_ctetdata, crop_percents, crop_rate_matrices,
+    crop_mix_matrices, calculate_ratios,
     apply_annual_ratios, compute_flow, compute_daily_volume,
     compute_monthly_volume, compute_annual_volume, compute_daily_fractions,
     user_begin_date, user_end_date
@@ -21,9 +22,11 @@ import pandas as pd
 import xlrd
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../lib')))
+import aet_cet_input
 import aet_config
 import aet_utils
 import mod_dmis
+import period_agg
 
 mmHaPerDay_to_cms = 0.001 * 10000 / 86400    # 0.001 (mm/m) * 10000 (m2/hectare) / 86400 (seconds/day)
 
@@ -42,9 +45,7 @@ class AETCellsData():
         """ """
         self.et_cells_data = dict()
         self.crop_num_list = []
-        self.cell_daily_output_aet_data = {}
-        self.cell_monthly_output_aet_data = {}
-        self.cell_annual_output_aet_data = {}
+        self.aet_param_output = None
 
     def set_cell_crops(self, cfg):
         """ExtractET cell crop data
@@ -142,6 +143,8 @@ class ETCell():
 
     def __init__(self):
         """ """
+        # CropET daily output by crop type number when computed in process
+        self.cet_frames = None
 
     def __str__(self):
         """ """
@@ -199,11 +202,7 @@ class ETCell():
                     self.usedCropTypes.append(ctCount + 1)
                     self.numUsedCropTypes += 1
             logging.debug('Reading crop ET data')
-            if cfg.input_cet['data_structure_type'].upper() == 'DRI':
-                success = self.DRI_input_cet_data(cell_count, cfg, cells)
-            else:
-                success = self.RDB_input_cet_data(cell_count, cfg, cells)
-            if not success:
+            if not self.input_cet_data(cell_count, cfg, cells):
                 return False
             if cfg.ngs_toggle == 1:
                 if not self.dist_ngs_to_gs(cfg): return False
@@ -212,8 +211,8 @@ class ETCell():
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred processing ET Cell crop type data for ' +  self.cell_id)
             return False
 
-    def DRI_input_cet_data(self, cell_count, cfg, cells):
-        """Read crop ET data for single station in DRI station files with all parameters
+    def input_cet_data(self, cell_count, cfg, cells):
+        """Read crop ET data of used crop types for single ET cell in DRI or RDB format
 
         Parameters
         ----------
@@ -231,237 +230,47 @@ class ETCell():
 
         """
 
-        crops_dict = {}
-        try:
-            # Get list of 0 based line numbers to skip
-            # Ignore header but assume header was set as 1's based index
-            data_skip = [i for i in range(cfg.input_cet['header_lines']) if i + 1 != cfg.input_cet['names_line']]
-            for ctCount in range(0, self.numUsedCropTypes, 1):
-                input_cet_path = os.path.join(cfg.input_cet['ws'], cfg.input_cet['name_format'].replace('%c', '%02d' % self.usedCropTypes[ctCount]) % self.cell_id)
-                if not os.path.isfile(input_cet_path):
-                    logging.error('ERROR:  input crop et file {} does not exist'.format(input_cet_path))
-                    return False
-                logging.debug('  {0}'.format(input_cet_path))
-                crop_df = pd.read_csv(input_cet_path, engine = 'python',
-                        header = cfg.input_cet['names_line'] - len(data_skip) - 1,
-                        skiprows = data_skip, sep = cfg.input_cet['delimiter'],
-                        comment = "#", na_values = ['NaN'])
-
-                # Check fields
-
-                for field_key, field_name in cfg.input_cet['fields'].items():
-                    if (field_name is not None and field_name not in crop_df.columns):
-                        if cfg.input_cet['fnspec'][field_key].lower() == 'estimated': continue
-                        if cfg.input_cet['fnspec'][field_key].lower() == 'unused': continue
-                        logging.error(
-                            ('\n  ERROR: Field "{0}" was not found in {1}\n'+
-                             '    Check {2}_field value in INI file').format(
-                            field_name, os.path.basename(input_cet_path), field_key))
-                        return False
-                    # Rename dataframe fields
-                    if field_name is not None: crop_df = crop_df.rename(columns = {field_name:field_key})
-                crop_df['niwr'] = crop_df['cir'].values
-
-                # Convert date strings to datetimes and index on date
-
-                if cfg.input_cet['fields']['date'] is not None:
-                    crop_df['date'] = pd.to_datetime(crop_df['date'])
-                else:
-                    if cfg.time_step == 'day':
-                        crop_df['date'] = crop_df[['year', 'month', 'day']].apply(
-                            lambda s : datetime.datetime(*s),axis = 1)
-                    else:
-                        crop_df['date'] = crop_df[['year', 'month', 'day', 'hour']].apply(
-                        lambda s : datetime.datetime(*s),axis = 1)
-                crop_df.set_index('date', inplace = True)
-
-                # if cell_count == 0 and ctCount == 0:
-                    # verify period
-
-                if cfg.start_dt is None:
-                    pydt = crop_df.index[0]
-                    cfg.start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
-                if cfg.end_dt is None:
-                    pydt = crop_df.index[len(crop_df) - 1]
-                    cfg.end_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
-
-                # truncate period
-
-                try:
-                    crop_df = crop_df.truncate(before = cfg.start_dt, after = cfg.end_dt)
-                except:
-                    logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input crop ET data')
-                    return False
-                if len(crop_df.index) < 1:
-                    logging.error('No values found reading crop et data')
-                    return False
-
-                # compute seasonally adjusted crop et, effective precipitation and irrigation water requirement
-
-                try:
-                    crop_df['cet'], crop_df['effprcp'], crop_df['cir'] = seasonal_ctetdata(cfg.ngs_toggle,
-                        cfg.crop_irr_flags[self.usedCropTypes[ctCount] - 1], crop_df['season'], crop_df['etact'],
-                        crop_df['etpot'], crop_df['ppt'], crop_df['sro'], crop_df['dperc'], crop_df['sir'], crop_df['niwr'])
-                except:
-                    logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) +  ' occurred computing seasonally adjusted crop type et data for ' +  self.cell_id + ' from DRI format\n')
-                    return False
-
-                if ctCount == 0:
-                    # store ET Cell reference ET and precip if first crop
-                    self.etcData_df = mod_dmis.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
-                    self.etcData_df['refet'] = crop_df['refet']
-                    self.etcData_df['ppt'] = crop_df['ppt']
-
-                # drop unused columns
-
-                for fn in list(crop_df.columns):
-                    if fn not in ['date', 'year', 'cet', 'effprcp', 'cir', 'season']:
-                        crop_df.drop(fn, axis = 1, inplace = True)
-
-                # add crop number column
-                crop_df['Crop Num'] = self.usedCropTypes[ctCount]
-                crop_df.reset_index(inplace = True)
-                crops_dict[self.usedCropTypes[ctCount]] = crop_df
-                del crop_df
-            self.crops_df = pd.concat(crops_dict)
-            self.crops_df.set_index(['Crop Num', 'date'], inplace = True)
-            return True
-        except:
-            logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) +  ' occurred processing ET Cell crop type data for ' +  self.cell_id + ' from DRI format\n')
-            return False
-
-    def RDB_input_cet_data(self, cell_count, cfg, cells):
-        """Read crop ET data for single ET cell using RDB format
-
-        Parameters
-        ----------
-        cell_count :
-            count of ET cell being processed
-        cfg :
-            configuration data from INI file
-        cells : dict
-            ET cell data
-
-        Returns
-        -------
-        True
-        False
-
-        """
-
-        crops_dict = {}
         try:
-            # Get list of 0 based line numbers to skip
-            # Ignore header but assume header was set as 1's based index
-            data_skip = [i for i in range(cfg.input_cet['header_lines']) if i + 1 != cfg.input_cet['names_line']]
-            input_cet_path = os.path.join(cfg.input_cet['ws'], cfg.input_cet['name_format'].replace('%s', self.cell_id)).replace("%c", "")
-            if not os.path.isfile(input_cet_path):
-                logging.error('ERROR:  input crop et file {} does not exist'.format(input_cet_path))
+            cell_cet = aet_cet_input.read_cell_cet(cfg, self.cell_id, self.usedCropTypes, self.cet_frames)
+            if cell_cet is None:
                 return False
-            logging.debug('  {0}'.format(input_cet_path))
-            """
-                crop_df = pd.read_csv(input_cet_path, engine = 'python',
-                        header = cfg.input_cet['names_line'] - len(data_skip) - 1,
-                        skiprows = data_skip, sep = cfg.input_cet['delimiter'],
-                        comment = "#", na_values = ['NaN'])
-            """
-            rdb_cet_df = pd.read_csv(input_cet_path, engine = 'python',
-                    header = cfg.input_cet['names_line'] - len(data_skip) - 1,
-                    skiprows = data_skip, sep = cfg.input_cet['delimiter'],
-                    comment = "#", na_values = ['NaN'])
-            crop_num_col = list(rdb_cet_df.columns)[0]
-            rdb_cet_df[crop_num_col] = rdb_cet_df[[crop_num_col]].apply(lambda s: int(*s), axis = 1, raw = True, result_type = 'reduce')
-
-            # Check fields
-
-            for field_key, field_name in cfg.input_cet['fields'].items():
-                if (field_name is not None and field_name not in rdb_cet_df.columns):
-                    if cfg.input_cet['fnspec'][field_key].lower() == 'estimated': continue
-                    if cfg.input_cet['fnspec'][field_key].lower() == 'unused': continue
-                    logging.error(('\n  ERROR: Field "{0}" was not found in {1}\n' +
-                             '    Check {2}_field value in INI file').format(field_name,
-                             os.path.basename(input_cet_path), field_key))
-                    return False
-                # Rename dataframe fields
-                if field_name is not None: rdb_cet_df = rdb_cet_df.rename(columns = {field_name:field_key})
-            rdb_cet_df['niwr'] = rdb_cet_df['cir'].values
+            dates, cet_data, field_keys = cell_cet
+            crop_fields = {}
+            for field_key in ['cet', 'effprcp', 'cir', 'season']:
+                crop_fields[field_key] = np.empty((len(dates), self.numUsedCropTypes), dtype = float)
 
-            # Convert date strings to datetimes and index on date
+            # compute seasonally adjusted crop et, effective precipitation and irrigation water requirement
 
-            if cfg.input_cet['fields']['date'] is not None:
-                rdb_cet_df['date'] = pd.to_datetime(rdb_cet_df['date'])
-            else:
-                if cfg.time_step == 'day':
-                    rdb_cet_df['date'] = rdb_cet_df[['year', 'month', 'day']].apply(
-                        lambda s : datetime.datetime(*s),axis = 1)
-                else:
-                    rdb_cet_df['date'] = rdb_cet_df[['year', 'month', 'day', 'hour']].apply(
-                    lambda s : datetime.datetime(*s),axis = 1)
             for ctCount in range(0, self.numUsedCropTypes, 1):
+                crop_data = dict(zip(field_keys, cet_data[:, ctCount, :].T))
                 try:
-                    crop_df = rdb_cet_df[rdb_cet_df[crop_num_col] == self.usedCropTypes[ctCount]]
-                except:
-                    logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred subsetting crop type ', crop_type, '.\n')
-                crop_df.reset_index(inplace = True)
-                crop_df.set_index('date', inplace = True)
-
-                # sub set data for this crop
-
-                if cell_count == 0 and ctCount == 0:
-                    # verify period
-
-                    if cfg.start_dt is None:
-                        pydt = crop_df.index[0]
-                        sdt = datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute)
-                        cfg.start_dt = pd.to_datetime(sdt)
-                    if cfg.end_dt is None:
-                        pydt = crop_df.index[len(crop_df) - 1]
-                        edt = datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute)
-                        cfg.end_dt = pd.to_datetime(edt)
-
-                # truncate period
-
-                try:
-                    crop_df = crop_df.truncate(before = cfg.start_dt, after = cfg.end_dt)
-                except:
-                    logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input crop ET data')
-                    return False
-
-                # compute seasonally adjusted crop et, effective precipitation and irrigation water requirement
-
-                try:
-                    crop_df['cet'], crop_df['effprcp'], crop_df['cir'] = seasonal_ctetdata(cfg.ngs_toggle,
-                        cfg.crop_irr_flags[self.usedCropTypes[ctCount] - 1], crop_df['season'], crop_df['etact'],
-                        crop_df['etpot'], crop_df['ppt'], crop_df['sro'], crop_df['dperc'], crop_df['sir'], crop_df['niwr'])
+                    cet, effprcp, cir = seasonal_ctetdata(cfg.ngs_toggle,
+                        cfg.crop_irr_flags[self.usedCropTypes[ctCount] - 1], crop_data['season'], crop_data['etact'],
+                        crop_data['etpot'], crop_data['ppt'], crop_data['sro'], crop_data['dperc'], crop_data['sir'], crop_data['cir'])
                 except:
-                    logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) +  ' occurred computing seasonally adjusted crop type et data for ' +  self.cell_id + ' from RDB format\n')
+                    logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) +  ' occurred computing seasonally adjusted crop type et data for ' +  self.cell_id + ' from ' + cfg.input_cet['data_structure_type'] + ' format\n')
                     return False
+                crop_fields['cet'][:, ctCount] = cet
+                crop_fields['effprcp'][:, ctCount] = effprcp
+                crop_fields['cir'][:, ctCount] = cir
+                crop_fields['season'][:, ctCount] = crop_data['season']
 
-                if ctCount == 0:
-                    # store ET Cell reference ET and precip if first crop
-
-                    self.etcData_df = mod_dmis.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
-                    self.etcData_df['refet'] = crop_df['refet']
-                    self.etcData_df['ppt'] = crop_df['ppt']
+            # store ET Cell reference ET and precip of first crop
 
-                # drop unused columns
+            self.etcData_df = mod_dmis.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
+            self.etcData_df['refet'] = pd.Series(cet_data[:, 0, field_keys.index('refet')], index = dates)
+            self.etcData_df['ppt'] = pd.Series(cet_data[:, 0, field_keys.index('ppt')], index = dates)
 
-                for fn in list(crop_df.columns):
-                    if fn not in ['date', 'year', 'cet', 'effprcp', 'cir', 'season']:
-                        crop_df.drop(fn, axis = 1, inplace = True)
-
-                # add crop number column
+            # crop type data indexed by crop number and date
 
-                crop_df['Crop Num'] = self.usedCropTypes[ctCount]
-                crop_df.reset_index(inplace = True)
-                crops_dict[self.usedCropTypes[ctCount]] = crop_df
-                del crop_df
-            del rdb_cet_df
-            self.crops_df = pd.concat(crops_dict)
-            self.crops_df.set_index(['Crop Num', 'date'], inplace = True)
+            self.crops_df = pd.DataFrame(
+                {'year': np.tile(dates.year, self.numUsedCropTypes)},
+                index = pd.MultiIndex.from_product([self.usedCropTypes, dates], names = ['Crop Num', 'date']))
+            for field_key in ['cet', 'effprcp', 'cir', 'season']:
+                self.crops_df[field_key] = crop_fields[field_key].T.ravel()
             return True
         except:
-            logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) +  ' occurred processing ET Cell crop type data for ' +  self.cell_id + ' from RDB format\n')
+            logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) +  ' occurred processing ET Cell crop type data for ' +  self.cell_id + ' from ' + cfg.input_cet['data_structure_type'] + ' format\n')
             return False
 
     def dist_ngs_to_gs(self, cfg):
@@ -760,73 +569,14 @@ class ETCell():
             self.etcCropIRs_df = mod_dmis.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
             self.etcCropETs_df = mod_dmis.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
 
-            # loop thru ET Cell's (user) crops
+            if cfg.crop_matrix_flag:
+                # weight all crops at once as days by crops matrices
 
-            for cCount in range(0, len(self.user_crops_list)):
-                logging.debug ("Computing weighted irrigation requirements for " + self.cell_id +  " crop " + self.user_crops_list[cCount])
-                cet_col_name = self.cell_id + "." + self.user_crops_list[cCount] + " " + cfg.output_cet['fields']['cet']
-                self.etcCropETs_df[cet_col_name] = np.zeros((cfg.number_days), dtype = float)
-                cir_col_name = self.cell_id + "." + self.user_crops_list[cCount] + " " + cfg.output_cir['fields']['cir']
-                self.etcCropIRs_df[cir_col_name] = np.zeros((cfg.number_days), dtype = float)
-                try:
-                    crop_mix_df = self.crops_mix_df[self.crops_mix_df['UserCropName'] == self.user_crops_list[cCount]]
-                except: continue
-                crop_mix_df.set_index('year', inplace = True, drop = True)
-                ct_index = self.crop_type_index(crop_mix_df['CropNumber'][cfg.start_dt.year])
-
-                # set up crop by crop and weighted output
-
-                if ct_index > -1:
-                    # pick up crop cir's and et's and compute straight ET Cell cir's, et's and eff precip for current year
-
-                    ct_df = self.crops_df.xs(crop_mix_df['CropNumber'][cfg.start_dt.year], level = 0, drop_level = False)
-                    ct_df.reset_index(inplace = True)
-                    ct_df.set_index('date', inplace = True)
-
-                    # following loop is really really slow; unclear how to speed it up
-                    # for dt, ctdata in ct_df.iterrows():
-                    #     year_to_use = dt.year
-                    #     if aet_utils.date_is_between(dt, self.ann_crops_df['UserBegDate'][year_to_use], self.ann_crops_df['UserEndDate'][year_to_use]):
-                    #
-                    #         self.etcCropETs_df.at[dt, cet_col_name] = ctdata['cet']
-                    #         self.etcData_df.at[dt, 'et'] = self.etcData_df.at[dt, 'et'] + ctdata['cet'] * crop_mix_df['CropPercents'][year_to_use] * 0.001
-                    #
-                    #         if aet_utils.date_is_between(dt, crop_mix_df['UserBegDate'][year_to_use], crop_mix_df['UserEndDate'][year_to_use]):
-                    #             self.etcData_df.at[dt, 'effprcp'] = self.etcData_df.at[dt, 'effprcp'] + ctdata['effprcp']  * crop_mix_df['CropPercents'][year_to_use] * 0.001
-                    #             self.etcData_df.at[dt, 'season'] = 1
-                    #             self.etcCropIRs_df.at[dt, cir_col_name] = ctdata['cir']
-                    #     del ct_df
-                    # del crop_mix_df
-
-                    # Reconfigure for performance
-                    dt_list = ct_df.index
-
-                    year_to_use = [dt.year for dt in dt_list]
-                    check_bool = [True if self.ann_crops_df['UserBegDate'][year_to_use[x]] <= dt_list[x] <= self.ann_crops_df['UserEndDate'][year_to_use[x]] else False
-                                  for x in range(0, len(dt_list), 1)]
-
-                    dt_list_reduced = [dt_list[x] for x in range(0, len(check_bool), 1) if check_bool[x]]
-                    year_to_use_reduced = [year_to_use[x] for x in range(0, len(check_bool), 1) if check_bool[x]]
-
-                    ctdata_list_reduced = [ct_df.at[x, 'cet'] for x in dt_list_reduced]
-                    self.etcCropETs_df.loc[dt_list_reduced, cet_col_name] = ctdata_list_reduced
-
-                    values_list = [self.etcData_df.at[dt_list_reduced[x], 'et'] + ct_df.at[dt_list_reduced[x], 'cet'] * crop_mix_df['CropPercents'][year_to_use_reduced[x]] * 0.001
-                                   for x in range(0, len(dt_list_reduced), 1)]
-                    self.etcData_df.loc[dt_list_reduced, 'et'] = values_list
-
-                    season_list = [True if crop_mix_df['UserBegDate'][year_to_use[x]] <= dt_list[x] <= crop_mix_df['UserEndDate'][year_to_use[x]] else False
-                                    for x in range(0, len(dt_list), 1)]
-                    dt_list_reduced = [dt_list[x] for x in range(0, len(check_bool), 1) if season_list[x]]
-                    year_to_use_reduced = [year_to_use[x] for x in range(0, len(check_bool), 1) if season_list[x]]
-
-                    values_list = [self.etcData_df.at[dt_list_reduced[x], 'effprcp'] + ct_df.at[dt_list_reduced[x], 'effprcp'] * crop_mix_df['CropPercents'][year_to_use_reduced[x]] * 0.001
-                                   for x in range(0, len(dt_list_reduced), 1)]
-                    self.etcData_df.loc[dt_list_reduced, 'effprcp'] = values_list
-                    self.etcData_df.loc[dt_list_reduced, 'season'] = 1
-
-                    values_list = [ct_df.at[x, 'cir'] for x in dt_list_reduced]
-                    self.etcCropIRs_df.loc[dt_list_reduced, cir_col_name] = values_list
+                ann_mask = self.weight_crop_matrices(cfg)
+            else:
+                # loop thru ET Cell's (user) crops
+
+                self.weight_crop_loop(cfg)
 
             # apply no negative ir's to crop by crop ir's if toggled
 
@@ -844,8 +594,8 @@ class ETCell():
 
                 # compute annual sums
 
-                unadj_ann_df = self.etcCropIRs_df.resample('AS').apply( aggregation_func)
-                adj_ann_df = adj_daily_df.resample('AS').apply( aggregation_func)
+                unadj_ann_df = period_agg.aggregate_df(self.etcCropIRs_df, aggregation_func, 'year')
+                adj_ann_df = period_agg.aggregate_df(adj_daily_df, aggregation_func, 'year')
                 del aggregation_func
 
                 # compute annual ratios for retaining annual totals
@@ -916,7 +666,7 @@ class ETCell():
                 aggregation_func = {}
                 for col_name in list(daily_df.columns):
                     aggregation_func.update({col_name: np.sum})
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_agg.aggregate_df(daily_df, aggregation_func, 'year')
                 del aggregation_func
 
                 # compute annual ratios
@@ -931,7 +681,7 @@ class ETCell():
                 daily_df['et'] = apply_annual_ratios(cfg.start_dt, daily_df.index, daily_df['smoothed'].values, annual_df['ratios'].values)
                 aggregation_func.update({'et': np.sum})
                 del annual_df
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_agg.aggregate_df(daily_df, aggregation_func, 'year')
                 del aggregation_func
                 # print "annual df\n", annual_df.head(5)
                 self.etcData_df['et'] = daily_df['et'].values
@@ -940,13 +690,20 @@ class ETCell():
                 del daily_df, annual_df
 
             # compute ET cell net irrigation requirement
-            for dt, dailydata in self.etcData_df.iterrows():
-                year_to_use = dt.year
-                if (aet_utils.date_is_between(dt, self.ann_crops_df['UserBegDate'][year_to_use], \
-                        self.ann_crops_df['UserEndDate'][year_to_use]) and dailydata['season'] == 1):
-                    self.etcData_df.at[dt, 'nir'] = dailydata['et'] - dailydata['effprcp']
-                else:
-                    self.etcData_df.at[dt, 'effprcp'] = 0.0
+            if cfg.crop_matrix_flag:
+                nir_mask = ann_mask & (self.etcData_df['season'].values == 1)
+                self.etcData_df['nir'] = np.where(nir_mask,
+                    self.etcData_df['et'].values - self.etcData_df['effprcp'].values, 0.0)
+                self.etcData_df['effprcp'] = np.where(nir_mask, self.etcData_df['effprcp'].values, 0.0)
+                del ann_mask, nir_mask
+            else:
+                for dt, dailydata in self.etcData_df.iterrows():
+                    year_to_use = dt.year
+                    if (aet_utils.date_is_between(dt, self.ann_crops_df['UserBegDate'][year_to_use], \
+                            self.ann_crops_df['UserEndDate'][year_to_use]) and dailydata['season'] == 1):
+                        self.etcData_df.at[dt, 'nir'] = dailydata['et'] - dailydata['effprcp']
+                    else:
+                        self.etcData_df.at[dt, 'effprcp'] = 0.0
 
             # apply no negative ir's to weighted ir's if toggled
 
@@ -961,7 +718,7 @@ class ETCell():
                 aggregation_func = {}
                 for col_name in list(daily_df.columns):
                     aggregation_func.update({col_name: np.sum})
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_agg.aggregate_df(daily_df, aggregation_func, 'year')
                 del aggregation_func
 
                 # compute annual ratios
@@ -989,7 +746,7 @@ class ETCell():
                 aggregation_func = {}
                 for col_name in list(daily_df.columns):
                     aggregation_func.update({col_name: np.sum})
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_agg.aggregate_df(daily_df, aggregation_func, 'year')
                 del aggregation_func
 
                 # compute annual ratios
@@ -1007,7 +764,7 @@ class ETCell():
             aggregation_func = {}
             for col_name in list(daily_df.columns):
                 aggregation_func.update({col_name: np.sum})
-            monthly_df = daily_df.resample('MS').apply( aggregation_func)
+            monthly_df = period_agg.aggregate_df(daily_df, aggregation_func, 'month')
             del aggregation_func
             self.etcData_df['nirfrac'] = compute_daily_fractions(cfg.start_dt, daily_df.index, daily_df['nir'].values, monthly_df['nir'].values)
             del daily_df, monthly_df
@@ -1029,6 +786,127 @@ class ETCell():
             logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) + " processing ET Cell requirements for " + self.cell_id + ".")
             return False
 
+    def weight_crop_loop(self, cfg):
+        """Weight crop requirements of user crops one crop at a time
+
+        Parameters:
+            cfg: configuration data from INI file
+
+        Returns:
+            None
+        """
+        for cCount in range(0, len(self.user_crops_list)):
+            logging.debug ("Computing weighted irrigation requirements for " + self.cell_id +  " crop " + self.user_crops_list[cCount])
+            cet_col_name = self.cell_id + "." + self.user_crops_list[cCount] + " " + cfg.output_cet['fields']['cet']
+            self.etcCropETs_df[cet_col_name] = np.zeros((cfg.number_days), dtype = float)
+            cir_col_name = self.cell_id + "." + self.user_crops_list[cCount] + " " + cfg.output_cir['fields']['cir']
+            self.etcCropIRs_df[cir_col_name] = np.zeros((cfg.number_days), dtype = float)
+            try:
+                crop_mix_df = self.crops_mix_df[self.crops_mix_df['UserCropName'] == self.user_crops_list[cCount]]
+            except: continue
+            crop_mix_df.set_index('year', inplace = True, drop = True)
+            ct_index = self.crop_type_index(crop_mix_df['CropNumber'][cfg.start_dt.year])
+
+            # set up crop by crop and weighted output
+
+            if ct_index > -1:
+                # pick up crop cir's and et's and compute straight ET Cell cir's, et's and eff precip for current year
+
+                ct_df = self.crops_df.xs(crop_mix_df['CropNumber'][cfg.start_dt.year], level = 0, drop_level = False)
+                ct_df.reset_index(inplace = True)
+                ct_df.set_index('date', inplace = True)
+
+                # following loop is really really slow; unclear how to speed it up
+                # for dt, ctdata in ct_df.iterrows():
+                #     year_to_use = dt.year
+                #     if aet_utils.date_is_between(dt, self.ann_crops_df['UserBegDate'][year_to_use], self.ann_crops_df['UserEndDate'][year_to_use]):
+                #
+                #         self.etcCropETs_df.at[dt, cet_col_name] = ctdata['cet']
+                #         self.etcData_df.at[dt, 'et'] = self.etcData_df.at[dt, 'et'] + ctdata['cet'] * crop_mix_df['CropPercents'][year_to_use] * 0.001
+                #
+                #         if aet_utils.date_is_between(dt, crop_mix_df['UserBegDate'][year_to_use], crop_mix_df['UserEndDate'][year_to_use]):
+                #             self.etcData_df.at[dt, 'effprcp'] = self.etcData_df.at[dt, 'effprcp'] + ctdata['effprcp']  * crop_mix_df['CropPercents'][year_to_use] * 0.001
+                #             self.etcData_df.at[dt, 'season'] = 1
+                #             self.etcCropIRs_df.at[dt, cir_col_name] = ctdata['cir']
+                #     del ct_df
+                # del crop_mix_df
+
+                # Reconfigure for performance
+                dt_list = ct_df.index
+
+                year_to_use = [dt.year for dt in dt_list]
+                check_bool = [True if self.ann_crops_df['UserBegDate'][year_to_use[x]] <= dt_list[x] <= self.ann_crops_df['UserEndDate'][year_to_use[x]] else False
+                              for x in range(0, len(dt_list), 1)]
+
+                dt_list_reduced = [dt_list[x] for x in range(0, len(check_bool), 1) if check_bool[x]]
+                year_to_use_reduced = [year_to_use[x] for x in range(0, len(check_bool), 1) if check_bool[x]]
+
+                ctdata_list_reduced = [ct_df.at[x, 'cet'] for x in dt_list_reduced]
+                self.etcCropETs_df.loc[dt_list_reduced, cet_col_name] = ctdata_list_reduced
+
+                values_list = [self.etcData_df.at[dt_list_reduced[x], 'et'] + ct_df.at[dt_list_reduced[x], 'cet'] * crop_mix_df['CropPercents'][year_to_use_reduced[x]] * 0.001
+                               for x in range(0, len(dt_list_reduced), 1)]
+                self.etcData_df.loc[dt_list_reduced, 'et'] = values_list
+
+                season_list = [True if crop_mix_df['UserBegDate'][year_to_use[x]] <= dt_list[x] <= crop_mix_df['UserEndDate'][year_to_use[x]] else False
+                                for x in range(0, len(dt_list), 1)]
+                dt_list_reduced = [dt_list[x] for x in range(0, len(check_bool), 1) if season_list[x]]
+                year_to_use_reduced = [year_to_use[x] for x in range(0, len(check_bool), 1) if season_list[x]]
+
+                values_list = [self.etcData_df.at[dt_list_reduced[x], 'effprcp'] + ct_df.at[dt_list_reduced[x], 'effprcp'] * crop_mix_df['CropPercents'][year_to_use_reduced[x]] * 0.001
+                               for x in range(0, len(dt_list_reduced), 1)]
+                self.etcData_df.loc[dt_list_reduced, 'effprcp'] = values_list
+                self.etcData_df.loc[dt_list_reduced, 'season'] = 1
+
+                values_list = [ct_df.at[x, 'cir'] for x in dt_list_reduced]
+                self.etcCropIRs_df.loc[dt_list_reduced, cir_col_name] = values_list
+
+    def weight_crop_matrices(self, cfg):
+        """Weight crop requirements of all user crops at once
+
+        Crop type rates and crop mix percents are aligned as days by crops
+            matrices and ET Cell et and effective precipitation are the
+            row products of masked rates and percents
+
+        Parameters:
+            cfg: configuration data from INI file
+
+        Returns:
+            ann_mask: True for days in ET Cell annual window
+        """
+        dt = self.etcData_df.index
+        logging.debug("Computing weighted irrigation requirements for " + self.cell_id + " crop matrices")
+
+        # crop types of user crops as of start year
+
+        start_mix_df = self.crops_mix_df[self.crops_mix_df['year'] == cfg.start_dt.year]
+        crop_numbers = start_mix_df.drop_duplicates('UserCropName').set_index('UserCropName')['CropNumber'].reindex(self.user_crops_list).values
+        used_crops = np.array([self.crop_type_index(crop_number) > -1 for crop_number in crop_numbers], dtype = bool)
+
+        cet_rates, effprcp_rates, cir_rates = crop_rate_matrices(dt, self.crops_df, crop_numbers, ['cet', 'effprcp', 'cir'])
+        ann_mask, season_mask, weights = crop_mix_matrices(dt, self.user_crops_list, self.crops_mix_df, self.ann_crops_df)
+        season_mask &= used_crops
+
+        # crop by crop et's in annual window and cir's in crop season
+
+        cet_rates = np.where(ann_mask[:, np.newaxis] & used_crops, cet_rates, 0.0)
+        effprcp_rates = np.where(season_mask, effprcp_rates, 0.0)
+        cir_rates = np.where(season_mask, cir_rates, 0.0)
+        cet_col_names = [self.cell_id + "." + crop + " " + cfg.output_cet['fields']['cet'] for crop in self.user_crops_list]
+        cir_col_names = [self.cell_id + "." + crop + " " + cfg.output_cir['fields']['cir'] for crop in self.user_crops_list]
+        self.etcCropETs_df = pd.DataFrame(cet_rates, index = self.etcCropETs_df.index, columns = cet_col_names)
+        self.etcCropIRs_df = pd.DataFrame(cir_rates, index = self.etcCropIRs_df.index, columns = cir_col_names)
+
+        # area weighted et and effective precipitation as one product
+        # crops without a percent for a year are skipped as in crop loop
+
+        weights = np.nan_to_num(weights)
+        weighted = np.einsum('fdc,dc->fd', np.stack([cet_rates, effprcp_rates]), weights)
+        self.etcData_df['et'] = weighted[0]
+        self.etcData_df['effprcp'] = weighted[1]
+        self.etcData_df['season'] = season_mask.any(axis = 1).astype(int)
+        return ann_mask
+
     def setup_output_aet_data(self, cell_count, cfg, cells):
         """Set up aet output data
 
@@ -1094,10 +972,10 @@ class ETCell():
                     aggregation_func.update({fn: np.sum})
             if cfg.monthly_output_aet_flag:
                 # monthly_output_aet_df = self.etcData_df.resample('MS').apply( aggregation_func)
-                monthly_output_aet_df = self.etcData_df.resample('M').apply( aggregation_func)
+                monthly_output_aet_df = period_agg.aggregate_df(self.etcData_df, aggregation_func, 'month', label = 'end')
             if cfg.annual_output_aet_flag:
                 # annual_output_aet_df = self.etcData_df.resample('AS').apply( aggregation_func)
-                annual_output_aet_df = self.etcData_df.resample('A').apply( aggregation_func)
+                annual_output_aet_df = period_agg.aggregate_df(self.etcData_df, aggregation_func, 'year', label = 'end')
 
             # set up output fields
 
@@ -1261,62 +1139,21 @@ class ETCell():
                     del annual_output_aet_df, annual_output_aet_path, adj_annual_fields
             else:    # formats other than SF P
                 logging.debug('Processing specified area et data by parameter')
-                if cell_count == 1:
-                    logging.warning('Setting up specified area et data by parameter')
-
-                    # construct empty data frame for each output parameter
-
-                    if cfg.daily_output_aet_flag:
-                        daily_index = pd.date_range(cfg.start_dt, cfg.end_dt, freq = "D", name = "Date")
-                        daily_index = daily_index + pd.Timedelta( \
-                            hours = cfg.output_aet['daily_hour_offset'], \
-                            minutes = cfg.output_aet['daily_minute_offset'])
-                        for field_name in adj_daily_fields:
-                            if field_name.lower() in ['year', 'month', 'day', 'doy']: continue
-                            cells.cell_daily_output_aet_data[field_name] = pd.DataFrame(index = daily_index)
-                    if cfg.monthly_output_aet_flag:
-                        monthly_index = pd.date_range(cfg.start_dt, cfg.end_dt, freq = "M", name = "Date")
-                        monthly_index = monthly_index + pd.Timedelta( \
-                            hours = cfg.output_aet['monthly_hour_offset'], \
-                            minutes = cfg.output_aet['monthly_minute_offset'])
-                        for field_name in adj_monthly_fields:
-                            if field_name.lower() in ['year', 'month', 'day', 'doy']: continue
-                            cells.cell_monthly_output_aet_data[field_name] = pd.DataFrame(index = monthly_index)
-                    if cfg.annual_output_aet_flag:
-                        annual_index = pd.date_range(cfg.start_dt, cfg.end_dt, freq = "A", name = "Date")
-                        annual_index = annual_index + pd.Timedelta( \
-                            hours = cfg.output_aet['annual_hour_offset'], \
-                            minutes = cfg.output_aet['annual_minute_offset'])
-                        for field_name in adj_annual_fields:
-                            if field_name.lower() in ['year', 'month', 'day', 'doy']: continue
-                            cells.cell_annual_output_aet_data[field_name] = pd.DataFrame(index = annual_index)
+
+                # append cell output to parameter sinks
+
                 if cfg.daily_output_aet_flag:
-                    for field_name in adj_daily_fields:
-                        if field_name.lower() in ['year', 'month', 'day', 'doy']: continue
-                        param_df = cells.cell_daily_output_aet_data.get(field_name)
-                        sp_name = self.cell_id + "." + field_name
-                        param_df[sp_name] = self.etcData_df[field_name].values
-                        cells.cell_daily_output_aet_data[field_name] = param_df
-                        del param_df
-                    del self.etcData_df, adj_daily_fields
+                    if not cells.aet_param_output.post_cell(self.cell_id, 'daily', self.etcData_df):
+                        return False
+                    del self.etcData_df
                 if cfg.monthly_output_aet_flag:
-                    for field_name in adj_monthly_fields:
-                        if field_name.lower() in ['year', 'month', 'day', 'doy']: continue
-                        param_df = cells.cell_monthly_output_aet_data.get(field_name)
-                        sp_name = self.cell_id + "." + field_name
-                        param_df[sp_name] = monthly_output_aet_df[field_name].values
-                        cells.cell_monthly_output_aet_data[field_name] = param_df
-                        del param_df
-                    del monthly_output_aet_df, adj_monthly_fields
+                    if not cells.aet_param_output.post_cell(self.cell_id, 'monthly', monthly_output_aet_df):
+                        return False
+                    del monthly_output_aet_df
                 if cfg.annual_output_aet_flag:
-                    for field_name in adj_annual_fields:
-                        if field_name.lower() in ['year', 'month', 'day', 'doy']: continue
-                        param_df = cells.cell_annual_output_aet_data.get(field_name)
-                        sp_name = self.cell_id + "." + field_name
-                        param_df[sp_name] = annual_output_aet_df[field_name].values
-                        cells.cell_annual_output_aet_data[field_name] = param_df
-                        del param_df
-                    del annual_output_aet_df, adj_annual_fields
+                    if not cells.aet_param_output.post_cell(self.cell_id, 'annual', annual_output_aet_df):
+                        return False
+                    del annual_output_aet_df
             return True;
         except:
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred setting up output aet data for {0}', format(self.cell_id))
@@ -1350,23 +1187,17 @@ class ETCell():
             # Check/modify units
 
             if cfg.output_cir['cir_units'].lower() == 'in*100':
-                for col_name in data_fields:
-                    self.etcCropIRs_df[col_name] /= 0.254
+                self.etcCropIRs_df[data_fields] /= 0.254
             elif cfg.output_cir['cir_units'].lower() == 'in*10':
-                for col_name in data_fields:
-                    self.etcCropIRs_df[col_name] /= 2.54
+                self.etcCropIRs_df[data_fields] /= 2.54
             elif cfg.output_cir['cir_units'].lower() in ['in', 'in/d', 'in/day', 'inches/day', 'inches']:
-                for col_name in data_fields:
-                    self.etcCropIRs_df[col_name] /= 25.4
+                self.etcCropIRs_df[data_fields] /= 25.4
             elif cfg.output_cir['cir_units'].lower() == 'm':
-                for col_name in data_fields:
-                    self.etcCropIRs_df[col_name] *= 0.001
+                self.etcCropIRs_df[data_fields] *= 0.001
             elif cfg.output_cir['cir_units'].lower() == 'm/day':
-                for col_name in data_fields:
-                    self.etcCropIRs_df[col_name] *= 0.001
+                self.etcCropIRs_df[data_fields] *= 0.001
             elif cfg.output_cir['cir_units'].lower() == 'meter':
-                for col_name in data_fields:
-                    self.etcCropIRs_df[col_name] *= 0.001
+                self.etcCropIRs_df[data_fields] *= 0.001
 
             # set up aggregations
 
@@ -1375,10 +1206,10 @@ class ETCell():
                 aggregation_func.update({col_name: np.sum})
             if cfg.monthly_output_cir_flag:
                 # monthly_output_cir_df = self.etcCropIRs_df.resample('MS').apply( aggregation_func)
-                monthly_output_cir_df = self.etcCropIRs_df.resample('M').apply( aggregation_func)
+                monthly_output_cir_df = period_agg.aggregate_df(self.etcCropIRs_df, aggregation_func, 'month', label = 'end')
             if cfg.annual_output_cir_flag:
                 # annual_output_cir_df = self.etcCropIRs_df.resample('AS').apply( aggregation_func)
-                annual_output_cir_df = self.etcCropIRs_df.resample('A').apply( aggregation_func)
+                annual_output_cir_df = period_agg.aggregate_df(self.etcCropIRs_df, aggregation_func, 'year', label = 'end')
 
             # set up output fields
 
@@ -1585,23 +1416,17 @@ class ETCell():
             # Check/modify units
 
             if cfg.output_cet['cet_units'].lower() == 'in*100':
-                for col_name in data_fields:
-                    self.etcCropETs_df[col_name] /= 0.254
+                self.etcCropETs_df[data_fields] /= 0.254
             elif cfg.output_cet['cet_units'].lower() == 'in*10':
-                for col_name in data_fields:
-                    self.etcCropETs_df[col_name] /= 2.54
+                self.etcCropETs_df[data_fields] /= 2.54
             elif cfg.output_cet['cet_units'].lower() in ['in', 'in/d', 'in/day', 'inches/day', 'inches']:
-                for col_name in data_fields:
-                    self.etcCropETs_df[col_name] /= 25.4
+                self.etcCropETs_df[data_fields] /= 25.4
             elif cfg.output_cet['cet_units'].lower() == 'm':
-                for col_name in data_fields:
-                    self.etcCropETs_df[col_name] *= 0.001
+                self.etcCropETs_df[data_fields] *= 0.001
             elif cfg.output_cet['cet_units'].lower() == 'm/day':
-                for col_name in data_fields:
-                    self.etcCropETs_df[col_name] *= 0.001
+                self.etcCropETs_df[data_fields] *= 0.001
             elif cfg.output_cet['cet_units'].lower() == 'meter':
-                for col_name in data_fields:
-                    self.etcCropETs_df[col_name] *= 0.001
+                self.etcCropETs_df[data_fields] *= 0.001
 
             # set up aggregations
 
@@ -1610,10 +1435,10 @@ class ETCell():
                 aggregation_func.update({col_name: np.sum})
             if cfg.monthly_output_cet_flag:
                 # monthly_output_cet_df = self.etcCropETs_df.resample('MS').apply( aggregation_func)
-                monthly_output_cet_df = self.etcCropETs_df.resample('M').apply( aggregation_func)
+                monthly_output_cet_df = period_agg.aggregate_df(self.etcCropETs_df, aggregation_func, 'month', label = 'end')
             if cfg.annual_output_cet_flag:
                 # annual_output_cet_df = self.etcCropETs_df.resample('AS').apply( aggregation_func)
-                annual_output_cet_df = self.etcCropETs_df.resample('A').apply( aggregation_func)
+                annual_output_cet_df = period_agg.aggregate_df(self.etcCropETs_df, aggregation_func, 'year', label = 'end')
 
             # set up output fields
 
@@ -1925,6 +1750,74 @@ def crop_percents(crop_mix_type, irr_area, area_or_percent):
         crop_percent = area_or_percent * 1000
     return crop_percent
 
+def crop_rate_matrices(dt, crops_df, crop_numbers, field_names):
+    """Align crop type rates as days by crops matrices
+
+    Parameters
+    ----------
+    dt :
+        DateTimeIndex
+    crops_df : pandas.DataFrame
+        crop type data indexed by crop number and date
+    crop_numbers : array
+        crop type number of each crop
+    field_names : list
+        crop type data fields
+
+    Returns
+    -------
+     : list
+        days by crops array of each field, zero for days and crop types
+        without data
+
+    """
+
+    rates = []
+    for field_name in field_names:
+        field_df = crops_df[field_name].unstack(level = 0, fill_value = 0.0)
+        rates.append(field_df.reindex(index = dt, columns = crop_numbers, fill_value = 0.0).values.astype(float))
+    return rates
+
+def crop_mix_matrices(dt, crops_list, crops_mix_df, ann_crops_df):
+    """Align annual crop mix as days by crops matrices
+
+    Parameters
+    ----------
+    dt :
+        DateTimeIndex
+    crops_list : list
+        user crop names
+    crops_mix_df : pandas.DataFrame
+        crop mix by year and user crop
+    ann_crops_df : pandas.DataFrame
+        annual totals indexed by year
+
+    Returns
+    -------
+    ann_mask : array
+        True for days in annual window
+    season_mask : array
+        days by crops, True for days in crop window
+    weights : array
+        days by crops crop fractions
+
+    """
+
+    years = dt.year
+    dates = dt.values[:, np.newaxis]
+    ann_df = ann_crops_df.reindex(years)
+    ann_mask = ((dt.values >= pd.to_datetime(ann_df['UserBegDate']).values) &
+                (dt.values <= pd.to_datetime(ann_df['UserEndDate']).values))
+
+    def mix_matrix(field_name):
+        return crops_mix_df.pivot(index = 'year', columns = 'UserCropName',
+            values = field_name).reindex(index = years, columns = crops_list)
+
+    season_mask = ((dates >= mix_matrix('UserBegDate').apply(pd.to_datetime).values) &
+                   (dates <= mix_matrix('UserEndDate').apply(pd.to_datetime).values))
+    weights = mix_matrix('CropPercents').values.astype(float) * 0.001
+    return ann_mask, season_mask, weights
+
 def calculate_ratios(c1, c2):
     """Calculate ratios of two NumPy arrays or df columns
 
@@ -2073,18 +1966,11 @@ def compute_annual_volume(years, flow_values, units):
         volumes
 
     """
-    volume_values = np.copy(flow_values)
-    for yCount, year in enumerate(years):
-        if ("acre-feet" in units.lower() or "af" in units.lower() or "acre-ft" in units.lower()):
-            if (year % 400 == 0 or year % 100 == 0 or year % 4 == 0):
-                volume_values[yCount] = flow_values[yCount] * 366 * 1.983471074
-            else:
-                volume_values[yCount] = flow_values[yCount] * 365 * 1.983471074
-        else:
-            if (year % 400 == 0 or year % 100 == 0 or year % 4 == 0):
-                volume_values[yCount] = flow_values[yCount] * 366 * 86400.0
-            else:
-                volume_values[yCount] = flow_values[yCount] * 365 * 86400.0
+    year_days = np.where(np.asarray(years) % 4 == 0, 366, 365)
+    if ("acre-feet" in units.lower() or "af" in units.lower() or "acre-ft" in units.lower()):
+        volume_values = flow_values * year_days * 1.983471074
+    else:
+        volume_values = flow_values * year_days * 86400.0
     return volume_values
 
 def compute_daily_fractions(ref_date, dt, daily_values, monthly_values):
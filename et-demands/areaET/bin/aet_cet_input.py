@@ -0,0 +1,263 @@
+"""aet_cet_input.py
+Reads CropET output of an ET cell in one pass
+Each used crop type file (DRI) or the cell file (RDB) is read once for the
+    configured fields only with the C parser, DRI files in parallel threads,
+    and the crop records are aligned as one days by crops by fields array
+CropET output computed in process is taken from memory instead of files
+Defines input_cet_path, cet_field_keys, frame_cet, read_cet_file,
+    read_cell_cet
+Called by aet_cells.py
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Field keys used to build dates instead of read as data
+date_keys = ['date', 'year', 'month', 'day', 'hour', 'doy']
+
+# Field key of RDB crop number column
+crop_num_key = 'Crop Num'
+
+def input_cet_path(cfg, cell_id, crop_number = None):
+    """Return path of CropET output file
+
+    Parameters
+    ----------
+    cfg :
+        configuration data from INI file
+    cell_id : str
+        ET cell id
+    crop_number : int
+        crop type number of DRI file, None for RDB file
+
+    Returns
+    -------
+     : str
+        file path
+
+    """
+
+    if crop_number is None:
+        return os.path.join(cfg.input_cet['ws'], cfg.input_cet['name_format'].replace('%s', cell_id)).replace("%c", "")
+    return os.path.join(cfg.input_cet['ws'], cfg.input_cet['name_format'].replace('%c', '%02d' % crop_number) % cell_id)
+
+def cet_field_keys(file_fields, cfg, source_name, index_dates_flag = False):
+    """Map configured field names of CropET output to field keys
+
+    Parameters
+    ----------
+    file_fields : list
+        field names of CropET output
+    cfg :
+        configuration data from INI file
+    source_name : str
+        file or data name used in messages
+    index_dates_flag : bool
+        True if dates are the index and date fields are not needed
+
+    Returns
+    -------
+     : dict
+        field keys by field name, None if a required field is missing
+
+    """
+
+    field_keys = {}
+    for field_key, field_name in cfg.input_cet['fields'].items():
+        if field_name is None: continue
+        if index_dates_flag and field_key in date_keys: continue
+        if field_name not in file_fields:
+            if cfg.input_cet['fnspec'][field_key].lower() == 'estimated': continue
+            if cfg.input_cet['fnspec'][field_key].lower() == 'unused': continue
+            logging.error(('\n  ERROR: Field "{0}" was not found in {1}\n' +
+                           '    Check {2}_field value in INI file').format(
+                           field_name, source_name, field_key))
+            return None
+        field_keys[field_name] = field_key
+    return field_keys
+
+def frame_cet(cet_df, cfg, source_name):
+    """Select configured fields of date indexed CropET output in memory
+
+    Parameters
+    ----------
+    cet_df : pandas.DataFrame
+        CropET daily output indexed by date
+    cfg :
+        configuration data from INI file
+    source_name : str
+        data name used in messages
+
+    Returns
+    -------
+     : pandas.DataFrame
+        data fields renamed to field keys and indexed by date,
+        None if a required field is missing
+
+    """
+
+    field_keys = cet_field_keys(list(cet_df.columns), cfg, source_name, index_dates_flag = True)
+    if field_keys is None:
+        return None
+    cet_df = cet_df[[fn for fn in cet_df.columns if fn in field_keys]].rename(columns = field_keys)
+    cet_df.index = pd.DatetimeIndex(cet_df.index, name = 'date')
+    return cet_df
+
+def read_cet_file(input_cet_path, cfg, crop_num_flag = False):
+    """Read configured fields of a CropET output file
+
+    Parameters
+    ----------
+    input_cet_path : str
+        file path
+    cfg :
+        configuration data from INI file
+    crop_num_flag : bool
+        True to read first column as crop number (RDB)
+
+    Returns
+    -------
+     : pandas.DataFrame
+        data fields renamed to field keys and indexed by date,
+        None if file could not be read
+
+    """
+
+    logging.debug('  {0}'.format(input_cet_path))
+
+    # Get list of 0 based line numbers to skip
+    # Ignore header but assume header was set as 1's based index
+    data_skip = [i for i in range(cfg.input_cet['header_lines']) if i + 1 != cfg.input_cet['names_line']]
+    read_kwargs = dict(header = cfg.input_cet['names_line'] - len(data_skip) - 1,
+        skiprows = data_skip, sep = cfg.input_cet['delimiter'], comment = "#")
+    try:
+        file_fields = list(pd.read_csv(input_cet_path, nrows = 0, **read_kwargs).columns)
+    except:
+        logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) + ' occurred reading {}'.format(input_cet_path))
+        return None
+
+    field_keys = cet_field_keys(file_fields, cfg, os.path.basename(input_cet_path))
+    if field_keys is None:
+        return None
+    if crop_num_flag:
+        field_keys[file_fields[0]] = crop_num_key
+    try:
+        cet_df = pd.read_csv(input_cet_path, engine = 'c', usecols = list(field_keys),
+            na_values = ['NaN'], **read_kwargs)
+    except:
+        logging.error('\n  ERROR: ' + str(sys.exc_info()[0]) + ' occurred reading {}'.format(input_cet_path))
+        return None
+    cet_df.rename(columns = field_keys, inplace = True)
+
+    # Convert date strings to datetimes and index on date
+
+    if cfg.input_cet['fields']['date'] is not None:
+        dates = pd.to_datetime(cet_df['date'])
+    elif cfg.time_step == 'day':
+        dates = pd.to_datetime(cet_df[['year', 'month', 'day']])
+    else:
+        dates = pd.to_datetime(cet_df[['year', 'month', 'day', 'hour']])
+    cet_df.index = pd.DatetimeIndex(dates, name = 'date')
+    return cet_df.drop(columns = [fn for fn in date_keys if fn in cet_df.columns])
+
+def read_cell_cet(cfg, cell_id, crop_numbers, cet_frames = None):
+    """Read CropET output of used crop types of an ET cell
+
+    Parameters
+    ----------
+    cfg :
+        configuration data from INI file
+    cell_id : str
+        ET cell id
+    crop_numbers : list
+        used crop type numbers
+    cet_frames : dict
+        CropET daily output in memory by crop type number, read from
+        files if None
+
+    Returns
+    -------
+    dates :
+        DateTimeIndex of first crop type truncated to run period
+    cet_data : array
+        days by crops by fields values, NaN for days missing in a crop
+    field_keys : list
+        field keys of last axis, in configured field order
+    None if data could not be read
+
+    Notes
+    -----
+    cfg.start_dt and cfg.end_dt are set from first crop type if not set.
+
+    """
+
+    if cet_frames is not None:
+        crop_dfs = []
+        for crop_number in crop_numbers:
+            source_name = 'crop {0:02d} of ET cell {1}'.format(crop_number, cell_id)
+            if crop_number not in cet_frames:
+                logging.error('ERROR:  crop et data of {} was not computed'.format(source_name))
+                return None
+            crop_dfs.append(frame_cet(cet_frames[crop_number], cfg, source_name))
+        if any(crop_df is None for crop_df in crop_dfs):
+            return None
+    elif cfg.input_cet['data_structure_type'].upper() == 'DRI':
+        input_cet_paths = [input_cet_path(cfg, cell_id, crop_number) for crop_number in crop_numbers]
+        for path in input_cet_paths:
+            if not os.path.isfile(path):
+                logging.error('ERROR:  input crop et file {} does not exist'.format(path))
+                return None
+        with ThreadPoolExecutor(max_workers = cfg.input_cet['read_threads']) as executor:
+            crop_dfs = list(executor.map(lambda path: read_cet_file(path, cfg), input_cet_paths))
+        if any(crop_df is None for crop_df in crop_dfs):
+            return None
+    else:
+        path = input_cet_path(cfg, cell_id)
+        if not os.path.isfile(path):
+            logging.error('ERROR:  input crop et file {} does not exist'.format(path))
+            return None
+        rdb_cet_df = read_cet_file(path, cfg, crop_num_flag = True)
+        if rdb_cet_df is None:
+            return None
+        crop_nums = rdb_cet_df.pop(crop_num_key).astype(int).values
+        crop_dfs = [rdb_cet_df[crop_nums == crop_number] for crop_number in crop_numbers]
+
+    # verify period
+
+    first_df = crop_dfs[0]
+    if len(first_df.index) > 0:
+        if cfg.start_dt is None:
+            pydt = first_df.index[0]
+            cfg.start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
+        if cfg.end_dt is None:
+            pydt = first_df.index[len(first_df) - 1]
+            cfg.end_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
+
+    # truncate period
+
+    try:
+        dates = first_df.truncate(before = cfg.start_dt, after = cfg.end_dt).index
+    except:
+        logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input crop ET data')
+        return None
+    if len(dates) < 1:
+        logging.error('No values found reading crop et data')
+        return None
+
+    # align crop records, fields in configured order for files and frames
+
+    field_keys = [fk for fk in cfg.input_cet['fields'] if fk in first_df.columns]
+    cet_data = np.empty((len(dates), len(crop_dfs), len(field_keys)), dtype = float)
+    for ctCount, crop_df in enumerate(crop_dfs):
+        cet_data[:, ctCount, :] = crop_df.reindex(index = dates, columns = field_keys).values
+    return dates, cet_data, field_keys
+
+if __name__ == '__main__':
+    pass
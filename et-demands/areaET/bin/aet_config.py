@@ -166,6 +166,26 @@ class AreaETConfig():
         self.output_cir = {}
         self.output_cir['data_structure_type'] = 'SF P'
 
+        # Workbook output streaming flag
+        # Streamed workbooks are rewritten in constant memory and replace
+        # existing workbook content instead of being merged with it
+
+        try:
+            self.wb_stream_flag = config.getboolean(project_sec, 'wb_stream_flag')
+        except:
+            logging.debug('    wb_stream_flag = False')
+            self.wb_stream_flag = False
+
+        # Crop matrix flag
+        # Crop mix weighting of ET Cell requirements is computed for all
+        # crops at once from days by crops matrices instead of crop by crop
+
+        try:
+            self.crop_matrix_flag = config.getboolean(project_sec, 'crop_matrix_flag')
+        except:
+            logging.debug('    crop_matrix_flag = True')
+            self.crop_matrix_flag = True
+
         # static (aka) meta data specfications
 
         try:
@@ -464,6 +484,15 @@ class AreaETConfig():
         except:
             self.input_cet['delimiter'] = '.'
 
+        # Number of threads reading DRI crop type files of a cell
+
+        try:
+            self.input_cet['read_threads'] = config.getint(input_cet_sec, 'read_threads')
+            if self.input_cet['read_threads'] is None or self.input_cet['read_threads'] < 1:
+                self.input_cet['read_threads'] = 4
+        except:
+            self.input_cet['read_threads'] = 4
+
         # Date can be read directly or computed from year, month, and day
 
         try: self.input_cet['fields']['date'] = config.get(input_cet_sec, 'date_field')
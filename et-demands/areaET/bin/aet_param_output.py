@@ -0,0 +1,286 @@
+"""aet_param_output.py
+Defines AETParamOutput class
+Posts area et output with parameter orientation (formats other than SF P)
+    Output of each cell is appended to open per parameter sinks as soon as
+    the cell is computed and released, so memory does not grow with the
+    number of cells
+    Column slot, workbook and columnar values are spooled to binary files
+    that are memory mapped when posted; rdb records are spooled as text
+    The spool folder is removed on close or, if the run exits before, at
+    interpreter exit
+Called by aet_cells.py and mod_area_et.py
+
+"""
+
+import atexit
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../lib')))
+import mod_dmis
+import period_agg
+
+# Supported file types
+text_file_types = ['csf', 'rdb']
+wb_file_types = ['xls', 'wb']
+columnar_file_types = ['parquet']
+
+class AETParamOutput():
+    """Parameter oriented area et output posted cell by cell
+
+    Attributes
+    ----------
+    cfg :
+        configuration data from INI file
+    file_type : str
+        lower case output file type
+    periods : list
+        posted periods ('daily', 'monthly', 'annual')
+    field_keys : dict
+        output field keys by field name
+    spool_ws : str
+        folder of spooled cell output, removed when posted
+    indexes : dict
+        DateTimeIndex by period, set from first posted cell
+    column_names : dict
+        posted station.parameter names by period and field name
+    spool_files : dict
+        open binary spool files by period and field name
+
+    """
+
+    def __init__(self, cfg):
+        """ """
+        self.cfg = cfg
+        self.file_type = cfg.output_aet['file_type'].lower()
+        self.periods = [period for period, flag in [
+            ('daily', cfg.daily_output_aet_flag),
+            ('monthly', cfg.monthly_output_aet_flag),
+            ('annual', cfg.annual_output_aet_flag)] if flag]
+        self.field_keys = dict(
+            (cfg.output_aet['fields'][fk], fk) for fk in cfg.output_aet['data_out_fields'])
+        self.spool_ws = None
+        self.indexes = {}
+        self.column_names = {}
+        self.spool_files = {}
+
+    def open(self):
+        """Check output specifications and set up spool folder
+
+        Returns
+        -------
+        success : boolean
+            True or False
+
+        """
+
+        if self.file_type not in text_file_types + wb_file_types + columnar_file_types:
+            logging.error('ERROR:  File type {} is not supported'.format(self.cfg.output_aet['file_type']))
+            return False
+        for field_name in self.cfg.output_aet['out_data_fields']:
+            if field_name not in self.field_keys:
+                logging.error('ERROR:  Unable to determine key for ' + field_name + ' posting aet output')
+                return False
+        logging.warning('Setting up specified area et data by parameter')
+        self.spool_ws = tempfile.mkdtemp(prefix = 'aet_spool_', dir = self.cfg.project_ws)
+        atexit.register(self.remove_spool)
+        return True
+
+    def period_index(self, period):
+        """Return output DateTimeIndex of a period
+
+        Parameters
+        ----------
+        period : str
+            'daily', 'monthly' or 'annual'
+
+        Returns
+        -------
+         : DateTimeIndex
+
+        """
+
+        period_index = pd.date_range(self.cfg.start_dt, self.cfg.end_dt, freq = "D", name = "Date")
+        if period == 'monthly':
+            period_index = period_agg.period_bounds(period_index, 'month', label = 'end').labels
+        elif period == 'annual':
+            period_index = period_agg.period_bounds(period_index, 'year', label = 'end').labels
+        return period_index + pd.Timedelta(
+            hours = self.cfg.output_aet[period + '_hour_offset'],
+            minutes = self.cfg.output_aet[period + '_minute_offset'])
+
+    def spool_path(self, period, field_name):
+        """Return spool file path of a period and field"""
+        fc = self.cfg.output_aet['out_data_fields'].index(field_name)
+        if self.file_type == 'rdb':
+            return os.path.join(self.spool_ws, '{}_{}.rdb'.format(period, fc))
+        return os.path.join(self.spool_ws, '{}_{}.bin'.format(period, fc))
+
+    def post_cell(self, cell_id, period, output_df):
+        """Append output of a cell to parameter sinks of a period
+
+        Parameters
+        ----------
+        cell_id : str
+            ET cell id
+        period : str
+            'daily', 'monthly' or 'annual'
+        output_df : pandas.DataFrame
+            cell output with output field name columns
+
+        Returns
+        -------
+        success : boolean
+            True or False
+
+        """
+
+        if period not in self.indexes:
+            self.indexes[period] = self.period_index(period)
+        period_index = self.indexes[period]
+        if len(output_df.index) != len(period_index):
+            logging.error('\nERROR: {0} output aet data of {1} has {2} values, expected {3}'.format(
+                period, cell_id, len(output_df.index), len(period_index)))
+            return False
+        try:
+            for field_name in self.cfg.output_aet['out_data_fields']:
+                key = (period, field_name)
+                sp_name = cell_id + "." + field_name
+                if self.file_type == 'rdb':
+                    param_df = pd.DataFrame({sp_name: output_df[field_name].values}, index = period_index)
+                    if not mod_dmis.rdb_output_by_dataframe(self.spool_path(period, field_name),
+                            self.cfg.output_aet['delimiter'], param_df,
+                            self.cfg.output_aet[period + '_float_format'],
+                            self.cfg.output_aet[period + '_date_format'], True, append_flag = True):
+                        return False
+                    del param_df
+                else:
+                    if key not in self.spool_files:
+                        self.spool_files[key] = open(self.spool_path(period, field_name), 'wb')
+                    output_df[field_name].values.astype(np.float64).tofile(self.spool_files[key])
+                self.column_names.setdefault(key, []).append(sp_name)
+            return True
+        except:
+            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred posting {0} output aet data of {1}'.format(
+                period, cell_id))
+            return False
+
+    def param_frame(self, period, field_name):
+        """Return spooled values of a parameter as a memory mapped DataFrame
+
+        Parameters
+        ----------
+        period : str
+            'daily', 'monthly' or 'annual'
+        field_name : str
+            output field name
+
+        Returns
+        -------
+         : pandas.DataFrame
+            values indexed by date with a station.parameter column by cell
+
+        """
+
+        key = (period, field_name)
+        self.spool_files.pop(key).close()
+        column_names = self.column_names[key]
+        spool_mm = np.memmap(self.spool_path(period, field_name), dtype = np.float64, mode = 'r',
+            shape = (len(column_names), len(self.indexes[period])))
+        return pd.DataFrame(spool_mm.T, index = self.indexes[period], columns = column_names, copy = False)
+
+    def post_params(self, period, file_path, field_names):
+        """Post spooled parameters of a period to a file
+
+        Parameters
+        ----------
+        period : str
+            'daily', 'monthly' or 'annual'
+        file_path : str
+            fully specified output file path
+        field_names : list
+            output field names posted to file
+
+        Returns
+        -------
+        success : boolean
+            True or False
+
+        """
+
+        logging.debug('  {0} output path for {1} is {2}'.format(period, ', '.join(field_names), file_path))
+        float_format = self.cfg.output_aet[period + '_float_format']
+        date_format = self.cfg.output_aet[period + '_date_format']
+        if self.file_type == 'rdb':
+            header = pd.DataFrame(columns = ['Station', 'Parameter', 'Date', 'Value']).to_csv(
+                sep = self.cfg.output_aet['delimiter'], index = False)
+            with open(file_path, 'wb') as rdb_f:
+                rdb_f.write(header.encode())
+                for field_name in field_names:
+                    with open(self.spool_path(period, field_name), 'rb') as spool_f:
+                        shutil.copyfileobj(spool_f, rdb_f)
+            return True
+        param_dfs = [self.param_frame(period, field_name) for field_name in field_names]
+        if self.file_type == 'csf':
+            return mod_dmis.csf_output_by_dataframes(file_path, self.cfg.output_aet['delimiter'],
+                param_dfs, float_format, date_format, 'date' in self.cfg.output_aet['fields'])
+        if self.file_type in wb_file_types:
+            if os.path.isfile(file_path):
+                shutil.copyfile(file_path, file_path.replace('.xls', '_bu.xls'))
+            ws_names = [self.cfg.output_aet['wsspec'][self.field_keys[field_name]] for field_name in field_names]
+            return mod_dmis.wb_output_via_df_dict(
+                file_path, ws_names, dict(zip(field_names, param_dfs)),
+                float_format, date_format, self.cfg.time_step, self.cfg.ts_quantity,
+                stream_flag = self.cfg.wb_stream_flag)
+        try:
+            mod_dmis.columnar_output_by_dataframe(os.path.splitext(file_path)[0], param_dfs)
+            return True
+        except:
+            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred posting columnar output data')
+            return False
+
+    def close(self):
+        """Post spooled output of all cells and remove spool folder
+
+        Returns
+        -------
+        success : boolean
+            True or False
+
+        """
+
+        logging.info("\nPosting non 'SF P' output aet data")
+        name_format = self.cfg.output_aet['name_format']
+        success = True
+        for period in self.periods:
+            if period not in self.indexes: continue
+            output_ws = getattr(self.cfg, period + '_output_aet_ws')
+            if '%p' in name_format:    # individual parameter files
+                for field_name in self.cfg.output_aet['out_data_fields']:
+                    file_path = os.path.join(output_ws, name_format.replace(
+                        '%p', self.cfg.output_aet['fnspec'][self.field_keys[field_name]]))
+                    success &= self.post_params(period, file_path, [field_name])
+            else:    # common parameter file
+                success &= self.post_params(period, os.path.join(output_ws, name_format),
+                    self.cfg.output_aet['out_data_fields'])
+        self.remove_spool()
+        return success
+
+    def remove_spool(self):
+        """Close spool files and remove spool folder"""
+        for spool_f in self.spool_files.values():
+            spool_f.close()
+        self.spool_files = {}
+        if self.spool_ws is not None:
+            shutil.rmtree(self.spool_ws, ignore_errors = True)
+            self.spool_ws = None
+        atexit.unregister(self.remove_spool)
+
+if __name__ == '__main__':
+    pass
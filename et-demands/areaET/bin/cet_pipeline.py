@@ -0,0 +1,131 @@
+"""cet_pipeline.py
+Defines CropETPipeline class
+Computes crop ET of ET cells in process for area ET
+    Daily crop ET of each crop type is kept in memory and handed to area ET
+    in lieu of daily crop files, so only area ET products are written
+
+Called by mod_area_et.py
+
+"""
+
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../cropET/bin')))
+import crop_cycle
+import crop_et_data
+import mod_crop_et
+
+class CropETPipeline():
+    """Crop ET model run cell by cell for area ET
+
+    Attributes
+    ----------
+    data :
+        crop ET configuration data
+    cells :
+        crop ET cells data
+    cell_count : int
+        count of cells computed
+
+    Notes
+    -----
+    Crop ET output files, growing season files and multiprocessing are
+    disabled; daily output frames of crop_cycle.write_crop_output() are
+    collected by post_crop().
+
+    """
+
+    def __init__(self):
+        """ """
+        self.data = None
+        self.cells = None
+        self.cell_count = 0
+        self.cet_frames = {}
+
+    def read_cet_ini(self, ini_path, debug_flag = False):
+        """Read crop ET INI file, crop parameters and cells
+
+        Parameters
+        ----------
+        ini_path : str
+            file path of crop ET INI file
+        debug_flag : boolean
+            True : write debug level comments to debug.txt
+
+        Returns
+        -------
+        None
+
+        """
+
+        logging.warning('\nReading crop ET configuration for in process crop ET')
+        self.data = crop_et_data.CropETData()
+        self.data.read_cet_ini(ini_path, debug_flag)
+
+        # only daily output is computed and it is posted to memory
+
+        self.data.cet_out['daily_output_flag'] = True
+        self.data.cet_out['monthly_output_flag'] = False
+        self.data.cet_out['annual_output_flag'] = False
+        self.data.gs_output_flag = False
+        self.data.cet_sink = self.post_crop
+        self.cells = mod_crop_et.set_cells(self.data)
+
+    def post_crop(self, et_cell, crop, daily_output_df):
+        """Keep daily crop ET output of a crop type
+
+        Parameters
+        ----------
+        et_cell :
+            crop ET cell
+        crop :
+            crop parameters
+        daily_output_df : pandas.DataFrame
+            daily output indexed by date with crop ET output field names
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.cet_frames[int(crop.class_number)] = daily_output_df
+
+    def compute_cell(self, cell_id):
+        """Compute crop ET of all crop types of an ET cell
+
+        Parameters
+        ----------
+        cell_id : str
+            ET cell id
+
+        Returns
+        -------
+        cet_frames : dict
+            daily output by crop type number, None if not computed
+
+        """
+
+        try:
+            cell = self.cells.et_cells_dict[cell_id]
+        except KeyError:
+            logging.error('\nERROR: ET Cell {} is not a crop ET cell'.format(cell_id))
+            return None
+        logging.warning('CellID: {} crop ET'.format(cell_id))
+        self.cell_count += 1
+        self.cet_frames = {}
+        if not cell.set_input_timeseries(self.cell_count, self.data, self.cells):
+            return None
+        crop_cycle.crop_cycle(self.data, cell)
+
+        # release climate of cell before next one is read
+
+        cell.climate_df = None
+        cell.refet_df = None
+        cet_frames, self.cet_frames = self.cet_frames, {}
+        return cet_frames
+
+if __name__ == '__main__':
+    pass
@@ -22,9 +22,12 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../l
 import aet_utils
 import aet_config
 import aet_cells
+import aet_param_output
+import cet_pipeline
 import mod_dmis
 
-def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag = False, mp_procs = 1):
+def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag = False, mp_procs = 1,
+         cet_ini_path = None):
     """ Main function for running Area ET model
 
     Arguments
@@ -40,6 +43,9 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
         False : default
     mp_procs : int
         number of cores to use for multiprocessing
+    cet_ini_path : str
+        file path of crop ET INI file; crop ET of each cell is computed in
+        process and used in lieu of crop ET files if set
 
     Returns
     -------
@@ -55,6 +61,9 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
     if debug_flag and mp_procs > 1:
         logging.warning('  Debug mode, disabling multiprocessing')
         mp_procs = 1
+    if cet_ini_path is not None and mp_procs > 1:
+        logging.warning('  In process crop ET mode, disabling multiprocessing')
+        mp_procs = 1
     if mp_procs > 1:
         logging.warning('  Multiprocessing mode, {0} cores'.format(mp_procs))
 
@@ -72,6 +81,18 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
     cells = aet_cells.AETCellsData()
     cells.set_cell_crops(cfg)
 
+    # Crop ET computed cell by cell in lieu of reading crop ET files
+    cet_run = None
+    if cet_ini_path is not None:
+        cet_run = cet_pipeline.CropETPipeline()
+        cet_run.read_cet_ini(cet_ini_path, debug_flag)
+
+    # Output with parameter orientation posted cell by cell
+    if cfg.output_aet_flag and cfg.output_aet['data_structure_type'].upper() != 'SF P':
+        cells.aet_param_output = aet_param_output.AETParamOutput(cfg)
+        if not cells.aet_param_output.open():
+            sys.exit()
+
     # Multiprocessing set up
     cell_mp_list =  []
     cell_mp_flag = False
@@ -111,6 +132,10 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
             if cell_mp_flag and cfg.output_aet['data_structure_type'].upper() == 'SF P' and cell_count > 1:
                 cell_mp_list.append([cell_count, cfg, cell, cells])
             else:
+                if cet_run is not None:
+                    cell.cet_frames = cet_run.compute_cell(cell_id)
+                    if cell.cet_frames is None:
+                        sys.exit()
                 if not cell.crop_types_cycle(cell_count, cfg, cells):
                     sys.exit()
                 if cell_count == 1:
@@ -120,6 +145,7 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
                     sys.exit()
                 if not cell.compute_area_requirements(cell_count, cfg, cells):
                     sys.exit()
+                cell.cet_frames = None
 
     # Multiprocess all cells
     results = []
@@ -144,269 +170,10 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
         output_nir_user_openwater(cfg, cells)
 
     # post output with parameter orientation
-    if cfg.output_aet_flag and cfg.output_aet['data_structure_type'].upper() != 'SF P':
-        # post aet output data
-
-        logging.info("\nPosting non 'SF P' output aet data")
-        if 'date' in cfg.output_aet['fields'] and cfg.output_aet['fields'] is not None:
-            date_is_posted = True
-        else:
-            date_is_posted = False
-        if cfg.daily_output_aet_flag:
-            if '%p' in cfg.output_aet['name_format']:    # individual parameter files
-                for field_name, param_df in cells.cell_daily_output_aet_data.items():
-                    field_key = None
-                    for fk, fn in cfg.output_aet['fields'].items():
-                        if fn == field_name:
-                            field_key = fk
-                            break
-                    if field_key is None:
-                        logging.error('ERROR:  Unable to determine key for ' + field_name + ' posting daily aet output')
-                        sys.exit()
-                    file_path = os.path.join(cfg.daily_output_aet_ws,
-                        cfg.output_aet['name_format'].replace('%p', cfg.output_aet['fnspec'][field_key]))
-                    logging.debug('  Daily output path for {0} is {1}'.format(field_name, file_path))
-                    if cfg.output_aet['file_type'].lower() == 'csf':
-                         if not mod_dmis.csf_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            param_df, cfg.output_aet['daily_float_format'],
-                            cfg.output_aet['daily_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'rdb':
-                         if not mod_dmis.rdb_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            param_df, cfg.output_aet['daily_float_format'],
-                            cfg.output_aet['daily_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'xls' or cfg.output_aet['file_type'].lower() == 'wb':
-                        if os.path.isfile(file_path):
-                            shutil.copyfile(file_path, file_path.replace('.xls', '_bu.xls'))
-                        params_dict = {}
-                        params_dict['[param_df'] = param_df
-                        ws_names = []
-                        ws_names.append(cfg.output_aet['wsspec'][field_key])
-                        if not mod_dmis.wb_output_via_df_dict_openpyxl(
-                                file_path, ws_names, params_dict,
-                                cfg.output_aet['daily_float_format'],
-                                cfg.output_aet['daily_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                                cfg.time_step, cfg.ts_quantity):
-                            sys.exit()
-                        del params_dict
-                    else:
-                        logging.error('ERROR:  File type {} is not supported'.format(cfg.output_aet['file_type']))
-                        sys.exit()
-            else:    # common parameter file
-                file_path = os.path.join(cfg.daily_output_aet_ws, cfg.output_aet['name_format'])
-                if cfg.output_aet['file_type'].lower() == 'xls' or cfg.output_aet['file_type'].lower() == 'wb':
-                    ws_names = []
-                    for field_name, param_df in cells.cell_daily_output_aet_data.items():
-                        field_key = None
-                        for fk, fn in cfg.output_aet['fields'].items():
-                            if fn == field_name:
-                                field_key = fk
-                                break
-                        if field_key is None:
-                            logging.error('ERROR:  Unable to determine key for ' + field_name + ' posting daily aet output')
-                            sys.exit()
-                        ws_names.append(cfg.output_aet['wsspec'][field_key])
-                    if os.path.isfile(file_path):
-                        shutil.copyfile(file_path, file_path.replace('.xls', '_bu.xls'))
-                    if not mod_dmis.wb_output_via_df_dict_openpyxl(
-                            file_path, ws_names, cells.cell_daily_output_aet_data,
-                            cfg.output_aet['daily_float_format'],
-                            cfg.output_aet['daily_date_format'],
-                            cfg.time_step, cfg.ts_quantity):
-                        sys.exit()
-                else:    # text output
-                    field_count = 0
-                    for field_name, param_df in cells.cell_daily_output_aet_data.items():
-                        field_count += 1
-                        if field_count == 1:
-                            params_df = param_df.copy()
-                        else:
-                            params_df = params_df.merge(param_df, left_index = True, right_index = True)
-                    if cfg.output_aet['file_type'].lower() == 'csf':
-                         if not mod_dmis.csf_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            params_df, cfg.output_aet['daily_float_format'],
-                            cfg.output_aet['daily_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'rdb':
-                         if not mod_dmis.rdb_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            params_df, cfg.output_aet['daily_float_format'],
-                            cfg.output_aet['daily_date_format'], date_is_posted):
-                            sys.exit()
-                    else:
-                        logging.error('ERROR:  File type {} is not supported'.format(cfg.output_aet['file_type']))
-                        sys.exit()
-            del cells.cell_daily_output_aet_data
-        if cfg.monthly_output_aet_flag:
-            if '%p' in cfg.output_aet['name_format']:    # individual parameter files
-                for field_name, param_df in cells.cell_monthly_output_aet_data.items():
-                    field_key = None
-                    for fk, fn in cfg.output_aet['fields'].items():
-                        if fn == field_name:
-                            field_key = fk
-                            break
-                    if field_key is None:
-                        logging.error('ERROR:  Unable to determine key for ' + field_name + ' posting daily aet output')
-                        sys.exit()
-                    file_path = os.path.join(cfg.monthly_output_aet_ws,
-                        cfg.output_aet['name_format'].replace('%p', cfg.output_aet['fnspec'][field_key]))
-                    logging.debug('  monthly output path for {0} is {1}'.format(field_name, file_path))
-                    if cfg.output_aet['file_type'].lower() == 'csf':
-                         if not mod_dmis.csf_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            param_df, cfg.output_aet['monthly_float_format'],
-                            cfg.output_aet['monthly_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'rdb':
-                         if not mod_dmis.rdb_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            param_df, cfg.output_aet['monthly_float_format'],
-                            cfg.output_aet['monthly_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'xls' or cfg.output_aet['file_type'].lower() == 'wb':
-                        if os.path.isfile(file_path):
-                            shutil.copyfile(file_path, file_path.replace('.xls', '_bu.xls'))
-                        params_dict = {}
-                        params_dict['[param_df'] = param_df
-                        ws_names = []
-                        ws_names.append(cfg.output_aet['wsspec'][field_key])
-                        if not mod_dmis.wb_output_via_df_dict_openpyxl(
-                                file_path, ws_names, params_dict,
-                                cfg.output_aet['monthly_float_format'],
-                                cfg.output_aet['monthly_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                                cfg.time_step, cfg.ts_quantity):
-                            sys.exit()
-                        del params_dict
-                    else:
-                        logging.error('ERROR:  File type {} is not supported'.format(cfg.output_aet['file_type']))
-                        sys.exit()
-            else:    # common parameter file
-                file_path = os.path.join(cfg.monthly_output_aet_ws, cfg.output_aet['name_format'])
-                if cfg.output_aet['file_type'].lower() == 'xls' or cfg.output_aet['file_type'].lower() == 'wb':
-                    ws_names = []
-                    for field_name, param_df in cells.cell_monthly_output_aet_data.items():
-                        field_key = None
-                        for fk, fn in cfg.output_aet['fields'].items():
-                            if fn == field_name:
-                                field_key = fk
-                                break
-                        if field_key is None:
-                            logging.error('ERROR:  Unable to determine key for ' + field_name + ' posting daily aet output')
-                            sys.exit()
-                        ws_names.append(cfg.output_aet['wsspec'][field_key])
-                    if os.path.isfile(file_path):
-                        shutil.copyfile(file_path, file_path.replace('.xls', '_bu.xls'))
-                    if not mod_dmis.wb_output_via_df_dict_openpyxl(
-                            file_path, ws_names, cells.cell_monthly_output_aet_data,
-                            cfg.output_aet['monthly_float_format'],
-                            cfg.output_aet['monthly_date_format'],
-                            cfg.time_step, cfg.ts_quantity):
-                        sys.exit()
-                else:    # text output
-                    field_count = 0
-                    for field_name, param_df in cells.cell_monthly_output_aet_data.items():
-                        field_count += 1
-                        if field_count == 1:
-                            params_df = param_df.copy()
-                        else:
-                            params_df = params_df.merge(param_df, left_index = True, right_index = True)
-                    if cfg.output_aet['file_type'].lower() == 'csf':
-                         if not mod_dmis.csf_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            params_df, cfg.output_aet['monthly_float_format'],
-                            cfg.output_aet['monthly_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'rdb':
-                         if not mod_dmis.rdb_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            params_df, cfg.output_aet['monthly_float_format'],
-                            cfg.output_aet['monthly_date_format'], date_is_posted):
-                            sys.exit()
-                    else:
-                        logging.error('ERROR:  File type {} is not supported'.format(cfg.output_aet['file_type']))
-                        sys.exit()
-            del cells.cell_monthly_output_aet_data
-        if cfg.annual_output_aet_flag:
-            if '%p' in cfg.output_aet['name_format']:    # individual parameter files
-                for field_name, param_df in cells.cell_annual_output_aet_data.items():
-                    field_key = None
-                    for fk, fn in cfg.output_aet['fields'].items():
-                        if fn == field_name:
-                            field_key = fk
-                            break
-                    if field_key is None:
-                        logging.error('ERROR:  Unable to determine key for ' + field_name + ' posting daily aet output')
-                        sys.exit()
-                    file_path = os.path.join(cfg.annual_output_aet_ws,
-                        cfg.output_aet['name_format'].replace('%p', cfg.output_aet['fnspec'][field_key]))
-                    logging.debug('  annual output path for {0} is {1}'.format(field_name, file_path))
-                    if cfg.output_aet['file_type'].lower() == 'csf':
-                         if not mod_dmis.csf_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            param_df, cfg.output_aet['annual_float_format'],
-                            cfg.output_aet['annual_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'rdb':
-                         if not mod_dmis.rdb_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            param_df, cfg.output_aet['annual_float_format'],
-                            cfg.output_aet['annual_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'xls' or cfg.output_aet['file_type'].lower() == 'wb':
-                        if os.path.isfile(file_path):
-                            shutil.copyfile(file_path, file_path.replace('.xls', '_bu.xls'))
-                        params_dict = {}
-                        params_dict['[param_df'] = param_df
-                        ws_names = []
-                        ws_names.append(cfg.output_aet['wsspec'][field_key])
-                        if not mod_dmis.wb_output_via_df_dict_openpyxl(
-                                file_path, ws_names, params_dict,
-                                cfg.output_aet['annual_float_format'],
-                                cfg.output_aet['annual_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                                cfg.time_step, cfg.ts_quantity):
-                            sys.exit()
-                        del params_dict
-                    else:
-                        logging.error('ERROR:  File type {} is not supported'.format(cfg.output_aet['file_type']))
-                        sys.exit()
-            else:    # common parameter file
-                file_path = os.path.join(cfg.annual_output_aet_ws, cfg.output_aet['name_format'])
-                if cfg.output_aet['file_type'].lower() == 'xls' or cfg.output_aet['file_type'].lower() == 'wb':
-                    ws_names = []
-                    for field_name, param_df in cells.cell_annual_output_aet_data.items():
-                        field_key = None
-                        for fk, fn in cfg.output_aet['fields'].items():
-                            if fn == field_name:
-                                field_key = fk
-                                break
-                        if field_key is None:
-                            logging.error('ERROR:  Unable to determine key for ' + field_name + ' posting daily aet output')
-                            sys.exit()
-                        ws_names.append(cfg.output_aet['wsspec'][field_key])
-                    if os.path.isfile(file_path):
-                        shutil.copyfile(file_path, file_path.replace('.xls', '_bu.xls'))
-                    if not mod_dmis.wb_output_via_df_dict_openpyxl(
-                            file_path, ws_names, cells.cell_annual_output_aet_data,
-                            cfg.output_aet['annual_float_format'],
-                            cfg.output_aet['annual_date_format'],
-                            cfg.time_step, cfg.ts_quantity):
-                        sys.exit()
-                else:    # text output
-                    field_count = 0
-                    for field_name, param_df in cells.cell_annual_output_aet_data.items():
-                        field_count += 1
-                        if field_count == 1:
-                            params_df = param_df.copy()
-                        else:
-                            params_df = params_df.merge(param_df, left_index = True, right_index = True)
-                    if cfg.output_aet['file_type'].lower() == 'csf':
-                         if not mod_dmis.csf_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            params_df, cfg.output_aet['annual_float_format'],
-                            cfg.output_aet['annual_date_format'], date_is_posted):
-                            sys.exit()
-                    elif cfg.output_aet['file_type'].lower() == 'rdb':
-                         if not mod_dmis.rdb_output_by_dataframe(file_path, cfg.output_aet['delimiter'],
-                            params_df, cfg.output_aet['annual_float_format'],
-                            cfg.output_aet['annual_date_format'], date_is_posted):
-                            sys.exit()
-                    else:
-                        logging.error('ERROR:  File type {} is not supported'.format(cfg.output_aet['file_type']))
-                        sys.exit()
-            del cells.cell_annual_output_aet_data
+    if cells.aet_param_output is not None:
+        if not cells.aet_param_output.close():
+            sys.exit()
+        cells.aet_param_output = None
 
     if cfg.output_cir_flag and cfg.output_cir['data_structure_type'].upper() != 'SF P':
         # post cir output data
@@ -439,11 +206,12 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
                 params_dict['[param_df'] = param_df
                 ws_names = []
                 ws_names.append(cfg.output_cir['wsspec'][field_key])
-                if not mod_dmis.wb_output_via_df_dict_openpyxl(
+                if not mod_dmis.wb_output_via_df_dict(
                         file_path, ws_names, params_dict,
                         cfg.output_cir['daily_float_format'],
                         cfg.output_cir['daily_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                        cfg.time_step, cfg.ts_quantity):
+                        cfg.time_step, cfg.ts_quantity,
+                        stream_flag = cfg.wb_stream_flag):
                     sys.exit()
                 del params_dict
             else:
@@ -473,11 +241,12 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
                 params_dict['[param_df'] = param_df
                 ws_names = []
                 ws_names.append(cfg.output_cir['wsspec'][field_key])
-                if not mod_dmis.wb_output_via_df_dict_openpyxl(
+                if not mod_dmis.wb_output_via_df_dict(
                         file_path, ws_names, params_dict,
                         cfg.output_cir['monthly_float_format'],
                         cfg.output_cir['monthly_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                        cfg.time_step, cfg.ts_quantity):
+                        cfg.time_step, cfg.ts_quantity,
+                        stream_flag = cfg.wb_stream_flag):
                     sys.exit()
                 del params_dict
             else:
@@ -507,11 +276,12 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
                 params_dict['[param_df'] = param_df
                 ws_names = []
                 ws_names.append(cfg.output_cir['wsspec'][field_key])
-                if not mod_dmis.wb_output_via_df_dict_openpyxl(
+                if not mod_dmis.wb_output_via_df_dict(
                         file_path, ws_names, params_dict,
                         cfg.output_cir['annual_float_format'],
                         cfg.output_cir['annual_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                        cfg.time_step, cfg.ts_quantity):
+                        cfg.time_step, cfg.ts_quantity,
+                        stream_flag = cfg.wb_stream_flag):
                     sys.exit()
                 del params_dict
             else:
@@ -550,11 +320,12 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
                 params_dict['[param_df'] = param_df
                 ws_names = []
                 ws_names.append(cfg.output_cet['wsspec'][field_key])
-                if not mod_dmis.wb_output_via_df_dict_openpyxl(
+                if not mod_dmis.wb_output_via_df_dict(
                         file_path, ws_names, params_dict,
                         cfg.output_cet['daily_float_format'],
                         cfg.output_cet['daily_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                        cfg.time_step, cfg.ts_quantity):
+                        cfg.time_step, cfg.ts_quantity,
+                        stream_flag = cfg.wb_stream_flag):
                     sys.exit()
                 del params_dict
             else:
@@ -584,11 +355,12 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
                 params_dict['[param_df'] = param_df
                 ws_names = []
                 ws_names.append(cfg.output_cet['wsspec'][field_key])
-                if not mod_dmis.wb_output_via_df_dict_openpyxl(
+                if not mod_dmis.wb_output_via_df_dict(
                         file_path, ws_names, params_dict,
                         cfg.output_cet['monthly_float_format'],
                         cfg.output_cet['monthly_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                        cfg.time_step, cfg.ts_quantity):
+                        cfg.time_step, cfg.ts_quantity,
+                        stream_flag = cfg.wb_stream_flag):
                     sys.exit()
                 del params_dict
             else:
@@ -618,11 +390,12 @@ def main(ini_path, log_level = logging.WARNING, etcid_to_run = 'ALL', debug_flag
                 params_dict['[param_df'] = param_df
                 ws_names = []
                 ws_names.append(cfg.output_cet['wsspec'][field_key])
-                if not mod_dmis.wb_output_via_df_dict_openpyxl(
+                if not mod_dmis.wb_output_via_df_dict(
                         file_path, ws_names, params_dict,
                         cfg.output_cet['annual_float_format'],
                         cfg.output_cet['annual_date_format'].replace('%Y','yyyy').replace('%m', 'mm').replace('%d', 'dd'),
-                        cfg.time_step, cfg.ts_quantity):
+                        cfg.time_step, cfg.ts_quantity,
+                        stream_flag = cfg.wb_stream_flag):
                     sys.exit()
                 del params_dict
             else:
@@ -683,12 +456,18 @@ def parse_args():
         '-mp', '--multiprocessing', default = 1, type = int,
         metavar = 'N', nargs = '?', const = mp.cpu_count(),
         help = 'Number of processers to use')
+    parser.add_argument(
+        '--cet_ini', metavar = 'PATH', default = None,
+        type = lambda x: is_valid_file(parser, x),
+        help = 'Crop ET input file; crop ET is computed in process')
     args = parser.parse_args()
 
-    # Convert INI path to an absolute path if necessary
+    # Convert INI paths to absolute paths if necessary
 
     if args.ini and os.path.isfile(os.path.abspath(args.ini)):
         args.ini = os.path.abspath(args.ini)
+    if args.cet_ini and os.path.isfile(os.path.abspath(args.cet_ini)):
+        args.cet_ini = os.path.abspath(args.cet_ini)
     return args
 
 
@@ -1120,4 +899,5 @@ if __name__ == '__main__':
     args = parse_args()
 
     main(ini_path=args.ini, log_level = args.log_level, etcid_to_run = args.etcid,
-         debug_flag = args.debug, mp_procs = args.multiprocessing)
+         debug_flag = args.debug, mp_procs = args.multiprocessing,
+         cet_ini_path = args.cet_ini)
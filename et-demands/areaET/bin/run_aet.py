@@ -12,7 +12,8 @@ import sys
 import tkinter as tk
 import tkinter.filedialog
 
-def main(ini_path, bin_ws = '', verbose_flag = False, etcid_to_run = 'ALL', debug_flag = False, mp_procs = 1):
+def main(ini_path, bin_ws = '', verbose_flag = False, etcid_to_run = 'ALL', debug_flag = False, mp_procs = 1,
+         cet_ini_path = None):
     """Wrapper for running crop ET model
 
     Arguments
@@ -29,6 +30,8 @@ def main(ini_path, bin_ws = '', verbose_flag = False, etcid_to_run = 'ALL', debu
         False : default
     mp_procs : int
         number of cores to use
+    cet_ini_path : str
+        file path of crop ET INI file to compute crop ET in process
 
     Returns
     -------
@@ -42,6 +45,7 @@ def main(ini_path, bin_ws = '', verbose_flag = False, etcid_to_run = 'ALL', debu
     -c, --etcid, mnid_to_run : user specified et cell id to run
     -d, --debug, debug_flag : save debug level comments to debug.txt
     -mp, --multiprocessing, mp_procs : number of processers to use
+    --cet_ini, cet_ini_path : crop ET INI file path
 
 
     """
@@ -76,6 +80,8 @@ def main(ini_path, bin_ws = '', verbose_flag = False, etcid_to_run = 'ALL', debu
         args_list.append('-v')
     if mp_procs > 1:
         args_list.extend(['-mp', str(mp_procs)])
+    if cet_ini_path is not None:
+        args_list.extend(['--cet_ini', cet_ini_path])
     # print "command line is "
     print(args_list)
     subprocess.call(args_list)
@@ -103,12 +109,18 @@ def parse_args():
         '-mp', '--multiprocessing', default=1, type=int,
         metavar = 'N', nargs = '?', const = mp.cpu_count(),
         help = 'Number of processers to use')
+    parser.add_argument(
+        '--cet_ini', metavar = 'PATH', default = None,
+        type = lambda x: is_valid_file(parser, x),
+        help = 'Crop ET input file; crop ET is computed in process')
     args = parser.parse_args()
 
-    # Convert INI path to an absolute path if necessary
+    # Convert INI paths to absolute paths if necessary
 
     if args.ini and os.path.isfile(os.path.abspath(args.ini)):
         args.ini = os.path.abspath(args.ini)
+    if args.cet_ini and os.path.isfile(os.path.abspath(args.cet_ini)):
+        args.cet_ini = os.path.abspath(args.cet_ini)
     # print "\nargs are\n", args, "\n"
     return args
 
@@ -204,4 +216,4 @@ if __name__ == '__main__':
         args.multiprocessing = 4
 
     main(ini_path, bin_ws = args.bin, verbose_flag = args.verbose, etcid_to_run = args.etcid,
-        debug_flag = args.debug, mp_procs = args.multiprocessing)
+        debug_flag = args.debug, mp_procs = args.multiprocessing, cet_ini_path = args.cet_ini)
@@ -0,0 +1,85 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('xlrd')
+import aet_cells
+import mod_dmis
+
+
+def make_cell():
+    dates = pd.date_range('2001-01-01', '2003-12-31', name='date')
+    rng = np.random.default_rng(0)
+    cell = aet_cells.ETCell()
+    cell.cell_id = '1'
+    cell.usedCropTypes = [3, 7, 13]
+    # Grass (crop type 44) is not a used crop type of the cell
+    user_crops = {'Alfalfa': 3, 'Corn': 7, 'Grass': 44, 'Beans': 13}
+    cell.user_crops_list = list(user_crops)
+    cell.crops_df = pd.DataFrame(
+        {'year': np.tile(dates.year, 3),
+         'cet': rng.uniform(0, 8, 3 * dates.size),
+         'effprcp': rng.uniform(0, 2, 3 * dates.size),
+         'cir': rng.uniform(-1, 6, 3 * dates.size)},
+        index=pd.MultiIndex.from_product(
+            [cell.usedCropTypes, dates], names=['Crop Num', 'date']))
+    mix_rows, ann_rows = [], []
+    for year in range(2001, 2004):
+        for crop, crop_number in user_crops.items():
+            beg = pd.Timestamp(year, 1, 1) + pd.Timedelta(
+                days=int(rng.integers(60, 120)))
+            end = beg + pd.Timedelta(days=int(rng.integers(90, 200)))
+            mix_rows.append([year, crop, crop_number, beg, end,
+                             rng.uniform(0, 400)])
+        ann_rows.append([year, pd.Timestamp(year, 3, 1),
+                         pd.Timestamp(year, 10, 31), 1000.])
+    cell.crops_mix_df = pd.DataFrame(mix_rows, columns=[
+        'year', 'UserCropName', 'CropNumber', 'UserBegDate', 'UserEndDate',
+        'CropPercents'])
+    # Percent of a crop that is not run is skipped by the crop loop
+    cell.crops_mix_df.loc[
+        (cell.crops_mix_df['UserCropName'] == 'Grass') &
+        (cell.crops_mix_df['year'] == 2002), 'CropPercents'] = np.nan
+    cell.ann_crops_df = pd.DataFrame(ann_rows, columns=[
+        'year', 'UserBegDate', 'UserEndDate', 'area']).set_index('year')
+    cfg = types.SimpleNamespace(
+        start_dt=dates[0], end_dt=dates[-1], number_days=dates.size,
+        time_step='day', ts_quantity=1, output_cet={'fields': {'cet': 'CET'}},
+        output_cir={'fields': {'cir': 'CIR'}})
+    return cell, cfg
+
+
+def reset_cell(cell, cfg):
+    cell.etcData_df = mod_dmis.make_ts_dataframe(
+        cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
+    for field_name, dtype in [('et', float), ('nir', float),
+                              ('effprcp', float), ('season', int)]:
+        cell.etcData_df[field_name] = np.zeros(cfg.number_days, dtype=dtype)
+    cell.etcCropIRs_df = mod_dmis.make_ts_dataframe(
+        cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
+    cell.etcCropETs_df = mod_dmis.make_ts_dataframe(
+        cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
+
+
+def test_weight_crop_matrices_matches_loop():
+    cell, cfg = make_cell()
+    reset_cell(cell, cfg)
+    cell.weight_crop_loop(cfg)
+    loop_data_df = cell.etcData_df.copy()
+    loop_ets_df, loop_irs_df = cell.etcCropETs_df, cell.etcCropIRs_df
+
+    reset_cell(cell, cfg)
+    ann_mask = cell.weight_crop_matrices(cfg)
+    for field_name in ['et', 'effprcp', 'season']:
+        assert not np.isnan(cell.etcData_df[field_name].values).any()
+        np.testing.assert_allclose(
+            cell.etcData_df[field_name].values,
+            loop_data_df[field_name].values, rtol=1e-12, atol=1e-12)
+    pd.testing.assert_frame_equal(cell.etcCropETs_df, loop_ets_df,
+                                  check_freq=False)
+    pd.testing.assert_frame_equal(cell.etcCropIRs_df, loop_irs_df,
+                                  check_freq=False)
+    dates = cell.etcData_df.index
+    assert ann_mask.sum() == ((dates.month >= 3) & (dates.month <= 10)).sum()
@@ -0,0 +1,101 @@
+import copy
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..',
+                                'cropET', 'tests'))
+import aet_cet_input
+import cet_pipeline
+import crop_cycle
+from test_crop_output import output_data
+from test_crop_scheduler import make_cells
+
+
+def cet_cfg(input_ws):
+    fields = {
+        'date': 'Date', 'year': None, 'month': None, 'day': None,
+        'hour': None, 'doy': None, 'refet': 'PMETo', 'ppt': 'PPT',
+        'etact': 'ETact', 'etpot': 'ETpot', 'sir': 'Irrigation',
+        'sro': 'Runoff', 'dperc': 'DPerc', 'season': 'Season',
+        'cir': 'NIWR'}
+    return types.SimpleNamespace(
+        time_step='day', start_dt=None, end_dt=None, input_cet={
+            'ws': input_ws, 'name_format': '%s_crop_%c.csv',
+            'data_structure_type': 'DRI', 'header_lines': 1,
+            'names_line': 1, 'delimiter': ',', 'read_threads': 2,
+            'fields': fields, 'fnspec': {k: k for k in fields}})
+
+
+def test_cell_cet_from_frames_matches_files(tmp_path):
+    csv_data = output_data(tmp_path, 'csv')
+    cell = make_cells([[3, 7]]).et_cells_dict['1']
+    crop_cycle.crop_cycle(csv_data, cell)
+
+    # Same cell computed in process, daily frames posted to the pipeline
+    cet_run = cet_pipeline.CropETPipeline()
+    cet_run.data = output_data(tmp_path, 'sink')
+    cet_run.data.cet_sink = cet_run.post_crop
+    cet_run.cells = make_cells([[3, 7]])
+    cet_frames = cet_run.compute_cell('1')
+    assert sorted(cet_frames) == [3, 7]
+    assert not os.listdir(cet_run.data.cet_out['daily_output_ws'])
+
+    file_cfg = cet_cfg(csv_data.cet_out['daily_output_ws'])
+    frame_cfg = copy.deepcopy(file_cfg)
+    file_dates, file_data, file_keys = aet_cet_input.read_cell_cet(
+        file_cfg, '1', [3, 7])
+    frame_dates, frame_data, frame_keys = aet_cet_input.read_cell_cet(
+        frame_cfg, '1', [3, 7], cet_frames)
+    assert frame_keys == file_keys
+    np.testing.assert_array_equal(frame_dates, file_dates)
+    assert (frame_cfg.start_dt, frame_cfg.end_dt) == (
+        file_cfg.start_dt, file_cfg.end_dt)
+    # NIWR of files is rounded to 6 decimals
+    np.testing.assert_allclose(frame_data, file_data, rtol=1e-12, atol=1e-6)
+
+
+def test_cell_cet_rdb_matches_dri(tmp_path):
+    csv_data = output_data(tmp_path, 'csv')
+    cell = make_cells([[3, 7]]).et_cells_dict['1']
+    crop_cycle.crop_cycle(csv_data, cell)
+
+    # Crop 7 is missing days, the first crop sets the dates
+    dri_ws = str(tmp_path / 'dri')
+    os.makedirs(dri_ws)
+    rdb_dfs = []
+    for crop_number in [3, 7]:
+        name = '1_crop_{:02d}.csv'.format(crop_number)
+        crop_df = pd.read_csv(
+            os.path.join(csv_data.cet_out['daily_output_ws'], name),
+            comment='#')
+        if crop_number == 7:
+            crop_df = crop_df.drop(index=list(range(40, 75)) + [500])
+        crop_df.to_csv(os.path.join(dri_ws, name), index=False)
+        crop_df.insert(0, 'Crop Num', crop_number)
+        rdb_dfs.append(crop_df)
+    rdb_ws = str(tmp_path / 'rdb')
+    os.makedirs(rdb_ws)
+    pd.concat(rdb_dfs).to_csv(os.path.join(rdb_ws, '1_crop.csv'),
+                              index=False)
+
+    dri_cfg = cet_cfg(dri_ws)
+    rdb_cfg = cet_cfg(rdb_ws)
+    rdb_cfg.input_cet.update({'name_format': '%s_crop.csv',
+                              'data_structure_type': 'RDB'})
+    dri_dates, dri_data, dri_keys = aet_cet_input.read_cell_cet(
+        dri_cfg, '1', [3, 7])
+    rdb_dates, rdb_data, rdb_keys = aet_cet_input.read_cell_cet(
+        rdb_cfg, '1', [3, 7])
+    assert rdb_keys == dri_keys
+    assert rdb_data.shape == (len(dri_dates), 2, len(dri_keys))
+    np.testing.assert_array_equal(rdb_dates, dri_dates)
+    np.testing.assert_array_equal(rdb_data, dri_data)
+
+    missing = np.zeros(len(rdb_dates), dtype=bool)
+    missing[list(range(40, 75)) + [500]] = True
+    assert np.isnan(rdb_data[missing, 1, :]).all()
+    assert not np.isnan(rdb_data[~missing, :, :]).any()
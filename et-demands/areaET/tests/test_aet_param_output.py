@@ -0,0 +1,141 @@
+import os
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import aet_param_output
+import mod_dmis
+
+periods = ['daily', 'monthly', 'annual']
+field_names = ['ET', 'NIR', 'ET_Flow']
+
+
+def make_cfg(project_ws, file_type, name_format):
+    cfg = types.SimpleNamespace(
+        project_ws=str(project_ws), start_dt=pd.Timestamp('2001-01-01'),
+        end_dt=pd.Timestamp('2003-12-31'), time_step='day', ts_quantity=1,
+        wb_stream_flag=True, daily_output_aet_flag=True,
+        monthly_output_aet_flag=True, annual_output_aet_flag=True)
+    fields = {'date': 'Date', 'et': 'ET', 'nir': 'NIR', 'etflow': 'ET_Flow'}
+    cfg.output_aet = {
+        'file_type': file_type, 'name_format': name_format,
+        'delimiter': ',', 'fields': fields,
+        'data_out_fields': ['et', 'nir', 'etflow'],
+        'out_data_fields': field_names,
+        'fnspec': {'et': 'ET', 'nir': 'NIR', 'etflow': 'ETF'},
+        'wsspec': {'et': 'ET', 'nir': 'NIR', 'etflow': 'ETF'}}
+    for period in periods:
+        output_ws = os.path.join(str(project_ws), period)
+        os.makedirs(output_ws, exist_ok=True)
+        setattr(cfg, period + '_output_aet_ws', output_ws)
+        cfg.output_aet[period + '_float_format'] = '%10.6f'
+        cfg.output_aet[period + '_date_format'] = '%Y-%m-%d'
+        cfg.output_aet[period + '_hour_offset'] = 0
+        cfg.output_aet[period + '_minute_offset'] = 0
+    return cfg
+
+
+def cell_output(cfg, writer, seed):
+    rng = np.random.default_rng(seed)
+    output = {}
+    for period in periods:
+        index = writer.period_index(period)
+        output[period] = pd.DataFrame(
+            rng.random((len(index), len(field_names))), index=index,
+            columns=field_names)
+        output[period].iloc[1, 1] = np.nan
+    return output
+
+
+def post_frames(cfg, cell_outputs):
+    """Post whole parameter frames of all cells at once"""
+    writer = aet_param_output.AETParamOutput(cfg)
+    file_type = cfg.output_aet['file_type']
+    output_func = {'csf': mod_dmis.csf_output_by_dataframe,
+                   'rdb': mod_dmis.rdb_output_by_dataframe}[file_type]
+    for period in periods:
+        param_dfs = dict(
+            (field_name, pd.DataFrame(dict(
+                (cell_id + '.' + field_name, output[period][field_name].values)
+                for cell_id, output in cell_outputs.items()),
+                index=writer.period_index(period)))
+            for field_name in field_names)
+        output_ws = getattr(cfg, period + '_output_aet_ws')
+        name_format = cfg.output_aet['name_format']
+        if '%p' in name_format:
+            file_dfs = [(name_format.replace(
+                '%p', cfg.output_aet['fnspec'][writer.field_keys[fn]]),
+                param_dfs[fn]) for fn in field_names]
+        else:
+            file_dfs = [(name_format, pd.concat(
+                [param_dfs[fn] for fn in field_names], axis=1))]
+        for file_name, params_df in file_dfs:
+            assert output_func(
+                os.path.join(output_ws, file_name), ',', params_df,
+                cfg.output_aet[period + '_float_format'],
+                cfg.output_aet[period + '_date_format'], True)
+
+
+@pytest.mark.parametrize('file_type, name_format', [
+    ('csf', 'KL_%p.csv'), ('csf', 'KL.csv'),
+    ('rdb', 'KL_%p.rdb'), ('rdb', 'KL.rdb')])
+def test_post_cells_matches_frames(tmp_path, file_type, name_format):
+    frame_cfg = make_cfg(tmp_path / 'frames', file_type, name_format)
+    cfg = make_cfg(tmp_path / 'cells', file_type, name_format)
+    writer = aet_param_output.AETParamOutput(cfg)
+    assert writer.open()
+    cell_outputs = dict((cell_id, cell_output(cfg, writer, seed))
+                        for seed, cell_id in enumerate(['A1', 'B2']))
+    for cell_id, output in cell_outputs.items():
+        for period in periods:
+            assert writer.post_cell(cell_id, period, output[period])
+    assert writer.close()
+    post_frames(frame_cfg, cell_outputs)
+
+    assert not [n for n in os.listdir(cfg.project_ws)
+                if n.startswith('aet_spool_')]
+    for period in periods:
+        file_names = sorted(os.listdir(getattr(cfg, period + '_output_aet_ws')))
+        assert file_names == sorted(os.listdir(
+            getattr(frame_cfg, period + '_output_aet_ws')))
+        for file_name in file_names:
+            with open(os.path.join(getattr(cfg, period + '_output_aet_ws'),
+                                   file_name)) as f:
+                cell_text = f.read()
+            with open(os.path.join(
+                    getattr(frame_cfg, period + '_output_aet_ws'),
+                    file_name)) as f:
+                assert cell_text == f.read()
+
+
+def test_close_posts_after_failed_param(tmp_path, monkeypatch):
+    cfg = make_cfg(tmp_path, 'csf', 'KL_%p.csv')
+    writer = aet_param_output.AETParamOutput(cfg)
+    assert writer.open()
+    for period, output_df in cell_output(cfg, writer, 0).items():
+        assert writer.post_cell('A1', period, output_df)
+    posted = []
+
+    def post_params(period, file_path, field_names):
+        posted.append(file_path)
+        return len(posted) > 1
+
+    monkeypatch.setattr(writer, 'post_params', post_params)
+    assert not writer.close()
+    assert len(posted) == len(periods) * len(field_names)
+    assert writer.spool_ws is None
+
+
+def test_remove_spool_without_close(tmp_path):
+    # Run stopped before close, spool removed as at interpreter exit
+    cfg = make_cfg(tmp_path, 'csf', 'KL_%p.csv')
+    writer = aet_param_output.AETParamOutput(cfg)
+    assert writer.open()
+    assert writer.post_cell('A1', 'daily',
+                            cell_output(cfg, writer, 0)['daily'])
+    spool_ws = writer.spool_ws
+    assert os.listdir(spool_ws)
+    writer.remove_spool()
+    assert not os.path.isdir(spool_ws)
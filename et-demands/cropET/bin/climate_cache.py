@@ -0,0 +1,137 @@
+"""climate_cache.py
+On disk cache of processed cell climate (climate_df, refet_df, climate)
+Entries are keyed by the size and modification time of the input files
+    and the INI and cell options used by ETCell.set_input_timeseries
+Called by et_cell.py
+
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import pickle
+
+import climate_archive
+
+# Bump when set_input_timeseries or process_climate output changes
+cache_version = 2
+
+# Cell attributes restored from the cache
+cache_attrs = ['climate_df', 'refet_df', 'climate']
+
+
+def input_paths(data, et_cell):
+    """Return input file paths read for et_cell"""
+    paths = [
+        os.path.join(data.refet['ws'],
+                     data.refet['name_format'] % et_cell.refet_id),
+        os.path.join(data.weather['ws'],
+                     data.weather['name_format'] % et_cell.refet_id)]
+    for archive_ws in [data.refet.get('archive_ws'),
+                       data.weather.get('archive_ws')]:
+        if archive_ws is not None:
+            paths.append(climate_archive.index_path(archive_ws))
+    if data.refet_ratios_path:
+        paths.append(data.refet_ratios_path)
+    if data.phenology_option > 0:
+        paths.append(os.path.join(
+            data.hist_temps['ws'],
+            data.hist_temps['name_format'] % et_cell.refet_id))
+    return paths
+
+
+def cache_key(data, et_cell):
+    """Return hash of input files and options for et_cell
+
+    Parameters
+    ---------
+    data :
+        configuration data
+    et_cell :
+        ETCell instance
+
+    Returns
+    -------
+    key : str
+
+    """
+    items = [cache_version, et_cell.cell_id, et_cell.refet_id,
+             et_cell.aridity_rating, et_cell.air_pressure,
+             data.start_dt, data.end_dt, data.phenology_option,
+             data.co2_flag, sorted(data.refet.items()),
+             sorted(data.weather.items())]
+    if data.refet_ratios_path:
+        items.extend([data.et_ratios_id_field, data.et_ratios_month_field,
+                      data.et_ratios_ratio_field, data.et_ratios_name_field,
+                      data.et_ratios_header_lines])
+    if data.phenology_option > 0:
+        items.append(sorted(data.hist_temps.items()))
+    for path in input_paths(data, et_cell):
+        try:
+            stat = os.stat(path)
+            items.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            items.append((path, None))
+    return hashlib.sha1(repr(items).encode('utf-8')).hexdigest()
+
+
+def cache_path(data, et_cell, key):
+    """Return cache file path of et_cell"""
+    return os.path.join(data.climate_cache_ws, '{}_{}.pkl'.format(
+        et_cell.cell_id, key[:16]))
+
+
+def read(data, et_cell):
+    """Restore processed climate of et_cell from cache
+
+    Returns
+    -------
+    key : str
+        cache key, passed to write()
+    : boolean
+        True if et_cell climate was read from cache
+
+    """
+    key = cache_key(data, et_cell)
+    path = cache_path(data, et_cell, key)
+    if not os.path.isfile(path):
+        return key, False
+    try:
+        with open(path, 'rb') as f:
+            cached = pickle.load(f)
+    except Exception:
+        logging.warning('  Climate cache {} could not be read'.format(path))
+        return key, False
+    if cached.get('key') != key:
+        return key, False
+    for attr in cache_attrs:
+        setattr(et_cell, attr, cached[attr])
+    logging.debug('  Climate read from cache {}'.format(path))
+    return key, True
+
+
+def write(data, et_cell, key):
+    """Write processed climate of et_cell to cache
+
+    Notes
+    -----
+    Older entries of the cell are removed.  Files are written under a
+    temporary name and renamed, so parallel workers never read a
+    partial file.
+
+    """
+    path = cache_path(data, et_cell, key)
+    for old_path in glob.glob(os.path.join(
+            data.climate_cache_ws, '{}_*.pkl'.format(et_cell.cell_id))):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    cached = {attr: getattr(et_cell, attr) for attr in cache_attrs}
+    cached['key'] = key
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
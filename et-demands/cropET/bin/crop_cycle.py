@@ -1,7 +1,7 @@
 """crop_cycle.py
 Defines DayData class
-Defines crop_cycle_mp, crop_cycle, crop_day_loop_mp, crop_day_loop,
-    write_crop_output
+Defines crop_cycle_mp, crop_cycle, crop_cycle_vec, crop_day_loop_mp,
+    crop_day_loop, write_cell_output, write_crop_output, write_table_output
 Called by mod_crop_et.py
 
 """
@@ -14,11 +14,27 @@ import numpy as np
 import pandas as pd
 import sys
 
+try:
+    import pyarrow as pa
+    import pyarrow.feather as pa_feather
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    pa = None
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                             '../../lib')))
 import calculate_height
 import compute_crop_et
 import compute_crop_gdd
+import crop_day_vec
+import crop_kernels
+import crop_pool
+import crop_store
+from crop_state import CropState
 from initialize_crop_cycle import InitializeCropCycle
+import growing_season
 import kcb_daily
+import period_agg
 
 
 class DayData:
@@ -37,7 +53,7 @@ class DayData:
         self.etref_array = np.zeros(30)
 
 
-def crop_cycle_mp(data, et_cell, mp_procs=1):
+def crop_cycle_mp(data, et_cell, mp_procs=1, pool=None):
     """Compute crop et for all crops using multiprocessing
 
     Parameters
@@ -48,6 +64,8 @@ def crop_cycle_mp(data, et_cell, mp_procs=1):
 
     mp_procs :
         number of cores to use for multiprocessing
+    pool : multiprocessing.Pool, optional
+        persistent pool from crop_pool.crop_pool()
 
     Returns
     -------
@@ -56,8 +74,31 @@ def crop_cycle_mp(data, et_cell, mp_procs=1):
     Notes
     -----
     crop_day_loop_mp() will unpack arguments and call crop_day_loop()
+    With a persistent pool the cell climate is published once in shared
+    memory and tasks carry the cell without its DataFrames
+    Vectorized runs process all crops of the cell in this process
 
     """
+    if getattr(data, 'vectorize_flag', False):
+        return crop_cycle_vec(data, et_cell, mp_procs)
+    write_cell_output(data, et_cell)
+
+    if pool is not None:
+        crop_mp_list = []
+        shared_cell = crop_pool.SharedCell(et_cell)
+        crop_count = 0
+        for crop_num, crop in sorted(et_cell.crop_params.items()):
+            if et_cell.crop_flags[crop_num] != 0:
+                crop_count += 1
+                crop_mp_list.append(
+                    (crop_count, shared_cell, crop_num, mp_procs))
+        try:
+            for crop_num in pool.imap_unordered(
+                    crop_pool.crop_day_loop_shared, crop_mp_list):
+                logging.info('  Crop {} done'.format(crop_num))
+        finally:
+            shared_cell.unlink()
+        return
 
     crop_count = 0
     crop_mp_list = []
@@ -86,7 +127,14 @@ def crop_cycle(data, et_cell, debug_flag=False, mp_procs=1):
 
     Returns:
         None
+
+    Notes:
+        With vectorize_flag set (and debug off) all crops are advanced
+        together by crop_cycle_vec()
     """
+    if getattr(data, 'vectorize_flag', False) and not debug_flag:
+        return crop_cycle_vec(data, et_cell, mp_procs)
+    write_cell_output(data, et_cell)
     crop_count = 0
     for crop_num, crop in sorted(et_cell.crop_params.items()):
         try:
@@ -102,6 +150,327 @@ def crop_cycle(data, et_cell, debug_flag=False, mp_procs=1):
             logging.warning(' KEYERROR NOT USED')
 
 
+def crop_cycle_vec(data, et_cell, mp_procs=1):
+    """Compute crop ET for all crops of a cell in one vectorized day loop
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    mp_procs : int
+        number of cores to use for multiprocessing
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Crop state is held in a CropState (one array element per crop) and
+    advanced by crop_day_vec.day_step(), results match crop_day_loop()
+    Crops whose cutting cycle curves are missing fall back to crop_day_loop()
+
+    """
+    write_cell_output(data, et_cell)
+    units = []
+    crop_counts = []
+    crop_count = 0
+    for crop_num, crop in sorted(et_cell.crop_params.items()):
+        if et_cell.crop_flags[crop_num] == 0:
+            continue
+        crop_count += 1
+        foo = crop_load_vec(data, et_cell, crop, crop_count, mp_procs,
+                            log_flag=(mp_procs == 1))
+        if foo is not None:
+            units.append((et_cell, crop, foo))
+            crop_counts.append(crop_count)
+    if units:
+        crop_units_vec(data, units, crop_counts)
+
+
+def crop_cycle_batch(data, et_cells, mp_procs=1):
+    """Compute crop ET for each crop across many cells in one day loop
+
+    Parameters
+    ---------
+    data :
+
+    et_cells : list
+        ETCell instances with input timeseries already set
+    mp_procs : int
+        number of cores to use for multiprocessing
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Cells are the array axis of the CropState, so the interpreter cost of
+    a crop is paid once per day rather than once per cell and day
+    Cells are grouped by date index, each group is run separately
+
+    """
+    for et_cell in et_cells:
+        write_cell_output(data, et_cell)
+    crop_nums = sorted(set(
+        crop_num for et_cell in et_cells
+        for crop_num, flag in et_cell.crop_flags.items()
+        if flag and crop_num in et_cell.crop_params))
+
+    # Crop count of each cell, as computed by crop_cycle()
+    crop_counts = {}
+    for et_cell in et_cells:
+        crop_counts[et_cell.cell_id] = {
+            crop_num: i + 1 for i, crop_num in enumerate(sorted(
+                c for c in et_cell.crop_params if et_cell.crop_flags[c]))}
+
+    for crop_num in crop_nums:
+        groups = {}
+        for et_cell in et_cells:
+            if not et_cell.crop_flags.get(crop_num, 0):
+                continue
+            crop = et_cell.crop_params[crop_num]
+            crop_count = crop_counts[et_cell.cell_id][crop_num]
+            foo = crop_load_vec(data, et_cell, crop, crop_count, mp_procs,
+                                log_flag=False)
+            if foo is None:
+                continue
+            index = foo.crop_df.index
+            key = (index[0], index[-1], len(index))
+            groups.setdefault(key, ([], []))
+            groups[key][0].append((et_cell, crop, foo))
+            groups[key][1].append(crop_count)
+        if groups and mp_procs == 1:
+            crop = list(groups.values())[0][0][0][1]
+            logging.warning('Crop {} - {} ({} cells)'.format(
+                crop.class_number, crop.name,
+                sum(len(units) for units, _ in groups.values())))
+        for units, unit_crop_counts in groups.values():
+            crop_units_vec(data, units, unit_crop_counts)
+
+
+def crop_load_vec(data, et_cell, crop, crop_count, mp_procs=1,
+                  log_flag=True):
+    """Load and set up a crop cycle for the vectorized day loop
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    crop_count : int
+        count of crop being computed
+    mp_procs : int
+        number of cores to use for multiprocessing
+    log_flag : boolean
+        True : log crop name [default]
+
+    Returns
+    -------
+    foo : InitializeCropCycle
+        None if the crop was not set up or was run by crop_day_loop()
+
+    """
+    try:
+        if crop.flag_for_means_to_estimate_pl_or_gu not in [1, 2, 3, 4]:
+            logging.error(
+                '\nERROR: kcb_daily() Unrecognized ' +
+                'flag_for_means_to_estimate_pl_or_gu value')
+            sys.exit()
+        if crop.cutting_crop and any(
+                crop.curve_number + i not in et_cell.crop_coeffs
+                for i in [1, 2]):
+            crop_day_loop(crop_count, data, et_cell, crop, False, mp_procs)
+            return None
+        if log_flag:
+            logging.warning(
+                'Crop {} - {}'.format(crop.class_number, crop.name))
+        foo = InitializeCropCycle()
+        foo.crop_load(data, et_cell, crop)
+        if data.co2_flag:
+            foo.setup_co2(et_cell, crop)
+        foo.setup_dataframe(et_cell)
+        if not foo.in_season and foo.crop_setup_flag:
+            foo.setup_crop(crop)
+    except KeyError:
+        logging.warning('Crop %2d %s' % (crop.class_number, crop.name))
+        logging.warning(' KEYERROR NOT USED')
+        return None
+    return foo
+
+
+def crop_units_vec(data, units, crop_counts):
+    """Run loaded crop cycles together and write their output
+
+    Parameters
+    ---------
+    data :
+
+    units : list
+        (et_cell, crop, foo) for each unit, all sharing one date index
+    crop_counts : list
+        crop count of each unit
+
+    Returns
+    -------
+    None
+
+    """
+    s = CropState(units)
+    crop_df = units[0][2].crop_df
+    output = crop_state_loop(data, s, [u[0].climate_df for u in units],
+                             crop_df,
+                             [foo.co2 for _, _, foo in units]
+                             if data.co2_flag else None)
+
+    for i, (et_cell, crop, foo) in enumerate(units):
+        for field, values in output.items():
+            foo.crop_df[field] = values[:, i]
+        if (data.cet_out['daily_output_flag'] or
+            data.cet_out['monthly_output_flag'] or
+            data.cet_out['annual_output_flag'] or
+            data.gs_output_flag):
+            write_crop_output(crop_counts[i], data, et_cell, crop, foo)
+
+
+def crop_state_loop(data, s, climate_dfs, crop_df, co2_list=None):
+    """Advance a CropState through every time step of crop_df
+
+    Parameters
+    ---------
+    data :
+
+    s : CropState
+
+    climate_dfs : list
+        climate of each unit, must contain every date in crop_df
+        units of the same cell may share one DataFrame
+    crop_df : pandas.DataFrame
+        date indexed frame with doy column
+    co2_list : list, optional
+        CO2 correction series for each unit
+
+    Returns
+    -------
+    output : dict
+        (days, units) array for each crop_df output column
+
+    """
+    dates = crop_df.index
+    n_days = len(dates)
+
+    # Each distinct climate frame is sliced once, then stacked (days, units)
+    frames = {}
+    for climate_df in climate_dfs:
+        if id(climate_df) not in frames:
+            frames[id(climate_df)] = climate_df.loc[dates]
+    unit_frames = [frames[id(climate_df)] for climate_df in climate_dfs]
+
+    def column(name):
+        if len(frames) == 1:
+            values = unit_frames[0][name].values.astype(np.float64)
+            return np.repeat(values[:, None], s.n, axis=1)
+        return np.column_stack(
+            [f[name].values for f in unit_frames]).astype(np.float64)
+
+    # Units using historic (constant) phenology temperatures
+    if data.phenology_option == 0:
+        hist = np.zeros(s.n, dtype=bool)
+    elif data.phenology_option == 1:
+        hist = s.crop_is_annual.copy()
+    elif data.phenology_option == 2:
+        hist = ~s.crop_is_annual
+    else:
+        hist = np.ones(s.n, dtype=bool)
+    temps = {}
+    for field, main_col, hist_col in [
+            ('tmean', 'tmean', 'meant'), ('tmin', 'tmin', 'mint'),
+            ('tmax', 'tmax', 'maxt'), ('t30', 't30', '30t')]:
+        if hist.any():
+            temps[field] = np.where(
+                hist[None, :], column(hist_col), column(main_col))
+        else:
+            temps[field] = column(main_col)
+    weather = {'tdew': column('tdew'), 'u2': column('wind'),
+                'precip': column('ppt'), 'rh_min': column('rh_min'),
+                'etref': column('etref'), 'snow_depth': column('snow_depth')}
+    if co2_list is not None:
+        co2 = np.column_stack(
+            [c.loc[dates].values.astype(np.float64) for c in co2_list])
+
+    doys = crop_df['doy'].values.astype(int).tolist()
+    years = dates.year.tolist()
+    months = dates.month.tolist()
+    days = dates.day.tolist()
+
+    output = {
+        'et_act': np.empty((n_days, s.n)), 'et_pot': np.empty((n_days, s.n)),
+        'et_bas': np.empty((n_days, s.n)), 'kc_act': np.empty((n_days, s.n)),
+        'kc_bas': np.empty((n_days, s.n)),
+        'irrigation': np.empty((n_days, s.n)),
+        'runoff': np.empty((n_days, s.n)), 'dperc': np.empty((n_days, s.n)),
+        'niwr': np.empty((n_days, s.n)),
+        'season': np.empty((n_days, s.n), dtype=np.int64),
+        'cutting': np.empty((n_days, s.n), dtype=np.int64),
+        'p_rz': np.empty((n_days, s.n)), 'p_eft': np.empty((n_days, s.n))}
+    season_count = np.zeros(s.n, dtype=np.int64)
+
+    # Compiled kernels share the CropState arrays
+    if getattr(data, 'numba_flag', False):
+        k = crop_kernels.kernel_state(s)
+    else:
+        k = None
+
+    d = crop_day_vec.DayArrays()
+    for t in range(n_days):
+        d.sdays += 1
+        d.doy = doys[t]
+        if d.sdays > 1 and years[t] != d.year:
+            season_count[:] = 0
+        d.year = years[t]
+        d.month = months[t]
+        d.day = days[t]
+        for field, values in weather.items():
+            setattr(d, field, values[t])
+        for field, values in temps.items():
+            setattr(d, field, values[t])
+        if co2_list is not None:
+            d.co2 = co2[t]
+
+        crop_day_vec.day_step(data, s, d, k)
+
+        output['et_act'][t] = s.etc_act
+        output['et_pot'][t] = s.etc_pot
+        output['et_bas'][t] = s.etc_bas
+        output['kc_act'][t] = s.kc_act
+        output['kc_bas'][t] = s.kc_bas
+        output['irrigation'][t] = s.irr_sim
+        output['runoff'][t] = s.sro
+        output['dperc'][t] = s.dperc
+        output['niwr'][t] = s.niwr + 0
+        output['season'][t] = s.in_season
+        output['cutting'][t] = s.cutting
+        output['p_rz'][t] = s.p_rz
+        output['p_eft'][t] = s.p_eft
+
+        # Check that season started
+        season_count += s.in_season
+        if d.month == 12 and d.day == 31:
+            for i in np.flatnonzero(season_count <= 1):
+                logging.warning(
+                    '  Crop {} - {} growing season {}'.format(
+                        s.crops[i].class_number, d.year,
+                        'never started' if season_count[i] == 0 else
+                        'active for 1 day'))
+    return output
+
+
 def crop_day_loop_mp(tup):
     """Compute crop et for each daily timestep using multiprocessing
 
@@ -201,29 +570,78 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
     if not foo.in_season and foo.crop_setup_flag:
         foo.setup_crop(crop)
 
-    for step_dt, step_doy in foo.crop_df[['doy']].iterrows():
+    # Climate is read from NumPy columns pulled once for all time steps
+    dates = foo.crop_df.index
+    n_days = len(dates)
+    climate_df = et_cell.climate_df.loc[dates]
+    if data.phenology_option == 0:
+        hist_temps = False
+    elif data.phenology_option == 1:  # annual crops only
+        hist_temps = crop.is_annual
+    elif data.phenology_option == 2:  # perennial crops only
+        hist_temps = not crop.is_annual
+    else:  # both annual and perennial
+        hist_temps = True
+    if hist_temps:
+        temp_cols = ['meant', 'mint', 'maxt', '30t']
+    else:
+        temp_cols = ['tmean', 'tmin', 'tmax', 't30']
+
+    def column(name):
+        return climate_df[name].values.astype(np.float64).tolist()
+
+    doy_list = foo.crop_df['doy'].values.astype(int).tolist()
+    year_list = dates.year.tolist()
+    month_list = dates.month.tolist()
+    day_list = dates.day.tolist()
+    tdew_list = column('tdew')
+    u2_list = column('wind')
+    precip_list = column('ppt')
+    rh_min_list = column('rh_min')
+    etref_list = column('etref')
+    snow_depth_list = column('snow_depth')
+    tmean_list, tmin_list, tmax_list, t30_list = [
+        column(col) for col in temp_cols]
+    if data.co2_flag:
+        co2_list = foo.co2.loc[dates].values.astype(np.float64).tolist()
+    if debug_flag:
+        refet_list = foo.crop_df['etref'].values.astype(np.float64).tolist()
+
+    # Output is written to preallocated arrays, copied to crop_df at end
+    et_act = np.empty(n_days)
+    et_pot = np.empty(n_days)
+    et_bas = np.empty(n_days)
+    kc_act = np.empty(n_days)
+    kc_bas = np.empty(n_days)
+    irrigation = np.empty(n_days)
+    runoff = np.empty(n_days)
+    dperc = np.empty(n_days)
+    niwr = np.empty(n_days)
+    season = np.empty(n_days, dtype=np.int64)
+    cutting = np.empty(n_days, dtype=np.int64)
+    p_rz = np.empty(n_days)
+    p_eft = np.empty(n_days)
+    season_count = 0
+
+    for t in range(n_days):
         if debug_flag:
             logging.debug(
                 '\n{}: DOY {}  Date {}'.format(
-                    func_str, int(step_doy), step_dt.date()))
+                    func_str, doy_list[t], dates[t].date()))
 
             # Log RefET values at time step
             logging.debug((
                 '{}: PPT {:.6f}  Wind {:.6f}  ' +
                 'Tdew {:.6f} ETref {:.6f}').format(
-                func_str, et_cell.climate_df.at[step_dt, 'ppt'],
-                et_cell.climate_df.at[step_dt, 'wind'],
-                et_cell.climate_df.at[step_dt, 'tdew'],
-                et_cell.refet_df.at[step_dt, 'etref']))
+                func_str, precip_list[t], u2_list[t], tdew_list[t],
+                refet_list[t]))
 
             # Log climate values at time step
             logging.debug((
                 '{}: tmax {:.6f}  tmin {:.6f}  ' +
                 'tmean {:.6f}  t30 {:.6f}').format(
-                func_str, et_cell.climate_df.at[step_dt, 'tmax'],
-                et_cell.climate_df.at[step_dt, 'tmin'],
-                et_cell.climate_df.at[step_dt, 'tmean'],
-                et_cell.climate_df.at[step_dt, 't30']))
+                func_str, tmax_list[t], tmin_list[t], tmean_list[t],
+                t30_list[t]))
 
         # End of season for each crop, set up for non-growing and dormant season
         if not foo.in_season and foo.dormant_setup_flag:
@@ -235,57 +653,27 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
                     foo.dormant_setup_flag))
 
         # Track variables for each day
-        # For now, cast all values to native Python types
+        # Values are native Python types
         foo_day.sdays += 1
-        foo_day.doy = int(step_doy)
-        if foo_day.doy == 155:
-            a = 1
-        foo_day.year = int(step_dt.year)
-        foo_day.month = int(step_dt.month)
-        foo_day.day = int(step_dt.day)
-        foo_day.date = step_dt
-        foo_day.tdew = float(et_cell.climate_df.at[step_dt, 'tdew'])
-        foo_day.u2 = float(et_cell.climate_df.at[step_dt, 'wind'])
-        foo_day.precip = float(et_cell.climate_df.at[step_dt, 'ppt'])
-        foo_day.rh_min = float(et_cell.climate_df.at[step_dt, 'rh_min'])
-        foo_day.etref = float(et_cell.climate_df.at[step_dt, 'etref'])
-        foo_day.snow_depth = float(et_cell.climate_df.at[step_dt, 'snow_depth'])
-        if data.phenology_option == 0:
-            foo_day.tmean = float(et_cell.climate_df.at[step_dt, 'tmean'])
-            foo_day.tmin = float(et_cell.climate_df.at[step_dt, 'tmin'])
-            foo_day.tmax = float(et_cell.climate_df.at[step_dt, 'tmax'])
-            foo_day.t30 = float(et_cell.climate_df.at[step_dt, 't30'])
-        elif data.phenology_option == 1:  # annual crops only
-            if crop.is_annual:
-                foo_day.tmean = float(et_cell.climate_df.at[step_dt, 'meant'])
-                foo_day.tmin = float(et_cell.climate_df.at[step_dt, 'mint'])
-                foo_day.tmax = float(et_cell.climate_df.at[step_dt, 'maxt'])
-                foo_day.t30 = float(et_cell.climate_df.at[step_dt, '30t'])
-            else:
-                foo_day.tmean = float(et_cell.climate_df.at[step_dt, 'tmean'])
-                foo_day.tmin = float(et_cell.climate_df.at[step_dt, 'tmin'])
-                foo_day.tmax = float(et_cell.climate_df.at[step_dt, 'tmax'])
-                foo_day.t30 = float(et_cell.climate_df.at[step_dt, 't30'])
-        elif data.phenology_option == 2:  # perennial crops only
-            if not crop.is_annual:
-                foo_day.tmean = float(et_cell.climate_df.at[step_dt, 'meant'])
-                foo_day.tmin = float(et_cell.climate_df.at[step_dt, 'mint'])
-                foo_day.tmax = float(et_cell.climate_df.at[step_dt, 'maxt'])
-                foo_day.t30 = float(et_cell.climate_df.at[step_dt, '30t'])
-            else:
-                foo_day.tmean = float(et_cell.climate_df.at[step_dt, 'tmean'])
-                foo_day.tmin = float(et_cell.climate_df.at[step_dt, 'tmin'])
-                foo_day.tmax = float(et_cell.climate_df.at[step_dt, 'tmax'])
-                foo_day.t30 = float(et_cell.climate_df.at[step_dt, 't30'])
-        else:  # both annual and perennial
-            foo_day.tmean = float(et_cell.climate_df.at[step_dt, 'meant'])
-            foo_day.tmin = float(et_cell.climate_df.at[step_dt, 'mint'])
-            foo_day.tmax = float(et_cell.climate_df.at[step_dt, 'maxt'])
-            foo_day.t30 = float(et_cell.climate_df.at[step_dt, '30t'])
+        foo_day.doy = doy_list[t]
+        foo_day.year = year_list[t]
+        foo_day.month = month_list[t]
+        foo_day.day = day_list[t]
+        foo_day.date = dates[t]
+        foo_day.tdew = tdew_list[t]
+        foo_day.u2 = u2_list[t]
+        foo_day.precip = precip_list[t]
+        foo_day.rh_min = rh_min_list[t]
+        foo_day.etref = etref_list[t]
+        foo_day.snow_depth = snow_depth_list[t]
+        foo_day.tmean = tmean_list[t]
+        foo_day.tmin = tmin_list[t]
+        foo_day.tmax = tmax_list[t]
+        foo_day.t30 = t30_list[t]
 
         # Get CO2 correction factor for each day
         if data.co2_flag:
-            foo_day.co2 = float(foo.co2.at[step_dt])
+            foo_day.co2 = co2_list[t]
 
         # Compute crop growing degree days
         compute_crop_gdd.compute_crop_gdd(crop, foo, foo_day)
@@ -301,21 +689,20 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
         compute_crop_et.compute_crop_et(data, et_cell, crop, foo, foo_day,
                                         debug_flag)
 
-        # Retrieve values from foo_day and write to output data frame
-        # Eventually let compute_crop_et() write directly to output df
-        foo.crop_df.at[step_dt, 'et_act'] = foo.etc_act
-        foo.crop_df.at[step_dt, 'et_pot'] = foo.etc_pot
-        foo.crop_df.at[step_dt, 'et_bas'] = foo.etc_bas
-        foo.crop_df.at[step_dt, 'kc_act'] = foo.kc_act
-        foo.crop_df.at[step_dt, 'kc_bas'] = foo.kc_bas
-        foo.crop_df.at[step_dt, 'irrigation'] = foo.irr_sim
-        foo.crop_df.at[step_dt, 'runoff'] = foo.sro
-        foo.crop_df.at[step_dt, 'dperc'] = foo.dperc
-        foo.crop_df.at[step_dt, 'p_rz'] = foo.p_rz
-        foo.crop_df.at[step_dt, 'p_eft'] = foo.p_eft
-        foo.crop_df.at[step_dt, 'niwr'] = foo.niwr + 0
-        foo.crop_df.at[step_dt, 'season'] = int(foo.in_season)
-        foo.crop_df.at[step_dt, 'cutting'] = int(foo.cutting)
+        # Retrieve values from foo_day and write to output arrays
+        et_act[t] = foo.etc_act
+        et_pot[t] = foo.etc_pot
+        et_bas[t] = foo.etc_bas
+        kc_act[t] = foo.kc_act
+        kc_bas[t] = foo.kc_bas
+        irrigation[t] = foo.irr_sim
+        runoff[t] = foo.sro
+        dperc[t] = foo.dperc
+        p_rz[t] = foo.p_rz
+        p_eft[t] = foo.p_eft
+        niwr[t] = foo.niwr + 0
+        season[t] = int(foo.in_season)
+        cutting[t] = int(foo.cutting)
 
         # Write final output file variables to DEBUG file
         if debug_flag:
@@ -331,9 +718,10 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
                 func_str, foo.irr_sim, foo.sro, foo.dperc, foo.niwr))
 
         # Check that season started
+        if t > 0 and foo_day.year != year_list[t - 1]:
+            season_count = 0
+        season_count += int(foo.in_season)
         if foo_day.month == 12 and foo_day.day == 31:
-            season_count = foo.crop_df.loc[
-                           str(foo_day.year):str(foo_day.year), 'season'].sum()
             if season_count == 0:
                 logging.warning(
                     '  Crop {} - {} growing season never started'.format(
@@ -343,6 +731,20 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
                     '  Crop {} - {} growing season active for 1 day'.format(
                         crop.class_number, foo_day.year))
 
+    foo.crop_df['et_act'] = et_act
+    foo.crop_df['et_pot'] = et_pot
+    foo.crop_df['et_bas'] = et_bas
+    foo.crop_df['kc_act'] = kc_act
+    foo.crop_df['kc_bas'] = kc_bas
+    foo.crop_df['irrigation'] = irrigation
+    foo.crop_df['runoff'] = runoff
+    foo.crop_df['dperc'] = dperc
+    foo.crop_df['niwr'] = niwr
+    foo.crop_df['season'] = season
+    foo.crop_df['cutting'] = cutting
+    foo.crop_df['p_rz'] = p_rz
+    foo.crop_df['p_eft'] = p_eft
+
     # Write output files
     if (data.cet_out['daily_output_flag'] or
         data.cet_out['monthly_output_flag'] or
@@ -352,6 +754,31 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
     return True
 
 
+def write_cell_output(data, et_cell):
+    """Write daily cell variables once per cell
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+        ETCell instance with its climate loaded
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Only the consolidated store has cell variables, they are written by
+    the process that loaded the cell so parallel crop tasks of the cell
+    never write the same chunk
+
+    """
+    if data.cet_out.get('file_type') == 'zarr':
+        crop_store.write_cell(data, et_cell)
+
+
 def write_crop_output(crop_count, data, et_cell, crop, foo):
     """Write output files for each cell and crop
 
@@ -403,11 +830,25 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
     p_rz_fraction_field = 'P_rz_fraction'
     p_eft_fraction_field = 'P_eft_fraction'
 
+    # Daily results go to an in process consumer (AreaET) if a sink is set
+    # or to the consolidated store instead of per crop files
+    cet_sink = getattr(data, 'cet_sink', None)
+    if cet_sink is not None:
+        daily_flag, monthly_flag, annual_flag = False, False, False
+    elif data.cet_out.get('file_type') == 'zarr':
+        crop_store.write_crop(data, et_cell, crop, foo.crop_df)
+        daily_flag, monthly_flag, annual_flag = False, False, False
+    else:
+        daily_flag = data.cet_out['daily_output_flag']
+        monthly_flag = data.cet_out['monthly_output_flag']
+        annual_flag = data.cet_out['annual_output_flag']
+
     # Merge crop and weather data frames to form daily output
-    if (data.cet_out['daily_output_flag'] or
-        data.cet_out['monthly_output_flag'] or
-        data.cet_out['annual_output_flag'] or
-        data.gs_output_flag):
+    if (daily_flag or
+        monthly_flag or
+        annual_flag or
+        data.gs_output_flag or
+        cet_sink is not None):
         daily_output_df = pd.merge(
             foo.crop_df, et_cell.climate_df[['ppt']],
             # foo.crop_df, et_cell.climate_df[['ppt', 't30']],
@@ -424,9 +865,11 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
             'runoff': runoff_field, 'dperc': dperc_field,
             'p_rz': p_rz_field, 'p_eft': p_eft_field,
             'season': season_field, 'cutting': cutting_field})
+        if cet_sink is not None:
+            cet_sink(et_cell, crop, daily_output_df.copy())
 
     # Compute monthly and annual stats before modifying daily format below
-    if data.cet_out['monthly_output_flag']:
+    if monthly_flag:
         monthly_resample_func = {
             pmet_field: np.sum, etact_field: np.sum, etpot_field: np.sum,
             etbas_field: np.sum, kc_field: np.mean, kcb_field: np.mean,
@@ -434,17 +877,15 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
             runoff_field: np.sum, dperc_field: np.sum,
             p_rz_field: np.sum, p_eft_field: np.sum,
             season_field: np.sum, cutting_field: np.sum}
-        # dri dm approach produces 'TypeError: ("'dict' object is not callable",
-        # a u'occurred at index DOY')
-        monthly_output_df = daily_output_df.resample('MS').apply(
-            monthly_resample_func)
+        monthly_output_df = period_agg.aggregate_df(
+            daily_output_df, monthly_resample_func, 'month')
         # add effective ppt fractions to monthly tables
         monthly_output_df[p_rz_fraction_field] = \
             (monthly_output_df[p_rz_field] / monthly_output_df[precip_field]).fillna(0)
         monthly_output_df[p_eft_fraction_field] = \
             (monthly_output_df[p_eft_field] / monthly_output_df[precip_field]).fillna(0)
 
-    if data.cet_out['annual_output_flag']:
+    if annual_flag:
         annual_resample_func = {
             pmet_field: np.sum, etact_field: np.sum, etpot_field: np.sum,
             etbas_field: np.sum, kc_field: np.mean, kcb_field: np.mean,
@@ -452,10 +893,8 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
             runoff_field: np.sum, dperc_field: np.sum,
             p_rz_field: np.sum, p_eft_field: np.sum,
             season_field: np.sum, cutting_field: np.sum}
-        # dri dm approach produces 'TypeError: ("'dict' object is not callable",
-        # a u'occurred at index DOY')
-        annual_output_df = daily_output_df.resample('AS').apply(
-            annual_resample_func)
+        annual_output_df = period_agg.aggregate_df(
+            daily_output_df, annual_resample_func, 'year')
         # add effective ppt fractions to annual tables
         annual_output_df[p_rz_fraction_field] = \
             (annual_output_df[p_rz_field] / annual_output_df[precip_field]).fillna(0)
@@ -465,81 +904,54 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
     # Get growing season start and end DOY for each year
     # Compute growing season length for each year
     if data.gs_output_flag:
-        # dri dm approach produces 'TypeError: ("'dict' object is not callable",
-        # a u'occurred at index DOY')
-        gs_output_df = daily_output_df.resample('AS').apply(
-            {year_field: np.mean})
-        gs_output_df[gs_start_doy_field] = np.nan
-        gs_output_df[gs_end_doy_field] = np.nan
+        gs_output_df = period_agg.aggregate_df(
+            daily_output_df, {year_field: np.mean}, 'year')
+        gs_bounds = period_agg.period_bounds(daily_output_df.index, 'year')
+        gs = growing_season.season_transitions(
+            daily_output_df[season_field].values, gs_bounds)
+        doy_array = daily_output_df[doy_field].values
+        year_starts = np.minimum(gs_bounds.starts, len(doy_array) - 1)
+        nonempty = gs.counts > 0
+        season_flag = nonempty & (gs.length > 0)
+        if not np.all(season_flag[nonempty]):
+            logging.debug('  Skipping, season flag was never set to 1')
+
+        # Season starts on first day after off to on transition or on first
+        # day of year, ends on first day after on to off transition or on
+        # last day of year
+        start_doy = np.where(
+            gs.start_i >= 0, doy_array[gs.start_i],
+            np.minimum.reduceat(doy_array, year_starts))
+        end_doy = np.where(
+            gs.end_i >= 0, doy_array[np.minimum(gs.end_i + 1, len(doy_array) - 1)],
+            np.maximum.reduceat(doy_array, year_starts))
+        gs_output_df[gs_start_doy_field] = np.where(
+            season_flag, start_doy, np.nan)
+        gs_output_df[gs_end_doy_field] = np.where(
+            season_flag, end_doy, np.nan)
         gs_output_df[gs_start_date_field] = None
         gs_output_df[gs_end_date_field] = None
-        gs_output_df[gs_length_field] = np.nan
-        for year_i, (year, group) in enumerate(daily_output_df.groupby(
-            [year_field])):
-            if not np.any(group[season_field].values):
-                logging.debug('  Skipping, season flag was never set to 1')
-                continue
-            else:
-                season_diff = np.diff(group[season_field].values)
-                try:
-                    start_i = np.where(season_diff == 1)[0][0] + 1
-
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_start_doy_field,
-                    #     int(group.ix[start_i, doy_field]))
-                    # Replacement for set_value Future Warning
-                    # gs_output_df.at[group.index[0], gs_start_doy_field] = int(
-                    #     group.ix[start_i, doy_field])
-                    # Replacement for .ix deprecation 4/22/2020
-                    gs_output_df.at[group.index[0], gs_start_doy_field] = int(
-                        group.loc[group.index[start_i], doy_field])
-                except:
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_start_doy_field,
-                    #     int(min(group[doy_field].values)))
-                    # Replacement for set_value Future Warning
-                    gs_output_df.at[group.index[0], gs_start_doy_field] = int(
-                        min(group[doy_field].values))
-
-                try:
-                    end_i = np.where(season_diff == -1)[0][0] + 1
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_end_doy_field,
-                    #     int(group.ix[end_i, doy_field]))
-                    # Replacement for set_value Future Warning
-                    # gs_output_df.at[group.index[0], gs_end_doy_field] = int(
-                    #     group.ix[end_i, doy_field])
-                    # Replacement for .ix deprecation 4/22/2020
-                    gs_output_df.at[group.index[0], gs_end_doy_field] = int(
-                        group.loc[group.index[end_i], doy_field])
-                except:
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_end_doy_field,
-                    #     int(max(group[doy_field].values)))
-                    # Replacement for set_value Future Warning
-                    gs_output_df.at[group.index[0], gs_end_doy_field] = int(
-                        max(group[doy_field].values))
-                del season_diff
-            # gs_output_pd.set_value(
-            #     group.index[0], gs_length_field,
-            #     int(sum(group[season_field].values)))
-            # Replacement for set_value Future Warning
-            gs_output_df.at[group.index[0], gs_length_field] = int(
-                sum(group[season_field].values))
+        # Years without season days have no length, as start and end
+        gs_output_df[gs_length_field] = np.where(
+            season_flag, gs.length, np.nan)
+        del gs_bounds, gs, doy_array, year_starts, nonempty, season_flag
 
     base_columns = []
     open_mode = 'w'
     print_index = True
     print_header = True
 
+    # Binary file types keep typed columns, formatting is csv only
+    csv_flag = data.cet_out.get('file_type', 'csv') == 'csv'
+
     # Write daily cet
-    if data.cet_out['daily_output_flag']:
+    if daily_flag:
         daily_output_df[year_field] = daily_output_df.index.year
         daily_output_df[month_field] = daily_output_df.index.month
         daily_output_df[day_field] = daily_output_df.index.day
 
         # format date attributes if values are formatted
-        if data.cet_out['daily_float_format'] is not None:
+        if csv_flag and data.cet_out['daily_float_format'] is not None:
             daily_output_df[year_field] = daily_output_df[year_field].map(
                 lambda x: ' %4d' % x)
             daily_output_df[month_field] = daily_output_df[month_field].map(
@@ -554,8 +966,9 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
         daily_output_df[niwr_field] = np.round(daily_output_df[niwr_field], 6)
         # daily_output_df[niwr_field] = np.round(
         # daily_output_df[niwr_field].values, 6)
-        daily_output_df[season_field] = daily_output_df[season_field].map(
-            lambda x: ' %1d' % x)
+        if csv_flag:
+            daily_output_df[season_field] = daily_output_df[season_field].map(
+                lambda x: ' %1d' % x)
         daily_output_path = os.path.join(
             data.cet_out['daily_output_ws'],
             data.cet_out['name_format'].replace(
@@ -580,27 +993,33 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
 
         # Most crops do not have cuttings, so append if needed
         if data.cutting_flag and crop.cutting_crop:
-            daily_output_df[cutting_field] = daily_output_df[cutting_field].map(
-                lambda x: ' %1d' % x)
+            if csv_flag:
+                daily_output_df[cutting_field] = daily_output_df[
+                    cutting_field].map(lambda x: ' %1d' % x)
             daily_output_columns.append(cutting_field)
 
-        with open(daily_output_path, open_mode, newline='') as daily_output_f:
-            daily_output_f.write('# {0:2d} - {1}\n'.format(
-                crop.class_number, crop.name))
-            daily_output_df.to_csv(
-                daily_output_f, header=print_header, index=print_index,
-                sep=',', columns=daily_output_columns,
-                float_format=data.cet_out['daily_float_format'],
-                date_format=data.cet_out['daily_date_format'])
+        if not csv_flag:
+            write_table_output(data, daily_output_df, daily_output_columns,
+                               data.cet_out['daily_output_ws'], et_cell, crop,
+                               year_groups=True)
+        else:
+            with open(daily_output_path, open_mode, newline='') as daily_output_f:
+                daily_output_f.write('# {0:2d} - {1}\n'.format(
+                    crop.class_number, crop.name))
+                daily_output_df.to_csv(
+                    daily_output_f, header=print_header, index=print_index,
+                    sep=',', columns=daily_output_columns,
+                    float_format=data.cet_out['daily_float_format'],
+                    date_format=data.cet_out['daily_date_format'])
         del daily_output_df, daily_output_path, daily_output_columns
 
     # Write monthly cet
-    if data.cet_out['monthly_output_flag']:
+    if monthly_flag:
         monthly_output_df[year_field] = monthly_output_df.index.year
         monthly_output_df[month_field] = monthly_output_df.index.month
 
         # format date attributes if values are formatted
-        if data.cet_out['monthly_float_format'] is not None:
+        if csv_flag and data.cet_out['monthly_float_format'] is not None:
             monthly_output_df[year_field] = \
                 monthly_output_df[year_field].map(lambda x: ' %4d' % x)
             monthly_output_df[month_field] = \
@@ -621,24 +1040,30 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
                                                  p_rz_fraction_field, p_eft_fraction_field,
                                                  niwr_field, season_field]
         if data.cutting_flag and crop.cutting_crop:
-            monthly_output_df[cutting_field] = \
-                monthly_output_df[cutting_field].map(lambda x: ' %1d' % x)
+            if csv_flag:
+                monthly_output_df[cutting_field] = \
+                    monthly_output_df[cutting_field].map(lambda x: ' %1d' % x)
             monthly_output_columns.append(cutting_field)
-        with open(monthly_output_path, open_mode, newline='') as monthly_output_f:
-            monthly_output_f.write('# {0:2d} - {1}\n'.format(
-                crop.class_number, crop.name))
-            monthly_output_df.to_csv(
-                monthly_output_f, header=print_header,
-                index=print_index, sep=',', columns=monthly_output_columns,
-                float_format=data.cet_out['monthly_float_format'],
-                date_format=data.cet_out['monthly_date_format'])
+        if not csv_flag:
+            write_table_output(data, monthly_output_df, monthly_output_columns,
+                               data.cet_out['monthly_output_ws'], et_cell, crop)
+        else:
+            with open(monthly_output_path, open_mode, newline='') as monthly_output_f:
+                monthly_output_f.write('# {0:2d} - {1}\n'.format(
+                    crop.class_number, crop.name))
+                monthly_output_df.to_csv(
+                    monthly_output_f, header=print_header,
+                    index=print_index, sep=',', columns=monthly_output_columns,
+                    float_format=data.cet_out['monthly_float_format'],
+                    date_format=data.cet_out['monthly_date_format'])
         del monthly_output_df, monthly_output_path, monthly_output_columns
 
     # Write annual cet
-    if data.cet_out['annual_output_flag']:
+    if annual_flag:
         annual_output_df[year_field] = annual_output_df.index.year
-        annual_output_df[season_field] = annual_output_df[season_field].map(
-            lambda x: ' %3d' % x)
+        if csv_flag:
+            annual_output_df[season_field] = annual_output_df[
+                season_field].map(lambda x: ' %3d' % x)
         annual_output_path = os.path.join(
             data.cet_out['annual_output_ws'],
             data.cet_out['name_format'].replace(
@@ -657,17 +1082,23 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
         except:
             pass
         if data.cutting_flag and crop.cutting_crop:
-            annual_output_df[cutting_field] = annual_output_df[
-                cutting_field].map(lambda x: ' %2d' % x)
+            if csv_flag:
+                annual_output_df[cutting_field] = annual_output_df[
+                    cutting_field].map(lambda x: ' %2d' % x)
             annual_output_columns.append(cutting_field)
-        with open(annual_output_path, open_mode, newline='') as annual_output_f:
-            annual_output_f.write('# {0:2d} - {1}\n'.format(
-                crop.class_number, crop.name))
-            annual_output_df.to_csv(
-                annual_output_f, header=print_header,
-                index=False, sep=',', columns=annual_output_columns,
-                float_format=data.cet_out['annual_float_format'],
-                date_format=data.cet_out['annual_date_format'])
+        if not csv_flag:
+            write_table_output(data, annual_output_df, annual_output_columns,
+                               data.cet_out['annual_output_ws'], et_cell, crop,
+                               index=False)
+        else:
+            with open(annual_output_path, open_mode, newline='') as annual_output_f:
+                annual_output_f.write('# {0:2d} - {1}\n'.format(
+                    crop.class_number, crop.name))
+                annual_output_df.to_csv(
+                    annual_output_f, header=print_header,
+                    index=False, sep=',', columns=annual_output_columns,
+                    float_format=data.cet_out['annual_float_format'],
+                    date_format=data.cet_out['annual_date_format'])
         del annual_output_df, annual_output_path, annual_output_columns
 
     # Write growing season statistics
@@ -732,5 +1163,81 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
         del gs_output_df, gs_output_path, gs_output_columns
 
 
+def write_table_output(data, output_df, output_columns, output_ws, et_cell,
+                       crop, index=True, year_groups=False):
+    """Write parquet or feather output file for a cell and crop
+
+    Parameters
+    ---------
+    data :
+
+    output_df : pandas.DataFrame
+        daily, monthly or annual output
+    output_columns : list
+        columns to write
+    output_ws : str
+        output folder
+    et_cell :
+
+    crop :
+
+    index : boolean
+        write Date index as first column
+    year_groups : boolean
+        write one parquet row group per year (daily output),
+        otherwise a single row group
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Daily parquet files are written with one row group per year so readers
+    can skip years through the row group statistics of the Year column
+    With partition_flag the file is <output_ws>/cell_id=<id>/crop=<nn>/part.*
+
+    """
+    file_type = data.cet_out['file_type']
+    if data.cet_out['partition_flag']:
+        output_ws = os.path.join(
+            output_ws, 'cell_id={}'.format(et_cell.cell_id),
+            'crop={:02d}'.format(int(crop.class_number)))
+        if not os.path.isdir(output_ws):
+            os.makedirs(output_ws, exist_ok=True)
+        output_path = os.path.join(output_ws, 'part.' + file_type)
+    else:
+        output_path = os.path.join(
+            output_ws, data.cet_out['name_format'].replace(
+                '%c', '%02d' % int(crop.class_number)) % et_cell.cell_id)
+
+    output_df = output_df[output_columns]
+    if index:
+        output_df = output_df.reset_index()
+    table = pa.Table.from_pandas(output_df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'crop'] = '{0:2d} - {1}'.format(
+        crop.class_number, crop.name).encode('utf-8')
+    metadata[b'cell_id'] = str(et_cell.cell_id).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    if file_type == 'feather':
+        pa_feather.write_feather(
+            table, output_path,
+            compression=data.cet_out['compression'] or 'uncompressed')
+        return
+    if year_groups:
+        years = output_df['Year'].values
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(years)) + 1))
+        ends = np.append(starts[1:], len(years))
+    else:
+        starts, ends = [0], [len(output_df)]
+    with pa_parquet.ParquetWriter(
+            output_path, table.schema,
+            compression=data.cet_out['compression'] or 'none') as writer:
+        for start, end in zip(starts, ends):
+            writer.write_table(table.slice(start, end - start))
+
+
 if __name__ == '__main__':
     pass
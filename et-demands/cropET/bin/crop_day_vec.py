@@ -0,0 +1,1036 @@
+"""crop_day_vec.py
+Vectorized versions of the daily crop functions
+    compute_crop_gdd, calculate_height, kcb_daily, compute_crop_et,
+    runoff and grow_root operating on a CropState
+Called by crop_cycle.py
+
+"""
+
+import datetime
+import logging
+import math
+import operator
+import sys
+
+import numpy as np
+
+import crop_kernels
+import open_water_evap
+
+# Python float semantics for pow and sin so results match the scalar code
+#   bit for bit (NumPy may dispatch these to SIMD approximations)
+_pow_ufunc = np.frompyfunc(operator.pow, 2, 1)
+_sin_ufunc = np.frompyfunc(math.sin, 1, 1)
+
+kc_bas_wscc = np.array([np.nan, 0.1, 0.1, 0.1])
+
+
+def _pow(x, y):
+    """Elementwise x ** y with Python float semantics"""
+    return _pow_ufunc(x, y).astype(np.float64)
+
+
+def _sin(x):
+    """Elementwise math.sin"""
+    return _sin_ufunc(x).astype(np.float64)
+
+
+def _max(a, b):
+    """Elementwise equivalent of builtin max(a, b)"""
+    return np.where(b > a, b, a)
+
+
+def _min(a, b):
+    """Elementwise equivalent of builtin min(a, b)"""
+    return np.where(b < a, b, a)
+
+
+def _round6_le_zero(x):
+    """Elementwise equivalent of round(x, 6) <= 0."""
+    result = x <= 0
+    small = np.flatnonzero((x > 0) & (x < 1e-5))
+    for i in small:
+        result[i] = round(float(x[i]), 6) <= 0.
+    return result
+
+
+class DayArrays:
+    """Daily climate container for all units
+
+    Attributes
+    ----------
+    doy, year, month, day, sdays : int
+        date of time step, shared by all units
+    tmean, tmin, tmax, t30, precip, u2, rh_min, etref, snow_depth, tdew,
+    co2 : ndarray
+        climate of time step for each unit
+
+    """
+
+    def __init__(self):
+        self.sdays = 0
+
+    def unit(self, i):
+        """Return a scalar DayData-like copy of unit i"""
+        foo_day = DayArrays()
+        for key, value in self.__dict__.items():
+            if isinstance(value, np.ndarray):
+                value = value[i].item()
+            setattr(foo_day, key, value)
+        return foo_day
+
+
+def compute_crop_gdd(s, d):
+    """Calculate crop growing degree days
+
+    Parameters
+    ---------
+    s : CropState
+    d : DayArrays
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    See compute_crop_gdd.compute_crop_gdd()
+
+    """
+    # 30 day ETref, etref_array is used as a ring buffer
+    if d.sdays > 30:
+        slot = (d.sdays - 1) % 30
+        etref_lost = s.etref_array[:, slot].copy()
+        s.etref_array[:, slot] = d.etref
+        s.etref_30[:] = s.etref_30 + (d.etref - etref_lost) / 30.
+    else:
+        s.etref_array[:, d.sdays - 1] = d.etref
+        s.etref_30[:] = (s.etref_30 * (d.sdays - 1) + d.etref) / d.sdays
+
+    # Reset CGDD on the trigger DOY
+    trigger = s.crop_gdd_trigger_doy
+    winter = s.crop_winter_crop
+    reset = (
+        (winter & (s.doy_prev < trigger) & (d.doy >= trigger)) |
+        (~winter & (s.doy_prev > (trigger + 199)) & (d.doy < (trigger + 199))))
+    if reset.any():
+        s.cgdd[reset] = 0.0
+        s.doy_start_cycle[reset] = 0
+        s.real_start[reset] = False
+        s.in_season[reset] = False
+    s.doy_prev = d.doy
+
+    is_crop = s.crop_curve_number > 0
+    tbase = s.crop_tbase
+
+    # Winter grain
+    m = is_crop & winter
+    if m.any():
+        tmin = d.tmin[m]
+        tmean = d.tmean[m]
+        gdd = np.where(
+            tmin < -4.0, 0.0,
+            np.where(tmean > tbase[m], tmean - tbase[m], 0.0))
+        gdd = gdd - s.gdd_penalty[m]
+        gdd = _max(gdd, 0.0)
+        cgdd = s.cgdd[m] + (gdd - s.cgdd_penalty[m])
+        cgdd = _max(0.0, cgdd)
+        s.gdd[m] = gdd
+        s.cgdd[m] = cgdd
+        s.gdd_penalty[m] = np.where(tmin < -10, 5.0, 0.0)
+        s.cgdd_penalty[m] = np.where(
+            (tmin < -25) & (d.snow_depth[m] <= 0), cgdd * 0.1, 0.0)
+
+    # Corn
+    m = is_crop & ~winter & (tbase < 0)
+    if m.any():
+        tmax = d.tmax[m]
+        tmin = d.tmin[m]
+        tb = tbase[m]
+        tmax_prev = np.where(tmax > 30, 30., tmax)
+        tmin_prev = np.where(tmin > 30, 30., tmin)
+        tmax_prev = np.where(tmax < -tb, -tb, tmax_prev)
+        tmin_prev = np.where(tmin < -tb, -tb, tmin_prev)
+        tmean_prev = 0.5 * (tmax_prev + tmin_prev)
+        s.cgdd[m] = s.cgdd[m] + (tmean_prev + tb)
+
+    # All other crops
+    m = is_crop & ~winter & (tbase >= 0) & (d.tmean > tbase)
+    if m.any():
+        s.gdd[m] = d.tmean[m] - tbase[m]
+        s.cgdd[m] = s.cgdd[m] + s.gdd[m]
+
+
+def calculate_height(s):
+    """Determine height of crop based on Kc and height limits
+
+    Parameters
+    ---------
+    s : CropState
+
+    Returns
+    -------
+    None
+
+    """
+    h_ini = s.crop_height_initial
+    h_max = s.crop_height_max
+    height_prev = s.height
+    m = (s.kc_bas > s.kc_min) & (s.kc_bas_mid > s.kc_min)
+    height = np.where(
+        m,
+        h_ini + (s.kc_bas - s.kc_min) / (s.kc_bas_mid - s.kc_min) *
+        (h_max - h_ini),
+        h_ini)
+    s.height[:] = _min(_max(h_ini, _max(height_prev, height)), h_max)
+
+
+def _kc_interp(s, m, curve, frac):
+    """Interpolate crop coefficient curve at fractional table position
+
+    Parameters
+    ---------
+    s : CropState
+    m : ndarray
+        unit mask
+    curve : ndarray
+        curve offset (0, 1, 2) of masked units
+    frac : ndarray
+        table position of masked units (already scaled by 10)
+
+    Returns
+    -------
+    idx : ndarray
+        table index
+    kc : ndarray
+
+    """
+    idx = np.minimum(
+        s.kc_curves.shape[2] - 2, np.trunc(frac).astype(np.int64))
+    data = s.kc_curves[np.flatnonzero(m), curve]
+    lo = np.take_along_axis(data, idx[:, None], axis=1)[:, 0]
+    hi = np.take_along_axis(data, idx[:, None] + 1, axis=1)[:, 0]
+    return idx, lo + (frac - idx) * (hi - lo)
+
+
+def _planting_doy(s, year):
+    """Planting or green-up DOY for flag_for_means_to_estimate_pl_or_gu 3"""
+    if s.pl_year == year:
+        return s.pl_doy
+    for i in np.flatnonzero(s.crop_flag_for_means_to_estimate_pl_or_gu == 3):
+        date_of_pl_or_gu = s.crop_date_of_pl_or_gu[i]
+        month_of_pl_or_gu = int(date_of_pl_or_gu)
+        day_of_pl_or_gu = int(round(
+            (date_of_pl_or_gu - month_of_pl_or_gu) * 30.4))
+        if day_of_pl_or_gu < 0.5:
+            day_of_pl_or_gu = 15
+        s.pl_doy[i] = datetime.datetime(
+            year, month_of_pl_or_gu, day_of_pl_or_gu).timetuple().tm_yday
+    s.pl_year = year
+    return s.pl_doy
+
+
+def kcb_daily(data, s, d):
+    """Compute basal ET
+
+    Parameters
+    ---------
+    data :
+
+    s : CropState
+    d : DayArrays
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    See kcb_daily.kcb_daily()
+
+    """
+    if data.gs_limit_flag:
+        gs_limit = 40
+    else:
+        gs_limit = 365
+    doy = d.doy
+    flag = s.crop_flag_for_means_to_estimate_pl_or_gu
+    trigger = s.crop_gdd_trigger_doy
+    ltpl = s.longterm_pl
+    threshold = s.crop_t30_for_pl_or_gu_or_cgdd
+
+    # Planting or green-up by CGDD (1) or T30 (2)
+    for flag_value, limit in [(1, 40), (2, gs_limit)]:
+        m = (flag == flag_value) & (doy < (trigger + 195))
+        if not m.any():
+            continue
+        start = m & (ltpl > 0) & (doy > (ltpl + limit)) & ~s.real_start
+        s.doy_start_cycle[start] = doy
+        s.real_start[start] = True
+        if flag_value == 1:
+            warm = m & ~s.real_start & (s.cgdd > threshold)
+        else:
+            warm = m & ~s.real_start & (d.t30 > threshold)
+        early = warm & (ltpl > 0) & (doy < (ltpl - limit))
+        if early.any():
+            s.real_start[early] = False
+            if flag_value == 1 or data.gs_limit_flag:
+                s.doy_start_cycle[early] = ltpl[early] - 40
+            else:
+                s.doy_start_cycle[early] = 1
+            s.doy_start_cycle[early & (s.doy_start_cycle < 1)] += 365
+        start = warm & ~early
+        s.doy_start_cycle[start] = doy
+        s.real_start[start] = True
+        start = m & (s.doy_start_cycle == doy)
+        if start.any():
+            s.real_start[start] = True
+            s.in_season[start] = True
+            s.stress_event[start] = False
+            s.dormant_setup_flag[start] = True
+            s.setup_crop(start)
+            s.cycle[start] = 1
+            offset = start & (s.crop_date_of_pl_or_gu < 0.0)
+            s.doy_start_cycle[offset] += np.trunc(
+                s.crop_date_of_pl_or_gu[offset]).astype(np.int64)
+            s.doy_start_cycle[offset & (s.doy_start_cycle < 1)] += 365
+
+    # Planting or green-up on a fixed date (3)
+    m = flag == 3
+    if m.any():
+        pl_doy = _planting_doy(s, d.year)
+        start = m & ((doy == pl_doy) | ((d.sdays == 1) & (pl_doy >= trigger)))
+        if start.any():
+            s.doy_start_cycle[start] = pl_doy[start]
+            s.in_season[start] = True
+            s.stress_event[start] = False
+            s.dormant_setup_flag[start] = True
+            s.setup_crop(start)
+
+    # Always in season (4)
+    m = flag == 4
+    if m.any():
+        s.in_season[m] = True
+        s.stress_event[m & (doy == trigger)] = False
+        s.dormant_setup_flag[m] = True
+
+    s.mad[:] = s.mad_mid
+    in_season = s.in_season.copy()
+    curve_type = s.crop_curve_type
+    class_number = s.crop_class_number
+    alfalfa_1st = s.crop_alfalfa_1st
+    curve = np.zeros(s.n, dtype=np.int64)
+    max_lines = 34
+
+    # Curve type 1, normalized cumulative GDD
+    m = in_season & (curve_type == 1)
+    if m.any():
+        planting = m & (s.doy_start_cycle == doy)
+        s.cgdd_at_planting[planting] = s.cgdd[planting]
+        cgdd_in_season = _max(0, s.cgdd - s.cgdd_at_planting)
+        cgdd_efc = s.crop_cgdd_for_efc.copy()
+        cgdd_term = s.crop_cgdd_for_termination.copy()
+        s.cutting[m] = 0
+        alfalfa = m & (
+            ((class_number == 1) & data.crop_one_flag) |
+            (class_number == 2) | (class_number == 3) |
+            ((class_number >= 4) & alfalfa_1st))
+        cgdd_term[alfalfa] = s.crop_cgdd_for_efc[alfalfa]
+        cycled = alfalfa & (s.cycle > 1)
+        cgdd_efc[cycled] = s.crop_cgdd_for_termination[cycled]
+        cgdd_term[cycled] = s.crop_cgdd_for_termination[cycled]
+        cuttings = np.where(
+            class_number == 2, s.dairy_cuttings, s.beef_cuttings)
+        curve[cycled] = np.where(
+            s.cycle[cycled] < cuttings[cycled] + 0.01 - 1, 1, 2)
+
+        m1 = m & (cgdd_in_season < cgdd_efc)
+        if m1.any():
+            n_cgdd = cgdd_in_season[m1] / cgdd_efc[m1]
+            s.n_cgdd[m1] = n_cgdd
+            s.kc_bas[m1] = _kc_interp(s, m1, curve[m1], n_cgdd * 10)[1]
+            s.mad[m1] = s.mad_ini[m1]
+        m2 = m & ~m1 & (cgdd_in_season < cgdd_term)
+        if m2.any():
+            n_cgdd = _max(cgdd_in_season[m2] / cgdd_efc[m2], 1)
+            s.n_cgdd[m2] = n_cgdd
+            idx, kc = _kc_interp(s, m2, curve[m2], n_cgdd * 10)
+            lentry = s.kc_lentry[np.flatnonzero(m2), curve[m2]]
+            kc_last = s.kc_curves[np.flatnonzero(m2), curve[m2], lentry]
+            s.kc_bas[m2] = np.where(idx < lentry, kc, kc_last)
+            s.mad[m2] = s.mad_mid[m2]
+        m3 = m & ~m1 & ~m2
+        if m3.any():
+            s.in_season[m3] = False
+            s.stress_event[m3] = False
+            cut = m3 & s.crop_cutting_crop
+            if cut.any():
+                s.cutting[cut] = 1
+                s.cycle[cut] += 1
+                s.in_season[cut] = True
+                s.cgdd_at_planting[cut] = s.cgdd[cut]
+                s.height[cut] = s.height_min[cut]
+                s.kc_bas[cut] = s.kc_curves[
+                    np.flatnonzero(cut), curve[cut], 0]
+        # Crop one reducer is only applied past effective full cover
+        if data.crop_one_flag:
+            reduce = m & ~m1 & (class_number == 1)
+            s.kc_bas[reduce] = s.kc_bas[reduce] * data.crop_one_reducer
+        days_into_season = doy - s.doy_start_cycle + 1
+        days_into_season[days_into_season < 1] += 365
+        harvest = (
+            m & (s.crop_time_for_harvest > 10) &
+            (days_into_season > s.crop_time_for_harvest))
+        s.in_season[harvest] = False
+        s.stress_event[harvest] = False
+
+    # Curve types 2 and 3, percent time from planting to EFC
+    m = in_season & ((curve_type == 2) | (curve_type == 3))
+    if m.any():
+        days_into_season = doy - s.doy_start_cycle + 1
+        days_into_season[days_into_season < 1] += 365
+        s.crop_time_for_efc[m] = _max(s.crop_time_for_efc[m], 1.)
+        s.n_pl_ec[m] = days_into_season[m] / s.crop_time_for_efc[m]
+        harvest = s.crop_time_for_harvest
+
+        m2 = m & (curve_type == 2)
+        if m2.any():
+            n_pl_ec = s.n_pl_ec[m2]
+            s.mad[m2] = np.where(n_pl_ec < 1, s.mad_ini[m2], s.mad_mid[m2])
+            interp = m2 & (s.n_pl_ec * 100 <= np.abs(harvest))
+            if interp.any():
+                s.kc_bas[interp] = _kc_interp(
+                    s, interp, curve[interp], s.n_pl_ec[interp] * 10.)[1]
+            hold = m2 & ~interp & (harvest < -0.5)
+            s.kc_bas[hold] = s.kc_bas_prev[hold]
+            end = m2 & ~interp & ~hold
+            s.in_season[end] = False
+            s.stress_event[end] = False
+
+        m3 = m & (curve_type == 3)
+        if m3.any():
+            early = m3 & (s.n_pl_ec < 1)
+            if early.any():
+                s.kc_bas[early] = _kc_interp(
+                    s, early, curve[early], s.n_pl_ec[early] * 10)[1]
+                s.mad[early] = s.mad_ini[early]
+            late = m3 & ~early
+            s.mad[late] = s.mad_mid[late]
+            days_after_efc = days_into_season - s.crop_time_for_efc
+            interp = late & (days_after_efc <= np.abs(harvest))
+            if interp.any():
+                n_days_after_efc = days_after_efc[interp] / 10 + 11
+                s.kc_bas[interp] = _kc_interp(
+                    s, interp, curve[interp], n_days_after_efc)[1]
+            hold = late & ~interp & (harvest < -0.5)
+            s.kc_bas[hold] = s.kc_bas_prev[hold]
+            end = late & ~interp & ~hold
+            s.in_season[end] = False
+            s.stress_event[end] = False
+
+    # Curve type 4, percent time from planting to termination
+    m = in_season & (curve_type == 4)
+    if m.any():
+        season_end = trigger + 195
+        bad = m & (s.doy_start_cycle >= season_end)
+        if bad.any():
+            logging.error(
+                ('kc_daily.kcb_daily(): Problem with estimated season ' +
+                 'length, crop_curve_type_4, crop {}.' +
+                 ' Check T30 (too low) or PL_GU_Date Negative Offset.').format(
+                    s.crop_class_number[np.flatnonzero(bad)[0]]))
+            sys.exit()
+        length_of_season = 2 * (season_end - s.doy_start_cycle)
+        if (m & (length_of_season > 366)).any():
+            logging.info('ADJUSTING GROWING SEASON (NOT CENTERING ON JULY 15)')
+        length_of_season = np.minimum(length_of_season, 366)
+        c47 = class_number == 47
+        length_of_season = np.where(
+            c47, np.maximum(length_of_season, 60), length_of_season)
+        length_of_season = np.where(
+            c47 & (length_of_season > 90), 100, length_of_season)
+        days_into_season = doy - s.doy_start_cycle
+        days_into_season[days_into_season < 0] += 365
+        n_pl_ec = days_into_season[m] / length_of_season[m]
+        s.n_pl_ec[m] = n_pl_ec
+        s.mad[m] = np.where(n_pl_ec < 0.5, s.mad_ini[m], s.mad_mid[m])
+        interp = m & (s.n_pl_ec <= 1)
+        if interp.any():
+            s.kc_bas[interp] = _kc_interp(
+                s, interp, curve[interp], s.n_pl_ec[interp] * 10)[1]
+        end = m & ~interp
+        s.in_season[end] = False
+        s.stress_event[end] = False
+
+    # Late season Kcb reduction for alfalfa after frost
+    late = doy > (trigger + 211)
+    m = in_season & ((class_number < 4) | ((class_number > 3) & alfalfa_1st))
+    if m.any():
+        s.T2Days[m & late & (d.tmin < -3) & (s.T2Days < 1)] = 1
+        s.T2Days[m & ~late] = 0
+        frost = m & (s.T2Days > 0)
+        if frost.any():
+            kc_bas = s.kc_bas[frost] - s.T2Days[frost] * 0.005
+            s.kc_bas[frost] = np.where(kc_bas < 0.1, 0.1, kc_bas)
+            s.T2Days[frost] += 1
+
+    # Killing frost
+    m = in_season & late
+    if m.any():
+        kill = (
+            m & (d.tmin < s.crop_killing_frost_temperature) &
+            ((class_number < 44) | (class_number > 46)) & s.in_season)
+        for i in np.flatnonzero(kill):
+            logging.info(
+                "Killing frost for crop %d of %.1f was found on DOY %d of %d" %
+                (class_number[i], s.crop_killing_frost_temperature[i],
+                 doy, d.year))
+        s.in_season[kill] = False
+        s.stress_event[kill] = False
+        if d.month == 12 and d.day == 31:
+            no_kill = (
+                m & ~kill & s.in_season &
+                ((class_number == 2) | (class_number == 3) |
+                 ((class_number > 3) & alfalfa_1st)))
+            for i in np.flatnonzero(no_kill):
+                logging.info("No killing frost in year %d" % (d.year))
+
+    s.kc_bas_prev[:] = s.kc_bas
+
+    # Bare soil, open water and CO2
+    bare = (class_number >= 44) & (class_number <= 46)
+    s.kc_bas[bare] = 0.1
+    s.kc_bas_prev[bare] = 0.1
+    water = (class_number >= 55) & (class_number <= 57)
+    if water.any():
+        if data.refet['type'] == 'eto':
+            kc_55, kc_57 = 1.05, 0.85
+        else:
+            kc_55, kc_57 = 0.875, 0.7
+        s.kc_bas[water & (class_number == 55)] = kc_55
+        s.kc_bas[water & (class_number == 57)] = kc_57
+        for i in np.flatnonzero(water & (class_number == 56)):
+            s.kc_bas[i] = open_water_evap.open_water_evap(
+                s.cells[i], d.unit(i))
+        s.kc_act[water] = s.kc_bas[water]
+        s.kc_pot[water] = s.kc_bas[water]
+        s.etc_act[water] = s.kc_act[water] * d.etref[water]
+        s.etc_pot[water] = s.kc_pot[water] * d.etref[water]
+        s.etc_bas[water] = s.kc_bas[water] * d.etref[water]
+        s.kc_bas_prev[water] = s.kc_bas[water]
+    if data.co2_flag:
+        m = ~bare & ~water
+        s.kc_bas_prev[m] = s.kc_bas[m]
+        s.kc_bas[m] = s.kc_bas[m] * d.co2[m]
+
+    s.height[:] = _max(s.height, 0.05)
+    if data.refet['type'] == 'eto':
+        s.kc_bas[:] = (
+            s.kc_bas + (0.04 * (d.u2 - 2) - 0.004 * (d.rh_min - 45)) *
+            _pow(s.height / 3, 0.3))
+
+
+def runoff(s, d, m):
+    """Curve number method for computing runoff
+
+    Parameters
+    ---------
+    s : CropState
+    d : DayArrays
+    m : ndarray
+        units with precipitation
+
+    Returns
+    -------
+    sro : ndarray
+        surface runoff of masked units
+
+    Notes
+    -----
+    See runoff.runoff()
+
+    """
+    precip = d.precip[m]
+    cn2 = _min(_max(s.cn2[m], 10), 100)
+    cn1 = cn2 / (2.281 - 0.01281 * cn2)
+    cn3 = cn2 / (0.427 + 0.00573 * cn2)
+    awc3 = 0.5 * s.rew[m]
+    awc1 = 0.7 * s.rew[m] + 0.3 * s.tew[m]
+    awc1 = np.where(awc1 <= awc3, awc3 + 0.01, awc1)
+    depl_surface = s.depl_surface[m]
+    cn = np.where(
+        depl_surface < awc3, cn3,
+        np.where(
+            depl_surface > awc1, cn1,
+            ((depl_surface - awc3) * cn1 + (awc1 - depl_surface) * cn3) /
+            (awc1 - awc3)))
+    s_new = 250 * (100 / cn - 1)
+    s.s[m] = s_new
+
+    irr = s.irr_flag[m]
+    sro = np.empty(precip.shape)
+    if irr.any():
+        p = precip[irr]
+        s4, s3, s2, s1 = s.s4[m][irr], s.s3[m][irr], s.s2[m][irr], s.s1[m][irr]
+        sro[irr] = 0.25 * (
+            _pow(_max(p - 0.2 * s4, 0), 2) / (p + 0.8 * s4) +
+            _pow(_max(p - 0.2 * s3, 0), 2) / (p + 0.8 * s3) +
+            _pow(_max(p - 0.2 * s2, 0), 2) / (p + 0.8 * s2) +
+            _pow(_max(p - 0.2 * s1, 0), 2) / (p + 0.8 * s1))
+        mi = np.flatnonzero(m)[irr]
+        s.s4[mi] = s3
+        s.s3[mi] = s2
+        s.s2[mi] = s1
+        s.s1[mi] = s_new[irr]
+    if (~irr).any():
+        p = precip[~irr]
+        ppt_net = _max(p - 0.2 * s_new[~irr], 0)
+        sro[~irr] = ppt_net * ppt_net / (p + 0.8 * s_new[~irr])
+    return sro
+
+
+def grow_root(s, m):
+    """Determine depth of root zone
+
+    Parameters
+    ---------
+    s : CropState
+    m : ndarray
+        units in season
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    See grow_root.grow_root()
+
+    """
+    eor = s.crop_end_of_root_growth_fraction_time[m]
+    curve_type = s.crop_curve_type[m]
+    fractime = np.zeros(eor.shape)
+    t1 = (curve_type == 1) & (eor != 0.0)
+    fractime[t1] = s.n_cgdd[m][t1] / eor[t1]
+    t2 = (curve_type > 1) & (eor != 0.0)
+    fractime[t2] = s.n_pl_ec[m][t2] / eor[t2]
+    fractime = _min(_max(fractime, 0), 1)
+
+    zr_prev = s.zr[m]
+    zr_max = s.zr_max[m]
+    zr_min = s.zr_min[m]
+    zr = (0.5 + 0.5 * _sin(3.03 * fractime - 1.47)) * (zr_max - zr_min) + zr_min
+    delta_zr = zr - zr_prev
+    grow = delta_zr > 0
+    depl_root = s.depl_root[m]
+    depl_root[grow] = depl_root[grow] + delta_zr[grow] * (
+        s.aw[m][grow] - s.aw3[m][grow])
+    s.depl_root[m] = depl_root
+    s.zr[m] = _max(zr, zr_prev)
+
+
+def compute_crop_et(data, s, d):
+    """Crop et computations
+
+    Parameters
+    ---------
+    data :
+
+    s : CropState
+    d : DayArrays
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    See compute_crop_et.compute_crop_et()
+    Open water units (55-57) are skipped.
+
+    """
+    class_number = s.crop_class_number
+    et = (class_number < 55) | (class_number > 57)
+    bare = (class_number >= 44) & (class_number <= 46)
+    eto = data.refet['type'] == 'eto'
+    etref = d.etref
+    in_season = s.in_season
+
+    height = _max(0.05, s.height)
+    s.height[et] = height[et]
+    crop_kc_max = s.crop_kc_max
+    if eto:
+        kc_max = (
+            (0.04 * (d.u2 - 2) - 0.004 * (d.rh_min - 45)) *
+            _pow(height / 3, 0.3))
+        kc_max = np.where(
+            crop_kc_max > 0.3, kc_max + crop_kc_max, kc_max + 1.2)
+    else:
+        kc_max = np.where(crop_kc_max > 0.3, crop_kc_max, 1.0)
+
+    # Bare soil fraction of cover
+    bare_fc = np.array([0.0, 0.4, 0.7])
+    cover = np.where(bare, class_number - 43, s.crop_winter_surface_cover_class)
+    fc = np.where(bare, bare_fc[np.clip(cover - 1, 0, 2)], s.fc)
+
+    # Winter kc_max by surface cover class (or bare soil class)
+    winter = (s.latitude > 0) & ((d.month < 4) or (d.month > 10))
+    if winter.any():
+        if eto:
+            winter_kc = np.array([np.nan, 1.1, 1.0, 0.95])
+        else:
+            winter_kc = np.array([np.nan, 0.9, 0.85, 0.8])
+        w = winter & (cover >= 1) & (cover <= 3)
+        kc_max = np.where(w, winter_kc[np.clip(cover, 0, 3)], kc_max)
+
+    kc_bas = s.kc_bas.copy()
+    dormant = ~in_season & et
+    if dormant.any():
+        kc_bas = np.where(
+            dormant & (class_number == 87), 0.25,
+            np.where(
+                dormant,
+                kc_bas_wscc[np.clip(s.crop_winter_surface_cover_class, 0, 3)],
+                kc_bas))
+    kc_max = _max(kc_max, kc_bas + 0.05)
+    kc_min = 0.1
+    nb = ~bare
+    kc_max = np.where(nb & (kc_max <= kc_min), kc_min + 0.001, kc_max)
+    m = nb & in_season
+    if m.any():
+        pos = m & (kc_bas > kc_min)
+        fc_pos = _min(
+            _pow((kc_bas[pos] - kc_min) / (kc_max[pos] - kc_min),
+                 1 + 0.5 * height[pos]),
+            0.99)
+        fc[pos] = fc_pos
+        fc[m & ~pos] = 0.001
+
+    # Precipitation and runoff
+    ppt_inf_prev = s.ppt_inf.copy()
+    ppt_inf = np.zeros(s.n)
+    sro = np.zeros(s.n)
+    wet = et & (d.precip > 0)
+    if wet.any():
+        s.depl_surface[wet] = (
+            s.wt_irr[wet] * s.depl_ze[wet] +
+            (1 - s.wt_irr[wet]) * s.depl_zep[wet])
+        sro[wet] = runoff(s, d, wet)
+        ppt_inf[wet] = d.precip[wet] - sro[wet]
+
+    # Irrigation wetting fraction and evaporable water
+    irr_auto = s.irr_auto
+    fw_irr = np.where(irr_auto > 0, s.fw_std, s.fw_irr)
+    tew = s.tew
+    depl_ze = s.depl_ze
+    depl_zep = s.depl_zep
+    watin_ze = tew - depl_ze
+    watin_ze = np.where(_round6_le_zero(watin_ze), 0.001, watin_ze)
+    watin_ze = _min(watin_ze, tew)
+    watin_zep = tew - depl_zep
+    watin_zep = np.where(_round6_le_zero(watin_zep), 0.001, watin_zep)
+    watin_zep = _min(watin_zep, tew)
+    few = 1 - fc
+    few = _min(_max(few, 0.001), fw_irr)
+    fewp = 1 - fc - few
+    fewp = _max(fewp, 0.001)
+    totwatin_ze = (watin_ze * few + watin_zep * fewp) / (few + fewp)
+
+    irr_sim = s.irr_sim
+    fw_div = np.where(fw_irr > 0.0001, fw_irr, 1)
+    dperc_ze = ppt_inf + irr_sim / fw_div - depl_ze
+    dperc_ze = _max(dperc_ze, 0)
+    depl_zep_prev = ppt_inf - depl_zep
+    depl_zep_prev = _max(depl_zep_prev, 0)
+    depl_ze = depl_ze - ppt_inf - irr_sim / fw_div + dperc_ze
+    depl_ze = _min(_max(depl_ze, 0), tew)
+    depl_zep = depl_zep - ppt_inf + depl_zep_prev
+    depl_zep = _min(_max(depl_zep, 0), tew)
+
+    kr2 = np.where(s.tew3 < 0.1, 0.0, s.kr2)
+    tew2use = s.tew2
+    tew3use = s.tew3
+    rew2use = s.rew
+    etref_30 = _max(0.1, s.etref_30)
+    if eto:
+        etr_threshold = 5
+    else:
+        etr_threshold = 4
+    low = etref_30 < etr_threshold
+    if low.any():
+        ratio = np.sqrt(etref_30 / etr_threshold)
+        tew2use = np.where(low, s.tew2 * ratio, tew2use)
+        tew3use = np.where(low, s.tew3 * ratio, tew3use)
+        rew2use = np.where(
+            low & (rew2use > 0.8 * tew2use), 0.8 * tew2use, rew2use)
+
+    def _kr(depl):
+        return np.where(
+            depl <= rew2use, 1.,
+            np.where(
+                depl <= tew2use,
+                kr2 + (1 - kr2) * (tew2use - depl) / (tew2use - rew2use),
+                np.where(
+                    tew3use > tew2use,
+                    kr2 * (tew3use - depl) / (tew3use - tew2use), 0.0)))
+    kr = _kr(depl_ze)
+    krp = _kr(depl_zep)
+
+    watin = few * watin_ze + fewp * watin_zep
+    wt_irr = np.where(watin > 0.0001, few * watin_ze / watin, few * watin_ze)
+    wt_irr = _min(_max(wt_irr, 0), 1)
+    ke_irr = kr * (kc_max - kc_bas) * wt_irr
+    ke_ppt = krp * (kc_max - kc_bas) * (1 - wt_irr)
+    ke_irr = _min(_max(ke_irr, 0), few * kc_max)
+    ke_ppt = _min(_max(ke_ppt, 0), fewp * kc_max)
+
+    # Transpiration and water stress
+    zr = s.zr
+    depl_root = s.depl_root
+    taw = s.aw * zr
+    taw = _max(taw, 0.001)
+    raw = s.mad * taw / 100
+    ks = np.where(depl_root > raw, _max((taw - depl_root) / (taw - raw), 0), 1.)
+    invoke_stress = s.crop_invoke_stress
+    ks = np.where(invoke_stress < 1, 1., ks)
+    stress_event = s.stress_event.copy()
+    stress = invoke_stress == 1
+    stress_event[stress & (ks < 0.05) & in_season & (kc_bas > 0.3)] = True
+    ks = np.where(stress & stress_event, 0.0, ks)
+
+    # Snow cover reduction, k_rad is the same for all units
+    if (d.snow_depth > 0.01).any():
+        k_rad = (
+            0.000000022 * d.doy ** 3 - 0.0000242 * d.doy ** 2 +
+            0.006 * d.doy + 0.011)
+        albedo_snow = 0.8
+        albedo_soil = 0.25
+        snow_mult = 1 - k_rad + (1 - albedo_snow) / (1 - albedo_soil) * k_rad
+        snow_mult = snow_mult * 0.7
+        kc_mult = np.where(d.snow_depth > 0.01, snow_mult, 1.)
+    else:
+        kc_mult = np.ones(s.n)
+    ke_irr = ke_irr * kc_mult
+    ke_ppt = ke_ppt * kc_mult
+
+    e_irr = ke_irr * etref
+    e_ppt = ke_ppt * etref
+
+    ze = 0.0001
+    zr = np.where(zr < 0.0001, 0.01, zr)
+    kt_prop = _pow(ze / zr, 0.6)
+    kt_prop = _min(kt_prop, 1)
+    kt_reducer_denom = _max(1 - depl_root / taw, 0.001)
+    kt_reducer = few * (1 - depl_ze / tew2use) / kt_reducer_denom
+    kt_prop = kt_prop * kt_reducer
+    kt_prop = _min(kt_prop, 1)
+    te_irr = kc_mult * ks * kc_bas * etref * kt_prop
+    kt_reducer = fewp * (1 - depl_zep / tew2use) / kt_reducer_denom
+    kt_prop = kt_prop * kt_reducer
+    kt_prop = _min(kt_prop, 1)
+    te_ppt = kc_mult * ks * kc_bas * etref * kt_prop
+
+    # Limit surface layer depletion to TEW
+    ok = et.copy()
+    depl_ze_prev = depl_ze
+    depl_zep_prev = depl_zep
+    depl_ze = depl_ze_prev + e_irr / few + te_irr
+    depl_ze = np.where(depl_ze < 0, 0.0, depl_ze)
+    over = depl_ze > tew
+    if over.any():
+        potential_e = depl_ze - depl_ze_prev
+        potential_e = np.where(potential_e < 0.0001, 0.0001, potential_e)
+        e_factor = 1 - (depl_ze - tew) / potential_e
+        e_factor = _min(_max(e_factor, 0), 1)
+        e_irr = np.where(over, e_irr * e_factor, e_irr)
+        te_irr = np.where(over, te_irr * e_factor, te_irr)
+        depl_ze = np.where(
+            over, depl_ze_prev + e_irr / few + te_irr, depl_ze)
+        bad = ok & over & (depl_ze > tew + 0.2)
+        if bad.any():
+            logging.warning(
+                'Problem in keeping depl_ze water balance within TEW.')
+            ok &= ~bad
+
+    # Units that stopped above keep their state from here on
+    s.fc[et] = fc[et]
+    s.kc_bas[et] = kc_bas[et]
+    s.kc_min[et] = kc_min
+    s.ppt_inf_prev[et] = ppt_inf_prev[et]
+    s.ppt_inf[et] = ppt_inf[et]
+    s.sro[et] = sro[et]
+    s.fw_irr[et] = fw_irr[et]
+    s.totwatin_ze[et] = totwatin_ze[et]
+    s.depl_ze[et] = depl_ze[et]
+    s.kr2[et] = kr2[et]
+    s.etref_30[et] = etref_30[et]
+    s.wt_irr[et] = wt_irr[et]
+    s.stress_event[et] = stress_event[et]
+    s.zr[et] = zr[et]
+    s.depl_zep[et & ~ok] = depl_zep[et & ~ok]
+
+    depl_zep = depl_zep_prev + e_ppt / fewp + te_ppt
+    depl_zep = _max(depl_zep, 0)
+    over = depl_zep > tew
+    if over.any():
+        potential_e = depl_zep - depl_zep_prev
+        potential_e = np.where(potential_e < 0.0001, 0.0001, potential_e)
+        e_factor = 1 - (depl_zep - tew) / potential_e
+        e_factor = _min(_max(e_factor, 0), 1)
+        e_ppt = np.where(over, e_ppt * e_factor, e_ppt)
+        te_ppt = np.where(over, te_ppt * e_factor, te_ppt)
+        depl_zep = np.where(
+            over, depl_zep_prev + e_ppt / fewp + te_ppt, depl_zep)
+        bad = ok & over & (depl_zep > tew + 0.2)
+        if bad.any():
+            logging.warning(
+                'Problem in keeping De water balance within TEW.')
+            s.depl_zep[bad] = depl_zep[bad]
+            ok &= ~bad
+
+    etref_divisor = np.where(etref < 0.01, 0.01, etref)
+    ke_irr = e_irr / etref_divisor
+    ke_ppt = e_ppt / etref_divisor
+    ke_irr = _min(_max(ke_irr, 0), 1.5)
+    ke_ppt = _min(_max(ke_ppt, 0), 1.5)
+    ke = ke_irr + ke_ppt
+    e = ke * etref
+    if (ok & (kc_mult > 1)).any():
+        logging.warning("kcmult > 1.")
+        ok &= ~(kc_mult > 1)
+    if (ok & (ks > 1)).any():
+        logging.warning("ks > 1.")
+        ok &= ~(ks > 1)
+
+    kc_act = kc_mult * ks * kc_bas + ke
+    kc_pot = kc_bas + ke
+    etc_act = kc_act * etref
+    etc_pot = kc_pot * etref
+    etc_bas = kc_bas * etref
+
+    cum_evap_prev = s.cum_evap_prev + e_irr - (ppt_inf - depl_zep_prev)
+    cum_evap_prev = _max(cum_evap_prev, 0)
+    depl_root = depl_root + (etc_act - ppt_inf)
+
+    # Automatic irrigation
+    irr_sim_prev = irr_sim
+    irr_sim = np.zeros(s.n)
+    irr_flag = s.irr_flag
+    if irr_flag.any():
+        doy_start_cycle = s.doy_start_cycle
+        dapi = s.crop_days_after_planting_irrigation
+        doy_to_start_irr = doy_start_cycle + dapi
+        doy_to_start_irr = np.where(
+            doy_to_start_irr > 365, doy_to_start_irr - 365, doy_to_start_irr)
+        crop_doy = d.doy - doy_start_cycle + 1
+        crop_doy = np.where(crop_doy < 1, crop_doy + 365, crop_doy)
+        irr = (
+            irr_flag & (crop_doy >= dapi) & (d.doy >= doy_to_start_irr) &
+            in_season & (depl_root > raw) & (kc_bas > 0.22))
+        irr_sim = np.where(irr, _max(depl_root, s.irr_min), irr_sim)
+    depl_root = depl_root - irr_sim
+    irr_auto = irr_sim
+    irr_sim = irr_sim + 0.0
+    irrigated = irr_sim > 0
+    cum_evap = np.where(irrigated, cum_evap_prev, s.cum_evap)
+    cum_evap_prev = np.where(irrigated, 0.0, cum_evap_prev)
+
+    # Deep percolation
+    dry = (
+        ((irr_sim + irr_sim_prev + ppt_inf + ppt_inf_prev) <= 0.0001) |
+        (zr < 0.2))
+    dperc = np.where(
+        dry,
+        np.where(depl_root < 0.0, -depl_root, 0.0),
+        np.where(depl_root < -20, -20.0 - depl_root, 0.0))
+    depl_root = depl_root + dperc
+
+    stressed = (invoke_stress > 0.5) & (depl_root > taw)
+    if stressed.any():
+        etc_act = np.where(
+            stressed, _max(etc_act - (depl_root - taw), 0), etc_act)
+        kc_act = np.where(stressed & (etref > 0.1), etc_act / etref, kc_act)
+        depl_root = np.where(stressed, taw, depl_root)
+
+    gross_dperc = dperc + 0.1 * irr_sim
+    zr_max = s.zr_max
+    daw3 = s.aw3 * (zr_max - zr)
+    taw3 = s.aw * (zr_max - zr)
+    daw3 = _max(daw3, 0)
+    taw3 = _max(taw3, 0)
+    daw3 = daw3 + gross_dperc
+    full = daw3 > taw3
+    dperc = np.where(full, daw3 - taw3, 0.)
+    daw3 = np.where(full, taw3, daw3)
+    daw3 = _max(daw3, 0)
+    aw3 = np.where(zr_max > zr, daw3 / (zr_max - zr), 0.)
+
+    precip = d.precip
+    niwr = np.where(
+        irrigated, etc_act - (precip - sro), etc_act - (precip - sro - dperc))
+    p_rz = np.where(irrigated, precip - sro, precip - sro - dperc)
+    p_rz = np.where(p_rz <= 0, 0., p_rz)
+    p_eft = np.where(irrigated, precip - sro - e, precip - sro - dperc - e)
+    p_eft = np.where(p_eft <= 0, 0., p_eft)
+
+    s.depl_zep[ok] = depl_zep[ok]
+    s.kc_act[ok] = kc_act[ok]
+    s.kc_pot[ok] = kc_pot[ok]
+    s.etc_act[ok] = etc_act[ok]
+    s.etc_pot[ok] = etc_pot[ok]
+    s.etc_bas[ok] = etc_bas[ok]
+    s.cum_evap[ok] = cum_evap[ok]
+    s.cum_evap_prev[ok] = cum_evap_prev[ok]
+    s.depl_root[ok] = depl_root[ok]
+    s.irr_sim[ok] = irr_sim[ok]
+    s.irr_auto[ok] = irr_auto[ok]
+    s.dperc[ok] = dperc[ok]
+    s.aw3[ok] = aw3[ok]
+    s.niwr[ok] = niwr[ok]
+    s.p_rz[ok] = p_rz[ok]
+    s.p_eft[ok] = p_eft[ok]
+
+    grow = ok & in_season
+    if grow.any():
+        grow_root(s, grow)
+
+
+def day_step(data, s, d, k=None):
+    """Advance all units one day
+
+    Parameters
+    ---------
+    data :
+
+    s : CropState
+    d : DayArrays
+    k : KernelState, optional
+        use the crop_kernels functions (except kcb_daily) if set
+
+    Returns
+    -------
+    None
+
+    """
+    dormant = ~s.in_season & s.dormant_setup_flag
+    if dormant.any():
+        s.setup_dormant(dormant)
+    if k is not None:
+        crop_kernels.compute_crop_gdd(
+            k, d.doy, s.doy_prev, d.sdays, d.tmean, d.tmin, d.tmax, d.etref,
+            d.snow_depth)
+        s.doy_prev = d.doy
+        crop_kernels.calculate_height(k)
+        with np.errstate(all='ignore'):
+            kcb_daily(data, s, d)
+        if crop_kernels.compute_crop_et(
+                k, data.refet['type'] == 'eto', d.month, d.doy, d.etref,
+                d.u2, d.rh_min, d.precip, d.snow_depth):
+            logging.warning(
+                'Problem in keeping surface layer water balance within TEW.')
+        return
+    with np.errstate(all='ignore'):
+        compute_crop_gdd(s, d)
+        calculate_height(s)
+        kcb_daily(data, s, d)
+        compute_crop_et(data, s, d)
@@ -12,7 +12,9 @@ import pandas as pd
 import sys
 
 import crop_coefficients
+import crop_kernels
 import crop_parameters
+import crop_store
 import util
 
 
@@ -457,17 +459,62 @@ class CropETData:
                 self.gs_output_ws = 'growing_season_stats'
 
         # cet file type specifications
-        self.cet_out['file_type'] = 'csv'
+        try:
+            self.cet_out['file_type'] = config.get(
+                crop_et_sec, 'file_type').lower()
+            if self.cet_out['file_type'] == 'none':
+                self.cet_out['file_type'] = 'csv'
+        except:
+            self.cet_out['file_type'] = 'csv'
+        if self.cet_out['file_type'] not in [
+                'csv', 'parquet', 'feather', 'zarr']:
+            logging.error('\nERROR: CropET file_type {} is not supported'
+                          .format(self.cet_out['file_type']))
+            sys.exit()
+        if self.cet_out['file_type'] in ['parquet', 'feather']:
+            try:
+                import pyarrow
+            except ImportError:
+                logging.warning('  pyarrow is not installed, writing csv')
+                self.cet_out['file_type'] = 'csv'
+        elif self.cet_out['file_type'] == 'zarr':
+            if crop_store.zarr is None:
+                logging.warning('  zarr is not installed, writing csv')
+                self.cet_out['file_type'] = 'csv'
+        # Daily results of all cells and crops in one zarr store
+        try:
+            self.cet_out['store_path'] = os.path.join(
+                self.project_ws, config.get(crop_et_sec, 'output_store_name'))
+        except:
+            self.cet_out['store_path'] = os.path.join(
+                self.project_ws, 'crop_et.zarr')
+        # Compression codec of parquet and feather files
+        try:
+            self.cet_out['compression'] = config.get(
+                crop_et_sec, 'output_compression')
+            if self.cet_out['compression'] == 'None':
+                self.cet_out['compression'] = None
+        except:
+            if self.cet_out['file_type'] == 'feather':
+                self.cet_out['compression'] = 'lz4'
+            else:
+                self.cet_out['compression'] = 'snappy'
+        # Partitioned layout: <folder>/cell_id=<id>/crop=<nn>/part.<type>
+        try:
+            self.cet_out['partition_flag'] = config.getboolean(
+                crop_et_sec, 'output_partition_flag')
+        except:
+            self.cet_out['partition_flag'] = False
         # self.cet_out['data_structure_type'] = "DRI"
-        self.cet_out['name_format'] = '%s_crop_%c.csv'
+        self.cet_out['name_format'] = '%s_crop_%c.' + self.cet_out['file_type']
         self.cet_out['header_lines'] = 1
         self.cet_out['names_line'] = 1
         self.cet_out['delimiter'] = ','
 
         # pick up user growing season file specifications
         if self.gs_output_flag:
-            self.gs_name_format = self.cet_out['name_format'].replace(
-                '%s', '%s_gs')
+            # Growing season statistics are always written as csv
+            self.gs_name_format = '%s_gs_crop_%c.csv'
 
         """
         Computational switches
@@ -513,6 +560,52 @@ class CropETData:
         except:
             self.gs_limit_flag = True
 
+        # Advance all crops of a cell together using NumPy arrays
+        try:
+            self.vectorize_flag = config.getboolean(crop_et_sec,
+                                                    'vectorize_flag')
+        except:
+            self.vectorize_flag = False
+
+        # Advance each crop across batches of cells using NumPy arrays
+        try:
+            self.batch_cells_flag = config.getboolean(crop_et_sec,
+                                                      'batch_cells_flag')
+        except:
+            self.batch_cells_flag = False
+        try:
+            self.batch_cells_size = config.getint(crop_et_sec,
+                                                  'batch_cells_size')
+        except:
+            self.batch_cells_size = 200
+
+        # Compiled (numba) kernels for the vectorized and batched modes
+        try:
+            self.numba_flag = config.getboolean(crop_et_sec, 'numba_flag')
+        except:
+            self.numba_flag = False
+        if self.numba_flag and not crop_kernels.numba_available:
+            logging.warning('  numba is not installed, ignoring numba_flag')
+            self.numba_flag = False
+        if self.numba_flag and not self.batch_cells_flag:
+            self.vectorize_flag = True
+
+        # Cache of processed cell climate, reused while inputs are unchanged
+        try:
+            self.climate_cache_flag = config.getboolean(
+                crop_et_sec, 'climate_cache_flag')
+        except:
+            self.climate_cache_flag = False
+        try:
+            self.climate_cache_ws = os.path.join(
+                self.project_ws, config.get(crop_et_sec,
+                                            'climate_cache_folder'))
+        except:
+            self.climate_cache_ws = os.path.join(
+                self.project_ws, 'climate_cache')
+        if self.climate_cache_flag and not os.path.isdir(
+                self.climate_cache_ws):
+            os.makedirs(self.climate_cache_ws)
 
         # Spatially varying calibration
         try: self.spatial_cal_flag = config.getboolean(crop_et_sec,
@@ -605,6 +698,19 @@ class CropETData:
             sys.exit()
 
         self.refet['file_type'] = 'csv'
+
+        # Memory mapped climate archive of refet files [Optional]
+        # Stations not in archive are read from refet folder
+        try:
+            self.refet['archive_ws'] = config.get(refet_sec, 'archive_folder')
+            if self.refet['archive_ws'] == 'None':
+                self.refet['archive_ws'] = None
+        except:
+            self.refet['archive_ws'] = None
+        if (self.refet['archive_ws'] is not None and
+                not os.path.isabs(self.refet['archive_ws'])):
+            self.refet['archive_ws'] = os.path.join(
+                self.project_ws, self.refet['archive_ws'])
         # self.refet['data_structure_type'] = 'SF P'
         self.refet['name_format'] = config.get(refet_sec, 'name_format')
         self.refet['header_lines'] = config.getint(refet_sec, 'header_lines')
@@ -709,6 +815,20 @@ class CropETData:
             sys.exit()
 
         self.weather['file_type'] = 'csv'
+
+        # Memory mapped climate archive of weather files [Optional]
+        # Stations not in archive are read from weather folder
+        try:
+            self.weather['archive_ws'] = config.get(weather_sec,
+                                                    'archive_folder')
+            if self.weather['archive_ws'] == 'None':
+                self.weather['archive_ws'] = None
+        except:
+            self.weather['archive_ws'] = None
+        if (self.weather['archive_ws'] is not None and
+                not os.path.isabs(self.weather['archive_ws'])):
+            self.weather['archive_ws'] = os.path.join(
+                self.project_ws, self.weather['archive_ws'])
          # self.weather['data_structure_type'] = 'SF P'
         self.weather['name_format'] = config.get(weather_sec, 'name_format')
         self.weather['header_lines'] = config.getint(weather_sec,
@@ -0,0 +1,635 @@
+"""crop_kernels.py
+Compiled kernels for the daily crop functions
+    compute_crop_gdd, calculate_height, runoff, grow_root and
+    compute_crop_et looping over the units of a CropState
+Called by crop_day_vec.py
+
+Kernels are compiled with numba when it is installed, otherwise they run
+as plain Python (same results, no speedup)
+
+"""
+
+import collections
+import math
+
+try:
+    import numba
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+
+def jit(func):
+    """Compile func with numba.njit if numba is available"""
+    if numba_available:
+        return numba.njit(cache=True)(func)
+    return func
+
+
+# CropState arrays passed to the kernels
+kernel_fields = [
+    'aw', 'aw3', 'cgdd', 'cgdd_penalty', 'cn2', 'cum_evap', 'cum_evap_prev',
+    'depl_root', 'depl_surface', 'depl_ze', 'depl_zep', 'dperc', 'etc_act',
+    'etc_bas', 'etc_pot', 'etref_30', 'fc', 'fw_irr', 'fw_std', 'gdd',
+    'gdd_penalty', 'height', 'irr_auto', 'irr_min', 'irr_sim', 'kc_act',
+    'kc_bas', 'kc_bas_mid', 'kc_min', 'kc_pot', 'kr2', 'mad', 'n_cgdd',
+    'n_pl_ec', 'niwr', 'p_eft', 'p_rz', 'ppt_inf', 'ppt_inf_prev', 'rew',
+    's', 's1', 's2', 's3', 's4', 'sro', 'tew', 'tew2', 'tew3', 'totwatin_ze',
+    'wt_irr', 'zr', 'zr_max', 'zr_min',
+    'doy_start_cycle',
+    'in_season', 'irr_flag', 'real_start', 'stress_event',
+    'crop_class_number', 'crop_curve_number', 'crop_curve_type',
+    'crop_days_after_planting_irrigation',
+    'crop_end_of_root_growth_fraction_time', 'crop_gdd_trigger_doy',
+    'crop_height_initial', 'crop_height_max', 'crop_invoke_stress',
+    'crop_kc_max', 'crop_tbase', 'crop_winter_crop',
+    'crop_winter_surface_cover_class',
+    'etref_array', 'latitude']
+KernelState = collections.namedtuple('KernelState', kernel_fields)
+
+
+def kernel_state(s):
+    """Return the CropState arrays used by the kernels
+
+    Parameters
+    ---------
+    s : CropState
+
+    Returns
+    -------
+    k : KernelState
+        named tuple of array references (updated in place by the kernels)
+
+    """
+    return KernelState(*[getattr(s, field) for field in kernel_fields])
+
+
+@jit
+def compute_crop_gdd(k, doy, doy_prev, sdays, tmean, tmin, tmax, etref,
+                     snow_depth):
+    """Calculate crop growing degree days
+
+    Parameters
+    ---------
+    k : KernelState
+    doy, doy_prev, sdays : int
+    tmean, tmin, tmax, etref, snow_depth : ndarray
+        climate of time step for each unit
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    See compute_crop_gdd.compute_crop_gdd()
+    etref_array is used as a ring buffer
+
+    """
+    for i in range(k.cgdd.shape[0]):
+        # 30 day ETref
+        if sdays > 30:
+            slot = (sdays - 1) % 30
+            etref_lost = k.etref_array[i, slot]
+            k.etref_array[i, slot] = etref[i]
+            k.etref_30[i] = k.etref_30[i] + (etref[i] - etref_lost) / 30.
+        else:
+            k.etref_array[i, sdays - 1] = etref[i]
+            k.etref_30[i] = (
+                (k.etref_30[i] * (sdays - 1) + etref[i]) / sdays)
+
+        # Reset CGDD on the trigger DOY
+        trigger = k.crop_gdd_trigger_doy[i]
+        winter_crop = k.crop_winter_crop[i]
+        if ((winter_crop and doy_prev < trigger and doy >= trigger) or
+                (not winter_crop and doy_prev > (trigger + 199) and
+                 doy < (trigger + 199))):
+            k.cgdd[i] = 0.0
+            k.doy_start_cycle[i] = 0
+            k.real_start[i] = False
+            k.in_season[i] = False
+
+        if k.crop_curve_number[i] <= 0:
+            continue
+        tbase = k.crop_tbase[i]
+        if winter_crop:
+            if tmin[i] < -4.0:
+                gdd = 0.0
+            elif tmean[i] > tbase:
+                gdd = tmean[i] - tbase
+            else:
+                gdd = 0.0
+            gdd -= k.gdd_penalty[i]
+            gdd = max(gdd, 0.0)
+            cgdd = k.cgdd[i] + (gdd - k.cgdd_penalty[i])
+            cgdd = max(0.0, cgdd)
+            k.gdd[i] = gdd
+            k.cgdd[i] = cgdd
+            if tmin[i] < -10:
+                k.gdd_penalty[i] = 5.0
+            else:
+                k.gdd_penalty[i] = 0.0
+            if tmin[i] < -25 and snow_depth[i] <= 0:
+                k.cgdd_penalty[i] = cgdd * 0.1
+            else:
+                k.cgdd_penalty[i] = 0.0
+        elif tbase < 0:
+            # Corn
+            tmax_prev = tmax[i]
+            tmin_prev = tmin[i]
+            if tmax[i] > 30:
+                tmax_prev = 30.
+            if tmin[i] > 30:
+                tmin_prev = 30.
+            if tmax[i] < -tbase:
+                tmax_prev = -tbase
+            if tmin[i] < -tbase:
+                tmin_prev = -tbase
+            tmean_prev = 0.5 * (tmax_prev + tmin_prev)
+            k.cgdd[i] = k.cgdd[i] + (tmean_prev + tbase)
+        elif tmean[i] > tbase:
+            k.gdd[i] = tmean[i] - tbase
+            k.cgdd[i] = k.cgdd[i] + k.gdd[i]
+
+
+@jit
+def calculate_height(k):
+    """Determine height of crop based on Kc and height limits
+
+    Parameters
+    ---------
+    k : KernelState
+
+    Returns
+    -------
+    None
+
+    """
+    for i in range(k.height.shape[0]):
+        h_ini = k.crop_height_initial[i]
+        h_max = k.crop_height_max[i]
+        height_prev = k.height[i]
+        kc_min = k.kc_min[i]
+        if k.kc_bas[i] > kc_min and k.kc_bas_mid[i] > kc_min:
+            height = (
+                h_ini + (k.kc_bas[i] - kc_min) / (k.kc_bas_mid[i] - kc_min) *
+                (h_max - h_ini))
+        else:
+            height = h_ini
+        k.height[i] = min(max(h_ini, max(height_prev, height)), h_max)
+
+
+@jit
+def runoff(k, i, precip):
+    """Curve number method for computing runoff of unit i
+
+    Parameters
+    ---------
+    k : KernelState
+    i : int
+        unit index
+    precip : float
+
+    Returns
+    -------
+    sro : float
+
+    Notes
+    -----
+    See runoff.runoff()
+
+    """
+    cn2 = min(max(k.cn2[i], 10), 100)
+    cn1 = cn2 / (2.281 - 0.01281 * cn2)
+    cn3 = cn2 / (0.427 + 0.00573 * cn2)
+    awc3 = 0.5 * k.rew[i]
+    awc1 = 0.7 * k.rew[i] + 0.3 * k.tew[i]
+    if awc1 <= awc3:
+        awc1 = awc3 + 0.01
+    depl_surface = k.depl_surface[i]
+    if depl_surface < awc3:
+        cn = cn3
+    elif depl_surface > awc1:
+        cn = cn1
+    else:
+        cn = (
+            ((depl_surface - awc3) * cn1 + (awc1 - depl_surface) * cn3) /
+            (awc1 - awc3))
+    k.s[i] = 250 * (100 / cn - 1)
+    if k.irr_flag[i]:
+        # Average runoff of the last four retention parameters
+        ppt_net4 = max(precip - 0.2 * k.s4[i], 0)
+        ppt_net3 = max(precip - 0.2 * k.s3[i], 0)
+        ppt_net2 = max(precip - 0.2 * k.s2[i], 0)
+        ppt_net1 = max(precip - 0.2 * k.s1[i], 0)
+        sro = 0.25 * (
+            ppt_net4 ** 2 / (precip + 0.8 * k.s4[i]) +
+            ppt_net3 ** 2 / (precip + 0.8 * k.s3[i]) +
+            ppt_net2 ** 2 / (precip + 0.8 * k.s2[i]) +
+            ppt_net1 ** 2 / (precip + 0.8 * k.s1[i]))
+        k.s4[i] = k.s3[i]
+        k.s3[i] = k.s2[i]
+        k.s2[i] = k.s1[i]
+        k.s1[i] = k.s[i]
+    else:
+        ppt_net = max(precip - 0.2 * k.s[i], 0)
+        sro = ppt_net * ppt_net / (precip + 0.8 * k.s[i])
+    k.sro[i] = sro
+    return sro
+
+
+@jit
+def grow_root(k, i):
+    """Determine depth of root zone of unit i
+
+    Parameters
+    ---------
+    k : KernelState
+    i : int
+        unit index
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    See grow_root.grow_root()
+
+    """
+    eor = k.crop_end_of_root_growth_fraction_time[i]
+    fractime = 0.
+    if k.crop_curve_type[i] == 1 and eor != 0.0:
+        fractime = k.n_cgdd[i] / eor
+    elif k.crop_curve_type[i] > 1 and eor != 0.0:
+        fractime = k.n_pl_ec[i] / eor
+    fractime = min(max(fractime, 0), 1)
+    zr_prev = k.zr[i]
+    zr = (
+        (0.5 + 0.5 * math.sin(3.03 * fractime - 1.47)) *
+        (k.zr_max[i] - k.zr_min[i]) + k.zr_min[i])
+    delta_zr = zr - zr_prev
+    if delta_zr > 0:
+        k.depl_root[i] = k.depl_root[i] + delta_zr * (k.aw[i] - k.aw3[i])
+    k.zr[i] = max(zr, zr_prev)
+
+
+@jit
+def compute_crop_et(k, eto, month, doy, etref, u2, rh_min, precip,
+                    snow_depth):
+    """Crop et computations
+
+    Parameters
+    ---------
+    k : KernelState
+    eto : boolean
+        True for ETo reference, False for ETr
+    month, doy : int
+    etref, u2, rh_min, precip, snow_depth : ndarray
+        climate of time step for each unit
+
+    Returns
+    -------
+    problems : int
+        count of units stopped by a water balance problem
+
+    Notes
+    -----
+    See compute_crop_et.compute_crop_et()
+    Open water units (55-57) are skipped.
+
+    """
+    problems = 0
+    for i in range(k.kc_bas.shape[0]):
+        class_number = k.crop_class_number[i]
+        if 55 <= class_number <= 57:
+            continue
+        bare = 44 <= class_number <= 46
+        in_season = k.in_season[i]
+
+        height = max(0.05, k.height[i])
+        k.height[i] = height
+        if eto:
+            kc_max = (
+                (0.04 * (u2[i] - 2) - 0.004 * (rh_min[i] - 45)) *
+                (height / 3) ** 0.3)
+            if k.crop_kc_max[i] > 0.3:
+                kc_max += k.crop_kc_max[i]
+            else:
+                kc_max += 1.2
+        elif k.crop_kc_max[i] > 0.3:
+            kc_max = k.crop_kc_max[i]
+        else:
+            kc_max = 1.0
+
+        # Bare soil fraction of cover, winter kc_max by surface cover class
+        wscc = k.crop_winter_surface_cover_class[i]
+        cover = wscc
+        if bare:
+            cover = class_number - 43
+            k.fc[i] = (0.0, 0.4, 0.7)[cover - 1]
+        if k.latitude[i] > 0 and (month < 4 or month > 10):
+            if cover == 1:
+                kc_max = 1.1 if eto else 0.9
+            elif cover == 2:
+                kc_max = 1.0 if eto else 0.85
+            elif cover == 3:
+                kc_max = 0.95 if eto else 0.8
+
+        if not in_season:
+            if class_number == 87:
+                k.kc_bas[i] = 0.25
+            elif wscc >= 1:
+                k.kc_bas[i] = 0.1
+            else:
+                k.kc_bas[i] = math.nan
+        kc_bas = k.kc_bas[i]
+        kc_max = max(kc_max, kc_bas + 0.05)
+        kc_min = 0.1
+        k.kc_min[i] = kc_min
+        if not bare:
+            if kc_max <= kc_min:
+                kc_max = kc_min + 0.001
+            if in_season:
+                if kc_bas > kc_min:
+                    k.fc[i] = min(
+                        ((kc_bas - kc_min) / (kc_max - kc_min)) **
+                        (1 + 0.5 * height), 0.99)
+                else:
+                    k.fc[i] = 0.001
+        fc = k.fc[i]
+
+        # Precipitation and runoff
+        k.ppt_inf_prev[i] = k.ppt_inf[i]
+        ppt_inf = 0.0
+        sro = 0.0
+        k.sro[i] = 0.0
+        if precip[i] > 0:
+            k.depl_surface[i] = (
+                k.wt_irr[i] * k.depl_ze[i] +
+                (1 - k.wt_irr[i]) * k.depl_zep[i])
+            sro = runoff(k, i, precip[i])
+            ppt_inf = precip[i] - sro
+        k.ppt_inf[i] = ppt_inf
+
+        # Irrigation wetting fraction and evaporable water
+        if k.irr_auto[i] > 0:
+            k.fw_irr[i] = k.fw_std[i]
+        fw_irr = k.fw_irr[i]
+        tew = k.tew[i]
+        watin_ze = tew - k.depl_ze[i]
+        if round(watin_ze, 6) <= 0.:
+            watin_ze = 0.001
+        watin_ze = min(watin_ze, tew)
+        watin_zep = tew - k.depl_zep[i]
+        if round(watin_zep, 6) <= 0.:
+            watin_zep = 0.001
+        watin_zep = min(watin_zep, tew)
+        few = 1 - fc
+        few = min(max(few, 0.001), fw_irr)
+        fewp = 1 - fc - few
+        fewp = max(fewp, 0.001)
+        k.totwatin_ze[i] = (watin_ze * few + watin_zep * fewp) / (few + fewp)
+
+        irr_sim = k.irr_sim[i]
+        if fw_irr > 0.0001:
+            fw_div = fw_irr
+        else:
+            fw_div = 1
+        dperc_ze = max(ppt_inf + irr_sim / fw_div - k.depl_ze[i], 0)
+        depl_zep_prev = max(ppt_inf - k.depl_zep[i], 0)
+        depl_ze = k.depl_ze[i] - ppt_inf - irr_sim / fw_div + dperc_ze
+        depl_ze = min(max(depl_ze, 0), tew)
+        depl_zep = k.depl_zep[i] - ppt_inf + depl_zep_prev
+        depl_zep = min(max(depl_zep, 0), tew)
+
+        if k.tew3[i] < 0.1:
+            k.kr2[i] = 0.0
+        kr2 = k.kr2[i]
+        tew2use = k.tew2[i]
+        tew3use = k.tew3[i]
+        rew2use = k.rew[i]
+        etref_30 = max(0.1, k.etref_30[i])
+        k.etref_30[i] = etref_30
+        if eto:
+            etr_threshold = 5
+        else:
+            etr_threshold = 4
+        if etref_30 < etr_threshold:
+            tew2use = k.tew2[i] * math.sqrt(etref_30 / etr_threshold)
+            tew3use = k.tew3[i] * math.sqrt(etref_30 / etr_threshold)
+            if rew2use > 0.8 * tew2use:
+                rew2use = 0.8 * tew2use
+
+        if depl_ze <= rew2use:
+            kr = 1.
+        elif depl_ze <= tew2use:
+            kr = kr2 + (1 - kr2) * (tew2use - depl_ze) / (tew2use - rew2use)
+        elif tew3use > tew2use:
+            kr = kr2 * (tew3use - depl_ze) / (tew3use - tew2use)
+        else:
+            kr = 0.0
+        if depl_zep <= rew2use:
+            krp = 1.
+        elif depl_zep <= tew2use:
+            krp = kr2 + (1 - kr2) * (tew2use - depl_zep) / (tew2use - rew2use)
+        elif tew3use > tew2use:
+            krp = kr2 * (tew3use - depl_zep) / (tew3use - tew2use)
+        else:
+            krp = 0.0
+
+        if (few * watin_ze + fewp * watin_zep) > 0.0001:
+            wt_irr = few * watin_ze / (few * watin_ze + fewp * watin_zep)
+        else:
+            wt_irr = few * watin_ze
+        wt_irr = min(max(wt_irr, 0), 1)
+        k.wt_irr[i] = wt_irr
+        ke_irr = kr * (kc_max - kc_bas) * wt_irr
+        ke_ppt = krp * (kc_max - kc_bas) * (1 - wt_irr)
+        ke_irr = min(max(ke_irr, 0), few * kc_max)
+        ke_ppt = min(max(ke_ppt, 0), fewp * kc_max)
+
+        # Transpiration and water stress
+        depl_root = k.depl_root[i]
+        taw = max(k.aw[i] * k.zr[i], 0.001)
+        raw = k.mad[i] * taw / 100
+        if depl_root > raw:
+            ks = max((taw - depl_root) / (taw - raw), 0)
+        else:
+            ks = 1.
+        invoke_stress = k.crop_invoke_stress[i]
+        if invoke_stress < 1:
+            ks = 1.
+        elif invoke_stress == 1:
+            if ks < 0.05 and in_season and kc_bas > 0.3:
+                k.stress_event[i] = True
+            if k.stress_event[i]:
+                ks = 0.0
+
+        # Snow cover reduction
+        kc_mult = 1.
+        if snow_depth[i] > 0.01:
+            k_rad = (
+                0.000000022 * doy ** 3 - 0.0000242 * doy ** 2 +
+                0.006 * doy + 0.011)
+            albedo_snow = 0.8
+            albedo_soil = 0.25
+            kc_mult = 1 - k_rad + (1 - albedo_snow) / (1 - albedo_soil) * k_rad
+            kc_mult = kc_mult * 0.7
+        ke_irr *= kc_mult
+        ke_ppt *= kc_mult
+
+        e_irr = ke_irr * etref[i]
+        e_ppt = ke_ppt * etref[i]
+
+        ze = 0.0001
+        if k.zr[i] < 0.0001:
+            k.zr[i] = 0.01
+        zr = k.zr[i]
+        kt_prop = min((ze / zr) ** 0.6, 1)
+        kt_reducer_denom = max(1 - depl_root / taw, 0.001)
+        kt_reducer = few * (1 - depl_ze / tew2use) / kt_reducer_denom
+        kt_prop = min(kt_prop * kt_reducer, 1)
+        te_irr = kc_mult * ks * kc_bas * etref[i] * kt_prop
+        kt_reducer = fewp * (1 - depl_zep / tew2use) / kt_reducer_denom
+        kt_prop = min(kt_prop * kt_reducer, 1)
+        te_ppt = kc_mult * ks * kc_bas * etref[i] * kt_prop
+
+        # Limit surface layer depletion to TEW
+        depl_ze_prev = depl_ze
+        depl_zep_prev = depl_zep
+        depl_ze = depl_ze_prev + e_irr / few + te_irr
+        if depl_ze < 0:
+            depl_ze = 0.0
+        if depl_ze > tew:
+            potential_e = depl_ze - depl_ze_prev
+            if potential_e < 0.0001:
+                potential_e = 0.0001
+            e_factor = min(max(1 - (depl_ze - tew) / potential_e, 0), 1)
+            e_irr *= e_factor
+            te_irr *= e_factor
+            depl_ze = depl_ze_prev + e_irr / few + te_irr
+            if depl_ze > tew + 0.2:
+                k.depl_ze[i] = depl_ze
+                k.depl_zep[i] = depl_zep
+                problems += 1
+                continue
+        k.depl_ze[i] = depl_ze
+
+        depl_zep = max(depl_zep_prev + e_ppt / fewp + te_ppt, 0)
+        if depl_zep > tew:
+            potential_e = depl_zep - depl_zep_prev
+            if potential_e < 0.0001:
+                potential_e = 0.0001
+            e_factor = min(max(1 - (depl_zep - tew) / potential_e, 0), 1)
+            e_ppt *= e_factor
+            te_ppt *= e_factor
+            depl_zep = depl_zep_prev + e_ppt / fewp + te_ppt
+            if depl_zep > tew + 0.2:
+                k.depl_zep[i] = depl_zep
+                problems += 1
+                continue
+        k.depl_zep[i] = depl_zep
+
+        if etref[i] < 0.01:
+            etref_divisor = 0.01
+        else:
+            etref_divisor = etref[i]
+        ke_irr = min(max(e_irr / etref_divisor, 0), 1.5)
+        ke_ppt = min(max(e_ppt / etref_divisor, 0), 1.5)
+        ke = ke_irr + ke_ppt
+        e = ke * etref[i]
+        if kc_mult > 1 or ks > 1:
+            problems += 1
+            continue
+
+        kc_act = kc_mult * ks * kc_bas + ke
+        k.kc_pot[i] = kc_bas + ke
+        etc_act = kc_act * etref[i]
+        k.etc_pot[i] = k.kc_pot[i] * etref[i]
+        k.etc_bas[i] = kc_bas * etref[i]
+
+        cum_evap_prev = max(
+            k.cum_evap_prev[i] + e_irr - (ppt_inf - depl_zep_prev), 0)
+        depl_root += etc_act - ppt_inf
+
+        # Automatic irrigation
+        irr_sim_prev = irr_sim
+        irr_sim = 0.0
+        if k.irr_flag[i]:
+            dapi = k.crop_days_after_planting_irrigation[i]
+            doy_start_cycle = k.doy_start_cycle[i]
+            doy_to_start_irr = doy_start_cycle + dapi
+            if doy_to_start_irr > 365:
+                doy_to_start_irr -= 365
+            crop_doy = doy - doy_start_cycle + 1
+            if crop_doy < 1:
+                crop_doy += 365
+            if (crop_doy >= dapi and doy >= doy_to_start_irr and
+                    in_season and depl_root > raw and kc_bas > 0.22):
+                irr_sim = max(depl_root, k.irr_min[i])
+        depl_root -= irr_sim
+        k.irr_auto[i] = irr_sim
+        k.irr_sim[i] = irr_sim
+        if irr_sim > 0:
+            k.cum_evap[i] = cum_evap_prev
+            cum_evap_prev = 0.0
+        k.cum_evap_prev[i] = cum_evap_prev
+
+        # Deep percolation
+        if ((irr_sim + irr_sim_prev + ppt_inf + k.ppt_inf_prev[i]) <= 0.0001 or
+                zr < 0.2):
+            if depl_root < 0.0:
+                dperc = -depl_root
+            else:
+                dperc = 0.0
+        elif depl_root < -20:
+            dperc = -20.0 - depl_root
+        else:
+            dperc = 0.0
+        depl_root += dperc
+
+        if invoke_stress > 0.5 and depl_root > taw:
+            etc_act = max(etc_act - (depl_root - taw), 0)
+            if etref[i] > 0.1:
+                kc_act = etc_act / etref[i]
+            depl_root = taw
+        k.kc_act[i] = kc_act
+        k.etc_act[i] = etc_act
+        k.depl_root[i] = depl_root
+
+        gross_dperc = dperc + 0.1 * irr_sim
+        zr_max = k.zr_max[i]
+        daw3 = max(k.aw3[i] * (zr_max - zr), 0)
+        taw3 = max(k.aw[i] * (zr_max - zr), 0)
+        daw3 += gross_dperc
+        if daw3 > taw3:
+            dperc = daw3 - taw3
+            daw3 = taw3
+        else:
+            dperc = 0.
+        daw3 = max(daw3, 0)
+        if zr_max > zr:
+            k.aw3[i] = daw3 / (zr_max - zr)
+        else:
+            k.aw3[i] = 0.
+        k.dperc[i] = dperc
+
+        if irr_sim > 0:
+            k.niwr[i] = etc_act - (precip[i] - sro)
+            p_rz = precip[i] - sro
+            p_eft = precip[i] - sro - e
+        else:
+            k.niwr[i] = etc_act - (precip[i] - sro - dperc)
+            p_rz = precip[i] - sro - dperc
+            p_eft = precip[i] - sro - dperc - e
+        if p_rz <= 0:
+            p_rz = 0.
+        if p_eft <= 0:
+            p_eft = 0.
+        k.p_rz[i] = p_rz
+        k.p_eft[i] = p_eft
+
+        if in_season:
+            grow_root(k, i)
+    return problems
@@ -0,0 +1,232 @@
+"""crop_pool.py
+Persistent worker pool support for multiprocessing by crop
+Cell climate is published once through multiprocessing.shared_memory
+    and attached zero-copy by the workers
+Called by mod_crop_et.py and crop_cycle.py
+
+"""
+
+import copy
+import logging
+import multiprocessing as mp
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+import crop_cycle
+
+# Cell DataFrames shared with the workers
+shared_frames = ['climate_df', 'refet_df']
+
+# Worker state, set by init_worker()
+_worker_data = None
+_worker_cell = None
+
+
+class SharedFrame(object):
+    """Picklable description of a DataFrame held in shared memory
+
+    Attributes
+    ----------
+    name : str
+        shared memory block name
+    columns : list
+        (column name, dtype string, byte offset) of each column,
+        index values are stored as column '__index__'
+    objects : dict
+        non numeric columns, passed by value
+    n : int
+        number of rows
+
+    """
+
+    def __init__(self, df):
+        """Copy DataFrame df into a new shared memory block"""
+        self.n = len(df)
+        self.index_name = df.index.name
+        self.index_freq = getattr(df.index, 'freqstr', None)
+        arrays = [('__index__', np.asarray(df.index.values))]
+        self.objects = {}
+        for col in df.columns:
+            values = df[col].values
+            if isinstance(values, np.ndarray) and values.dtype.kind in 'biufcmM':
+                arrays.append((col, values))
+            else:
+                self.objects[col] = values
+        self.columns = []
+        offset = 0
+        for col, values in arrays:
+            self.columns.append((col, values.dtype.str, offset))
+            # Keep each column 8 byte aligned
+            offset += -(-values.nbytes // 8) * 8
+        self.column_order = list(df.columns)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        self.name = self.shm.name
+        for (col, dtype, offset), (_, values) in zip(self.columns, arrays):
+            np.ndarray(self.n, dtype=dtype, buffer=self.shm.buf,
+                       offset=offset)[:] = values
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['shm'] = None
+        return state
+
+    def attach(self):
+        """Attach to shared memory block and return DataFrame view
+
+        Returns
+        -------
+        df : pandas.DataFrame
+            columns are views of the shared memory (read only)
+
+        """
+        self.shm = shared_memory.SharedMemory(name=self.name)
+        data = {}
+        index = None
+        for col, dtype, offset in self.columns:
+            values = np.ndarray(self.n, dtype=dtype, buffer=self.shm.buf,
+                                offset=offset)
+            values.flags.writeable = False
+            if col == '__index__' and self.index_freq:
+                index = pd.DatetimeIndex(
+                    values, name=self.index_name, freq=self.index_freq)
+            elif col == '__index__':
+                index = pd.Index(values, name=self.index_name, copy=False)
+            else:
+                data[col] = values
+        data.update(self.objects)
+        df = pd.DataFrame(data, index=index, copy=False)
+        return df[self.column_order]
+
+    def close(self):
+        """Detach from shared memory block"""
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+    def unlink(self):
+        """Release shared memory block
+
+        Blocks created in another process are attached by name first
+
+        """
+        if self.shm is None:
+            self.shm = shared_memory.SharedMemory(name=self.name)
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+
+class SharedCell(object):
+    """Picklable ETCell with its climate held in shared memory
+
+    Attributes
+    ----------
+    cell : ETCell
+        shallow copy of cell without its DataFrames
+    frames : dict
+        SharedFrame of each shared DataFrame attribute
+
+    """
+
+    def __init__(self, et_cell):
+        """Publish DataFrames of et_cell"""
+        self.cell = copy.copy(et_cell)
+        self.frames = {}
+        for attr, value in list(vars(et_cell).items()):
+            if not isinstance(value, pd.DataFrame):
+                continue
+            if attr in shared_frames:
+                self.frames[attr] = SharedFrame(value)
+            # Other DataFrames (weather_df, hist_temps_df) are not needed
+            setattr(self.cell, attr, None)
+        self.name = '_'.join(f.name for f in self.frames.values())
+
+    def attach(self):
+        """Return ETCell with DataFrames attached to shared memory"""
+        for attr, frame in self.frames.items():
+            setattr(self.cell, attr, frame.attach())
+        return self.cell
+
+    def close(self):
+        """Detach from shared memory"""
+        for attr, frame in self.frames.items():
+            setattr(self.cell, attr, None)
+            frame.close()
+
+    def unlink(self):
+        """Release shared memory"""
+        for frame in self.frames.values():
+            frame.unlink()
+
+
+def init_worker(data):
+    """Pool initializer, data is sent to each worker once
+
+    Parameters
+    ---------
+    data :
+        configuration data
+
+    Returns
+    -------
+    None
+
+    """
+    global _worker_data
+    _worker_data = data
+
+
+def crop_day_loop_shared(tup):
+    """Pool function computing one crop of a shared cell
+
+    Parameters
+    ---------
+    tup : tuple
+        crop_count, SharedCell, crop number and mp_procs
+
+    Returns
+    -------
+    crop_num : int
+
+    Notes
+    -----
+    The most recent cell stays attached until a task for another cell
+    arrives, so consecutive crops of a cell only attach once per worker
+
+    """
+    global _worker_cell
+    crop_count, shared_cell, crop_num, mp_procs = tup
+    if _worker_cell is None or _worker_cell.name != shared_cell.name:
+        if _worker_cell is not None:
+            _worker_cell.close()
+        shared_cell.attach()
+        _worker_cell = shared_cell
+    et_cell = _worker_cell.cell
+    crop_cycle.crop_day_loop(
+        crop_count, _worker_data, et_cell, et_cell.crop_params[crop_num],
+        False, mp_procs)
+    return crop_num
+
+
+def crop_pool(data, mp_procs):
+    """Return persistent pool for multiprocessing by crop
+
+    Parameters
+    ---------
+    data :
+        configuration data, sent once to each worker
+    mp_procs : int
+        number of cores to use for multiprocessing
+
+    Returns
+    -------
+    pool : multiprocessing.Pool
+
+    """
+    logging.info('  Starting pool of {} workers'.format(mp_procs))
+    # Workers must share the parent's tracker so blocks they create
+    #   or attach are released by the parent's unlink()
+    resource_tracker.ensure_running()
+    return mp.Pool(mp_procs, initializer=init_worker, initargs=(data,))
@@ -0,0 +1,326 @@
+"""crop_scheduler.py
+Dynamic scheduling of (cell, crop) tasks across a worker pool
+Replaces the choice between multiprocessing by cell and by crop
+Called by mod_crop_et.py
+
+"""
+
+import heapq
+import logging
+import multiprocessing as mp
+from multiprocessing import resource_tracker
+import os
+import queue
+import sys
+import time
+
+import crop_cycle
+import crop_pool
+
+# Worker state, set by init_worker()
+_worker_cells = None
+
+
+def task_years(data, et_cell=None):
+    """Estimate number of years a cell covers
+
+    Parameters
+    ---------
+    data :
+        configuration data
+    et_cell : optional
+        ETCell instance, its climate_df record length is used if loaded
+
+    Returns
+    -------
+    years : float
+
+    """
+    if et_cell is not None and getattr(et_cell, 'climate_df', None) is not None:
+        return max(len(et_cell.climate_df) / 365.25, 1.)
+    if data.start_dt is not None and data.end_dt is not None:
+        return max((data.end_dt - data.start_dt).days / 365.25, 1.)
+    return 1.
+
+
+def cell_crops(et_cell):
+    """Return (crop_count, crop_num) of each active crop of cell"""
+    crop_nums = [
+        crop_num for crop_num in sorted(et_cell.crop_params.keys())
+        if et_cell.crop_flags[crop_num] != 0]
+    return list(enumerate(crop_nums, start=1))
+
+
+def init_worker(data, cells):
+    """Pool initializer, data and cells are sent to each worker once
+
+    Parameters
+    ---------
+    data :
+        configuration data
+    cells :
+        ETCellData instance
+
+    Returns
+    -------
+    None
+
+    """
+    global _worker_cells
+    crop_pool.init_worker(data)
+    _worker_cells = cells
+
+
+def load_task(cell_count, cell_id):
+    """Pool function reading the climate of one cell
+
+    Returns
+    -------
+    tuple
+        pid, start and end time, SharedCell (None on failure) and years
+
+    """
+    start = time.perf_counter()
+    et_cell = _worker_cells.et_cells_dict[cell_id]
+    if not et_cell.set_input_timeseries(
+            cell_count, crop_pool._worker_data, _worker_cells):
+        return os.getpid(), start, time.perf_counter(), None, 0
+    crop_cycle.write_cell_output(crop_pool._worker_data, et_cell)
+    years = task_years(crop_pool._worker_data, et_cell)
+    shared_cell = crop_pool.SharedCell(et_cell)
+    # Climate now lives in shared memory, free the worker copy
+    for attr in ['refet_df', 'climate_df', 'weather_df', 'hist_temps_df']:
+        setattr(et_cell, attr, None)
+    return os.getpid(), start, time.perf_counter(), shared_cell, years
+
+
+def crop_task(crop_count, shared_cell, crop_num, mp_procs):
+    """Pool function computing one crop of a shared cell
+
+    Returns
+    -------
+    tuple
+        pid, start and end time
+
+    """
+    start = time.perf_counter()
+    crop_pool.crop_day_loop_shared(
+        (crop_count, shared_cell, crop_num, mp_procs))
+    return os.getpid(), start, time.perf_counter()
+
+
+def cell_task(cell_count, cell_id, mp_procs):
+    """Pool function computing all crops of one cell (vectorized runs)
+
+    Returns
+    -------
+    tuple
+        pid, start and end time, success flag
+
+    """
+    start = time.perf_counter()
+    data = crop_pool._worker_data
+    et_cell = _worker_cells.et_cells_dict[cell_id]
+    if not et_cell.set_input_timeseries(cell_count, data, _worker_cells):
+        return os.getpid(), start, time.perf_counter(), False
+    crop_cycle.crop_cycle_vec(data, et_cell, mp_procs)
+    for attr in ['refet_df', 'climate_df', 'weather_df', 'hist_temps_df']:
+        setattr(et_cell, attr, None)
+    return os.getpid(), start, time.perf_counter(), True
+
+
+class Scheduler(object):
+    """Feed a pool with (cell, crop) tasks ordered by estimated cost
+
+    Cells are loaded once by a worker and published in shared memory,
+    their crops are queued largest first (years x crops) and handed to
+    whichever worker is free.  At most max_cells cells are resident at
+    a time, a cell is released when its last crop finishes.
+
+    Attributes
+    ----------
+    stats : dict
+        tasks and busy seconds of each worker pid
+
+    """
+
+    def __init__(self, data, cells, mp_procs, max_cells=None):
+        self.data = data
+        self.cells = cells
+        self.mp_procs = mp_procs
+        self.max_cells = max_cells or mp_procs + 1
+        self.results = queue.Queue()
+        self.ready = []
+        self.resident = {}
+        self.loading = 0
+        self.in_flight = 0
+        self.seq = 0
+        self.stats = {}
+
+    def submit(self, pool, key, func, args):
+        """Submit task, its result is put on results queue"""
+        self.in_flight += 1
+        pool.apply_async(
+            func, args,
+            callback=lambda r: self.results.put((key, r)),
+            error_callback=lambda e: self.results.put(('error', e)))
+
+    def record(self, pid, start, end):
+        stats = self.stats.setdefault(pid, [0, 0.])
+        stats[0] += 1
+        stats[1] += end - start
+
+    def cell_tasks(self, cell_list):
+        """Return (cost, cell_count, cell_id) of each cell, largest first
+
+        Cost is record years times active crops of the cell, cells
+        without climate loaded yet are costed over the run period
+
+        """
+        tasks = []
+        for cell_count, cell_id in cell_list:
+            et_cell = self.cells.et_cells_dict[cell_id]
+            n = len(cell_crops(et_cell))
+            if n:
+                tasks.append(
+                    (task_years(self.data, et_cell) * n, cell_count, cell_id))
+        return sorted(tasks, key=lambda x: -x[0])
+
+    def run(self, cell_list):
+        """Compute all crops of cells in cell_list
+
+        Parameters
+        ---------
+        cell_list : list
+            (cell_count, cell_id) of each cell to run
+
+        Returns
+        -------
+        None
+
+        """
+        pending = self.cell_tasks(cell_list)
+        logging.warning('  Scheduling {} cells across {} workers'.format(
+            len(pending), self.mp_procs))
+        clock_start = time.perf_counter()
+        # Workers share the parent's shared memory tracker
+        resource_tracker.ensure_running()
+        pool = mp.Pool(self.mp_procs, initializer=init_worker,
+                       initargs=(self.data, self.cells))
+        try:
+            if self.data.vectorize_flag:
+                self.run_cells(pool, pending)
+            else:
+                self.run_crops(pool, pending)
+        finally:
+            for shared_cell, remaining in self.resident.values():
+                shared_cell.unlink()
+            pool.close()
+            pool.join()
+        self.report(time.perf_counter() - clock_start)
+
+    def run_cells(self, pool, pending):
+        """One task per cell, all crops of a cell computed together"""
+        pending = list(reversed(pending))
+        while pending or self.in_flight:
+            while pending and self.in_flight < self.mp_procs:
+                cost, cell_count, cell_id = pending.pop()
+                self.submit(pool, cell_id, cell_task,
+                            (cell_count, cell_id, self.mp_procs))
+            key, result = self.results.get()
+            self.in_flight -= 1
+            if key == 'error':
+                raise result
+            pid, start, end, success = result
+            if not success:
+                logging.error('  Cell {} input timeseries could not be '
+                              'read'.format(key))
+                sys.exit()
+            self.record(pid, start, end)
+            logging.warning('CellID: {}'.format(key))
+
+    def run_crops(self, pool, pending):
+        """Load cells as capacity allows and feed their crops to workers"""
+        pending = list(reversed(pending))
+        while pending or self.ready or self.in_flight:
+            while self.in_flight < self.mp_procs:
+                if (pending and
+                        len(self.resident) + self.loading < self.max_cells):
+                    cost, cell_count, cell_id = pending.pop()
+                    self.loading += 1
+                    self.submit(pool, ('load', cell_id), load_task,
+                                (cell_count, cell_id))
+                elif self.ready:
+                    cost, seq, cell_id, crop_count, crop_num = heapq.heappop(
+                        self.ready)
+                    shared_cell = self.resident[cell_id][0]
+                    self.submit(pool, ('crop', cell_id), crop_task,
+                                (crop_count, shared_cell, crop_num,
+                                 self.mp_procs))
+                else:
+                    break
+            key, result = self.results.get()
+            self.in_flight -= 1
+            if key == 'error':
+                raise result
+            kind, cell_id = key
+            if kind == 'load':
+                self.loaded(cell_id, *result)
+            else:
+                self.record(*result)
+                entry = self.resident[cell_id]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    entry[0].unlink()
+                    del self.resident[cell_id]
+
+    def loaded(self, cell_id, pid, start, end, shared_cell, years):
+        """Queue crops of a newly loaded cell"""
+        self.loading -= 1
+        self.record(pid, start, end)
+        if shared_cell is None:
+            logging.error('  Cell {} input timeseries could not be '
+                          'read'.format(cell_id))
+            sys.exit()
+        logging.warning('CellID: {}'.format(cell_id))
+        crops = cell_crops(self.cells.et_cells_dict[cell_id])
+        self.resident[cell_id] = [shared_cell, len(crops)]
+        for crop_count, crop_num in crops:
+            self.seq += 1
+            heapq.heappush(
+                self.ready, (-years, self.seq, cell_id, crop_count, crop_num))
+
+    def report(self, wall_time):
+        """Log tasks, busy time and utilisation of each worker"""
+        logging.warning('\nWorker utilisation ({:.1f} s wall)'.format(
+            wall_time))
+        for i, (pid, (tasks, busy)) in enumerate(sorted(self.stats.items())):
+            logging.warning(
+                '  Worker {} (pid {}): {} tasks, {:.1f} s busy, {:.0f}%'.format(
+                    i + 1, pid, tasks, busy,
+                    100. * busy / wall_time if wall_time else 0.))
+
+
+def run(data, cells, cell_list, mp_procs):
+    """Compute all crops of cells in cell_list with a Scheduler
+
+    Parameters
+    ---------
+    data :
+        configuration data
+    cells :
+        ETCellData instance
+    cell_list : list
+        (cell_count, cell_id) of each cell to run
+    mp_procs : int
+        number of cores to use for multiprocessing
+
+    Returns
+    -------
+    stats : dict
+        tasks and busy seconds of each worker pid
+
+    """
+    scheduler = Scheduler(data, cells, mp_procs)
+    scheduler.run(cell_list)
+    return scheduler.stats
@@ -0,0 +1,165 @@
+"""crop_state.py
+Defines CropState class
+Struct-of-arrays container for the crop cycle state of many units
+    (crops of one cell, or one crop over many cells)
+Called by crop_cycle.py and crop_day_vec.py
+
+"""
+
+import numpy as np
+
+from initialize_crop_cycle import InitializeCropCycle
+
+# Per-unit state copied from InitializeCropCycle after crop_load()
+float_fields = [
+    'aw', 'aw3', 'cn2', 'cgdd', 'cgdd_penalty', 'cgdd_at_planting',
+    'cum_evap', 'cum_evap_prev', 'depl_ze', 'depl_zep', 'depl_surface',
+    'depl_root', 'dperc', 'etc_act', 'etc_pot', 'etc_bas', 'etref_30', 'fc',
+    'fw_spec', 'fw_std', 'fw_irr', 'gdd', 'gdd_penalty', 'height_min',
+    'height_max', 'height', 'irr_auto', 'irr_sim', 'irr_min', 'kc_act',
+    'kc_pot', 'kc_min', 'kc_bas', 'kc_bas_mid', 'kc_bas_prev', 'kr2', 'mad',
+    'mad_ini', 'mad_mid', 'n_cgdd', 'n_pl_ec', 'niwr', 'p_rz', 'p_eft',
+    'ppt_inf', 'ppt_inf_prev', 'rew', 'tew', 'tew2', 'tew3', 's', 's1', 's2',
+    's3', 's4', 'sro', 'totwatin_ze', 'wt_irr', 'zr', 'zr_min', 'zr_max']
+int_fields = ['doy_start_cycle', 'cutting', 'cycle', 'longterm_pl', 'T2Days']
+bool_fields = ['real_start', 'irr_flag', 'in_season', 'dormant_setup_flag',
+               'crop_setup_flag', 'stress_event']
+
+# Per-unit crop parameters (CropParameters attribute, numpy dtype)
+crop_fields = [
+    ('class_number', np.int64), ('curve_number', np.int64),
+    ('curve_type', np.int64),
+    ('flag_for_means_to_estimate_pl_or_gu', np.int64),
+    ('t30_for_pl_or_gu_or_cgdd', np.float64), ('date_of_pl_or_gu', np.float64),
+    ('tbase', np.float64), ('cgdd_for_efc', np.float64),
+    ('cgdd_for_termination', np.float64), ('time_for_efc', np.float64),
+    ('time_for_harvest', np.float64), ('killing_frost_temperature', np.float64),
+    ('invoke_stress', np.int64), ('gdd_trigger_doy', np.int64),
+    ('winter_crop', np.bool_), ('cutting_crop', np.bool_),
+    ('days_after_planting_irrigation', np.int64),
+    ('end_of_root_growth_fraction_time', np.float64),
+    ('height_initial', np.float64), ('height_max', np.float64),
+    ('kc_max', np.float64), ('winter_surface_cover_class', np.int64),
+    ('is_annual', np.bool_)]
+
+
+class UnitView(object):
+    """Attribute view of a single unit of a CropState
+
+    Lets the scalar InitializeCropCycle setup methods run unchanged
+    against one row of the state arrays.
+
+    """
+
+    def __init__(self, state, i):
+        object.__setattr__(self, '_state', state)
+        object.__setattr__(self, '_i', i)
+
+    def __getattr__(self, name):
+        return getattr(self._state, name)[self._i].item()
+
+    def __setattr__(self, name, value):
+        getattr(self._state, name)[self._i] = value
+
+
+class CropState:
+    """Crop cycle state for many units held in NumPy arrays
+
+    Attributes
+    ----------
+    n : int
+        number of units
+    crops : list
+        CropParameters instance of each unit
+    cells : list
+        ETCell instance of each unit
+    kc_curves : ndarray
+        crop coefficient curves (n, 3, 35) for curve_number + 0, 1, 2
+    kc_lentry : ndarray
+        last non-zero entry of each curve (n, 3)
+
+    Notes
+    -----
+    Each field of InitializeCropCycle used in the daily loop is an array
+    indexed by unit.
+    Crop parameters are stored the same way with a 'crop_' prefix.
+
+    """
+
+    def __init__(self, units):
+        """Build state from list of (et_cell, crop, foo) tuples
+
+        Parameters
+        ---------
+        units : list
+            (et_cell, crop, foo) for each unit, foo already loaded
+
+        """
+        self.n = len(units)
+        self.cells = [u[0] for u in units]
+        self.crops = [u[1] for u in units]
+        foos = [u[2] for u in units]
+        defaults = InitializeCropCycle()
+        defaults.longterm_pl = 0
+        defaults.T2Days = 0
+        defaults.zr = 0.
+        defaults.stress_event = False
+        for field in float_fields:
+            setattr(self, field, np.array(
+                [getattr(f, field, getattr(defaults, field)) for f in foos],
+                dtype=np.float64))
+        for field in int_fields:
+            setattr(self, field, np.array(
+                [getattr(f, field, getattr(defaults, field)) for f in foos],
+                dtype=np.int64))
+        for field in bool_fields:
+            setattr(self, field, np.array(
+                [getattr(f, field, getattr(defaults, field)) for f in foos],
+                dtype=np.bool_))
+        for field, dtype in crop_fields:
+            setattr(self, 'crop_' + field, np.array(
+                [getattr(c, field) for c in self.crops], dtype=dtype))
+        self.crop_alfalfa_1st = np.array(
+            [c.curve_name.upper() == "ALFALFA 1ST CYCLE" for c in self.crops],
+            dtype=np.bool_)
+
+        # Cell properties
+        self.latitude = np.array(
+            [c.latitude for c in self.cells], dtype=np.float64)
+        self.dairy_cuttings = np.array(
+            [getattr(c, 'dairy_cuttings', 0) for c in self.cells],
+            dtype=np.float64)
+        self.beef_cuttings = np.array(
+            [getattr(c, 'beef_cuttings', 0) for c in self.cells],
+            dtype=np.float64)
+
+        # Crop coefficient curves, including alfalfa cutting cycles
+        self.kc_curves = np.zeros((self.n, 3, 35), dtype=np.float64)
+        self.kc_lentry = np.zeros((self.n, 3), dtype=np.int64)
+        for i, (cell, crop) in enumerate(zip(self.cells, self.crops)):
+            for j in range(3):
+                coeff = cell.crop_coeffs.get(crop.curve_number + j)
+                if coeff is None:
+                    continue
+                self.kc_curves[i, j, :] = coeff.data
+                self.kc_lentry[i, j] = coeff.lentry
+
+        self.etref_array = np.zeros((self.n, 30), dtype=np.float64)
+        self.doy_prev = 0
+        self.pl_year = None
+        self.pl_doy = np.zeros(self.n, dtype=np.int64)
+
+    def view(self, i):
+        """Return a scalar attribute view of unit i"""
+        return UnitView(self, i)
+
+    def setup_crop(self, mask):
+        """Run InitializeCropCycle.setup_crop() for masked units"""
+        for i in np.flatnonzero(mask):
+            InitializeCropCycle.setup_crop(self.view(i), self.crops[i])
+
+    def setup_dormant(self, mask):
+        """Run InitializeCropCycle.setup_dormant() for masked units"""
+        for i in np.flatnonzero(mask):
+            InitializeCropCycle.setup_dormant(
+                self.view(i), self.cells[i], self.crops[i])
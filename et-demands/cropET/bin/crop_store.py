@@ -0,0 +1,219 @@
+"""crop_store.py
+Consolidated zarr store of daily CropET results
+Daily variables are (cell, crop, time) arrays chunked by cell and crop,
+    so each (cell, crop) is one chunk and parallel workers write their own
+    chunks without locking
+Daily cell variables are written once per cell by the process that loads
+    the cell climate, crop tasks only write crop variables
+Called by mod_crop_et.py and crop_cycle.py
+
+"""
+
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+# Daily crop_df fields written for each (cell, crop)
+crop_variables = [
+    'et_act', 'et_pot', 'et_bas', 'kc_act', 'kc_bas', 'irrigation',
+    'runoff', 'dperc', 'niwr', 'p_rz', 'p_eft', 'season', 'cutting']
+# Daily cell fields, (cell, time) arrays
+cell_variables = ['etref', 'ppt']
+# Flag fields are stored as int8 with -1 fill, all others as float64
+flag_variables = ['season', 'cutting']
+
+# Store opened by this process, set by open_store()
+_store = None
+
+
+def create_store(data, cells, etcid_to_run='ALL'):
+    """Create empty store for all cells and crops to be run
+
+    Parameters
+    ---------
+    data :
+        configuration data
+    cells :
+        ETCellData instance
+    etcid_to_run : str
+        et cell id to run, 'ALL' [default]
+
+    Returns
+    -------
+    None
+
+    """
+    if data.start_dt is None or data.end_dt is None:
+        logging.error('\nERROR: zarr output requires start_date and end_date')
+        sys.exit()
+    store_path = data.cet_out['store_path']
+    if etcid_to_run == 'ALL':
+        cell_ids = sorted(cells.et_cells_dict.keys())
+    else:
+        cell_ids = [etcid_to_run]
+    crop_nums = [int(c) for c in cells.crop_num_list]
+    dates = pd.date_range(data.start_dt, data.end_dt, freq='D')
+    logging.info('  Creating store {} ({} cells, {} crops, {} days)'.format(
+        store_path, len(cell_ids), len(crop_nums), len(dates)))
+
+    group = zarr.open_group(store_path, mode='w')
+    group.attrs.update({
+        'cell_id': cell_ids, 'crop': crop_nums,
+        'start_date': dates[0].strftime('%Y-%m-%d'), 'days': len(dates),
+        'refet_type': data.refet['type']})
+    for var in crop_variables:
+        shape = (len(cell_ids), len(crop_nums), len(dates))
+        create_array(store_path, var, shape, (1, 1, len(dates)))
+    for var in cell_variables:
+        shape = (len(cell_ids), len(dates))
+        create_array(store_path, var, shape, (1, len(dates)))
+
+
+def create_array(store_path, var, shape, chunks):
+    """Create empty array var of store"""
+    if var in flag_variables:
+        dtype, fill_value = np.int8, -1
+    else:
+        dtype, fill_value = np.float64, np.nan
+    zarr.open_array(
+        store=os.path.join(store_path, var), mode='w', shape=shape,
+        chunks=chunks, dtype=dtype, fill_value=fill_value)
+
+
+def open_store(store_path):
+    """Return store opened for writing, cached per process
+
+    Returns
+    -------
+    store : dict
+        arrays, cell and crop positions, start date and number of days
+
+    """
+    global _store
+    if _store is None or _store['path'] != store_path:
+        group = zarr.open_group(store_path, mode='r')
+        attrs = dict(group.attrs)
+        _store = {
+            'path': store_path,
+            'cells': {c: i for i, c in enumerate(attrs['cell_id'])},
+            'crops': {c: i for i, c in enumerate(attrs['crop'])},
+            'start': pd.Timestamp(attrs['start_date']),
+            'days': attrs['days'],
+            'arrays': {
+                var: zarr.open_array(
+                    store=os.path.join(store_path, var), mode='r+')
+                for var in crop_variables + cell_variables}}
+    return _store
+
+
+def store_times(store, index):
+    """Return store time positions of index and mask of those in store"""
+    t = (index - store['start']).days.values
+    return t, (t >= 0) & (t < store['days'])
+
+
+def write_cell(data, et_cell):
+    """Write daily cell variables of one cell into their chunk
+
+    Parameters
+    ---------
+    data :
+        configuration data
+    et_cell :
+        ETCell instance with its refet_df and climate_df loaded
+
+    Returns
+    -------
+    None
+
+    """
+    store = open_store(data.cet_out['store_path'])
+    i = store['cells'][et_cell.cell_id]
+    t, mask = store_times(store, et_cell.refet_df.index)
+    if not mask.any():
+        return
+    t0, t1 = t[mask][0], t[mask][-1] + 1
+    ppt = et_cell.climate_df['ppt'].reindex(et_cell.refet_df.index).values
+    store['arrays']['etref'][i, t0:t1] = et_cell.refet_df['etref'].values[mask]
+    store['arrays']['ppt'][i, t0:t1] = ppt[mask]
+
+
+def write_crop(data, et_cell, crop, crop_df):
+    """Write daily results of one cell and crop into their chunks
+
+    Parameters
+    ---------
+    data :
+        configuration data
+    et_cell :
+        ETCell instance
+    crop :
+        crop parameters
+    crop_df : pandas.DataFrame
+        daily crop_df of crop
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Cell variables are written by write_cell()
+
+    """
+    store = open_store(data.cet_out['store_path'])
+    i = store['cells'][et_cell.cell_id]
+    j = store['crops'][int(crop.class_number)]
+    t, mask = store_times(store, crop_df.index)
+    if not mask.any():
+        return
+    t0, t1 = t[mask][0], t[mask][-1] + 1
+    for var in crop_variables:
+        values = crop_df[var].values[mask]
+        if var in flag_variables:
+            values = values.astype(np.int8)
+        store['arrays'][var][i, j, t0:t1] = values
+
+
+def read_crop(store_path, var, crop_num, cell_ids=None):
+    """Read one variable of one crop for many cells
+
+    Parameters
+    ---------
+    store_path : str
+        zarr store path
+    var : str
+        variable name (see crop_variables and cell_variables)
+    crop_num : int
+        crop number, ignored for cell variables
+    cell_ids : list, optional
+        cells to read, all cells [default]
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        dates by cell id
+
+    """
+    group = zarr.open_group(store_path, mode='r')
+    attrs = dict(group.attrs)
+    cell_index = {c: i for i, c in enumerate(attrs['cell_id'])}
+    if cell_ids is None:
+        cell_ids = attrs['cell_id']
+    rows = [cell_index[c] for c in cell_ids]
+    array = zarr.open_array(store=os.path.join(store_path, var), mode='r')
+    if var in cell_variables:
+        values = array.oindex[rows, :]
+    else:
+        values = array.oindex[rows, attrs['crop'].index(int(crop_num)), :]
+    dates = pd.date_range(attrs['start_date'], periods=attrs['days'],
+                          freq='D', name='Date')
+    return pd.DataFrame(values.T, index=dates, columns=cell_ids)
@@ -20,6 +20,8 @@ import shapefile
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
                                              '../../lib')))
+import climate_archive
+import climate_cache
 import crop_et_data
 import util
 
@@ -720,6 +722,10 @@ class ETCell():
             False
 
         """
+        if getattr(data, 'climate_cache_flag', False):
+            cache_key, cached = climate_cache.read(data, self)
+            if cached:
+                return True
 
         if not self.set_refet_data(data, cells):
             return False
@@ -733,6 +739,8 @@ class ETCell():
 
         # Process climate arrays
         self.process_climate(data)
+        if getattr(data, 'climate_cache_flag', False):
+            climate_cache.write(data, self, cache_key)
         return True
 
     def set_refet_data(self, data, cells):
@@ -795,8 +803,8 @@ class ETCell():
                     field_key, field_units))
 
         # set date attributes
-        self.refet_df['doy'] = [int(ts.strftime('%j')) for ts in
-                                self.refet_df.index]
+        self.refet_df['doy'] = self.refet_df.index.dayofyear.values.astype(
+            np.int64)
         return True
 
     def SF_P_refet_data(self, data):
@@ -817,30 +825,40 @@ class ETCell():
 
         refet_path = os.path.join(data.refet['ws'], data.refet['name_format']
                                   % self.refet_id)
-        logging.debug('  {0}'.format(refet_path))
+        self.refet_df = None
+        if data.refet.get('archive_ws') is not None:
+            # Archived records are date indexed views of the archive
+            self.refet_df = climate_archive.station_df(
+                data.refet['archive_ws'], self.refet_id)
+        if self.refet_df is None:
+            logging.debug('  {0}'.format(refet_path))
 
-        # Get list of 0 based line numbers to skip
-        # Ignore header but assume header was set as a 1's based index
-        skiprows = [i for i in range(data.refet['header_lines'])
-                    if i + 1 != data.refet['names_line']]
-        try:
-            self.refet_df = pd.read_csv(
-                refet_path, engine='python',
-                header=data.refet['names_line'] - len(skiprows) - 1,
-                skiprows=skiprows, delimiter=data.refet['delimiter'])
-        except IOError:
-            logging.error(('  IOError: RefET data file could not be read ' +
-                           'and may not exist\n  {}').format(refet_path))
-            sys.exit()
-        except:
-            logging.error(('  Unknown error reading RefET data ' +
-                           'file\n {}').format(refet_path))
-            sys.exit()
+            # Get list of 0 based line numbers to skip
+            # Ignore header but assume header was set as a 1's based index
+            skiprows = [i for i in range(data.refet['header_lines'])
+                        if i + 1 != data.refet['names_line']]
+            try:
+                self.refet_df = pd.read_csv(
+                    refet_path, engine='python',
+                    header=data.refet['names_line'] - len(skiprows) - 1,
+                    skiprows=skiprows, delimiter=data.refet['delimiter'])
+            except IOError:
+                logging.error(('  IOError: RefET data file could not be ' +
+                               'read and may not exist\n  {}').format(
+                                   refet_path))
+                sys.exit()
+            except:
+                logging.error(('  Unknown error reading RefET data ' +
+                               'file\n {}').format(refet_path))
+                sys.exit()
+        archive_flag = self.refet_df.index.name == 'date'
         logging.debug('  Columns: {}'.format(', '.join(list(
             self.refet_df.columns))))
 
         # Check that fields exist in data table
         for field_key, field_name in data.refet['fields'].items():
+            if archive_flag and field_key == 'date':
+                continue
             if (field_name is not None and
                 field_name not in self.refet_df.columns):
                 logging.error(
@@ -853,12 +871,15 @@ class ETCell():
             self.refet_df = self.refet_df.rename(columns={field_name: field_key})
 
         # Convert date strings to datetimes
-        if data.refet['fields']['date'] is not None:
+        if archive_flag:
+            pass
+        elif data.refet['fields']['date'] is not None:
             self.refet_df['date'] = pd.to_datetime(self.refet_df['date'])
+            self.refet_df.set_index('date', inplace=True)
         else:
-            self.refet_df['date'] = self.refet_df[['year', 'month', 'day']]. \
-                apply(lambda s: datetime.datetime(*s), axis=1)
-        self.refet_df.set_index('date', inplace=True)
+            self.refet_df['date'] = pd.to_datetime(
+                self.refet_df[['year', 'month', 'day']])
+            self.refet_df.set_index('date', inplace=True)
 
         # truncate period
         try:
@@ -1037,8 +1058,8 @@ class ETCell():
                               format(field_key, field_units))
 
         # set date attributes
-        self.weather_df['doy'] = [int(ts.strftime('%j')) for ts in
-                                  self.weather_df.index]
+        self.weather_df['doy'] = \
+            self.weather_df.index.dayofyear.values.astype(np.int64)
 
         # Scale wind height to 2m if necessary
         if data.weather['wind_height'] != 2:
@@ -1120,32 +1141,42 @@ class ETCell():
 
         weather_path = os.path.join(data.weather['ws'],
                                     data.weather['name_format'] % self.refet_id)
-        logging.debug('  {0}'.format(weather_path))
+        self.weather_df = None
+        if data.weather.get('archive_ws') is not None:
+            # Archived records are date indexed views of the archive
+            self.weather_df = climate_archive.station_df(
+                data.weather['archive_ws'], self.refet_id)
+        if self.weather_df is None:
+            logging.debug('  {0}'.format(weather_path))
 
-        # Get list of 0 based line numbers to skip
-        # Ignore header but assume header was set as 1's based index
-        skiprows = [i for i in range(data.weather['header_lines'])
-                    if i + 1 != data.weather['names_line']]
-        try:
-            self.weather_df = pd.read_csv(weather_path, engine='python',
-                                          header=data.weather['names_line'] - len(skiprows) - 1,
-                                          skiprows=skiprows, delimiter=data.weather['delimiter'])
-        except IOError:
-            logging.error(('  IOError: Weather data file could not be read ' +
-                           'and may not exist\n  {}').format(weather_path))
-            return False
-            # sys.exit()
-        except:
-            logging.error(('  Unknown error reading Weather data ' +
-                           'file\n {}').format(weather_path))
-            return False
-            # sys.exit()
+            # Get list of 0 based line numbers to skip
+            # Ignore header but assume header was set as 1's based index
+            skiprows = [i for i in range(data.weather['header_lines'])
+                        if i + 1 != data.weather['names_line']]
+            try:
+                self.weather_df = pd.read_csv(weather_path, engine='python',
+                                              header=data.weather['names_line'] - len(skiprows) - 1,
+                                              skiprows=skiprows, delimiter=data.weather['delimiter'])
+            except IOError:
+                logging.error(('  IOError: Weather data file could not be ' +
+                               'read and may not exist\n  {}').format(
+                                   weather_path))
+                return False
+                # sys.exit()
+            except:
+                logging.error(('  Unknown error reading Weather data ' +
+                               'file\n {}').format(weather_path))
+                return False
+                # sys.exit()
+        archive_flag = self.weather_df.index.name == 'date'
         logging.debug('  Columns: {0}'.format(
             ', '.join(list(self.weather_df.columns))))
 
         # Check fields
 
         for field_key, field_name in data.weather['fields'].items():
+            if archive_flag and field_key == 'date':
+                continue
             if (field_name is not None and
                 field_name not in self.weather_df.columns):
                 if data.weather['fnspec'][field_key].lower() == 'estimated':
@@ -1161,13 +1192,15 @@ class ETCell():
             self.weather_df = self.weather_df.rename(columns={field_name: field_key})
 
         # Convert date strings to datetimes
-        if data.weather['fields']['date'] is not None:
+        if archive_flag:
+            pass
+        elif data.weather['fields']['date'] is not None:
             self.weather_df['date'] = pd.to_datetime(self.weather_df['date'])
+            self.weather_df.set_index('date', inplace=True)
         else:
-            self.weather_df['date'] = self.weather_df[['year', 'month',
-                                                       'day']].apply(
-                lambda s: datetime.datetime(*s), axis=1)
-        self.weather_df.set_index('date', inplace=True)
+            self.weather_df['date'] = pd.to_datetime(
+                self.weather_df[['year', 'month', 'day']])
+            self.weather_df.set_index('date', inplace=True)
 
         # truncate period
         try:
@@ -1230,8 +1263,8 @@ class ETCell():
 
         # set date attributes
 
-        self.hist_temps_df['doy'] = [int(ts.strftime('%j')) for ts in
-                                     self.hist_temps_df.index]
+        self.hist_temps_df['doy'] = \
+            self.hist_temps_df.index.dayofyear.values.astype(np.int64)
         return True
 
     def historical_temps(self, data):
@@ -1295,10 +1328,8 @@ class ETCell():
             self.hist_temps_df['date'] = pd.to_datetime(
                 self.hist_temps_df['date'])
         else:
-            self.hist_temps_df['date'] = self.hist_temps_df[['year',
-                                                             'month',
-                                                             'day']].apply(
-                lambda s: datetime.datetime(*s), axis=1)
+            self.hist_temps_df['date'] = pd.to_datetime(
+                self.hist_temps_df[['year', 'month', 'day']])
         self.hist_temps_df.set_index('date', inplace=True)
 
         # truncate period
@@ -1377,8 +1408,8 @@ class ETCell():
 
             aridity_adj = [0., 0., 0., 0., 1., 1.5, 2., 3.5, 4.5, 3., 0.,
                            0., 0.]
-            month = np.array([dt.month for dt in self.climate_df.index])
-            day = np.array([dt.day for dt in self.climate_df.index])
+            month = self.climate_df.index.month.values
+            day = self.climate_df.index.day.values
             moa_frac = np.clip((month + (day - 15) / 30.4), 1, 11)
             arid_adj = np.interp(moa_frac, range(len(aridity_adj)), aridity_adj)
             arid_adj *= self.aridity_rating / 100.
@@ -1390,89 +1421,90 @@ class ETCell():
 
         # T30 stuff - done after temperature adjustments
 
-        self.climate_df['tmean'] = self.climate_df[["tmax", "tmin"]].mean(
-            axis=1)
-        self.climate_df['meant'] = self.climate_df[["maxt", "mint"]].mean(
-            axis=1)
-        # self.climate_df['t30'] = pd.rolling_mean(self.climate_df['tmean'],
-        #  window = 30, min_periods = 1)
-        self.climate_df['t30'] = self.climate_df['tmean'].rolling(
-            window=30, min_periods=1).mean()
-        # self.climate_df['30t'] = pd.rolling_mean(self.climate_df['meant'],
-        #  window = 30, min_periods = 1)
-        self.climate_df['30t'] = self.climate_df['meant'].rolling(
+        self.climate_df['tmean'] = nan_mean(
+            self.climate_df['tmax'].values, self.climate_df['tmin'].values)
+        self.climate_df['meant'] = nan_mean(
+            self.climate_df['maxt'].values, self.climate_df['mint'].values)
+        # Both 30 day means in one rolling pass
+        t30_df = self.climate_df[['tmean', 'meant']].rolling(
             window=30, min_periods=1).mean()
-
-        # Accumulate T30 over period of record
-        main_t30_lt = np.array(
-            self.climate_df[['t30', 'doy']].groupby('doy').mean()['t30'])
-        hist_t30_lt = np.array(
-            self.climate_df[['30t', 'doy']].groupby('doy').mean()['30t'])
+        self.climate_df['t30'] = t30_df['tmean'].values
+        self.climate_df['30t'] = t30_df['meant'].values
 
         # Compute GDD for each day
-        # self.climate_df['main_cgdd'] = self.climate_df['tmean']
-        # self.climate_df.ix[self.climate_df['tmean'] <= 0, 'main_cgdd'] = 0
-        # self.climate_df['hist_cgdd'] = self.climate_df['meant']
-        # self.climate_df.ix[self.climate_df['tmean'] <= 0, 'hist_cgdd'] = 0
-
-        # Replacement for .ix deprecation above 4/22/2020
-        self.climate_df['main_cgdd'] = self.climate_df['tmean']
-        self.climate_df.loc[self.climate_df['tmean'] <= 0, 'main_cgdd'] = 0
-        self.climate_df['hist_cgdd'] = self.climate_df['meant']
-        self.climate_df.loc[self.climate_df['tmean'] <= 0, 'hist_cgdd'] = 0
+        # Historic GDD is also zeroed on days with main tmean <= 0
+        tmean = self.climate_df['tmean'].values
+        self.climate_df['main_cgdd'] = np.where(tmean <= 0, 0., tmean)
+        self.climate_df['hist_cgdd'] = np.where(
+            tmean <= 0, 0., self.climate_df['meant'].values)
 
         # Compute cumulative GDD for each year
-        self.climate_df['main_cgdd'] = self.climate_df[['doy',
-                                                        'main_cgdd']].groupby(
-            self.climate_df.index.map(lambda x: x.year)).main_cgdd.cumsum()
-        self.climate_df['hist_cgdd'] = self.climate_df[['doy',
-                                                        'hist_cgdd']].groupby(
-            self.climate_df.index.map(lambda x: x.year)).hist_cgdd.cumsum()
-
-        # Compute mean cumulative GDD for each DOY
-        main_cgdd_0_lt = np.array(
-            self.climate_df[['main_cgdd', 'doy']].groupby('doy').mean()[
-                'main_cgdd'])
-        hist_cgdd_0_lt = np.array(
-            self.climate_df[['hist_cgdd', 'doy']].groupby('doy').mean()[
-                'hist_cgdd'])
+        year = self.climate_df.index.year.values
+        cgdd_df = self.climate_df[['main_cgdd', 'hist_cgdd']].groupby(
+            year).cumsum()
+        self.climate_df['main_cgdd'] = cgdd_df['main_cgdd'].values
+        self.climate_df['hist_cgdd'] = cgdd_df['hist_cgdd'].values
+
+        # Long term mean T30 and cumulative GDD for each DOY in one pass
+        doy_lt_df = self.climate_df[
+            ['t30', '30t', 'main_cgdd', 'hist_cgdd']].groupby(
+            self.climate_df['doy'].values).mean()
 
         # Revert from indexing by I to indexing by DOY (for now)
         # Copy DOY 1 value into DOY 0
-
-        main_t30_lt = np.insert(main_t30_lt, 0, main_t30_lt[0])
-        main_cgdd_0_lt = np.insert(main_cgdd_0_lt, 0, main_cgdd_0_lt[0])
-        hist_t30_lt = np.insert(hist_t30_lt, 0, hist_t30_lt[0])
-        hist_cgdd_0_lt = np.insert(hist_cgdd_0_lt, 0, hist_cgdd_0_lt[0])
-
         self.climate = {}
-        self.climate['main_t30_lt'] = main_t30_lt
-        self.climate['main_cgdd_0_lt'] = main_cgdd_0_lt
-        self.climate['hist_t30_lt'] = hist_t30_lt
-        self.climate['hist_cgdd_0_lt'] = hist_cgdd_0_lt
+        for key, field in [('main_t30_lt', 't30'), ('hist_t30_lt', '30t'),
+                           ('main_cgdd_0_lt', 'main_cgdd'),
+                           ('hist_cgdd_0_lt', 'hist_cgdd')]:
+            values = doy_lt_df[field].values
+            self.climate[key] = np.insert(values, 0, values[0])
 
         # Calculate an estimated depth of snow on ground using simple
-        # melt rate function))
+        # melt rate function
         if np.any(self.climate_df['snow']):
-            for i, doy in self.climate_df['doy'].iteritems():
-                # Calculate an estimated depth of snow on ground using simple
-                # melt rate function
+            self.climate_df['snow_depth'] = snow_depth_from_snow(
+                self.climate_df['snow'].values,
+                self.climate_df['snow_depth'].values,
+                self.climate_df['tmax'].values)
+        return True
 
-                snow = self.climate_df['snow'][i]
-                snow_depth = self.climate_df['snow_depth'][i]
 
-                # Assume settle rate of 2 to 1
+def nan_mean(a, b):
+    """Mean of two arrays, skipping NaN like DataFrame.mean(axis=1)"""
+    return np.where(np.isnan(a), b, np.where(np.isnan(b), a, (a + b) / 2))
 
-                snow_accum += snow * 0.5  # assume a settle rate of 2 to 1
 
-                # 4 mm/day melt per degree C
+def snow_depth_from_snow(snow, snow_depth, tmax):
+    """Limit snow depth by accumulated snow using simple melt rate function
 
-                snow_melt = max(4 * self.climate_df['tmax'][i], 0.0)
-                snow_accum = max(snow_accum - snow_melt, 0.0)
-                snow_depth = min(snow_depth, snow_accum)
-                self.climate_df['snow_depth'][i] = snow_depth
-        return True
+    Parameters
+    ---------
+    snow : ndarray
+        daily snow water equivalent
+    snow_depth : ndarray
+        daily snow depth
+    tmax : ndarray
+        daily maximum temperature [C]
+
+    Returns
+    -------
+    ndarray
 
+    Notes
+    -----
+    Accumulation is clipped at zero each day, so the recursion is
+    evaluated in order over plain lists
+
+    """
+    snow_depth = np.array(snow_depth, dtype=np.float64)
+    snow_accum = 0.
+    for i, (s, t) in enumerate(zip(snow.tolist(), tmax.tolist())):
+        # Assume settle rate of 2 to 1
+        snow_accum += s * 0.5
+        # 4 mm/day melt per degree C
+        snow_accum = max(snow_accum - max(4 * t, 0.0), 0.0)
+        snow_depth[i] = min(snow_depth[i], snow_accum)
+    return snow_depth
 
 if __name__ == '__main__':
     pass
@@ -15,6 +15,9 @@ import pandas as pd
 
 import crop_et_data
 import crop_cycle
+import crop_pool
+import crop_scheduler
+import crop_store
 import et_cell
 import util
 
@@ -84,71 +87,44 @@ def main(ini_path, log_level=logging.WARNING,
         logging.warning('  Setting growing_season_stats_flag = True')
         data.gs_output_flag = True
 
-    # Read crop type (aka class) specific parameters and coefficients
-    # Crop coefficients are constant for all cells
-    # Crop params can vary if CDL data are used but have base parameters
-    # File paths are read from INI
-    data.set_crop_params()
-    data.set_crop_coeffs()
-    if data.co2_flag:
-        data.set_crop_co2()
+    cells = set_cells(data)
 
-    # Read cell properties, crop flags and cuttings
-    cells = et_cell.ETCellData()
-    cells.set_cell_properties(data)
-    cells.set_cell_crops(data)
-    cells.set_cell_cuttings(data)
-    cells.filter_crops(data)
-    cells.filter_cells(data)
-
-    # First apply static crop parameters to all cells
-    # Could "cell" just inherit "data" values instead ????
-    cells.set_static_crop_params(data.crop_params)
-    cells.set_static_crop_coeffs(data.crop_coeffs)
-
-    # Read spatially varying crop parameters
-    if data.spatial_cal_flag:
-        cells.set_spatial_crop_params(data.spatial_cal_ws)
+    # Store is created once, workers then write their own chunks
+    if data.cet_out['file_type'] == 'zarr':
+        crop_store.create_store(data, cells, etcid_to_run)
 
     # print(cells.et_cells_dict['1067'])
     # print(cells.et_cells_dict['1067'].crop_params)
     # print(cells.et_cells_dict['1067'].crop_params[40])
     # sys.exit()
     # Multiprocessing logic
-    # If cell count is low, process crops in parallel
-    # If cell count is high, process cells in parallel (crops in serial)
-
-    cell_mp_list, cell_mp_flag, crop_mp_flag = [], False, False
-    if mp_procs > 1:
+    # All cells: (cell, crop) tasks are scheduled dynamically across workers
+    # Single cell: crops of the cell are processed in parallel
+
+    sched_cells, sched_flag, crop_mp_flag = [], False, False
+    batch_flag = data.batch_cells_flag and not debug_flag
+    batch_cells = []
+    if batch_flag:
+        logging.warning('  Batch mode, up to {} cells per batch'.format(
+            data.batch_cells_size))
+    elif mp_procs > 1:
         logging.warning("\nSetting multiprocessing logic")
-        # if data.cet_out['data_structure_type'].upper() == 'RDB':
-        #     logging.warning("  Multiprocessing is not available for RDB output")
-        #     mp_procs = 1
-        # else:
         if etcid_to_run == 'ALL':
-            cells_count = len(cells.et_cells_dict.keys())
-            crops_count = len(cells.crop_num_list)
-            logging.warning('  Cell count: {}'.format(cells_count))
-            logging.warning('  Crop count: {}'.format(crops_count))
-
-            # 0.5 multiplier is to prefer multiprocessing by cell
-            # because of 1 CPU time spent loading/processing weather data
-            # when multiprocessing by crop
-
-            # # Force cell_mp__flag to True for testing
-            # logging.warning("  Multiprocessing by cell")
-            # cell_mp_flag = True
-
-            if (0.5 * cells_count) > crops_count:
-                logging.warning("  Multiprocessing by cell")
-                cell_mp_flag = True
-            else:
-                logging.warning("  Multiprocessing by crop")
-                crop_mp_flag = True
+            logging.warning('  Cell count: {}'.format(
+                len(cells.et_cells_dict.keys())))
+            logging.warning('  Crop count: {}'.format(
+                len(cells.crop_num_list)))
+            logging.warning("  Multiprocessing by (cell, crop) task")
+            sched_flag = True
         else:
             logging.warning("  Multiprocessing by crop")
             crop_mp_flag = True
 
+    # One persistent pool is shared by all cells when multiprocessing by crop
+    pool = None
+    if crop_mp_flag and not data.vectorize_flag:
+        pool = crop_pool.crop_pool(data, mp_procs)
+
     """
     Loop through et cells
 
@@ -160,29 +136,48 @@ def main(ini_path, log_level=logging.WARNING,
             logging.info('\nProcessing node id' + cell_id + ' with name ' +
                          cell.cell_name)
             cell_count += 1
-            if cell_mp_flag:
-                # Multiprocessing by cell
-                cell_mp_list.append([cell_count, data, cell, mp_procs])
+            if batch_flag:
+                # Cells are run together after the loop
+                batch_cells.append(cell)
+            elif sched_flag:
+                # Cells are loaded and run by the scheduler after the loop
+                sched_cells.append((cell_count, cell_id))
             elif crop_mp_flag:
                 # Multiprocessing by crop
                 logging.warning('CellID: {}'.format(cell_id))
                 if not cell.set_input_timeseries(cell_count, data, cells):
                     sys.exit()
-                crop_cycle.crop_cycle_mp(data, cell, mp_procs=mp_procs)
+                crop_cycle.crop_cycle_mp(data, cell, mp_procs=mp_procs,
+                                         pool=pool)
             else:
                 logging.warning('CellID: {}'.format(cell_id))
                 if not cell.set_input_timeseries(cell_count, data, cells):
                     sys.exit()
                 crop_cycle.crop_cycle(data, cell, debug_flag=debug_flag)
 
-    # Multiprocess all cells
-    results = []
-    if cell_mp_list:
+    if pool is not None:
+        pool.close()
+        pool.join()
+        del pool
+
+    # Batches of cells, optionally one batch per process
+    batch_size = max(data.batch_cells_size, 1)
+    batch_list = [
+        [i, data, batch_cells[i:i + batch_size], cells]
+        for i in range(0, len(batch_cells), batch_size)]
+    if batch_list and mp_procs > 1:
         pool = mp.Pool(mp_procs)
-        results = pool.imap(cell_mp, cell_mp_list, chunksize=1)
+        results = pool.imap(batch_mp, batch_list, chunksize=1)
         pool.close()
         pool.join()
         del pool, results
+    elif batch_list:
+        for batch in batch_list:
+            batch_sp(*batch)
+
+    # Schedule (cell, crop) tasks of all cells
+    if sched_cells:
+        crop_scheduler.run(data, cells, sched_cells, mp_procs)
 
     logging.warning('\nCROPET Run Completed')
     logging.info('\n{} seconds'.format(time.perf_counter() - clock_start))
@@ -218,7 +213,53 @@ def main(ini_path, log_level=logging.WARNING,
                         crop=crop_num, start_dt=gs_start_dt, end_dt=gs_end_dt))
 
 
-def cell_mp(tup):
+def set_cells(data):
+    """Read crop parameters and coefficients and cell properties
+
+    Parameters
+    ---------
+    data : dict
+        configuration data
+
+    Returns
+    -------
+    cells : ETCellData
+        cells with crop flags, cuttings and crop parameters set
+
+    Notes
+    -----
+    Also used by AreaET to compute crop ET of cells in process
+
+    """
+    # Read crop type (aka class) specific parameters and coefficients
+    # Crop coefficients are constant for all cells
+    # Crop params can vary if CDL data are used but have base parameters
+    # File paths are read from INI
+    data.set_crop_params()
+    data.set_crop_coeffs()
+    if data.co2_flag:
+        data.set_crop_co2()
+
+    # Read cell properties, crop flags and cuttings
+    cells = et_cell.ETCellData()
+    cells.set_cell_properties(data)
+    cells.set_cell_crops(data)
+    cells.set_cell_cuttings(data)
+    cells.filter_crops(data)
+    cells.filter_cells(data)
+
+    # First apply static crop parameters to all cells
+    # Could "cell" just inherit "data" values instead ????
+    cells.set_static_crop_params(data.crop_params)
+    cells.set_static_crop_coeffs(data.crop_coeffs)
+
+    # Read spatially varying crop parameters
+    if data.spatial_cal_flag:
+        cells.set_spatial_crop_params(data.spatial_cal_ws)
+    return cells
+
+
+def batch_mp(tup):
     """Pool multiprocessing friendly function
 
     Parameters
@@ -236,34 +277,39 @@ def cell_mp(tup):
 
     """
 
-    return cell_sp(*tup)
+    return batch_sp(*tup)
 
 
-def cell_sp(cell_count, data, cell, mp_procs=1):
-    """Compute crop cycle for each cell
+def batch_sp(cell_count, data, batch_cells, cells):
+    """Compute crop cycle for a batch of cells together
 
     Parameters
     ---------
     cell_count : int
-        count of cell being processed
+        count of cells processed before this batch
     data : dict
         configuration data
-    cell : dict
-        ETCell instance
-    mp_procs : int
-        number of processors
-        1 [default]
+    batch_cells : list
+        ETCell instances of batch
+    cells : dict
+        ETCellData instance
 
     Returns
     -------
     None
 
     """
-    if not cell.set_input_timeseries(cell_count, data, cell):
-        sys.exit()
-
-    print('CellID: {}'.format(cell.cell_id))
-    crop_cycle.crop_cycle(data, cell, debug_flag=False, mp_procs=mp_procs)
+    for i, cell in enumerate(batch_cells):
+        if not cell.set_input_timeseries(cell_count + i + 1, data, cells):
+            sys.exit()
+    logging.warning('CellIDs: {} - {}'.format(
+        batch_cells[0].cell_id, batch_cells[-1].cell_id))
+    crop_cycle.crop_cycle_batch(data, batch_cells)
+
+    # Release climate of batch before next one is read
+    for cell in batch_cells:
+        cell.climate_df = None
+        cell.refet_df = None
 
 
 def is_valid_file(parser, arg):
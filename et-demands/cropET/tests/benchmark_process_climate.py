@@ -0,0 +1,40 @@
+"""benchmark_process_climate.py
+Microbenchmark of ETCell climate preprocessing on a synthetic station
+Run from cropET/tests: python benchmark_process_climate.py [years]
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'bin')))
+
+from test_et_cell import make_station
+
+
+def main(years=40, repeat=5):
+    with tempfile.TemporaryDirectory() as temp_ws:
+        data, cell = make_station(temp_ws, end_year=2000 + years)
+        clock = time.perf_counter()
+        cell.set_refet_data(data, None)
+        cell.set_weather_data(1, data, None)
+        read_time = time.perf_counter() - clock
+        weather_df, refet_df = cell.weather_df, cell.refet_df
+
+        times = []
+        for i in range(repeat):
+            cell.weather_df, cell.refet_df = weather_df.copy(), refet_df.copy()
+            clock = time.perf_counter()
+            cell.process_climate(data)
+            times.append(time.perf_counter() - clock)
+    print('{} years, {} days'.format(years, len(refet_df)))
+    print('  read RefET and weather: {:8.4f} s'.format(read_time))
+    print('  process_climate (best of {}): {:8.4f} s'.format(
+        repeat, min(times)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
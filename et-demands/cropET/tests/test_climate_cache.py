@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+import et_cell
+from test_et_cell import make_station
+
+
+def test_climate_cache(tmp_path, monkeypatch):
+    data, cell = make_station(tmp_path)
+    assert cell.set_input_timeseries(1, data, None)
+    expected = cell.climate_df
+
+    data.climate_cache_flag = True
+    cell.set_input_timeseries(1, data, None)
+    assert len(os.listdir(data.climate_cache_ws)) == 1
+
+    # Second run is read from cache without processing climate
+    def fail(*args):
+        raise AssertionError('climate was not read from cache')
+
+    monkeypatch.setattr(et_cell.ETCell, 'process_climate', fail)
+    cell = et_cell.ETCell()
+    cell.cell_id, cell.refet_id = '1', 'STN1'
+    cell.aridity_rating, cell.air_pressure = 50., 90.
+    assert cell.set_input_timeseries(1, data, None)
+    pd.testing.assert_frame_equal(cell.climate_df, expected)
+    assert set(cell.climate) == {'main_t30_lt', 'main_cgdd_0_lt',
+                                 'hist_t30_lt', 'hist_cgdd_0_lt'}
+
+    # Changed options invalidate the entry
+    cell.aridity_rating = 0.
+    with pytest.raises(AssertionError):
+        cell.set_input_timeseries(1, data, None)
+
+
+def test_climate_cache_ratio_options(tmp_path):
+    import climate_cache
+
+    data, cell = make_station(tmp_path)
+    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
+              'Oct', 'Nov', 'Dec']
+    ratios_df = pd.DataFrame([['STN1', 'Station 1'] + [0.9] * 12],
+                             columns=['Met Node ID', 'Met Node Name'] + months)
+    data.refet_ratios_path = os.path.join(str(tmp_path), 'ETr_Ratios.csv')
+    ratios_df.to_csv(data.refet_ratios_path, index=False)
+    data.et_ratios_header_lines = 1
+    data.et_ratios_id_field = 'Met Node ID'
+    data.et_ratios_name_field = 'Met Node Name'
+    data.et_ratios_month_field = 'month'
+    data.et_ratios_ratio_field = 'ratio'
+    data.climate_cache_flag = True
+    assert cell.set_input_timeseries(1, data, None)
+    assert climate_cache.read(data, cell)[1]
+
+    # Ratio file options are part of the key
+    data.et_ratios_ratio_field = 'et_ratio'
+    assert not climate_cache.read(data, cell)[1]
@@ -0,0 +1,132 @@
+import os
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import crop_coefficients
+import crop_cycle
+import crop_parameters
+
+static_ws = os.path.join(os.path.dirname(__file__), '..', '..', 'static')
+test_crops = [1, 2, 3, 4, 7, 13, 15, 17, 26, 33, 44, 45, 46, 47, 55, 56, 61, 87]
+
+
+def read_crop_coeffs(path):
+    a = np.loadtxt(path, delimiter='\t', dtype='str', encoding='latin-1')
+    coeffs = {}
+    for i, num in enumerate(a[3, 2:]):
+        coeff = crop_coefficients.CropCoeff()
+        coeff.init_from_column(a[2, 2 + i], a[3, 2 + i], a[4, 2 + i],
+                               a[6:, 2 + i])
+        coeffs[int(coeff.curve_no)] = coeff
+    return coeffs
+
+
+def make_cell(refet_type, cell_id='1', latitude=45.):
+    rng = np.random.default_rng(int(cell_id))
+    dates = pd.date_range('2001-01-01', '2003-12-31', freq='D')
+    doy = dates.dayofyear.values
+    season = np.sin(2 * np.pi * (doy - 110) / 365.)
+    tmax = 14 + 16 * season + rng.normal(0, 3, len(dates))
+    tmin = tmax - 12 - rng.uniform(0, 4, len(dates))
+    ppt = np.where(rng.uniform(size=len(dates)) < 0.2,
+                   rng.gamma(1.5, 4, len(dates)), 0.)
+    climate_df = pd.DataFrame({
+        'doy': doy, 'ppt': ppt, 'tmax': tmax, 'tmin': tmin,
+        'tdew': tmin - 2, 'wind': rng.uniform(1, 5, len(dates)),
+        'rh_min': rng.uniform(15, 60, len(dates)), 'snow': 0.,
+        'snow_depth': np.where(season < -0.6, 20., 0.)}, index=dates)
+    climate_df['maxt'] = climate_df['tmax']
+    climate_df['mint'] = climate_df['tmin']
+    climate_df['etref'] = np.clip(4 + 3.5 * season, 0.2, None)
+    climate_df['tmean'] = 0.5 * (climate_df['tmax'] + climate_df['tmin'])
+    climate_df['meant'] = climate_df['tmean']
+    climate_df['t30'] = climate_df['tmean'].rolling(30, min_periods=1).mean()
+    climate_df['30t'] = climate_df['t30']
+    cgdd = climate_df['tmean'].clip(lower=0).groupby(dates.year).cumsum()
+    t30_lt = climate_df['t30'].groupby(doy).mean().values
+    cgdd_lt = cgdd.groupby(doy).mean().values
+    climate = {'main_t30_lt': np.insert(t30_lt, 0, t30_lt[0]),
+               'main_cgdd_0_lt': np.insert(cgdd_lt, 0, cgdd_lt[0])}
+
+    crop_params = crop_parameters.read_crop_parameters(
+        os.path.join(static_ws, 'CropParams.txt'))
+    if refet_type == 'eto':
+        coeffs_name = 'CropCoefs_eto.txt'
+    else:
+        coeffs_name = 'CropCoefs.txt'
+    return types.SimpleNamespace(
+        cell_id=cell_id, latitude=latitude, stn_whc=2.0, stn_hydrogroup=2,
+        dairy_cuttings=5, beef_cuttings=3, air_pressure=90.,
+        crop_params=crop_params,
+        crop_flags={k: k in test_crops for k in crop_params},
+        crop_coeffs=read_crop_coeffs(os.path.join(static_ws, coeffs_name)),
+        climate=climate, climate_df=climate_df,
+        refet_df=climate_df[['doy', 'etref']].copy())
+
+
+def make_data(refet_type, vectorize_flag, numba_flag=False):
+    return types.SimpleNamespace(
+        phenology_option=0, co2_flag=False, gs_limit_flag=True,
+        crop_one_flag=True, crop_one_reducer=0.9,
+        refet={'type': refet_type}, gs_output_flag=False,
+        vectorize_flag=vectorize_flag, numba_flag=numba_flag,
+        cet_out={'daily_output_flag': True, 'monthly_output_flag': False,
+                 'annual_output_flag': False})
+
+
+def capture_output(monkeypatch):
+    results = {}
+
+    def capture(crop_count, data, et_cell, crop, foo):
+        results[(et_cell.cell_id, crop.class_number)] = foo.crop_df
+
+    monkeypatch.setattr(crop_cycle, 'write_crop_output', capture)
+    return results
+
+
+def run(monkeypatch, refet_type, vectorize_flag, numba_flag=False):
+    results = capture_output(monkeypatch)
+    crop_cycle.crop_cycle(make_data(refet_type, vectorize_flag, numba_flag),
+                          make_cell(refet_type))
+    return {key[1]: df for key, df in results.items()}
+
+
+def assert_results_equal(actual, expected):
+    assert expected
+    assert sorted(actual) == sorted(expected)
+    for key in expected:
+        pd.testing.assert_frame_equal(
+            actual[key], expected[key], check_exact=True,
+            check_dtype=False, obj='{}'.format(key))
+
+
+@pytest.mark.parametrize('refet_type', ['eto', 'etr'])
+def test_vectorized_matches_crop_day_loop(monkeypatch, refet_type):
+    expected = run(monkeypatch, refet_type, False)
+    actual = run(monkeypatch, refet_type, True)
+    assert_results_equal(actual, expected)
+
+
+def test_kernels_match_crop_day_loop(monkeypatch):
+    # Runs compiled when numba is installed, as plain Python otherwise
+    expected = run(monkeypatch, 'eto', False)
+    actual = run(monkeypatch, 'eto', True, numba_flag=True)
+    assert_results_equal(actual, expected)
+
+
+def test_batch_matches_crop_day_loop(monkeypatch):
+    cells = [make_cell('eto', str(i), latitude) for i, latitude in
+             enumerate([38., 42.5, 47.], 1)]
+    for cell in cells:
+        cell.crop_flags = {k: k in [1, 7, 13, 44, 56]
+                           for k in cell.crop_flags}
+    cells[1].crop_flags[13] = False
+    expected = capture_output(monkeypatch)
+    for cell in cells:
+        crop_cycle.crop_cycle(make_data('eto', False), cell)
+    actual = capture_output(monkeypatch)
+    crop_cycle.crop_cycle_batch(make_data('eto', False), cells)
+    assert_results_equal(actual, expected)
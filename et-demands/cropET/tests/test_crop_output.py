@@ -0,0 +1,127 @@
+import os
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import crop_cycle
+from test_crop_day_vec import make_cell, make_data
+
+pytest.importorskip('pyarrow')
+
+
+def output_data(tmp_path, file_type, partition_flag=False):
+    data = make_data('eto', False)
+    data.refet['fields'] = {'etref': 'ETo'}
+    data.kc_flag, data.niwr_flag, data.cutting_flag = True, True, True
+    data.cet_out.update({
+        'monthly_output_flag': True, 'annual_output_flag': True,
+        'file_type': file_type, 'compression': None,
+        'partition_flag': partition_flag,
+        'name_format': '%s_crop_%c.' + file_type})
+    for step, date_format in [('daily', '%Y-%m-%d'), ('monthly', '%Y-%m'),
+                              ('annual', '%Y')]:
+        data.cet_out[step + '_output_ws'] = str(tmp_path / file_type / step)
+        data.cet_out[step + '_date_format'] = date_format
+        data.cet_out[step + '_float_format'] = None
+        os.makedirs(data.cet_out[step + '_output_ws'], exist_ok=True)
+    return data
+
+
+def run_crop(data):
+    cell = make_cell('eto')
+    cell.crop_flags = {k: k == 3 for k in cell.crop_flags}
+    crop_cycle.crop_cycle(data, cell)
+
+
+def test_parquet_matches_csv(tmp_path):
+    csv_data = output_data(tmp_path, 'csv')
+    run_crop(csv_data)
+    parquet_data = output_data(tmp_path, 'parquet')
+    run_crop(parquet_data)
+    for step in ['daily', 'monthly', 'annual']:
+        csv_df = pd.read_csv(
+            os.path.join(csv_data.cet_out[step + '_output_ws'],
+                         '1_crop_03.csv'), comment='#')
+        parquet_df = pd.read_parquet(os.path.join(
+            parquet_data.cet_out[step + '_output_ws'], '1_crop_03.parquet'))
+        assert list(parquet_df.columns) == list(csv_df.columns)
+        for col in csv_df.columns:
+            if col == 'Date':
+                continue
+            np.testing.assert_allclose(
+                parquet_df[col].values.astype(float),
+                csv_df[col].values.astype(float), rtol=1e-12)
+
+
+def test_partitioned_layout(tmp_path):
+    import pyarrow.parquet as pq
+
+    data = output_data(tmp_path, 'parquet', partition_flag=True)
+    run_crop(data)
+    part_path = os.path.join(data.cet_out['daily_output_ws'], 'cell_id=1',
+                             'crop=03', 'part.parquet')
+    # One row group per year
+    assert pq.ParquetFile(part_path).metadata.num_row_groups == 3
+    # Monthly and annual tables are a single row group
+    for step in ['monthly', 'annual']:
+        assert pq.ParquetFile(os.path.join(
+            data.cet_out[step + '_output_ws'], 'cell_id=1', 'crop=03',
+            'part.parquet')).metadata.num_row_groups == 1
+    df = pd.read_parquet(data.cet_out['daily_output_ws'],
+                         columns=['Year', 'ETact', 'crop'],
+                         filters=[('Year', '=', 2002)])
+    assert len(df) == 365
+    assert set(df['crop'].astype(int)) == {3}
+
+
+def test_cet_sink(tmp_path):
+    csv_data = output_data(tmp_path, 'csv')
+    run_crop(csv_data)
+    sink_data = output_data(tmp_path, 'sink')
+    frames = {}
+    sink_data.cet_sink = lambda et_cell, crop, daily_df: frames.update(
+        {int(crop.class_number): daily_df})
+    run_crop(sink_data)
+    for step in ['daily', 'monthly', 'annual']:
+        assert not os.listdir(sink_data.cet_out[step + '_output_ws'])
+    csv_df = pd.read_csv(
+        os.path.join(csv_data.cet_out['daily_output_ws'], '1_crop_03.csv'),
+        comment='#', index_col='Date', parse_dates=True)
+    assert list(frames) == [3]
+    for col in ['ETact', 'ETpot', 'PPT', 'NIWR', 'Irrigation', 'Season']:
+        np.testing.assert_allclose(
+            frames[3][col].values.astype(float),
+            csv_df[col].values.astype(float), rtol=1e-12, atol=1e-6)
+    np.testing.assert_array_equal(frames[3].index, csv_df.index)
+
+
+def test_growing_season_without_season_year(tmp_path):
+    data = output_data(tmp_path, 'csv')
+    data.cet_out.update({'daily_output_flag': False,
+                         'monthly_output_flag': False,
+                         'annual_output_flag': False})
+    data.gs_output_flag, data.gs_name_format = True, None
+    data.gs_output_ws = str(tmp_path)
+    cell = make_cell('eto')
+    crop = cell.crop_params[3]
+    crop_df = cell.refet_df.copy()
+    for var in ['et_act', 'et_pot', 'et_bas', 'kc_act', 'kc_bas',
+                'irrigation', 'runoff', 'dperc', 'niwr', 'p_rz', 'p_eft']:
+        crop_df[var] = 0.
+    # Season in 2001, none in 2002, through year end in 2003
+    year = crop_df.index.year
+    doy = crop_df.index.dayofyear
+    crop_df['season'] = (((year == 2001) & (doy > 100) & (doy <= 200)) |
+                         ((year == 2003) & (doy > 250))).astype(int)
+    crop_df['cutting'] = 0
+    crop_cycle.write_crop_output(1, data, cell, crop,
+                                 types.SimpleNamespace(crop_df=crop_df))
+
+    gs_df = pd.read_csv(str(tmp_path / '1_gs_crop_03.csv'), comment='#')
+    assert list(gs_df['Year']) == [2001, 2002, 2003]
+    np.testing.assert_array_equal(gs_df['Start_DOY'], [101, np.nan, 251])
+    np.testing.assert_array_equal(gs_df['End_DOY'], [201, np.nan, 365])
+    np.testing.assert_array_equal(gs_df['GS_Length'], [100, np.nan, 115])
+    assert gs_df['Start_Date'].isna().tolist() == [False, True, False]
@@ -0,0 +1,50 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import crop_cycle
+import crop_pool
+from test_crop_day_vec import capture_output, make_cell, make_data
+
+
+def test_shared_frame_round_trip():
+    df = pd.DataFrame(
+        {'doy': np.arange(1, 11), 'etref': np.linspace(0, 1, 10),
+         'flag': np.arange(10) > 4},
+        index=pd.date_range('2001-01-01', periods=10, freq='D'))
+    frame = crop_pool.SharedFrame(df)
+    worker_frame = pickle.loads(pickle.dumps(frame))
+    try:
+        attached = worker_frame.attach()
+        pd.testing.assert_frame_equal(attached, df)
+        assert not attached['etref'].values.flags.writeable
+        del attached
+    finally:
+        worker_frame.close()
+        frame.unlink()
+
+
+def test_pool_matches_crop_day_loop(monkeypatch, tmp_path):
+    cell = make_cell('eto')
+    cell.crop_flags = {k: k in [1, 7, 44] for k in cell.crop_flags}
+    data = make_data('eto', False)
+    expected = capture_output(monkeypatch)
+    crop_cycle.crop_cycle(data, cell)
+
+    # Workers write their output where the test can read it
+    def write_pickle(crop_count, data, et_cell, crop, foo):
+        foo.crop_df.to_pickle(
+            tmp_path / '{}_{}.pkl'.format(et_cell.cell_id, crop.class_number))
+
+    monkeypatch.setattr(crop_cycle, 'write_crop_output', write_pickle)
+    pool = crop_pool.crop_pool(data, 2)
+    try:
+        crop_cycle.crop_cycle_mp(data, cell, mp_procs=2, pool=pool)
+    finally:
+        pool.close()
+        pool.join()
+    for (cell_id, crop_num), df in expected.items():
+        pd.testing.assert_frame_equal(
+            pd.read_pickle(tmp_path / '{}_{}.pkl'.format(cell_id, crop_num)),
+            df, check_exact=True)
@@ -0,0 +1,64 @@
+import types
+
+import pandas as pd
+
+import crop_cycle
+import crop_scheduler
+from test_crop_day_vec import capture_output, make_cell, make_data
+
+
+class Cell(types.SimpleNamespace):
+    # Synthetic climate is already set
+    def set_input_timeseries(self, cell_count, data, cells):
+        return True
+
+
+def make_cells(crop_lists):
+    et_cells_dict = {}
+    for i, crop_list in enumerate(crop_lists, 1):
+        cell = make_cell('eto', str(i))
+        cell.crop_flags = {k: k in crop_list for k in cell.crop_flags}
+        et_cells_dict[cell.cell_id] = Cell(**vars(cell))
+    return types.SimpleNamespace(et_cells_dict=et_cells_dict)
+
+
+def test_cell_tasks_largest_first():
+    cells = make_cells([[1], [1, 7, 44], [], [7, 44]])
+    data = make_data('eto', False)
+    data.start_dt = pd.Timestamp('2001-01-01')
+    data.end_dt = pd.Timestamp('2003-12-31')
+    scheduler = crop_scheduler.Scheduler(data, cells, 2)
+    tasks = scheduler.cell_tasks([(i, str(i)) for i in range(1, 5)])
+    assert [cell_id for cost, cell_count, cell_id in tasks] == ['2', '4', '1']
+
+    # Longer record outweighs one more crop, unloaded cells use run period
+    cells.et_cells_dict['2'].climate_df = cells.et_cells_dict[
+        '2'].climate_df.iloc[:365]
+    cells.et_cells_dict['4'].climate_df = None
+    tasks = scheduler.cell_tasks([(i, str(i)) for i in range(1, 5)])
+    assert [cell_id for cost, cell_count, cell_id in tasks] == ['4', '2', '1']
+    assert tasks[0][0] == 2 * (data.end_dt - data.start_dt).days / 365.25
+
+
+def test_scheduler_matches_crop_day_loop(monkeypatch, tmp_path):
+    cells = make_cells([[1, 7], [44], [7, 13, 56]])
+    data = make_data('eto', False)
+    data.start_dt, data.end_dt = None, None
+    expected = capture_output(monkeypatch)
+    for cell in cells.et_cells_dict.values():
+        crop_cycle.crop_cycle(data, cell)
+
+    # Workers write their output where the test can read it
+    def write_pickle(crop_count, data, et_cell, crop, foo):
+        foo.crop_df.to_pickle(
+            tmp_path / '{}_{}.pkl'.format(et_cell.cell_id, crop.class_number))
+
+    monkeypatch.setattr(crop_cycle, 'write_crop_output', write_pickle)
+    stats = crop_scheduler.run(
+        data, cells, [(i, str(i)) for i in range(1, 4)], 2)
+    # 3 cell loads and 6 crops
+    assert sum(tasks for tasks, busy in stats.values()) == 9
+    for (cell_id, crop_num), df in expected.items():
+        pd.testing.assert_frame_equal(
+            pd.read_pickle(tmp_path / '{}_{}.pkl'.format(cell_id, crop_num)),
+            df, check_exact=True)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import crop_cycle
+import crop_scheduler
+import crop_store
+from test_crop_day_vec import capture_output, make_data
+from test_crop_scheduler import make_cells
+
+pytest.importorskip('zarr')
+
+
+def test_store_matches_crop_df(monkeypatch, tmp_path):
+    cells = make_cells([[3, 7], [7, 44]])
+    cells.crop_num_list = [3, 7, 44]
+    data = make_data('eto', False)
+    data.refet['fields'] = {'etref': 'ETo'}
+    data.start_dt = pd.Timestamp('2001-01-01')
+    data.end_dt = pd.Timestamp('2003-12-31')
+    expected = capture_output(monkeypatch)
+    for cell in cells.et_cells_dict.values():
+        crop_cycle.crop_cycle(data, cell)
+
+    # Workers write their own (cell, crop) chunks of the store
+    monkeypatch.undo()
+    data.cet_out.update({
+        'file_type': 'zarr', 'store_path': str(tmp_path / 'crop_et.zarr')})
+    crop_store.create_store(data, cells)
+    crop_scheduler.run(data, cells, [(1, '1'), (2, '2')], 2)
+
+    for (cell_id, crop_num), crop_df in expected.items():
+        for var in ['et_act', 'niwr', 'season']:
+            df = crop_store.read_crop(data.cet_out['store_path'], var,
+                                      crop_num, [cell_id])
+            np.testing.assert_array_equal(
+                df[cell_id].values, crop_df[var].values.astype(float))
+    etref = crop_store.read_crop(data.cet_out['store_path'], 'etref', None)
+    ppt = crop_store.read_crop(data.cet_out['store_path'], 'ppt', None)
+    assert list(etref.columns) == ['1', '2']
+    for cell_id, cell in cells.et_cells_dict.items():
+        np.testing.assert_array_equal(
+            etref[cell_id].values, cell.climate_df['etref'].values)
+        np.testing.assert_array_equal(
+            ppt[cell_id].values, cell.climate_df['ppt'].values)
+    # Crop 3 was not run for cell 2
+    df = crop_store.read_crop(data.cet_out['store_path'], 'et_act', 3)
+    assert np.isnan(df['2'].values).all()
+
+
+def test_crop_writes_crop_variables_only(tmp_path):
+    cells = make_cells([[3]])
+    cells.crop_num_list = [3]
+    cell = cells.et_cells_dict['1']
+    data = make_data('eto', False)
+    data.start_dt = pd.Timestamp('2001-01-01')
+    data.end_dt = pd.Timestamp('2003-12-31')
+    data.cet_out.update({
+        'file_type': 'zarr', 'store_path': str(tmp_path / 'crop_et.zarr')})
+    crop_store.create_store(data, cells)
+    crop_df = cell.refet_df.copy()
+    for var in crop_store.crop_variables:
+        crop_df[var] = 1
+    crop_store.write_crop(data, cell, cell.crop_params[3], crop_df)
+    store_path = data.cet_out['store_path']
+    assert (crop_store.read_crop(store_path, 'et_act', 3)['1'] == 1).all()
+    for var in crop_store.cell_variables:
+        assert crop_store.read_crop(store_path, var, None)['1'].isna().all()
+    crop_store.write_cell(data, cell)
+    np.testing.assert_array_equal(
+        crop_store.read_crop(store_path, 'ppt', None)['1'].values,
+        cell.climate_df['ppt'].values)
@@ -0,0 +1,92 @@
+import os
+import types
+
+import numpy as np
+import pandas as pd
+
+import et_cell
+
+
+def make_station(tmp_path, aridity_rating=50., end_year=2004):
+    """Write a RET style station file and return data and cell"""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2001-01-01', '{}-12-31'.format(end_year),
+                          freq='D')
+    season = np.sin(2 * np.pi * (dates.dayofyear.values - 110) / 365.)
+    tmax = 14 + 16 * season + rng.normal(0, 3, len(dates))
+    df = pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'), 'TMax': tmax,
+        'TMin': tmax - 12 - rng.uniform(0, 4, len(dates)),
+        'Precip': rng.gamma(0.3, 4, len(dates)),
+        'Wind': rng.uniform(1, 5, len(dates)),
+        'TDew': tmax - 20, 'ASCEr': np.clip(4 + 3.5 * season, 0.2, None)})
+    station_path = os.path.join(str(tmp_path), 'STN1_RET.csv')
+    df.to_csv(station_path, index=False)
+
+    file_spec = {'ws': str(tmp_path), 'name_format': '%s_RET.csv',
+                 'header_lines': 1, 'names_line': 1, 'delimiter': ','}
+    data = types.SimpleNamespace(
+        refet=dict(file_spec, type='eto',
+                   fields={'date': 'Date', 'etref': 'ASCEr'},
+                   units={'etref': 'mm/day'}),
+        weather=dict(file_spec, wind_height=2.,
+                     fields={'date': 'Date', 'tmax': 'TMax', 'tmin': 'TMin',
+                             'ppt': 'Precip', 'wind': 'Wind', 'tdew': 'TDew'},
+                     units={'tmax': 'C', 'tmin': 'C', 'ppt': 'mm/day',
+                            'wind': 'm/s', 'tdew': 'C'},
+                     fnspec={}),
+        refet_ratios_path=None, phenology_option=0, co2_flag=False,
+        start_dt=None, end_dt=None, climate_cache_flag=False,
+        climate_cache_ws=os.path.join(str(tmp_path), 'climate_cache'))
+    os.makedirs(data.climate_cache_ws)
+    cell = et_cell.ETCell()
+    cell.cell_id, cell.refet_id = '1', 'STN1'
+    cell.aridity_rating, cell.air_pressure = aridity_rating, 90.
+    return data, cell
+
+
+def test_process_climate(tmp_path):
+    data, cell = make_station(tmp_path)
+    assert cell.set_input_timeseries(1, data, None)
+    df = cell.climate_df
+    assert df['doy'].dtype == np.int64
+    assert (df['doy'].values == df.index.dayofyear.values).all()
+    np.testing.assert_array_equal(
+        df['t30'].values,
+        df['tmean'].rolling(window=30, min_periods=1).mean().values)
+
+    # Long term arrays are indexed by DOY, DOY 0 is a copy of DOY 1
+    cgdd = df['tmean'].clip(lower=0).groupby(df.index.year).cumsum()
+    cgdd_lt = cgdd.groupby(df['doy']).mean().values
+    assert len(cell.climate['main_cgdd_0_lt']) == 367
+    np.testing.assert_allclose(cell.climate['main_cgdd_0_lt'][1:], cgdd_lt)
+    assert (cell.climate['main_cgdd_0_lt'][0] ==
+            cell.climate['main_cgdd_0_lt'][1])
+
+
+def test_snow_depth_from_snow():
+    snow = np.array([10., 10., 0., 0., 4.])
+    snow_depth = np.array([50., 50., 50., 1., 50.])
+    tmax = np.array([-5., -2., 0.5, -1., 0.])
+    np.testing.assert_array_equal(
+        et_cell.snow_depth_from_snow(snow, snow_depth, tmax),
+        [5., 10., 8., 1., 10.])
+
+
+def test_climate_archive(tmp_path):
+    import climate_archive
+
+    data, cell = make_station(tmp_path)
+    assert cell.set_input_timeseries(1, data, None)
+    expected = cell.climate_df
+
+    archive_ws = os.path.join(str(tmp_path), 'archive')
+    climate_archive.build_archive(archive_ws, climate_archive.station_ids(
+        str(tmp_path), data.refet['name_format']))
+    data.refet['archive_ws'] = data.weather['archive_ws'] = archive_ws
+    os.remove(os.path.join(str(tmp_path), 'STN1_RET.csv'))
+    cell = et_cell.ETCell()
+    cell.cell_id, cell.refet_id = '1', 'STN1'
+    cell.aridity_rating, cell.air_pressure = 50., 90.
+    assert cell.set_input_timeseries(1, data, None)
+    pd.testing.assert_frame_equal(cell.climate_df, expected)
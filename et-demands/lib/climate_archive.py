@@ -0,0 +1,326 @@
+"""climate_archive.py
+Memory mapped archive of station climate time series
+An archive folder holds a shared date index, one station by date array
+    of fixed dtype per variable and a station offset table, so station
+    records are sliced out of the page cache instead of parsed from text
+Built by tools/build_climate_archive.py
+Called by et_cell.py and met_nodes.py
+
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+archive_version = 1
+index_name = 'archive.json'
+dates_name = 'dates.npy'
+
+# Archive indexes of this process keyed by archive folder
+_indexes = {}
+
+
+def index_path(archive_ws):
+    """Return path of archive index file"""
+    return os.path.join(archive_ws, index_name)
+
+
+def read_index(archive_ws):
+    """Read archive index and date index, cached in process
+
+    Parameters
+    ---------
+    archive_ws : str
+        archive folder
+
+    Returns
+    -------
+    index : dict
+        archive index with 'dates' DatetimeIndex, None if not readable
+
+    Notes
+    -----
+    Cached indexes are reread if the archive index file is modified.
+
+    """
+
+    archive_path = index_path(archive_ws)
+    try:
+        stat = os.stat(archive_path)
+    except OSError:
+        logging.error('  ERROR: climate archive {} does not exist'.format(
+            archive_path))
+        return None
+    archive_key = os.path.abspath(archive_ws)
+    archive_stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _indexes.get(archive_key)
+    if cached is not None and cached[0] == archive_stamp:
+        return cached[1]
+    with open(archive_path, 'r') as archive_f:
+        index = json.load(archive_f)
+    if index.get('version') != archive_version:
+        logging.error('  ERROR: climate archive {} version {} is not '
+                      'supported'.format(archive_path, index.get('version')))
+        return None
+    index['dates'] = pd.DatetimeIndex(
+        np.load(os.path.join(archive_ws, dates_name)), name='date')
+    _indexes[archive_key] = (archive_stamp, index)
+    return index
+
+
+def station_df(archive_ws, station_id):
+    """Return date indexed record of station from archive
+
+    Parameters
+    ---------
+    archive_ws : str
+        archive folder
+    station_id : str
+        station id as in station file name
+
+    Returns
+    -------
+    : pandas.DataFrame
+        columns named as in station file, None if station is not archived
+
+    Notes
+    -----
+    Columns are views of copy on write memory maps of the variable files.
+    Unmodified pages are shared through the page cache by all processes
+    reading the archive, and changes to a record stay in the record.
+
+    """
+
+    index = read_index(archive_ws)
+    if index is None:
+        return None
+    try:
+        station = index['stations'][station_id]
+    except KeyError:
+        logging.debug('  Station {} is not in climate archive {}'.format(
+            station_id, archive_ws))
+        return None
+    row, start, stop = station['row'], station['start'], station['stop']
+    variables = index['variables']
+    columns = {}
+    for name in station['variables']:
+        values = np.load(os.path.join(archive_ws, variables[name]['file']),
+                         mmap_mode='c')
+        columns[name] = values[row, start:stop]
+    return pd.DataFrame(columns, index=index['dates'][start:stop],
+                        copy=False)
+
+
+def station_ids(station_ws, name_format):
+    """Return ids and paths of station files matching name_format
+
+    Parameters
+    ---------
+    station_ws : str
+        station file folder
+    name_format : str
+        station file name format with %s as station id
+
+    Returns
+    -------
+    : list
+        sorted (station id, file path) tuples
+
+    """
+
+    prefix, suffix = name_format.split('%s', 1)
+    name_re = re.compile('^{}(.+){}$'.format(re.escape(prefix),
+                                              re.escape(suffix)))
+    stations = []
+    for station_path in glob.glob(os.path.join(
+            station_ws, glob.escape(prefix) + '*' + glob.escape(suffix))):
+        name_match = name_re.match(os.path.basename(station_path))
+        if name_match:
+            stations.append((name_match.group(1), station_path))
+    return sorted(stations)
+
+
+def read_station_file(station_path, header_lines=1, names_line=1,
+                      delimiter=',', date_field='Date', ymd_fields=None):
+    """Read station text file into date indexed numeric columns
+
+    Parameters
+    ---------
+    station_path : str
+        station file path
+    header_lines : int
+        number of header lines
+    names_line : int
+        line of field names
+    delimiter : str
+        field delimiter
+    date_field : str
+        date field name
+    ymd_fields : list
+        year, month and day field names used if date_field is None
+
+    Returns
+    -------
+    : pandas.DataFrame
+        None if the file could not be read
+
+    """
+
+    # Get list of 0 based line numbers to skip
+    # Ignore header but assume header was set as 1's based index
+    skiprows = [i for i in range(header_lines) if i + 1 != names_line]
+    try:
+        station_df = pd.read_csv(
+            station_path, engine='python',
+            header=names_line - len(skiprows) - 1,
+            skiprows=skiprows, sep=delimiter, na_values='NaN')
+    except Exception as e:
+        logging.error('  ERROR: {} reading {}'.format(e, station_path))
+        return None
+    try:
+        if date_field is not None:
+            dates = pd.to_datetime(station_df.pop(date_field))
+        else:
+            dates = pd.to_datetime(station_df[ymd_fields].rename(
+                columns=dict(zip(ymd_fields, ['year', 'month', 'day']))))
+    except (KeyError, ValueError) as e:
+        logging.error('  ERROR: dates of {} could not be read, {}'.format(
+            station_path, e))
+        return None
+    station_df.index = pd.DatetimeIndex(dates, name='date')
+    text_fields = [field_name for field_name in station_df.columns
+                   if not (pd.api.types.is_numeric_dtype(station_df[field_name])
+                           or station_df[field_name].isnull().all())]
+    if text_fields:
+        logging.debug('  Text fields not archived: {}'.format(
+            ', '.join(text_fields)))
+    return station_df.drop(columns=text_fields)
+
+
+def build_archive(archive_ws, station_files, dtype='float64', **read_kwargs):
+    """Write station files to archive
+
+    Parameters
+    ---------
+    archive_ws : str
+        archive folder
+    station_files : list
+        (station id, file path) tuples
+    dtype : str
+        dtype of non integer variables
+    read_kwargs :
+        read_station_file() options
+
+    Returns
+    -------
+    : int
+        number of stations archived, None if none could be archived
+
+    Notes
+    -----
+    Station files are read twice, once for dates and fields and once to
+    fill the variable arrays, so the whole set is never held in memory.
+    Integer fields of all stations are archived as int64.  Stations whose
+    dates are not a run of the shared date index are left out and are read
+    from their text files by models.
+
+    """
+
+    # First pass, dates and fields of stations
+
+    station_dates = {}
+    station_fields = {}
+    field_kinds = {}
+    for station_id, station_path in station_files:
+        logging.info('  {}'.format(station_path))
+        station_df = read_station_file(station_path, **read_kwargs)
+        if station_df is None:
+            continue
+        if not station_df.index.is_monotonic_increasing or \
+                station_df.index.has_duplicates:
+            logging.warning('  Dates of station {} are not sorted and '
+                            'unique, not archived'.format(station_id))
+            continue
+        station_dates[station_id] = station_df.index
+        station_fields[station_id] = list(station_df.columns)
+        for field_name in station_df.columns:
+            field_kinds.setdefault(field_name, set()).add(
+                station_df[field_name].dtype.kind)
+    if not station_dates:
+        logging.error('  ERROR: no station files could be archived')
+        return None
+    dates = station_dates[next(iter(station_dates))]
+    for station_index in station_dates.values():
+        dates = dates.union(station_index)
+
+    # Station offset table
+
+    stations = {}
+    for station_id, station_index in station_dates.items():
+        start = dates.get_loc(station_index[0])
+        stop = start + len(station_index)
+        if not dates[start:stop].equals(station_index):
+            logging.warning('  Dates of station {} are not a run of the '
+                            'shared date index, not archived'.format(
+                                station_id))
+            continue
+        stations[station_id] = {
+            'row': len(stations), 'start': int(start), 'stop': int(stop),
+            'variables': station_fields[station_id]}
+    if not stations:
+        logging.error('  ERROR: no station files could be archived')
+        return None
+
+    # Variable arrays
+
+    if not os.path.isdir(archive_ws):
+        os.makedirs(archive_ws)
+    elif os.path.isfile(index_path(archive_ws)):
+        os.remove(index_path(archive_ws))
+    np.save(os.path.join(archive_ws, dates_name),
+            dates.values)
+    variables = {}
+    arrays = {}
+    for field_count, (field_name, kinds) in enumerate(field_kinds.items()):
+        if kinds <= set('iub') and all(
+                field_name in station['variables']
+                for station in stations.values()):
+            field_dtype = 'int64'
+            fill_value = 0
+        else:
+            field_dtype = dtype
+            fill_value = np.nan
+        variables[field_name] = {
+            'file': 'var_{:03d}.npy'.format(field_count),
+            'dtype': field_dtype}
+        arrays[field_name] = np.lib.format.open_memmap(
+            os.path.join(archive_ws, variables[field_name]['file']), mode='w+',
+            dtype=field_dtype, shape=(len(stations), len(dates)))
+        arrays[field_name][:] = fill_value
+
+    # Second pass, fill station rows
+
+    station_paths = dict(station_files)
+    for station_id, station in stations.items():
+        station_df = read_station_file(station_paths[station_id],
+                                       **read_kwargs)
+        for field_name in station['variables']:
+            arrays[field_name][
+                station['row'], station['start']:station['stop']] = \
+                station_df[field_name].values
+    for values in arrays.values():
+        values.flush()
+    del arrays
+
+    # Index is written last so readers never see a partial archive
+
+    with open(index_path(archive_ws), 'w') as archive_f:
+        json.dump({'version': archive_version, 'variables': variables,
+                   'stations': stations}, archive_f, indent=1)
+    _indexes.pop(os.path.abspath(archive_ws), None)
+    return len(stations)
@@ -0,0 +1,102 @@
+"""growing_season.py
+Growing season transitions of daily season flags
+Off to on and on to off transitions of the season flag are found with one
+    difference along the day axis and the first transition of each year is
+    reduced per period, for one series or many cell and crop series stacked
+    in one days by series array
+Called by crop_cycle.py and tools/compute_growing_season.py
+
+"""
+
+import numpy as np
+
+import period_agg
+
+
+class SeasonTransitions():
+    """First season transitions of each period
+
+    All arrays are periods by the trailing axes of the season flags.
+
+    Attributes
+    ----------
+    first_i : array
+        row of first day of each period, -1 for periods without days
+    last_i : array
+        row of last day of each period, -1 for periods without days
+    start_i : array
+        row of first season day after first off to on transition,
+        -1 if there is none
+    end_i : array
+        row of last season day before first on to off transition,
+        -1 if there is none
+    length : array
+        number of season days
+    counts : array
+        number of days
+
+    """
+
+    def __init__(self, first_i, last_i, start_i, end_i, length, counts):
+        """ """
+        self.first_i = first_i
+        self.last_i = last_i
+        self.start_i = start_i
+        self.end_i = end_i
+        self.length = length
+        self.counts = counts
+
+
+def season_transitions(season, bounds):
+    """Find first growing season transitions of each period
+
+    Parameters
+    ---------
+    season : array
+        season flags (0/1 or boolean), days by any number of series axes
+    bounds : period_agg.PeriodBounds
+        periods of days, typically years
+
+    Returns
+    -------
+    SeasonTransitions
+
+    Notes
+    -----
+    Transitions are only found between days of the same period.
+
+    """
+
+    season = np.asarray(season) > 0
+    day_count = season.shape[0]
+    series_shape = season.shape[1:]
+    empty = bounds.counts == 0
+    starts = np.minimum(bounds.starts, max(day_count - 1, 0))
+    ends = bounds.starts + bounds.counts
+
+    # transition days, day r is compared to day r - 1 of same period
+
+    rows = np.arange(day_count).reshape((-1,) + (1,) * len(series_shape))
+    same_period = np.ones(day_count, dtype = bool)
+    same_period[bounds.starts[~empty]] = False
+    same_period = same_period.reshape(rows.shape)
+    up = np.zeros(season.shape, dtype = bool)
+    down = np.zeros(season.shape, dtype = bool)
+    up[1:] = season[1:] & ~season[:-1]
+    down[1:] = ~season[1:] & season[:-1]
+    up &= same_period
+    down &= same_period
+
+    # first transition of each period
+
+    none_i = day_count
+    start_i = np.minimum.reduceat(np.where(up, rows, none_i), starts, axis = 0)
+    end_i = np.minimum.reduceat(np.where(down, rows, none_i), starts, axis = 0) - 1
+    start_i[empty] = none_i
+    end_i[empty] = none_i - 1
+    start_i = np.where(start_i < ends.reshape((-1,) + (1,) * len(series_shape)), start_i, -1)
+    end_i = np.where(end_i < ends.reshape((-1,) + (1,) * len(series_shape)) - 1, end_i, -1)
+    length = period_agg.aggregate(season.astype(np.int64), bounds, 'sum')
+    first_i = np.where(empty, -1, bounds.starts)
+    last_i = np.where(empty, -1, ends - 1)
+    return SeasonTransitions(first_i, last_i, start_i, end_i, length, bounds.counts)
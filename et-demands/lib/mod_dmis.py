@@ -12,6 +12,15 @@ import pandas as pd
 import numpy as np
 import openpyxl as op
 from openpyxl.utils.dataframe import dataframe_to_rows
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
 
 def is_leap_year(year_to_test):
     """Test if year is a leap year
@@ -186,6 +195,170 @@ def char_to_numeric_month(cmonth):
     nmonth = cmonths.index(cmonth.upper()) + 1
     return nmonth
 
+# Parsed text files keyed by file path and parse options
+# entries hold file size and modification time and are replaced when the file changes
+_parsed_files = {}
+
+def clear_parsed_files():
+    """Clears in process cache of parsed column slot and RDB files"""
+    _parsed_files.clear()
+
+def _cached_parse(key, file_path, parse_func):
+    """Returns parsed file from cache, parsing it if new or modified
+
+     Args:
+        key: tuple of parse options
+        file_path: fully specified file path
+        parse_func: function returning parsed dataframe or None
+
+    Returns:
+        parsed dataframe or None
+    """
+    stat = os.stat(file_path)
+    file_key = (os.path.abspath(file_path),) + key
+    file_stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _parsed_files.get(file_key)
+    if cached is not None and cached[0] == file_stamp:
+        return cached[1]
+    parsed_df = parse_func()
+    if parsed_df is not None:
+        _parsed_files[file_key] = (file_stamp, parsed_df)
+    return parsed_df
+
+def _read_text_file(file_path, header_lines, names_line, valuesSeparator, mia_value):
+    """Reads delimited text file, names_line 0 reads file without header"""
+    if names_line == 0:
+        return pd.read_csv(file_path, header = None, sep = valuesSeparator,
+                na_values = mia_value, engine = 'python')
+    # Get list of 0 based line numbers to skip - Ignore header but assume header was set as 1's based index
+    data_skip = [i for i in range(header_lines) if i + 1 != names_line]
+    return pd.read_csv(file_path, engine = 'python',
+            header = names_line - len(data_skip) - 1, skiprows = data_skip,
+            sep = valuesSeparator, na_values = mia_value)
+
+def ParseColumnSlot(file_path, header_lines, names_line, time_step,
+        valuesSeparator, mia_value = 'NaN', wyem = 12):
+    """Parses column slot file once into a date indexed columnar dataframe
+
+    Parsed dataframes are cached in process by file path, parse options and
+    file modification time, so later reads of other stations and parameters
+    of the file do not reread it.
+
+     Args:
+        file_path: fully specified file path
+        header_lines: number of header lines
+        names_line: line of header names
+        time_step: RiverWare style string timestep
+        valuesSeparator: separator of values
+        mia_value: missing value
+        wyem: Water Year End Month
+
+    Returns:
+        dataframe of all file columns indexed by date, None if empty
+    """
+    def parse():
+        input_df = _read_text_file(file_path, header_lines, names_line,
+                valuesSeparator, mia_value)
+        if input_df.empty:
+            logging.error("No data read in file" + file_path)
+            return None
+        input_columns = list(input_df.columns)
+        lc_columns = [x.lower() for x in input_columns]
+
+        # determine date column
+
+        try:
+            date_column = lc_columns.index('date')
+        except:
+            date_column = 0
+        date_column_name = input_columns[date_column]
+        input_df = input_df.rename(columns = {date_column_name:'date'})
+        dates = pd.DatetimeIndex(pd.to_datetime(input_df.pop('date')))
+
+        # make sure that daily, monthly and annual data use end of period dates and do not include a time stamp
+
+        if time_step == 'day' or time_step == 'month' or time_step == 'year':
+            if time_step == 'day':
+                days = dates.day
+            elif time_step == 'month':
+                days = dates.days_in_month
+            else:
+                days = pd.Timestamp(2000, wyem, 1).days_in_month
+            dates = pd.DatetimeIndex(pd.to_datetime(pd.DataFrame({
+                'year': dates.year, 'month': dates.month, 'day': days})))
+        input_df.index = dates.rename('date')
+        return input_df.apply(pd.to_numeric, errors = 'coerce')
+
+    return _cached_parse(('column_slot', header_lines, names_line, time_step,
+            valuesSeparator, mia_value, wyem), file_path, parse)
+
+def ParseTextRDB(file_path, header_lines, names_line, time_step,
+        valuesSeparator, mia_value = 'NaN'):
+    """Parses RDB Text Relational Database once into a columnar dataframe
+
+    Rows are pivoted to one column per station.parameter.  Parsed
+    dataframes are cached in process by file path, parse options and file
+    modification time.
+
+     Args:
+        file_path: fully specified file path
+        header_lines: number of header lines
+        names_line: line of header names, 0 if file has no header
+        time_step: RiverWare style string timestep
+        valuesSeparator: separator of values
+        mia_value: missing value
+
+    Returns:
+        dataframe of station.parameter columns indexed by date, None if empty
+    """
+    def parse():
+        input_df = _read_text_file(file_path, header_lines, names_line,
+                valuesSeparator, mia_value)
+        if input_df.empty:
+            logging.error("No data read in file" + file_path)
+            return None
+        if names_line == 0:
+            # default column names and locations
+            input_df.columns = ['Station', 'Parameter', 'Date', 'Value']
+        input_columns = list(input_df.columns)
+        lc_columns = [str(x).lower() for x in input_columns]
+
+        # determine column types
+
+        column_names = []
+        for names, default in [(['station', 'object'], 0), (['parameter', 'slot'], 1),
+                               (['date'], 2), (['value'], 3)]:
+            found = [lc_columns.index(name) for name in names if name in lc_columns]
+            column_names.append(input_columns[found[0] if found else default])
+        sta_column_name, param_column_name, date_column_name, values_column_name = column_names
+
+        # create new column of station and parameter
+
+        sta_param = (input_df[sta_column_name].map(str) + "."
+                     + input_df[param_column_name].map(str))
+        if time_step == 'year' and len(str(input_df[date_column_name][0])) == 4:
+            dates = pd.to_datetime(input_df[date_column_name].map(str), format = '%Y')
+        else:
+            dates = pd.to_datetime(input_df[date_column_name])
+        long_df = pd.DataFrame({'date': dates.values, 'sta_param': sta_param.values,
+                'value': pd.to_numeric(input_df[values_column_name], errors = 'coerce').values})
+
+        # one column per station and parameter in order of first appearance
+
+        wide_df = long_df.pivot_table(index = 'date', columns = 'sta_param',
+                values = 'value', aggfunc = 'first', dropna = False)
+        wide_df = wide_df[list(pd.unique(sta_param))]
+        wide_df.columns.name = None
+
+        # first and last dates of rows of each station and parameter
+
+        periods = long_df.groupby('sta_param', sort = False)['date'].agg(['min', 'max'])
+        wide_df.attrs['periods'] = dict(zip(periods.index, zip(periods['min'], periods['max'])))
+        return wide_df
+
+    return _cached_parse(('rdb', header_lines, names_line, time_step,
+            valuesSeparator, mia_value), file_path, parse)
+
 def ReadOneColumnSlot(file_path, header_lines, names_line, stationToRead, 
         parameterToRead, units, scaleFactor, time_step, ts_quantity, 
         valuesSeparator, start_dt = None, end_dt = None, 
@@ -215,92 +388,54 @@ def ReadOneColumnSlot(file_path, header_lines, names_line, stationToRead,
     lc_station = stationToRead.lower()
     lc_param = parameterToRead.lower()
     try:
-        # Get list of 0 based line numbers to skip - Ignore header but assume header was set as 1's based index
-        data_skip = [i for i in range(header_lines) if i + 1 != names_line]
-        input_df = pd.read_csv(file_path, engine = 'python',
-                header = names_line - len(data_skip) - 1, skiprows = data_skip, 
-                sep = valuesSeparator, na_values = mia_value)
-        if input_df.empty:
-            logging.error("No data read in file" + file_path)
+        input_df = ParseColumnSlot(file_path, header_lines, names_line,
+                time_step, valuesSeparator, mia_value, wyem)
+        if input_df is None:
             return return_df
         input_columns = list(input_df.columns)
         lc_columns = [x.lower() for x in input_columns]
-        
-        # determine date column
 
-        try:
-            date_column = lc_columns.index('date')
-        except:
-            date_column = 0
-        date_column_name = input_columns[date_column]
-        input_columns.remove(date_column_name)
-        lc_columns.remove(date_column_name.lower())
-            
-        # set date column as index
+        # determine values column
+
+        notFound = True
+        for column, input_column in enumerate(lc_columns):
+            if lc_station in input_column and lc_param in input_column:
+                notFound = False
+                break
+        if notFound:
+            logging.error("Unable to locate station " + stationToRead + " and parameter " + parameterToRead + " in file " + file_path + ".")
+            return return_df
+        column_name = input_columns[column]
+        input_df = input_df[[column_name]]
 
-        input_df = input_df.rename(columns = {date_column_name:'date'})
-        
-        # make sure that daily, monthly and annual data use end of period dates and do not include a time stamp
-        
-        input_df['date'] = pd.to_datetime(input_df['date'])
-        input_df.set_index('date', inplace = True)
-        if time_step == 'day' or time_step == 'month' or time_step == 'year':
-            input_df['year'] = input_df.index.year
-            input_df['month'] = input_df.index.month
-            if time_step == 'day':
-                input_df['day'] = input_df.index.day
-            elif time_step == 'month':
-                input_df['day'] = input_df.index.days_in_month
-            else:
-                pydt = input_df.index[len(input_df) - 1]
-                pydt = pd.to_datetime(datetime.datetime(2000, wyem, 1, pydt.hour, pydt.minute))
-                pydt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.days_in_month, pydt.hour, pydt.minute))
-                input_df['day'] = pydt.days_in_month
-            input_df['date'] = input_df[['year', 'month', 'day']].apply(
-                lambda s : datetime.datetime(*s),axis = 1)
-            input_df['date'] = pd.to_datetime(input_df['date'])
-            input_df.set_index('date', inplace = True)
-        
         # verify period
-        
+
         if start_dt is None:
             pydt = input_df.index[0]
             start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
-        if end_dt is None: 
+        if end_dt is None:
             pydt = input_df.index[len(input_df) - 1]
             end_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
-                
+
         try:
             input_df = input_df.truncate(before = start_dt, after = end_dt)
         except:
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input data')
             return return_df
         if len(input_df.index) < 1:
-           input_df = make_ts_dataframe(time_step, ts_quantity, start_dt, 
+           input_df = make_ts_dataframe(time_step, ts_quantity, start_dt,
                        end_dt, wyem)
-        
+
         # adjust for missing rows
-        
+
         full_index = make_dt_index(time_step, ts_quantity, start_dt, end_dt, wyem)
         full_index = full_index + pd.Timedelta(full_index[0] - input_df.index[0])
         input_df = input_df.reindex(index = full_index)
-    
-        # determine values column
 
-        notFound = True
-        for column, input_column in enumerate(lc_columns):
-            if lc_station in input_column and lc_param in input_column:
-                notFound = False
-                break
-        if notFound:
-            logging.error("Unable to locate station " + stationToRead + " and parameter " + parameterToRead + " in file " + file_path + ".")
-            return return_df
-            
         # merge values
-        
-        column_name = input_columns[column]
+
         try:
-            return_df = pd.merge(make_ts_dataframe(time_step, ts_quantity, start_dt, end_dt), 
+            return_df = pd.merge(make_ts_dataframe(time_step, ts_quantity, start_dt, end_dt),
                     input_df[[column_name]], left_index = True, right_index = True)
         except:
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred merging input data with return dataframe.\n')
@@ -308,7 +443,7 @@ def ReadOneColumnSlot(file_path, header_lines, names_line, stationToRead,
             return return_df
         del input_df, full_index
         return_df = return_df.rename(columns = {column_name:parameterToRead})
-        
+
         # scale values
 
         return_df[parameterToRead] *= scaleFactor
@@ -346,107 +481,33 @@ def ReadOneTextRDB(file_path, header_lines, names_line, stationToRead,
     lc_station = stationToRead.lower()
     lc_param = parameterToRead.lower()
     try:
-        if names_line == 0:
-            # default column names and locations
-            
-            input_df = pd.read_csv(file_path, engine = 'python',
-                    header = None, sep = valuesSeparator, na_values = mia_value)
-            if input_df.empty:
-                logging.error("No data read in file" + file_path)
-                return return_df
-            sta_column_name = "Station"
-            param_column_name = "Parameter"
-            date_column_name = "Date"
-            values_column_name = "Value"
-            input_columns = ['Station', 'Parameter', 'Date', 'Value']
-            input_df.columns = input_columns
-        else:
-            # dynamic column names and location
-            
-            # Get list of 0 based line numbers to skip - Ignore header but assume header was set as 1's based index
-            data_skip = [i for i in range(header_lines) if i + 1 != names_line]
-            input_df = pd.read_csv(file_path, engine = 'python',
-                    header = names_line - len(data_skip) - 1, skiprows = data_skip, 
-                    na_values = mia_value, sep = valuesSeparator)
-            if input_df.empty:
-                logging.error("No data read in file" + file_path)
-                return return_df
-            input_columns = list(input_df.columns)
-            lc_columns = [x.lower() for x in input_columns]
-        
-            # determine column types
-
-            try:
-                sta_column = lc_columns.index('station')
-            except:
-                try:
-                    sta_column = lc_columns.index('object')
-                except:
-                    stacolumn = 0
-            sta_column_name = input_columns[sta_column]
-            try:
-                param_column = lc_columns.index('parameter')
-            except:
-                try:
-                    param_column = lc_columns.index('slot')
-                except:
-                    stacolumn = 1
-            param_column_name = input_columns[param_column]
-            try:
-                date_column = lc_columns.index('date')
-            except:
-                date_column = 2
-            date_column_name = input_columns[date_column]
-            try:
-                values_column = lc_columns.index('value')
-            except:
-                values_column = 3
-            values_column_name = input_columns[values_column]
-        
-        # create new column of lower case station and parameter
-        
-        try:
-            input_df["sta_param"] = (input_df[sta_column_name].map(str) + "." 
-                                      + input_df[param_column_name].map(str)).str.lower()
-        except:
-            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred creating sta_param column.\n')
+        input_df = ParseTextRDB(file_path, header_lines, names_line,
+                time_step, valuesSeparator, mia_value)
+        if input_df is None:
             return return_df
-    
+
         # locate requested station and parameter
 
-        sta_params = list(pd.unique(input_df.sta_param.ravel()))
         notFound = True
-        for sta_param in sta_params:
-            if lc_station in sta_param and lc_param in sta_param:
+        for sta_param in input_df.columns:
+            if lc_station in sta_param.lower() and lc_param in sta_param.lower():
                 notFound = False
                 break
         if notFound:
             logging.error("Unable to locate station " + stationToRead + " and parameter " + parameterToRead + " in file " + file_path + ".")
             return return_df
-    
+
         # filter data to requested station and parameter values
-        
-        try:
-            input_df = input_df[input_df.sta_param == sta_param]
-        except:
-            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred filtering to ', sta_param, '.\n')
-            return return_df
 
-        # set date column as index
+        first_dt, last_dt = input_df.attrs['periods'][sta_param]
+        input_df = input_df[[sta_param]].truncate(before = first_dt, after = last_dt)
 
-        input_df = input_df.rename(columns = {date_column_name:'date'})
-        if time_step == 'year' and len(str(input_df['date'][0])) == 4:
-            input_df['date'] = pd.to_datetime(input_df['date'], format = '%Y')
-        else:
-            input_df['date'] = pd.to_datetime(input_df['date'])
-        input_df.set_index('date', inplace = True)
-        
         # set starting and ending dates
-        
+
         if start_dt is None:
             pydt = input_df.index[0]
             start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
-        if end_dt is None: 
+        if end_dt is None:
             pydt = input_df.index[len(input_df) - 1]
             end_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
         try:
@@ -454,25 +515,25 @@ def ReadOneTextRDB(file_path, header_lines, names_line, stationToRead,
         except:
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input data')
             return return_df
-        
+
         # adjust for missing rows
-        
+
         full_index = make_dt_index(time_step, ts_quantity, start_dt, end_dt, wyem)
         full_index = full_index + pd.Timedelta(full_index[0] - input_df.index[0])
         input_df = input_df.reindex(index = full_index)
 
         # merge values
-        
+
         try:
-            return_df = pd.merge(make_ts_dataframe(time_step, ts_quantity, start_dt, end_dt), 
-                    input_df[[values_column_name]], left_index = True, right_index = True)
+            return_df = pd.merge(make_ts_dataframe(time_step, ts_quantity, start_dt, end_dt),
+                    input_df[[sta_param]], left_index = True, right_index = True)
         except:
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred merging input data with return dataframe.\n')
             # raise
             return return_df
         del input_df, full_index
-        return_df = return_df.rename(columns = {values_column_name:parameterToRead})
-        
+        return_df = return_df.rename(columns = {sta_param:parameterToRead})
+
         # scale values
 
         return_df[parameterToRead] *= scaleFactor
@@ -632,53 +693,17 @@ def ColumnSlotToDataframe(file_path, header_lines, names_line,
     """
     return_df = None
     try:
-        # Get list of 0 based line numbers to skip - Ignore header but assume header was set as 1's based index
-        data_skip = [i for i in range(header_lines) if i + 1 != names_line]
-        input_df = pd.read_csv(file_path, engine = 'python',
-                header = names_line - len(data_skip) - 1, skiprows = data_skip, 
-                sep = valuesSeparator, na_values = mia_value)
-        if input_df.empty:
-            logging.error("No data read in file" + file_path)
+        input_df = ParseColumnSlot(file_path, header_lines, names_line,
+                time_step, valuesSeparator, mia_value, wyem)
+        if input_df is None:
             return return_df
-        input_columns = list(input_df.columns)
-        lc_columns = [x.lower() for x in input_columns]
-        
-        # determine date column
 
-        try:
-            date_column = lc_columns.index('date')
-        except:
-            date_column = 0
-        date_column_name = input_columns[date_column]
-        input_df = input_df.rename(columns = {date_column_name:'date'})
-        
-        # make sure that daily, monthly and annual data use end of period dates and do not include a time stamp
-        
-        input_df['date'] = pd.to_datetime(input_df['date'])
-        input_df.set_index('date', inplace = True)
-        if time_step == 'day' or time_step == 'month' or time_step == 'year':
-            input_df['year'] = input_df.index.year
-            input_df['month'] = input_df.index.month
-            if time_step == 'day':
-                input_df['day'] = input_df.index.day
-            elif time_step == 'month':
-                input_df['day'] = input_df.index.days_in_month
-            else:
-                pydt = input_df.index[len(input_df) - 1]
-                pydt = pd.to_datetime(datetime.datetime(2000, wyem, 1, pydt.hour, pydt.minute))
-                pydt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.days_in_month, pydt.hour, pydt.minute))
-                input_df['day'] = pydt.days_in_month
-            input_df['date'] = input_df[['year', 'month', 'day']].apply(
-                lambda s : datetime.datetime(*s),axis = 1)
-            input_df['date'] = pd.to_datetime(input_df['date'])
-            input_df.set_index('date', inplace = True)
-        
         # verify period
-        
+
         if start_dt is None:
             pydt = input_df.index[0]
             start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
-        if end_dt is None: 
+        if end_dt is None:
             pydt = input_df.index[len(input_df) - 1]
             end_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
 
@@ -688,11 +713,11 @@ def ColumnSlotToDataframe(file_path, header_lines, names_line,
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input data')
             return return_df
         if len(input_df.index) < 1:
-           input_df = make_ts_dataframe(time_step, ts_quantity, start_dt, 
+           input_df = make_ts_dataframe(time_step, ts_quantity, start_dt,
                        end_dt, wyem)
-        
+
         # adjust for missing rows
-        
+
         full_index = make_dt_index(time_step, ts_quantity, start_dt, end_dt, wyem)
         full_index = full_index + pd.Timedelta(full_index[0] - input_df.index[0])
         # could not get user mia_value to work but it appears to work better using default np.nan
@@ -727,81 +752,15 @@ def TextRDBToDataframe(file_path, header_lines, names_line,
     """
     return_df = None
     try:
-        if names_line == 0:
-            # default column names and locations
-            
-            input_df = pd.read_csv(file_path, engine = 'python',
-                    header = None, sep = valuesSeparator, na_value = mia_value)
-            if input_df.empty:
-                logging.error("No data read in file" + file_path)
-                return return_df
-            sta_column_name = "Station"
-            param_column_name = "Parameter"
-            date_column_name = "Date"
-            values_column_name = "Value"
-            input_columns = ['Station', 'Parameter', 'Date', 'Value']
-            input_df.columns = input_columns
-        else:
-            # dynamic column names and location
-            
-            # Get list of 0 based line numbers to skip - Ignore header but assume header was set as 1's based index
-            data_skip = [i for i in range(header_lines) if i + 1 != names_line]
-            input_df = pd.read_csv(file_path, engine = 'python',
-                    header = names_line - len(data_skip) - 1, skiprows = data_skip, 
-                    na_values = mia_value, sep = valuesSeparator)
-            if input_df.empty:
-                logging.error("No data read in file" + file_path)
-                return return_df
-            input_columns = list(input_df.columns)
-            lc_columns = [x.lower() for x in input_columns]
-        
-            # determine column types
-
-            try:
-                sta_column = lc_columns.index('station')
-            except:
-                try:
-                    sta_column = lc_columns.index('object')
-                except:
-                    stacolumn = 0
-            sta_column_name = input_columns[sta_column]
-            try:
-                param_column = lc_columns.index('parameter')
-            except:
-                try:
-                    param_column = lc_columns.index('slot')
-                except:
-                    stacolumn = 1
-            param_column_name = input_columns[param_column]
-            try:
-                date_column = lc_columns.index('date')
-            except:
-                date_column = 2
-            date_column_name = input_columns[date_column]
-            try:
-                values_column = lc_columns.index('value')
-            except:
-                values_column = 3
-            values_column_name = input_columns[values_column]
-        
-        # create new column of station and parameter
-        
-        try:
-            input_df["sta_param"] = input_df[sta_column_name].map(str) \
-                                      + "." + input_df[param_column_name].map(str)
-        except:
-            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred creating sta_param column.\n')
+        input_df = ParseTextRDB(file_path, header_lines, names_line,
+                time_step, valuesSeparator, mia_value)
+        if input_df is None:
             return return_df
-    
+
         # set starting and ending dates
 
-        input_df = input_df.rename(columns = {date_column_name:'date'})
-        if time_step == 'year' and len(str(input_df['date'][0])) == 4:
-            input_df['date'] = pd.to_datetime(input_df['date'], format = '%Y')
-        else:
-            input_df['date'] = pd.to_datetime(input_df['date'])
-        pysdt = input_df['date'][0]
-        pyedt = input_df['date'][len(input_df) - 1]
+        pysdt = input_df.index[0]
+        pyedt = input_df.index[len(input_df) - 1]
         if time_step == 'year':
             adt = pd.to_datetime(datetime.datetime(2000, wyem, 1))
             sdt = datetime.datetime(pysdt.year, wyem, adt.days_in_month, 0, 0)
@@ -817,32 +776,23 @@ def TextRDBToDataframe(file_path, header_lines, names_line,
             edt = datetime.datetime(pyedt.year, pyedt.month, pyedt.day, pyedt.hour, pyedt.minute)
         sdt = pd.to_datetime(sdt)
         edt = pd.to_datetime(edt)
-        
-        # following is going to fail with missing rows but do not know a workaround
-        
-        return_df = make_ts_dataframe(time_step, ts_quantity, sdt, edt, wyem)
-        
-        # parse sta_param column into output dataframe
 
-        sta_params = list(pd.unique(input_df.sta_param.ravel()))
-        notFound = True
-        for sta_param in sta_params:
-            try:
-                # temp_df = make_ts_dataframe(time_step, ts_quantity, sdt, edt)
-                temp_df = input_df[input_df.sta_param == sta_param]
-                return_df[sta_param] = temp_df[values_column_name].values
-                del temp_df
-                # return_df = pd.merge(return_df, temp_df[[sta_param]], left_index = True, right_index = True)
-            except:
-                logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred filtering to ', sta_param, '.\n')
-                sys.exit()
+        # values are placed on time steps of period in order
+        # dates of files with missing rows are matched instead
+
+        return_df = make_ts_dataframe(time_step, ts_quantity, sdt, edt, wyem)
+        if len(return_df.index) == len(input_df.index):
+            return_df = input_df.set_axis(return_df.index, axis = 0)
+        else:
+            return_df = input_df.reindex(index = return_df.index)
+        return_df.attrs = {}
         del input_df
-    
+
         # set starting and ending dates and truncate final dataframe
 
         if start_dt is None:
             start_dt = return_df.index[0]
-        if end_dt is None: 
+        if end_dt is None:
             end_dt = return_df.index[len(return_df) - 1]
         try:
             input_df = return_df.truncate(before = start_dt, after = end_dt)
@@ -850,7 +800,7 @@ def TextRDBToDataframe(file_path, header_lines, names_line,
             logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input data')
             return_df = None
             return return_df
-        
+
         # adjust for missing rows
 
         full_index = make_dt_index(time_step, ts_quantity, start_dt, end_dt, wyem)
@@ -1076,6 +1026,57 @@ def csf_output_by_dataframe(file_path, delimiter, new_data_df,
         # raise
         return False
 
+def dataframe_row_chunks(new_data_dfs, chunk_cells = 1048576):
+    """Yield row chunks of side by side DataFrame's
+
+       Chunks hold about chunk_cells values, so DataFrame's backed by
+       memory mapped files are converted a piece at a time.
+
+    Args:
+        new_data_dfs: list of DataFrame's sharing an index
+        chunk_cells: number of values in a chunk
+
+    Returns:
+        generator of DataFrame's
+    """
+    column_count = sum(len(new_data_df.columns) for new_data_df in new_data_dfs)
+    chunk_rows = max(1, chunk_cells // max(1, column_count))
+    for start in range(0, len(new_data_dfs[0].index), chunk_rows):
+        if len(new_data_dfs) == 1:
+            yield new_data_dfs[0].iloc[start:start + chunk_rows]
+        else:
+            yield pd.concat([new_data_df.iloc[start:start + chunk_rows]
+                             for new_data_df in new_data_dfs], axis = 1)
+
+def csf_output_by_dataframes(file_path, delimiter, new_data_dfs,
+        float_format, date_format, date_is_posted,
+        mia_value = 'NaN'):
+    """Post side by side DataFrame's to a column slot text file a chunk at a time
+
+    Args:
+        file_path: fully specified file path
+        delimiter: delimiter
+        new_data_dfs: list of DataFrame's sharing an index
+        float_format: floating point number format
+        date_format: date format
+        date_is_posted: date is posted flag
+        mia_value: missing value
+
+    Returns:
+        success: True or False
+    """
+    logging.debug('  Posting specified data to a text column slot file')
+    try:
+        with open(file_path, 'w', newline = '') as file_f:
+            for chunk_count, chunk_df in enumerate(dataframe_row_chunks(new_data_dfs)):
+                chunk_df.to_csv(file_f, sep = delimiter, header = chunk_count == 0,
+                        index = date_is_posted, date_format = date_format,
+                        float_format = float_format, na_rep = mia_value)
+        return True
+    except:
+        logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred posting csv output data')
+        return False
+
 def rdb_output_by_df_nodate_formatting(file_path, 
         delimiter, new_data_df, float_format, 
         date_format, mia_value = 'NaN'):
@@ -1130,7 +1131,7 @@ def rdb_output_by_df_nodate_formatting(file_path,
          
 def rdb_output_by_dataframe(file_path, delimiter, 
         new_data_df, float_format, date_format, 
-        date_is_posted, mia_value = 'NaN'):
+        date_is_posted, mia_value = 'NaN', append_flag = False):
     """Post a DataFrame to an rdb text file
 
     Args:
@@ -1141,6 +1142,7 @@ def rdb_output_by_dataframe(file_path, delimiter,
         date_format: date format
         date_is_posted: date is posted flag
         mia_value: missing value
+        append_flag: True to append records without header to file
     """
     logging.debug('  Posting specified data to a text rdb')
     dates_dti = pd.to_datetime(new_data_df.index)
@@ -1163,7 +1165,7 @@ def rdb_output_by_dataframe(file_path, delimiter,
             column_df['Station'] = station
             column_df['Parameter'] = param
             if float_format is None:
-                if staCount == 0:
+                if staCount == 0 and not append_flag:
                     column_df.to_csv(path_or_buf = file_path, sep = delimiter, 
                                 index = False, na_rep = mia_value)
                 else:
@@ -1171,7 +1173,7 @@ def rdb_output_by_dataframe(file_path, delimiter,
                                 index = False, na_rep = mia_value,
                                 header = False, mode = 'a')
             else:    # formatted output causes loss of precision
-                if staCount == 0:
+                if staCount == 0 and not append_flag:
                     column_df.to_csv(path_or_buf = file_path, sep = delimiter,
                         index = False, float_format = float_format, na_rep = mia_value)
                 else:
@@ -1413,7 +1415,7 @@ def wb_output_via_df_dict_xlsxwriter(wb_path, ws_names, new_data_dict,
                         # new data exist in a common worksheet name - merge data
 
                         key_index = ws_names.index(sn)
-                        key_name = new_data_dict.keys()[key_index]
+                        key_name = list(new_data_dict.keys())[key_index]
                         new_data_df = new_data_dict[key_name]
                         if replace_flag:
                             # replace existing period with new period
@@ -1596,7 +1598,7 @@ def wb_output_via_df_dict_openpyxl(wb_path, ws_names, new_data_dict,
                 wb.remove_sheet(wb[ws_name])
             ws = wb.create_sheet(title = ws_name)
             key_index = ws_names.index(ws_name)
-            key_name = new_data_dict.keys()[key_index]
+            key_name = list(new_data_dict.keys())[key_index]
             new_data_df = new_data_dict[key_name]
             if ws_name in existing_sheets:
                 # merge new data with existing data
@@ -1721,3 +1723,247 @@ def wb_output_via_df_dict_openpyxl(wb_path, ws_names, new_data_dict,
     except:
         logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred posting workbook data from dictionary')
         sys.exit()
+
+# Excel worksheet size limits, including header row and date column
+wb_max_rows = 1048576
+wb_max_columns = 16384
+
+def excel_number_format(float_format):
+    """Converts python float format such as %10.6f to Excel number format
+
+     Args:
+        float_format: python or Excel number format
+
+    Returns:
+        Excel number format or None
+    """
+    if float_format is None or '%' not in float_format:
+        return float_format
+    try:
+        precision = int(float_format.split('.')[1].rstrip('fFeEgG'))
+    except (IndexError, ValueError):
+        return None
+    if precision < 1:
+        return '0'
+    return '0.' + '0' * precision
+
+def excel_date_format(date_format):
+    """Converts python strftime date format to Excel date format
+
+     Args:
+        date_format: python or Excel date format
+
+    Returns:
+        Excel date format or None
+    """
+    if date_format is None or '%' not in date_format:
+        return date_format
+    for py_code, xl_code in [('%Y', 'yyyy'), ('%y', 'yy'), ('%m', 'mm'), ('%d', 'dd'),
+            ('%j', 'ddd'), ('%H', 'hh'), ('%M', 'mm'), ('%S', 'ss')]:
+        date_format = date_format.replace(py_code, xl_code)
+    return date_format
+
+def columnar_output_by_dataframe(file_path, new_data_df):
+    """Post a date indexed DataFrame to a parquet file, csv if pyarrow is not installed
+
+       Rows are posted a chunk at a time, one parquet row group per chunk.
+
+     Args:
+        file_path: fully specified file path without extension
+        new_data_df: new data DataFrame or list of side by side DataFrame's
+
+    Returns:
+        fully specified path of posted file
+    """
+    if isinstance(new_data_df, pd.DataFrame):
+        new_data_dfs = [new_data_df]
+    else:
+        new_data_dfs = new_data_df
+    if pyarrow is not None:
+        file_path += '.parquet'
+        pq_writer = None
+        for chunk_df in dataframe_row_chunks(new_data_dfs):
+            table = pyarrow.Table.from_pandas(chunk_df, preserve_index = True)
+            if pq_writer is None:
+                pq_writer = pyarrow.parquet.ParquetWriter(file_path, table.schema)
+            pq_writer.write_table(table)
+        if pq_writer is None:
+            pd.concat(new_data_dfs, axis = 1).to_parquet(file_path, engine = 'pyarrow', index = True)
+        else:
+            pq_writer.close()
+    else:
+        logging.warning('  pyarrow is not installed, posting csv')
+        file_path += '.csv'
+        with open(file_path, 'w', newline = '') as file_f:
+            for chunk_count, chunk_df in enumerate(dataframe_row_chunks(new_data_dfs)):
+                chunk_df.to_csv(file_f, header = chunk_count == 0, index = True)
+    return file_path
+
+def _ws_stream_xlsxwriter(wb, ws_name, new_data_df, formats, column_width,
+        mia_value, chunk_rows):
+    """Streams a DataFrame to a worksheet of a constant memory xlsxwriter workbook"""
+    ws = wb.add_worksheet(ws_name)
+    ws.set_column(0, 0, column_width)
+    ws.set_column(1, len(new_data_df.columns), 10)
+    ws.freeze_panes(1, 1)
+    ws.write_row(0, 0, ['Date'] + list(new_data_df.columns), formats['header'])
+    row_count = 0
+    for start in range(0, len(new_data_df.index), chunk_rows):
+        chunk_df = new_data_df.iloc[start:start + chunk_rows]
+        dates = chunk_df.index.to_pydatetime()
+        values = chunk_df.astype(object).where(chunk_df.notnull(), mia_value).values.tolist()
+        for dt, row in zip(dates, values):
+            row_count += 1
+            ws.write_datetime(row_count, 0, dt, formats['date'])
+            ws.write_row(row_count, 1, row, formats['float'])
+        del chunk_df, dates, values
+
+def _ws_stream_openpyxl(wb, ws_name, new_data_df, formats, column_width,
+        mia_value, chunk_rows):
+    """Streams a DataFrame to a worksheet of a write only openpyxl workbook"""
+    ws = wb.create_sheet(title = ws_name)
+    ws.column_dimensions['A'].width = column_width
+    for column in range(len(new_data_df.columns)):
+        ws.column_dimensions[op.utils.cell.get_column_letter(column + 2)].width = 10.00
+    ws.freeze_panes = 'B2'
+    header_row = []
+    for column_name in ['Date'] + list(new_data_df.columns):
+        cur_cell = op.cell.WriteOnlyCell(ws, value = column_name)
+        cur_cell.font = op.styles.Font(bold = True)
+        cur_cell.alignment = op.styles.alignment.Alignment(wrap_text = True)
+        header_row.append(cur_cell)
+    ws.append(header_row)
+    for start in range(0, len(new_data_df.index), chunk_rows):
+        chunk_df = new_data_df.iloc[start:start + chunk_rows]
+        dates = chunk_df.index.to_pydatetime()
+        values = chunk_df.astype(object).where(chunk_df.notnull(), mia_value).values.tolist()
+        for dt, row in zip(dates, values):
+            date_cell = op.cell.WriteOnlyCell(ws, value = dt)
+            date_cell.font = op.styles.Font(bold = True)
+            if formats['date'] is not None:
+                date_cell.number_format = formats['date']
+            if formats['float'] is not None:
+                value_cells = []
+                for value in row:
+                    value_cell = op.cell.WriteOnlyCell(ws, value = value)
+                    value_cell.number_format = formats['float']
+                    value_cells.append(value_cell)
+                row = value_cells
+            ws.append([date_cell] + row)
+        del chunk_df, dates, values
+
+def wb_output_via_df_dict_streaming(wb_path, ws_names, new_data_dict,
+        float_format, date_format, time_step, ts_quantity,
+        mia_value = 'NaN', wyem = 12, chunk_rows = 10000):
+    """Post a dictionary of DataFrame's to a new workbook in constant memory
+
+       Worksheets are streamed to the file a row at a time, through a
+       constant memory xlsxwriter workbook or, if xlsxwriter is not
+       installed, a write only openpyxl workbook.  Rows are converted
+       chunk_rows at a time.  An existing workbook is replaced, not
+       merged with.
+
+       DataFrame's with more rows or columns than fit in a worksheet are
+       posted to a parquet file (csv if pyarrow is not installed) named
+       after workbook and worksheet, next to workbook.
+
+    Args:
+        wb_path: fully specified workbook path
+        ws_names: list of worksheet names
+        new_data_dict: dictionary of data frames to post
+        float_format: floating point number format, python or Excel
+        date_format: date format, python or Excel
+        time_step: RiverWare style string timestep
+        ts_quantity: Interger number of time_steps's in interval
+        mia_value: missing value
+        wyem: Water Year End Month
+        chunk_rows: number of rows converted at a time
+
+    Returns:
+        success: True or False
+    """
+    try:
+        time_freq = get_ts_freq(time_step, ts_quantity, wyem)
+        if 'T' in time_freq or 'H' in time_freq: # minute or hourly output
+            column_width = 16.0
+        elif 'D' in time_freq: # daily output
+            column_width = 12.0
+        elif 'M' in time_freq: # post monthly output
+            column_width = 11.0
+        elif 'A' in time_freq: # post annual output
+            column_width = 10.0
+        else:
+            column_width = 12.0
+
+        # post worksheets too large for a workbook to columnar files
+
+        wb_sheets = []
+        for ws_name, new_data_df in zip(ws_names, new_data_dict.values()):
+            if (len(new_data_df.index) + 1 > wb_max_rows or
+                    len(new_data_df.columns) + 1 > wb_max_columns):
+                columnar_path = columnar_output_by_dataframe(
+                    '{}_{}'.format(os.path.splitext(wb_path)[0], ws_name), new_data_df)
+                logging.warning('  Worksheet {} exceeds workbook size limits, posted to\n  {}'.format(
+                    ws_name, columnar_path))
+            else:
+                wb_sheets.append((ws_name, new_data_df))
+        if len(wb_sheets) < 1:
+            return True
+        if os.path.isfile(wb_path):
+            logging.warning('  Existing workbook is replaced by streamed worksheets\n  {}'.format(wb_path))
+        formats = {'float': excel_number_format(float_format),
+                   'date': excel_date_format(date_format)}
+        if xlsxwriter is not None:
+            wb = xlsxwriter.Workbook(wb_path, {'constant_memory': True})
+            formats['header'] = wb.add_format({'bold': True, 'text_wrap': True})
+            formats['date'] = wb.add_format({'bold': True, 'num_format': formats['date'] or 'yyyy-mm-dd'})
+            if formats['float'] is not None:
+                formats['float'] = wb.add_format({'num_format': formats['float']})
+            for ws_name, new_data_df in wb_sheets:
+                _ws_stream_xlsxwriter(wb, ws_name, new_data_df, formats,
+                        column_width, mia_value, chunk_rows)
+            wb.close()
+        else:
+            wb = op.Workbook(write_only = True)
+            for ws_name, new_data_df in wb_sheets:
+                _ws_stream_openpyxl(wb, ws_name, new_data_df, formats,
+                        column_width, mia_value, chunk_rows)
+            wb.save(wb_path)
+        del wb
+        return True
+    except:
+        logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred streaming workbook data from dictionary')
+        return False
+
+def wb_output_via_df_dict(wb_path, ws_names, new_data_dict,
+        float_format, date_format, time_step, ts_quantity,
+        mia_value = 'NaN', replace_flag = True, wyem = 12, stream_flag = False):
+    """Post a dictionary of DataFrame's to a workbook
+
+       Merges worksheets with existing workbook content through openpyxl
+       unless stream_flag is True, which writes a new workbook replacing
+       the existing one.
+
+    Args:
+        wb_path: fully specified workbook path
+        ws_names: list of worksheet names
+        new_data_dict: dictionary of data frames to post
+        float_format: floating point number format
+        date_format: date format
+        time_step: RiverWare style string timestep
+        ts_quantity: Interger number of time_steps's in interval
+        mia_value: missing value
+        replace_flag: True or False, used if not streamed
+        wyem: Water Year End Month
+        stream_flag: True or False
+
+    Returns:
+        success: True or False
+    """
+    if stream_flag:
+        return wb_output_via_df_dict_streaming(wb_path, ws_names, new_data_dict,
+                float_format, date_format, time_step, ts_quantity,
+                mia_value, wyem)
+    return wb_output_via_df_dict_openpyxl(wb_path, ws_names, new_data_dict,
+            float_format, excel_date_format(date_format), time_step, ts_quantity,
+            mia_value, replace_flag, wyem)
@@ -0,0 +1,182 @@
+"""period_agg.py
+Monthly and annual aggregation of daily time series
+Period boundaries of a date index are computed once as first row positions
+    and many series are reduced at once with np.add.reduceat, in lieu of
+    DataFrame.resample().apply() with a dictionary of functions
+Annual periods are calendar years or water years ending in a given month
+Called by crop_cycle.py, met_nodes.py and aet_cells.py
+
+"""
+
+import numpy as np
+import pandas as pd
+
+# Aggregation names of functions used in resample dictionaries
+agg_names = {np.sum: 'sum', np.nansum: 'sum', np.mean: 'mean', np.nanmean: 'mean',
+             'sum': 'sum', 'mean': 'mean'}
+
+
+class PeriodBounds():
+    """First row positions and labels of periods of a date index
+
+    Attributes
+    ----------
+    starts : array
+        position of first row of each period, an empty period starts at
+        the first row of the next period
+    counts : array
+        number of rows in each period
+    labels : DatetimeIndex
+        period start or end dates
+
+    """
+
+    def __init__(self, starts, counts, labels):
+        """ """
+        self.starts = starts
+        self.counts = counts
+        self.labels = labels
+
+
+def period_bounds(dt_index, period, wyem = 12, label = 'start'):
+    """Compute periods of a sorted date index
+
+    Parameters
+    ---------
+    dt_index : DatetimeIndex
+        sorted dates
+    period : str
+        'month' or 'year'
+    wyem : int
+        water year end month of annual periods, 12 for calendar years
+    label : str
+        'start' to label periods by first day (resample 'MS', 'YS'),
+        'end' by last day (resample 'ME', 'YE-<wyem>')
+
+    Returns
+    -------
+    PeriodBounds
+
+    Notes
+    -----
+    Periods run from period of first date to period of last date, so
+    periods without dates are included as resample does.
+
+    """
+
+    dt_index = pd.DatetimeIndex(dt_index)
+    month_ids = dt_index.year.values.astype(np.int64) * 12 + dt_index.month.values - 1
+    if period == 'month':
+        period_ids = month_ids
+    elif period == 'year':
+        period_ids = (month_ids - wyem) // 12 + 1
+    else:
+        raise ValueError('Unsupported period {}'.format(period))
+    if len(period_ids) == 0:
+        all_ids = period_ids
+    else:
+        all_ids = np.arange(period_ids[0], period_ids[-1] + 1)
+    edges = np.searchsorted(period_ids, np.append(all_ids, all_ids[-1:] + 1))
+    starts = edges[:-1]
+    counts = np.diff(edges)
+
+    # label months as datetime64 months since epoch
+
+    if period == 'month':
+        first_months = all_ids
+        last_months = all_ids
+    else:
+        first_months = (all_ids - 1) * 12 + wyem
+        last_months = all_ids * 12 + wyem - 1
+    if label == 'start':
+        labels = (first_months - 1970 * 12).astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        labels = (last_months + 1 - 1970 * 12).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    labels = pd.DatetimeIndex(labels, name = dt_index.name).as_unit(dt_index.unit)
+    return PeriodBounds(starts, counts, labels)
+
+
+def aggregate(values, bounds, how = 'sum'):
+    """Aggregate rows of one or more series by period
+
+    Parameters
+    ---------
+    values : array
+        rows by series, or a single series
+    bounds : PeriodBounds
+        periods of rows
+    how : str
+        'sum' or 'mean'; missing values are skipped, sums of periods
+        without values are 0 and means are NaN
+
+    Returns
+    -------
+     : array
+        periods by series, or by period for a single series
+
+    """
+
+    values = np.asarray(values)
+    if len(bounds.starts) == 0:
+        return np.empty((0,) + values.shape[1:], dtype = float if how == 'mean' else values.dtype)
+    empty = bounds.counts == 0
+    starts = np.minimum(bounds.starts, len(values) - 1)
+    if values.dtype.kind in 'biu':
+        sums = np.add.reduceat(values.astype(np.int64) if values.dtype.kind == 'b' else values, starts, axis = 0)
+        sums[empty] = 0
+        if how == 'sum':
+            return sums
+        counts = bounds.counts.reshape((-1,) + (1,) * (values.ndim - 1))
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    missing = np.isnan(values)
+    sums = np.add.reduceat(np.where(missing, 0.0, values), starts, axis = 0)
+    sums[empty] = 0.0
+    if how == 'sum':
+        return sums
+    counts = np.add.reduceat(~missing, starts, axis = 0)
+    counts[empty] = 0
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def aggregate_df(input_df, agg_funcs, period, wyem = 12, label = 'start'):
+    """Aggregate date indexed DataFrame columns by period
+
+    Parameters
+    ---------
+    input_df : pandas.DataFrame
+        data indexed by sorted dates
+    agg_funcs : dict
+        aggregation function (np.sum, np.mean, 'sum' or 'mean') by column
+        name, as passed to resample().apply()
+    period : str
+        'month' or 'year'
+    wyem : int
+        water year end month of annual periods
+    label : str
+        'start' or 'end' of period
+
+    Returns
+    -------
+     : pandas.DataFrame
+        agg_funcs columns indexed by period label
+
+    Notes
+    -----
+    Columns sharing a dtype and aggregation are reduced together.
+
+    """
+
+    bounds = period_bounds(input_df.index, period, wyem, label)
+    hows = dict((col_name, agg_names[func]) for col_name, func in agg_funcs.items())
+    groups = {}
+    for col_name, how in hows.items():
+        groups.setdefault((input_df[col_name].dtype, how), []).append(col_name)
+    output_data = {}
+    for (dtype, how), col_names in groups.items():
+        agg_values = aggregate(input_df[col_names].values, bounds, how)
+        for cc, col_name in enumerate(col_names):
+            output_data[col_name] = agg_values[:, cc]
+    return pd.DataFrame(dict((col_name, output_data[col_name]) for col_name in hows),
+                        index = bounds.labels)
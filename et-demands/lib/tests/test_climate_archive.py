@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import climate_archive
+
+
+def write_station(station_ws, station_id, start, periods, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=periods)
+    station_df = pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'), 'Year': dates.year,
+        'TMax': rng.normal(20, 5, periods), 'Prcp': rng.gamma(0.3, 4, periods),
+        'Source': 'gauge'})
+    station_df.loc[3, 'TMax'] = np.nan
+    station_path = os.path.join(station_ws, '{}_met.csv'.format(station_id))
+    station_df.to_csv(station_path, index=False)
+    return pd.read_csv(station_path, engine='python')
+
+
+def test_climate_archive(tmp_path):
+    station_ws = str(tmp_path)
+    archive_ws = os.path.join(station_ws, 'archive')
+    expected = {
+        'STN1': write_station(station_ws, 'STN1', '2000-01-01', 400, 0),
+        'STN2': write_station(station_ws, 'STN2', '2000-06-01', 300, 1)}
+    # dates not a run of the shared date index
+    gap_df = write_station(station_ws, 'STN3', '2000-01-01', 10, 2)
+    gap_df.drop(index=5).to_csv(os.path.join(station_ws, 'STN3_met.csv'),
+                                index=False)
+
+    station_files = climate_archive.station_ids(station_ws, '%s_met.csv')
+    assert [station_id for station_id, path in station_files] == [
+        'STN1', 'STN2', 'STN3']
+    assert climate_archive.build_archive(archive_ws, station_files) == 2
+
+    for station_id, station_df in expected.items():
+        archive_df = climate_archive.station_df(archive_ws, station_id)
+        assert list(archive_df.columns) == ['Year', 'TMax', 'Prcp']
+        assert archive_df['Year'].dtype == np.int64
+        np.testing.assert_array_equal(
+            archive_df.index, pd.to_datetime(station_df['Date']))
+        for field_name in archive_df.columns:
+            np.testing.assert_array_equal(
+                archive_df[field_name].values, station_df[field_name].values)
+
+        # Columns are copy on write views of the archive
+        assert isinstance(archive_df['TMax'].values.base, np.memmap)
+        archive_df.loc[archive_df.index[0], 'TMax'] = -99.
+    assert climate_archive.station_df(archive_ws, 'STN1')['TMax'].iloc[0] == \
+        expected['STN1']['TMax'].iloc[0]
+    assert climate_archive.station_df(archive_ws, 'STN3') is None
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+import growing_season
+import period_agg
+
+
+def naive_transitions(season, dates):
+    """First transitions of each year with a loop over days"""
+    start_i, end_i = [], []
+    for year in range(dates.year[0], dates.year[-1] + 1):
+        rows = np.where(dates.year == year)[0]
+        up = [r for r in rows[1:] if season[r] and not season[r - 1]]
+        down = [r for r in rows[1:] if not season[r] and season[r - 1]]
+        start_i.append(up[0] if up else -1)
+        end_i.append(down[0] - 1 if down else -1)
+    return np.array(start_i), np.array(end_i)
+
+
+def test_season_transitions():
+    dates = pd.date_range('1990-03-17', '1998-08-05')
+    rng = np.random.default_rng(0)
+    season = np.zeros((dates.size, 3, 4), dtype=int)
+    for cc in range(3):
+        for ss in range(4):
+            for year in range(1990, 1999):
+                rows = np.where(dates.year == year)[0]
+                first = rng.integers(0, rows.size)
+                last = rng.integers(first, rows.size)
+                season[rows[first:last], cc, ss] = 1
+    # season running through new year and year without season
+    season[np.where(dates.year == 1993)[0][300:], 1, 2] = 1
+    season[np.where(dates.year == 1995)[0], 2, 3] = 0
+    bounds = period_agg.period_bounds(dates, 'year')
+
+    gs = growing_season.season_transitions(season, bounds)
+    assert gs.start_i.shape == (9, 3, 4)
+    for cc in range(3):
+        for ss in range(4):
+            start_i, end_i = naive_transitions(season[:, cc, ss], dates)
+            np.testing.assert_array_equal(gs.start_i[:, cc, ss], start_i)
+            np.testing.assert_array_equal(gs.end_i[:, cc, ss], end_i)
+            single = growing_season.season_transitions(
+                season[:, cc, ss], bounds)
+            np.testing.assert_array_equal(single.start_i, start_i)
+            np.testing.assert_array_equal(single.end_i, end_i)
+    np.testing.assert_array_equal(
+        gs.length, pd.DataFrame(season.reshape(dates.size, -1), index=dates)
+        .resample('YS').sum().values.reshape(9, 3, 4))
+    assert gs.first_i[0] == 0 and gs.last_i[-1] == dates.size - 1
@@ -0,0 +1,151 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('openpyxl')
+import mod_dmis
+
+
+@pytest.fixture
+def rdb_path(tmp_path):
+    dates = pd.date_range('2000-01-01', '2001-12-31')
+    rng = np.random.default_rng(0)
+    rdb_df = pd.concat([
+        pd.DataFrame({'Station': sta, 'Parameter': param,
+                      'Date': dates.strftime('%Y-%m-%d'),
+                      'Value': rng.random(dates.size)})
+        for sta in ['STA1', 'STA2'] for param in ['ETact', 'NIWR']])
+    path = tmp_path / 'rdb.csv'
+    rdb_df.to_csv(path, index=False)
+    mod_dmis.clear_parsed_files()
+    return str(path), rdb_df
+
+
+def test_text_rdb_parsed_once(rdb_path, monkeypatch):
+    path, rdb_df = rdb_path
+    read_csv = pd.read_csv
+    reads = []
+    monkeypatch.setattr(pd, 'read_csv',
+                        lambda *a, **kw: reads.append(a) or read_csv(*a, **kw))
+
+    for sta in ['STA1', 'STA2']:
+        df = mod_dmis.ReadOneTextRDB(
+            path, 1, 1, sta, 'NIWR', 'mm', 2., 'day', 1, ',')
+        expected = rdb_df[(rdb_df.Station == sta) &
+                          (rdb_df.Parameter == 'NIWR')].Value.values
+        np.testing.assert_allclose(df['NIWR'].values, 2. * expected)
+    wide_df = mod_dmis.TextRDBToDataframe(path, 1, 1, 'day', 1, ',')
+    assert list(wide_df.columns) == [
+        'STA1.ETact', 'STA1.NIWR', 'STA2.ETact', 'STA2.NIWR']
+    df = mod_dmis.ReadOneDataframeColumn(
+        wide_df, 'STA2', 'ETact', 'mm', 1., 'day', 1,
+        wide_df.index[0], wide_df.index[-1])
+    np.testing.assert_allclose(
+        df['ETact'].values, rdb_df[(rdb_df.Station == 'STA2') &
+                                   (rdb_df.Parameter == 'ETact')].Value.values)
+    assert len(reads) == 1
+
+    # Modified file is parsed again
+    rdb_df.loc[rdb_df.Station == 'STA1', 'Value'] = 1.
+    rdb_df.to_csv(path, index=False)
+    os.utime(path, ns=(0, 0))
+    df = mod_dmis.ReadOneTextRDB(
+        path, 1, 1, 'STA1', 'NIWR', 'mm', 1., 'day', 1, ',')
+    assert len(reads) == 2
+    assert (df['NIWR'] == 1.).all()
+
+
+def test_column_slot(tmp_path):
+    dates = pd.date_range('2000-01-01', '2000-12-31')
+    cs_df = pd.DataFrame({'Date': dates.strftime('%Y-%m-%d'),
+                          'STA1.NIWR': np.arange(dates.size, dtype=float),
+                          'STA2.NIWR': -np.arange(dates.size, dtype=float)})
+    cs_df.drop(index=[10, 11]).to_csv(tmp_path / 'cs.csv', index=False)
+    path = str(tmp_path / 'cs.csv')
+    df = mod_dmis.ReadOneColumnSlot(
+        path, 1, 1, 'STA2', 'NIWR', 'mm', 1., 'day', 1, ',')
+    assert len(df.index) == dates.size
+    assert df['NIWR'].isnull().sum() == 2
+    assert df['NIWR'].iloc[12] == -12.
+    df = mod_dmis.ColumnSlotToDataframe(
+        path, 1, 1, 'day', 1, ',', pd.Timestamp('2000-03-01'),
+        pd.Timestamp('2000-03-31'))
+    assert df.shape == (31, 2)
+    assert df['STA1.NIWR'].iloc[0] == 60.
+
+
+@pytest.mark.parametrize('engine', ['xlsxwriter', 'openpyxl'])
+def test_wb_output_streaming(tmp_path, monkeypatch, caplog, engine):
+    if engine == 'xlsxwriter' and mod_dmis.xlsxwriter is None:
+        pytest.skip('xlsxwriter is not installed')
+    if engine == 'openpyxl':
+        monkeypatch.setattr(mod_dmis, 'xlsxwriter', None)
+    dates = pd.date_range('2000-01-01', periods=50, name='Date')
+    rng = np.random.default_rng(0)
+    small_df = pd.DataFrame(rng.random((50, 3)), index=dates,
+                            columns=['STA1', 'STA2', 'STA3'])
+    small_df.iloc[4, 1] = np.nan
+    large_df = small_df.reindex(pd.date_range('2000-01-01', periods=80,
+                                              name='Date'))
+    monkeypatch.setattr(mod_dmis, 'wb_max_rows', 60)
+    wb_path = str(tmp_path / 'aet.xlsx')
+    assert mod_dmis.wb_output_via_df_dict_streaming(
+        wb_path, ['ETact', 'NIWR'], {'ETact': small_df, 'NIWR': large_df},
+        '%10.6f', '%Y-%m-%d', 'day', 1, chunk_rows=7)
+
+    ws_df = pd.read_excel(wb_path, sheet_name=None, index_col=0,
+                          na_values='NaN')
+    assert list(ws_df) == ['ETact']
+    pd.testing.assert_frame_equal(ws_df['ETact'], small_df,
+                                  check_index_type=False, check_freq=False)
+
+    # worksheet over the row limit is posted to a columnar file
+    columnar_path = [name for name in os.listdir(tmp_path)
+                     if name.startswith('aet_NIWR')]
+    assert len(columnar_path) == 1
+
+    # streaming replaces an existing workbook, with a warning
+    with caplog.at_level(logging.WARNING):
+        assert mod_dmis.wb_output_via_df_dict_streaming(
+            wb_path, ['ETpot'], {'ETpot': small_df}, '%10.6f', '%Y-%m-%d',
+            'day', 1)
+    assert list(pd.read_excel(wb_path, sheet_name=None)) == ['ETpot']
+    assert 'Existing workbook is replaced' in caplog.text
+
+    # default posting merges with existing workbook content
+    assert mod_dmis.wb_output_via_df_dict(
+        wb_path, ['ETact'], {'ETact': small_df}, '%10.6f', '%Y-%m-%d',
+        'day', 1)
+    assert list(pd.read_excel(wb_path, sheet_name=None)) == ['ETpot', 'ETact']
+
+
+def test_csf_output_by_dataframes(tmp_path, monkeypatch):
+    monkeypatch.setattr(mod_dmis.dataframe_row_chunks, '__defaults__', (50,))
+    dates = pd.date_range('2000-01-01', periods=100, name='Date')
+    rng = np.random.default_rng(0)
+    param_dfs = [pd.DataFrame(rng.random((100, 2)), index=dates,
+                              columns=['STA1.' + param, 'STA2.' + param])
+                 for param in ['ETact', 'NIWR']]
+    param_dfs[1].iloc[7, 0] = np.nan
+    path = str(tmp_path / 'chunked.csv')
+    assert mod_dmis.csf_output_by_dataframes(
+        path, ',', param_dfs, '%10.6f', '%Y-%m-%d', True)
+    expected_path = str(tmp_path / 'whole.csv')
+    assert mod_dmis.csf_output_by_dataframe(
+        expected_path, ',', pd.concat(param_dfs, axis=1), '%10.6f',
+        '%Y-%m-%d', True)
+    with open(path) as f, open(expected_path) as expected_f:
+        assert f.read() == expected_f.read()
+
+    # columnar output is posted a row group at a time
+    columnar_path = mod_dmis.columnar_output_by_dataframe(
+        str(tmp_path / 'columnar'), param_dfs)
+    columnar_df = (pd.read_parquet(columnar_path)
+                   if columnar_path.endswith('.parquet')
+                   else pd.read_csv(columnar_path, index_col=0,
+                                    parse_dates=True))
+    pd.testing.assert_frame_equal(columnar_df, pd.concat(param_dfs, axis=1),
+                                  check_freq=False)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import period_agg
+
+
+@pytest.mark.parametrize('period, wyem, label, freq', [
+    ('month', 12, 'start', 'MS'), ('year', 12, 'start', 'YS'),
+    ('month', 12, 'end', 'ME'), ('year', 12, 'end', 'YE'),
+    ('year', 9, 'end', 'YE-SEP'), ('year', 9, 'start', 'YS-OCT')])
+def test_aggregate_df(period, wyem, label, freq):
+    dates = pd.date_range('1990-03-17', '1996-08-05', name='Date')
+    rng = np.random.default_rng(0)
+    daily_df = pd.DataFrame({
+        'ETact': rng.random(dates.size), 'Kc': rng.random(dates.size),
+        'Season': rng.integers(0, 2, dates.size), 'Year': dates.year},
+        index=dates)
+    daily_df.iloc[5:40, 0] = np.nan
+    daily_df.iloc[100, 1] = np.nan
+    # months without any dates
+    daily_df = daily_df.drop(dates[400:480])
+    agg_funcs = {'Kc': np.mean, 'ETact': np.sum, 'Season': np.sum,
+                 'Year': np.mean}
+
+    agg_df = period_agg.aggregate_df(daily_df, agg_funcs, period, wyem, label)
+    pd.testing.assert_frame_equal(
+        agg_df, daily_df.resample(freq).apply(agg_funcs), check_freq=False)
+
+
+def test_aggregate_stacked_series():
+    dates = pd.date_range('2000-01-01', '2001-12-31')
+    values = np.ones((dates.size, 3, 2))
+    bounds = period_agg.period_bounds(dates, 'year')
+    np.testing.assert_array_equal(
+        period_agg.aggregate(values, bounds)[:, 0, 0], [366, 365])
+    np.testing.assert_array_equal(bounds.labels.year, [2000, 2001])
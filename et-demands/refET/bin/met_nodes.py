@@ -10,10 +10,14 @@ import sys
 
 import numpy as np
 import pandas as pd
+import refet
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../lib')))
+import climate_archive
+import period_agg
 import ref_et_data
 import ret_utils
+import ret_writer
 
 
 # MOVE TO UNIT CONVERSION SCRIPT / SECTION
@@ -303,6 +307,25 @@ class MetNode():
         if not success:
             logging.error('Unable to read and fill daily input meteorological data.')
             return False
+        return self.fill_met_data(cfg, mnd)
+
+    def fill_met_data(self, cfg, mnd):
+        """Convert units and fill missing values of input_met_df
+
+        Parameters
+        ---------
+        cfg :
+            configuration data from INI file
+        mnd : dict
+            Met node data
+
+        Returns
+        -------
+        : boolean
+            True
+            False
+
+        """
 
         # Check/modify units
         for field_key, field_units in cfg.input_met['units'].items():
@@ -354,89 +377,64 @@ class MetNode():
 
         # contrain max temperatures to 120 F and min temperature to 90 F
 
-        self.input_met_df['tmax'] = self.input_met_df[['tmax']].apply(lambda s: ret_utils.max_max_temp(*s), axis = 1, raw = True, result_type='reduce')
-        self.input_met_df['tmin'] = self.input_met_df[['tmin']].apply(lambda s: ret_utils.max_min_temp(*s), axis = 1, raw = True, result_type='reduce')
-
-        # fill missing tmax data
+        self.input_met_df['tmax'] = ret_utils.max_max_temp(self.input_met_df['tmax'].values.astype(np.float64))
+        self.input_met_df['tmin'] = ret_utils.max_min_temp(self.input_met_df['tmin'].values.astype(np.float64))
 
-        # interpolation fails if at least one value is not filled - used try and except to overcome
+        # fill missing values by interpolation and average monthly values
+        # average monthly values are looked up by month of each day
 
-        try:    # fill by interpolation
-            self.input_met_df['tmax'].interpolate(method = 'time', limit = 3, limit_direction = 'both', inplace = True)
-        except: pass
-        try:    # fill with average monthly values
-            for dt, month in sorted(self.input_met_df['month'].items()):
-                if pd.isnull(self.input_met_df.at[dt, 'tmax']):
-                   self.input_met_df.at[dt, 'tmax'] = mnd.avg_monthly_tmax[self.met_node_id][month - 1]
-        except: pass
+        months = self.input_met_df['month'].values
+        self.fill_report = {}
 
-        # fill missing tmin data
+        # fill missing tmax and tmin data
 
-        try:    # fill by interpolation
-            self.input_met_df['tmin'].interpolate(method = 'time', limit = 3, limit_direction = 'both', inplace = True)
-        except: pass
-        try:    # fill with average monthly values
-            for dt, month in sorted(self.input_met_df['month'].items()):
-                if pd.isnull(self.input_met_df.at[dt, 'tmin']):
-                   self.input_met_df.at[dt, 'tmin'] = mnd.avg_monthly_tmin[self.met_node_id][month - 1]
-        except: pass
+        self.fill_missing_values('tmax', months, interpolate = True,
+            avg_monthly = self.avg_monthly_values(mnd.avg_monthly_tmax, self.met_node_id))
+        self.fill_missing_values('tmin', months, interpolate = True,
+            avg_monthly = self.avg_monthly_values(mnd.avg_monthly_tmin, self.met_node_id))
 
         # don't allow tmin to be more than tmax
 
-        self.input_met_df['tmax'] = self.input_met_df[['tmax', 'tmin']].apply(lambda s: max(*s), axis = 1, raw = True, result_type='reduce')
+        self.input_met_df['tmax'] = np.where(self.input_met_df['tmin'] > self.input_met_df['tmax'],
+            self.input_met_df['tmin'], self.input_met_df['tmax'])
 
         # Scale wind height to 2m if necessary
 
         if 'wind' in input_met_columns:
             if cfg.input_met['wind_height'] != 2:
                 self.input_met_df['wind'] = refet.calcs._wind_height_adjust(self.input_met_df['wind'], cfg.input_met['wind_height'])
-
-            # fill missing wind by interpolation
-
-            try:
-                self.input_met_df['wind'].interpolate(method = 'time', limit = 3, limit_direction = 'both', inplace = True)
-            except: pass
         else:
             self.input_met_df['wind'] = np.nan
 
-        # fill missing wind with average monthly values
+        # fill missing wind by interpolation and with average monthly values
 
-        try:    # fill with average monthly values
-            for dt, month in sorted(self.input_met_df['month'].items()):
-                if pd.isnull(self.input_met_df.at[dt, 'wind']):
-                   self.input_met_df.at[dt, 'wind'] = mnd.avg_monthly_wind[self.wind_id][month - 1]
-        except: pass
+        self.fill_missing_values('wind', months, interpolate = 'wind' in input_met_columns,
+            avg_monthly = self.avg_monthly_values(mnd.avg_monthly_wind, self.wind_id))
 
         # Add precip, snow and snow_depth if necessary; otherwise, fill missing values with zeros
 
-        if 'ppt' not in self.input_met_df.columns:
-            self.input_met_df['ppt'] = 0
-        else:
-            self.input_met_df['ppt'].fillna(0)
-        if 'snow' not in self.input_met_df.columns:
-            self.input_met_df['snow'] = 0
-        else:
-            self.input_met_df['snow'].fillna(0)
-        if 'snow_depth' not in self.input_met_df.columns:
-            self.input_met_df['snow_depth'] = 0
-        else:
-            self.input_met_df['snow_depth'].fillna(0)
+        for fn in ['ppt', 'snow', 'snow_depth']:
+            if fn not in self.input_met_df.columns:
+                self.input_met_df[fn] = 0
+            else:
+                self.fill_missing_values(fn, months, fill_values = 0.0)
 
         # Calculate TDew from specific humidity or TMin and Ko
-        if 'tdew' in input_met_columns:
-            try:    # fill by interpolation
-                self.input_met_df['tdew'].interpolate(method = 'time', limit = 3, limit_direction = 'both', inplace = True)
-            except: pass
-        else:
+        if 'tdew' not in input_met_columns:
             self.input_met_df['tdew'] = np.nan
             if 'q' in self.input_met_df.columns:
                 self.input_met_df['tdew'] = ret_utils.tdew_from_ea(ret_utils.ea_from_q(
                     self.air_pressure, self.input_met_df['q'].values))
-        try:    # fill missing values with tmin minus average monthly Ko
-            for dt, month in sorted(self.input_met_df['month'].items()):
-                if pd.isnull(self.input_met_df.at[dt, 'tdew']):
-                   self.input_met_df.at[dt, 'tdew'] = self.input_met_df.at[dt, 'tmin'] - mnd.avg_monthly_Ko[self.Ko_id][month - 1]
-        except:
+
+        # fill missing values with tmin minus average monthly Ko
+        avg_monthly_Ko = self.avg_monthly_values(mnd.avg_monthly_Ko, self.Ko_id)
+        if avg_monthly_Ko is None:
+            tdew_fill = None
+        else:
+            tdew_fill = self.input_met_df['tmin'].values - ret_utils.avg_monthly_to_daily(avg_monthly_Ko, months)
+        self.fill_missing_values('tdew', months, interpolate = 'tdew' in input_met_columns,
+            fill_values = tdew_fill, fill_name = 'tmin_Ko')
+        if avg_monthly_Ko is None and self.fill_report['tdew']['remaining'] > 0:
             logging.error('Unable to develop dew point temperature data.')
             return False
 
@@ -444,24 +442,105 @@ class MetNode():
 
         if 'rs' not in self.input_met_df.columns: self.input_met_df['rs'] = np.nan
         try:
-            for dt, doy in sorted(self.input_met_df['doy'].items()):
-                if pd.isnull(self.input_met_df.at[dt, 'rs']):
-                    self.input_met_df.at[dt, 'rs'] = ret_utils.rs_daily(doy,
-                        self.input_met_df.at[dt, 'tmax'],
-                        self.input_met_df.at[dt,'tmin'],
-                        self.input_met_df.at[dt, 'tdew'],
-                        self.elevation,
-                        self.latitude,
-                        mnd.avg_monthly_tmax[self.met_node_id][self.input_met_df['month'][dt] - 1],
-                        mnd.avg_monthly_tmin[self.met_node_id][self.input_met_df['month'][dt] - 1],
-                        self.TR_b0,
-                        self.TR_b1,
-                        self.TR_b2)
+            rs_missing = self.input_met_df['rs'].isnull().values
+            if rs_missing.any():
+                rs_df = self.input_met_df.loc[rs_missing]
+                rs = np.full(len(self.input_met_df.index), np.nan)
+                rs[rs_missing] = ret_utils.rs_daily(rs_df['doy'].values,
+                    rs_df['tmax'].values, rs_df['tmin'].values, rs_df['tdew'].values,
+                    self.elevation, self.latitude,
+                    ret_utils.avg_monthly_to_daily(mnd.avg_monthly_tmax[self.met_node_id], rs_df['month'].values),
+                    ret_utils.avg_monthly_to_daily(mnd.avg_monthly_tmin[self.met_node_id], rs_df['month'].values),
+                    self.TR_b0, self.TR_b1, self.TR_b2)
+            else:
+                rs = None
+            self.fill_missing_values('rs', months, fill_values = rs, fill_name = 'estimated')
         except:
-            logging.error('Unable to develop solar radiation.' + str(dt) + str(doy))
+            logging.error('Unable to develop solar radiation.')
             return False
+        for fn, counts in self.fill_report.items():
+            logging.debug('  {0}: {1}'.format(fn, ', '.join(
+                '{0} {1}'.format(k, v) for k, v in counts.items())))
         return True
 
+    def avg_monthly_values(self, avg_monthly_data, node_id):
+        """Average monthly values of node
+
+        Parameters
+        ---------
+        avg_monthly_data : dict
+            average monthly values keyed by node id
+        node_id : str
+            node id
+
+        Returns
+        -------
+        : list or None
+            average monthly values or None if node has no values
+
+        """
+
+        try:
+            avg_monthly = avg_monthly_data[node_id]
+        except (KeyError, TypeError):
+            return None
+        if len(avg_monthly) != 12:
+            return None
+        return avg_monthly
+
+    def fill_missing_values(self, field, months, interpolate = False,
+                            avg_monthly = None, fill_values = None,
+                            fill_name = None):
+        """Fill missing values of input met field and record fill counts
+
+        Parameters
+        ---------
+        field : str
+            input_met_df field
+        months : ndarray
+            month of each time step
+        interpolate : boolean
+            if True, fill gaps of up to 3 time steps by interpolation
+        avg_monthly : list
+            average monthly values used to fill remaining values
+        fill_values : scalar or ndarray
+            values used to fill remaining values
+        fill_name : str
+            name of fill in fill report
+
+        Returns
+        -------
+        None
+
+        Notes
+        -----
+        Counts of missing, interpolated, filled and remaining values are
+        saved to fill_report[field].
+
+        """
+
+        values = self.input_met_df[field]
+        counts = {'missing': int(values.isnull().sum())}
+        if interpolate and counts['missing']:
+            # interpolation fails if at least one value is not filled
+            try:
+                values = values.interpolate(method = 'time', limit = 3, limit_direction = 'both')
+            except: pass
+            counts['interpolated'] = counts['missing'] - int(values.isnull().sum())
+        if avg_monthly is not None:
+            fill_values = ret_utils.avg_monthly_to_daily(avg_monthly, months)
+            if fill_name is None: fill_name = 'avg_monthly'
+        if fill_values is not None:
+            if fill_name is None: fill_name = 'filled'
+            missing = values.isnull().values
+            counts[fill_name] = int(missing.sum())
+            values = values.mask(missing, fill_values)
+        counts['remaining'] = int(values.isnull().sum())
+        if fill_values is not None:
+            counts[fill_name] -= counts['remaining']
+        self.input_met_df[field] = values
+        self.fill_report[field] = counts
+
     def input_met_data(self, cfg):
         """Read meteorological/climate data for single station in station files with all parameters
 
@@ -478,71 +557,253 @@ class MetNode():
 
         """
 
+        self.input_met_df, input_met_path = self.archive_met_data(cfg)
+        if self.input_met_df is None:
+            input_met_path = self.input_met_path(cfg)
+            if input_met_path is None:
+                return False
+            # Get list of 0 based line numbers to skip
+            # Ignore header but assume header was set as 1's based index
+            data_skip = [i for i in range(cfg.input_met['header_lines']) if i + 1 != cfg.input_met['names_line']]
+            self.input_met_df = pd.read_csv(input_met_path, engine = 'python',
+                    header = cfg.input_met['names_line'] - len(data_skip) - 1,
+                    skiprows = data_skip, sep = cfg.input_met['delimiter'],
+                    na_values = 'NaN')
+        logging.debug('  Columns: {0}'.format(', '.join(list(self.input_met_df.columns))))
+        self.input_met_df = self.prepare_met_data(cfg, self.input_met_df, input_met_path)
+        if self.input_met_df is None:
+            return False
+
+        # verify period
+
+        if cfg.start_dt is None:
+            pydt = self.input_met_df.index[0]
+            cfg.start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
+        if cfg.end_dt is None:
+            pydt = self.input_met_df.index[len(self.input_met_df.index) - 1]
+            cfg.end_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
+
+        # truncate period
+
+        try:
+            self.input_met_df = self.input_met_df.truncate(before = cfg.start_dt, after = cfg.end_dt)
+        except:
+            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input met data')
+            return False
+        if len(self.input_met_df.index) < 1:
+            logging.error('No values found reading met data')
+            return False
+        return True
+
+    def input_met_path(self, cfg):
+        """Path of input met data file, None if file does not exist"""
         if self.met_data_path is not None:
             input_met_path = self.met_data_path
         else:
             input_met_path = os.path.join(cfg.input_met['ws'], cfg.input_met['name_format'] % self.source_met_id)
         if not os.path.isfile(input_met_path):
             logging.error('ERROR:  input met file {} does not exist'.format(input_met_path))
-            return False
+            return None
         logging.debug('  {0}'.format(input_met_path))
-        # Get list of 0 based line numbers to skip
-        # Ignore header but assume header was set as 1's based index
-        data_skip = [i for i in range(cfg.input_met['header_lines']) if i + 1 != cfg.input_met['names_line']]
-#        self.input_met_df = pd.read_csv(input_met_path, engine = 'python',
-        self.input_met_df = pd.read_csv(input_met_path, engine = 'python',
-                header = cfg.input_met['names_line'] - len(data_skip) - 1,
-                skiprows = data_skip, sep = cfg.input_met['delimiter'],
-                na_values = 'NaN')
-        logging.debug('  Columns: {0}'.format(', '.join(list(self.input_met_df.columns))))
+        return input_met_path
+
+    def archive_met_data(self, cfg):
+        """Input met data of station from memory mapped climate archive
+
+        Parameters
+        ---------
+        cfg :
+            configuration data from INI file
+
+        Returns
+        -------
+        : tuple
+            date indexed input met data as archived and archive path,
+            (None, None) if no archive is set or station is not archived
+
+        """
+
+        if cfg.input_met.get('archive_ws') is None or self.met_data_path is not None:
+            return None, None
+        input_met_df = climate_archive.station_df(cfg.input_met['archive_ws'], self.source_met_id)
+        if input_met_df is None:
+            return None, None
+        logging.debug('  {0} in {1}'.format(self.source_met_id, cfg.input_met['archive_ws']))
+        return input_met_df, cfg.input_met['archive_ws']
+
+    def prepare_met_data(self, cfg, input_met_df, input_met_path):
+        """Check and rename fields of input met data and index on date
+
+        Parameters
+        ---------
+        cfg :
+            configuration data from INI file
+        input_met_df : pandas.DataFrame
+            input met data as read
+        input_met_path : str
+            input met data file path
+
+        Returns
+        -------
+        : pandas.DataFrame or None
+            None if a field is missing
+
+        """
 
         # Check fields
+        # Archived data is already indexed on date
 
+        archive_flag = isinstance(input_met_df.index, pd.DatetimeIndex)
         for field_key, field_name in cfg.input_met['fields'].items():
-            if (field_name is not None and field_name not in self.input_met_df.columns):
+            if archive_flag and field_key == 'date': continue
+            if (field_name is not None and field_name not in input_met_df.columns):
                 if cfg.input_met['fnspec'][field_key].lower() == 'estimated': continue
                 if cfg.input_met['fnspec'][field_key].lower() == 'unused': continue
                 logging.error(
                     ('\n  ERROR: Field "{0}" was not found in {1}\n'+
                      '    Check {2}_field value in INI file').format(
                     field_name, os.path.basename(input_met_path), field_key))
-                return False
+                return None
             # Rename dataframe fields
-            self.input_met_df = self.input_met_df.rename(columns = {field_name:field_key})
+            input_met_df = input_met_df.rename(columns = {field_name:field_key})
 
         # Convert date strings to datetimes and index on date
 
+        if archive_flag:
+            return input_met_df
         if cfg.input_met['fields']['date'] is not None:
-            self.input_met_df['date'] = pd.to_datetime(self.input_met_df['date'])
+            input_met_df['date'] = pd.to_datetime(input_met_df['date'])
         else:
             if cfg.time_step == 'day':
-                self.input_met_df['date'] = self.input_met_df[['year', 'month', 'day']].apply(
+                input_met_df['date'] = input_met_df[['year', 'month', 'day']].apply(
                     lambda s : datetime.datetime(*s),axis = 1)
             else:
-                self.input_met_df['date'] = self.input_met_df[['year', 'month', 'day', 'hour']].apply(
+                input_met_df['date'] = input_met_df[['year', 'month', 'day', 'hour']].apply(
                     lambda s : datetime.datetime(*s),axis = 1)
-        self.input_met_df.set_index('date', inplace = True)
+        return input_met_df.set_index('date')
 
-        # verify period
+    def met_data_chunks(self, cfg, read_rows = 100000):
+        """Read input met data in chunks of cfg.time_chunk_years calendar years
 
-        if cfg.start_dt is None:
-            pydt = self.input_met_df.index[0]
-            cfg.start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
+        Parameters
+        ---------
+        cfg :
+            configuration data from INI file
+        read_rows : int
+            number of rows read from file at a time
+
+        Yields
+        ------
+        window_df : pandas.DataFrame
+            input met data of chunk with halo time steps
+        period : tuple
+            first and last date of chunk output
+        None is yielded if the data could not be read.
+
+        Notes
+        -----
+        Windows extend back three time steps for the soil heat flux and,
+        on both sides, to a time step with all interpolated fields
+        present, so gap filling and reference ET of each chunk match
+        those of the whole record.
+
+        """
+
+        archive_df, input_met_path = self.archive_met_data(cfg)
+        if archive_df is not None:
+            # archived rows are sliced in place of file chunks
+            reader = (archive_df.iloc[i:i + read_rows]
+                      for i in range(0, len(archive_df.index), read_rows))
+        else:
+            input_met_path = self.input_met_path(cfg)
+            if input_met_path is None:
+                yield None
+                return
+            data_skip = [i for i in range(cfg.input_met['header_lines']) if i + 1 != cfg.input_met['names_line']]
+            reader = pd.read_csv(input_met_path, engine = 'python',
+                    header = cfg.input_met['names_line'] - len(data_skip) - 1,
+                    skiprows = data_skip, sep = cfg.input_met['delimiter'],
+                    na_values = 'NaN', chunksize = read_rows)
+        buffer_df = None
+        chunk_start = None
+        eof_flag = False
+        while not eof_flag:
+            try:
+                input_met_df = self.prepare_met_data(cfg, next(reader), input_met_path)
+            except StopIteration:
+                eof_flag = True
+            else:
+                if input_met_df is None:
+                    yield None
+                    return
+                if cfg.start_dt is None:
+                    pydt = input_met_df.index[0]
+                    cfg.start_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
+                input_met_df = input_met_df.truncate(before = cfg.start_dt, after = cfg.end_dt)
+                if buffer_df is None:
+                    buffer_df = input_met_df
+                else:
+                    buffer_df = pd.concat([buffer_df, input_met_df])
+            if buffer_df is None or len(buffer_df.index) < 1:
+                continue
+            if chunk_start is None:
+                chunk_start = buffer_df.index[0]
+            interp_fields = [fn for fn in ['tmax', 'tmin', 'wind', 'tdew'] if fn in buffer_df.columns]
+            valid = buffer_df[interp_fields].notnull().all(axis = 1).values
+
+            # yield chunks whose halo is complete
+
+            while chunk_start is not None:
+                chunk_end = pd.Timestamp(chunk_start.year + cfg.time_chunk_years, 1, 1)
+                i0 = buffer_df.index.searchsorted(chunk_start)
+                i1 = buffer_df.index.searchsorted(chunk_end)
+                valid_after = np.flatnonzero(valid[i1:])
+                if valid_after.size:
+                    window_end = i1 + valid_after[0] + 1
+                elif eof_flag:
+                    window_end = len(buffer_df.index)
+                else:
+                    break
+                window_start = self.halo_start(valid, i0)
+                yield (buffer_df.iloc[window_start:window_end],
+                       (chunk_start, buffer_df.index[i1 - 1]))
+                if i1 < len(buffer_df.index):
+                    chunk_start = buffer_df.index[i1]
+                    window_start = self.halo_start(valid, i1)
+                    buffer_df = buffer_df.iloc[window_start:]
+                    valid = valid[window_start:]
+                else:
+                    chunk_start = None
+        if buffer_df is None or len(buffer_df.index) < 1:
+            logging.error('No values found reading met data')
+            yield None
+            return
         if cfg.end_dt is None:
-            pydt = self.input_met_df.index[len(self.input_met_df.index) - 1]
+            pydt = buffer_df.index[len(buffer_df.index) - 1]
             cfg.end_dt = pd.to_datetime(datetime.datetime(pydt.year, pydt.month, pydt.day, pydt.hour, pydt.minute))
 
-        # truncate period
+    def halo_start(self, valid, i):
+        """Start of halo before position i of a time chunk
 
-        try:
-            self.input_met_df = self.input_met_df.truncate(before = cfg.start_dt, after = cfg.end_dt)
-        except:
-            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred truncating input met data')
-            return False
-        if len(self.input_met_df.index) < 1:
-            logging.error('No values found reading met data')
-            return False
-        return True
+        Parameters
+        ---------
+        valid : ndarray
+            True where all interpolated fields are present
+        i : int
+            position of first time step of chunk
+
+        Returns
+        -------
+        : int
+
+        """
+
+        # halo time steps are filled too, so the halo starts at a time
+        # step with all interpolated fields at least three steps back
+        valid_before = np.flatnonzero(valid[:max(i - 2, 0)])
+        if valid_before.size:
+            return valid_before[-1]
+        return 0
 
     def calculate_and_post_ret_data(self, cfg):
         """Computes reference et and posts reference et and met data
@@ -560,48 +821,79 @@ class MetNode():
 
         """
 
+        outputs = self.calculate_ret_outputs(cfg)
+        if outputs is None:
+            return False
+        ret_writer.post_outputs(outputs)
+        return True
+
+    def calculate_ret_outputs(self, cfg, output_period = None, append_flag = False):
+        """Computes reference et and builds reference et and met data output records
+
+        Parameters
+        ---------
+        cfg :
+            configuration data from INI file
+        output_period : tuple
+            first and last date output, all of input_met_df if None
+        append_flag : boolean
+            True if records are appended to files of previous time chunks
+
+        Returns
+        -------
+        : list or None
+            output records, None if reference et could not be computed
+
+        """
+
         logging.debug('Computing Reference ET and post ref et and and meteorological data')
 
         try:
             # construct ref et object and set up output
 
             retObj = ref_et_data.refET(cfg.input_met['TR_b0'], cfg.input_met['TR_b1'], cfg.input_met['TR_b2'])
-            ret_df = ret_utils.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
+            outputs = []
+            met_index = self.input_met_df.index
+            ret_df = ret_utils.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, met_index[0], met_index[-1])
             for fn in cfg.refet_out['refet_out_fields']: ret_df[fn] = np.nan
             if cfg.output_retalt_flag:
-                retalt_df = ret_utils.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, cfg.start_dt, cfg.end_dt)
+                retalt_df = ret_utils.make_ts_dataframe(cfg.time_step, cfg.ts_quantity, met_index[0], met_index[-1])
                 for fn in cfg.refetalt_out['refet_out_fields']: retalt_df[fn] = np.nan
-            for dt, row in self.input_met_df.iterrows():
-                HargreavesSamani = retObj.et_hargreaves_samani(dt.dayofyear, row['tmax'],
-                    row['tmin'], self.latitude)
-
-                penmans = retObj.compute_penmans(dt.year, dt.month, dt.day, dt.dayofyear,
-                    cfg.time_step, row['tmax'], row['tmin'], row['tdew'],
-                    row['rs'], row['wind'], self.elevation, self.latitude)
-                Penman, PreTay, KimbPeng, ASCEr, ASCEo, FAO56PM, KimbPen = penmans
 
-                # store ref et calcs
-                ret_df['ascer'][dt] = ASCEr
-                ret_df['asceg'][dt] = ASCEo
-
-                # store alt ref et calcs
+            # compute ref et of whole met record in one call
+            doy = met_index.dayofyear.values
+            tmax = self.input_met_df['tmax'].values.astype(np.float64)
+            tmin = self.input_met_df['tmin'].values.astype(np.float64)
+            HargreavesSamani = retObj.et_hargreaves_samani(doy, tmax, tmin, self.latitude)
+            penmans = retObj.compute_penmans(met_index.year.values, met_index.month.values,
+                met_index.day.values, doy, cfg.time_step, tmax, tmin,
+                self.input_met_df['tdew'].values.astype(np.float64),
+                self.input_met_df['rs'].values.astype(np.float64),
+                self.input_met_df['wind'].values.astype(np.float64),
+                self.elevation, self.latitude)
+            Penman, PreTay, KimbPeng, ASCEr, ASCEo, FAO56PM, KimbPen = penmans
+
+            # store ref et calcs
+            ret_df['ascer'] = pd.Series(ASCEr, index = met_index)
+            ret_df['asceg'] = pd.Series(ASCEo, index = met_index)
+
+            # store alt ref et calcs
+            if cfg.output_retalt_flag:
+                alt_values = {
                     # ASCE for comparison
-                retalt_df['ascer'][dt] = ASCEr
-                retalt_df['asceg'][dt] = ASCEo
+                    'ascer': ASCEr, 'asceg': ASCEo,
                     # Alt
-                retalt_df['penm'][dt] = Penman
-                retalt_df['kimo'][dt] = KimbPeng
-                retalt_df['kimr'][dt] = KimbPen
-                retalt_df['fao56'][dt] = FAO56PM
-                retalt_df['pretay'][dt] = PreTay
-                retalt_df['harg'][dt] = HargreavesSamani
+                    'penm': Penman, 'kimo': KimbPeng, 'kimr': KimbPen,
+                    'fao56': FAO56PM, 'pretay': PreTay, 'harg': HargreavesSamani}
+                for fn, values in alt_values.items():
+                    retalt_df[fn] = pd.Series(values, index = met_index)
 
             # merge ref et calcs with met data for output
             try:
                 daily_refet_df = pd.merge(self.input_met_df, ret_df, left_index = True, right_index = True)
             except:
                 logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred merging input met with ref et dataframe.\n')
-                return False
+                return None
 
             # merge alt ref et calcs with met data for output
             if cfg.output_retalt_flag:
@@ -609,7 +901,13 @@ class MetNode():
                     daily_refetalt_df = pd.merge(self.input_met_df, retalt_df, left_index = True, right_index = True)
                 except:
                     logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred merging input met with alt ref et dataframe.\n')
-                    return False
+                    return None
+
+            # drop halo time steps of time chunk
+            if output_period is not None:
+                daily_refet_df = daily_refet_df.truncate(before = output_period[0], after = output_period[1])
+                if cfg.output_retalt_flag:
+                    daily_refetalt_df = daily_refetalt_df.truncate(before = output_period[0], after = output_period[1])
 
             # Check/modify units
             for field_key, field_units in cfg.refet_out['units'].items():
@@ -674,9 +972,9 @@ class MetNode():
                 elif "solar" in field_name: aggregation_func.update({fn: np.mean})
                 else: aggregation_func.update({fn: np.sum})
             if cfg.monthly_refet_flag:
-                monthly_refet_df = daily_refet_df.resample('MS').apply( aggregation_func)
+                monthly_refet_df = period_agg.aggregate_df(daily_refet_df, aggregation_func, 'month')
             if cfg.annual_refet_flag:
-                annual_refet_df = daily_refet_df.resample('AS').apply( aggregation_func)
+                annual_refet_df = period_agg.aggregate_df(daily_refet_df, aggregation_func, 'year')
 
             # set up output fields
             if cfg.daily_refet_flag:
@@ -730,28 +1028,8 @@ class MetNode():
 
                 daily_refet_path = os.path.join(cfg.daily_refet_ws, cfg.refet_out['name_format'] % self.met_node_id)
                 logging.debug('  {0}'.format(daily_refet_path))
-                with open(daily_refet_path, 'w', newline='') as daily_refet_f:
-                    daily_refet_f.write(cfg.refet_out['daily_header1'] + '\n')
-                    if cfg.refet_out['header_lines'] == 2:
-                        daily_refet_f.write(cfg.refet_out['daily_header2'] + '\n')
-                    if cfg.refet_out['daily_float_format'] is None:
-                        if 'date' in cfg.used_refet_out_fields:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['daily_date_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refet_out_fields:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['daily_date_format'],
-                                float_format = cfg.refet_out['daily_float_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields,
-                                float_format = cfg.refet_out['daily_float_format'])
+                outputs.append(ret_writer.output_record(daily_refet_path, cfg.refet_out, 'daily',
+                    daily_refet_df, adj_daily_fields, 'date' in cfg.used_refet_out_fields, append_flag))
                 del daily_refet_df, daily_refet_path, adj_daily_fields
             if cfg.monthly_refet_flag:
                 if cfg.refet_out['monthly_float_format'] is not None:
@@ -765,28 +1043,8 @@ class MetNode():
                 # post monthly output
                 monthly_refet_path = os.path.join(cfg.monthly_refet_ws, cfg.refet_out['name_format'] % self.met_node_id)
                 logging.debug('  {0}'.format(monthly_refet_path))
-                with open(monthly_refet_path, 'w', newline='') as monthly_refet_f:
-                    monthly_refet_f.write(cfg.refet_out['monthly_header1'] + '\n')
-                    if cfg.refet_out['header_lines'] == 2:
-                        monthly_refet_f.write(cfg.refet_out['monthly_header2'] + '\n')
-                    if cfg.refet_out['monthly_float_format'] is None:
-                        if 'date' in cfg.used_refet_out_fields:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['monthly_date_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refet_out_fields:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['monthly_date_format'],
-                                float_format = cfg.refet_out['monthly_float_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields,
-                                float_format = cfg.refet_out['monthly_float_format'])
+                outputs.append(ret_writer.output_record(monthly_refet_path, cfg.refet_out, 'monthly',
+                    monthly_refet_df, adj_monthly_fields, 'date' in cfg.used_refet_out_fields, append_flag))
                 del monthly_refet_df, monthly_refet_path, adj_monthly_fields
             if cfg.annual_refet_flag:
                 # format date attributes if values are formatted
@@ -799,29 +1057,11 @@ class MetNode():
                 # post annual output
                 annual_refet_path = os.path.join(cfg.annual_refet_ws, cfg.refet_out['name_format'] % self.met_node_id)
                 logging.debug('  {0}'.format(annual_refet_path))
-                with open(annual_refet_path, 'w', newline='') as annual_refet_f:
-                    annual_refet_f.write(cfg.refet_out['annual_header1'] + '\n')
-                    if cfg.refet_out['header_lines'] == 2:
-                        annual_refet_f.write(cfg.refet_out['annual_header2'] + '\n')
-                    if cfg.refet_out['annual_float_format'] is None:
-                        if 'date' in cfg.used_refet_out_fields:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['annual_date_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refet_out_fields:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['annual_date_format'],
-                                float_format = cfg.refet_out['annual_float_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields,
-                                float_format = cfg.refet_out['annual_float_format'])
+                outputs.append(ret_writer.output_record(annual_refet_path, cfg.refet_out, 'annual',
+                    annual_refet_df, adj_annual_fields, 'date' in cfg.used_refet_out_fields, append_flag))
                 del annual_refet_df, annual_refet_path, adj_annual_fields
+            if not cfg.output_retalt_flag:
+                return outputs
 
             ## Post Alternative Ref ET Calcs
             # Check/modify units
@@ -889,9 +1129,9 @@ class MetNode():
                 elif "solar" in field_name: aggregation_func.update({fn: np.mean})
                 else: aggregation_func.update({fn: np.sum})
             if cfg.monthly_refetalt_flag:
-                monthly_refetalt_df = daily_refetalt_df.resample('MS').apply( aggregation_func)
+                monthly_refetalt_df = period_agg.aggregate_df(daily_refetalt_df, aggregation_func, 'month')
             if cfg.annual_refetalt_flag:
-                annual_refetalt_df = daily_refetalt_df.resample('AS').apply( aggregation_func)
+                annual_refetalt_df = period_agg.aggregate_df(daily_refetalt_df, aggregation_func, 'year')
 
             # set up output fields
 
@@ -946,28 +1186,8 @@ class MetNode():
 
                 daily_refetalt_path = os.path.join(cfg.daily_refetalt_ws, cfg.refetalt_out['name_format'] % self.met_node_id)
                 logging.debug('  {0}'.format(daily_refetalt_path))
-                with open(daily_refetalt_path, 'w', newline='') as daily_refetalt_f:
-                    daily_refetalt_f.write(cfg.refetalt_out['daily_header1'] + '\n')
-                    if cfg.refetalt_out['header_lines'] == 2:
-                        daily_refetalt_f.write(cfg.refetalt_out['daily_header2'] + '\n')
-                    if cfg.refetalt_out['daily_float_format'] is None:
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['daily_date_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['daily_date_format'],
-                                float_format = cfg.refetalt_out['daily_float_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields,
-                                float_format = cfg.refetalt_out['daily_float_format'])
+                outputs.append(ret_writer.output_record(daily_refetalt_path, cfg.refetalt_out, 'daily',
+                    daily_refetalt_df, adj_daily_fields, 'date' in cfg.used_refetalt_out_fields, append_flag))
                 del daily_refetalt_df, daily_refetalt_path, adj_daily_fields
             if cfg.monthly_refetalt_flag:
                 if cfg.refetalt_out['monthly_float_format'] is not None:
@@ -982,28 +1202,8 @@ class MetNode():
 
                 monthly_refetalt_path = os.path.join(cfg.monthly_refetalt_ws, cfg.refetalt_out['name_format'] % self.met_node_id)
                 logging.debug('  {0}'.format(monthly_refetalt_path))
-                with open(monthly_refetalt_path, 'w', newline='') as monthly_refetalt_f:
-                    monthly_refetalt_f.write(cfg.refetalt_out['monthly_header1'] + '\n')
-                    if cfg.refetalt_out['header_lines'] == 2:
-                        monthly_refetalt_f.write(cfg.refetalt_out['monthly_header2'] + '\n')
-                    if cfg.refetalt_out['monthly_float_format'] is None:
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['monthly_date_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['monthly_date_format'],
-                                float_format = cfg.refetalt_out['monthly_float_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields,
-                                float_format = cfg.refetalt_out['monthly_float_format'])
+                outputs.append(ret_writer.output_record(monthly_refetalt_path, cfg.refetalt_out, 'monthly',
+                    monthly_refetalt_df, adj_monthly_fields, 'date' in cfg.used_refetalt_out_fields, append_flag))
                 del monthly_refetalt_df, monthly_refetalt_path, adj_monthly_fields
             if cfg.annual_refetalt_flag:
                 # format date attributes if values are formatted
@@ -1017,30 +1217,10 @@ class MetNode():
 
                 annual_refetalt_path = os.path.join(cfg.annual_refetalt_ws, cfg.refetalt_out['name_format'] % self.met_node_id)
                 logging.debug('  {0}'.format(annual_refetalt_path))
-                with open(annual_refetalt_path, 'w', newline='') as annual_refetalt_f:
-                    annual_refetalt_f.write(cfg.refetalt_out['annual_header1'] + '\n')
-                    if cfg.refetalt_out['header_lines'] == 2:
-                        annual_refetalt_f.write(cfg.refetalt_out['annual_header2'] + '\n')
-                    if cfg.refetalt_out['annual_float_format'] is None:
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['annual_date_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['annual_date_format'],
-                                float_format = cfg.refetalt_out['annual_float_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields,
-                                float_format = cfg.refetalt_out['annual_float_format'])
+                outputs.append(ret_writer.output_record(annual_refetalt_path, cfg.refetalt_out, 'annual',
+                    annual_refetalt_df, adj_annual_fields, 'date' in cfg.used_refetalt_out_fields, append_flag))
                 del annual_refetalt_df, annual_refetalt_path, adj_annual_fields
-            return True;
+            return outputs
         except:
-            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred computing reference ET for {0}', format(self.met_node_id))
-            return False
+            logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred computing reference ET for {0}'.format(self.met_node_id))
+            return None
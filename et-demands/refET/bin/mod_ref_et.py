@@ -4,6 +4,7 @@ called by run_ret.py
 
 """
 import argparse
+import collections
 import datetime
 import logging
 import multiprocessing as mp
@@ -18,8 +19,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
                                              '../../lib')))
 import ret_utils
 import ret_config
+import ret_grid
+import ret_writer
 import met_nodes
 
+# Worker configuration, set by init_worker()
+_worker_cfg = None
+_worker_mnd = None
+
 def main(ini_path, log_level = logging.WARNING, mnid_to_run = 'ALL',
         debug_flag = False, mp_procs = 1):
     """ Main function for running Reference ET model
@@ -69,6 +76,15 @@ def main(ini_path, log_level = logging.WARNING, mnid_to_run = 'ALL',
         logger = ret_utils.file_logger(logger, log_level=logging.DEBUG,
                                        output_ws=cfg.project_ws)
 
+    # Gridded mode computes reference ET of met cubes in lieu of met nodes
+
+    if cfg.grid_flag:
+        if not ret_grid.run_grid(cfg):
+            sys.exit()
+        logging.warning('\nREFET Run Completed')
+        logging.info('\n{} seconds'.format(time.perf_counter()-clock_start))
+        return
+
     # Read Met Nodes Meta Data
 
     mnd = met_nodes.MetNodesData()
@@ -96,9 +112,18 @@ def main(ini_path, log_level = logging.WARNING, mnid_to_run = 'ALL',
         avgTMinRev_hand.write(avg_monthly_header + "\n")
 
     # Multiprocessing set up
+    # time chunks of each node are spread over cores in chunked mode
     node_mp_list = []
     node_mp_flag = False
-    if mp_procs > 1:
+    chunk_pool = None
+    if cfg.time_chunk_years is not None:
+        logging.warning('  Processing met nodes in {} year time chunks'.format(
+            cfg.time_chunk_years))
+        if mp_procs > 1:
+            logging.warning("  Multiprocessing by time chunk")
+            chunk_pool = mp.Pool(mp_procs, initializer = init_worker,
+                                 initargs = (cfg, mnd, None))
+    elif mp_procs > 1:
         if not cfg.avg_monthly_flag:
             if mnid_to_run == 'ALL':
                 nodes_count = len(mnd.met_nodes_data.keys())
@@ -115,6 +140,11 @@ def main(ini_path, log_level = logging.WARNING, mnid_to_run = 'ALL',
                             " average monthly data.")
             mp_procs = 1
 
+    # Output files of all nodes are posted by one writer process
+    if node_mp_flag:
+        writer, output_queue = ret_writer.start_writer(2 * mp_procs)
+        ret_writer.set_queue(output_queue)
+
     # loop thru met nodes meta data
 
     logging.warning("\n")
@@ -129,8 +159,12 @@ def main(ini_path, log_level = logging.WARNING, mnid_to_run = 'ALL',
         # read input met data
 
         met_node_count += 1
-        if node_mp_flag and met_node_count > 1:
-            node_mp_list.append([met_node_count, cfg, met_node, mnd])
+        if cfg.time_chunk_years is not None:
+            if not node_chunks(met_node_count, cfg, met_node, mnd,
+                               chunk_pool, 2 * mp_procs):
+                sys.exit()
+        elif node_mp_flag and met_node_count > 1:
+            node_mp_list.append([met_node_count, met_node])
         else:
             if not met_node.read_and_fill_met_data(met_node_count, cfg, mnd):
                 if cfg.avg_monthly_flag:
@@ -171,20 +205,60 @@ def main(ini_path, log_level = logging.WARNING, mnid_to_run = 'ALL',
     if cfg.avg_monthly_flag:
         avgTMaxRev_hand.close()
         avgTMinRev_hand.close()
+    if chunk_pool is not None:
+        chunk_pool.close()
+        chunk_pool.join()
 
     # Multiprocess all nodes
-    results = []
-    if node_mp_list:
-        pool = mp.Pool(mp_procs)
-        results = pool.imap(node_mp, node_mp_list, chunksize=1)
-        pool.close()
-        pool.join()
-        del pool, results
+    # cfg and mnd are sent once to each worker of the pool
+    if node_mp_flag:
+        failed_nodes = []
+        if node_mp_list:
+            pool = mp.Pool(mp_procs, initializer = init_worker,
+                           initargs = (cfg, mnd, output_queue))
+            for met_node_id, success in pool.imap_unordered(
+                    node_mp, node_mp_list, chunksize = 1):
+                if not success:
+                    failed_nodes.append(met_node_id)
+            pool.close()
+            pool.join()
+            del pool
+        ret_writer.set_queue(None)
+        if not ret_writer.stop_writer(writer, output_queue):
+            logging.error('\nERROR: Unable to write reference ET output')
+            sys.exit()
+        if failed_nodes:
+            logging.error('\nERROR: Unable to process met nodes {}'.format(
+                ', '.join(sorted(failed_nodes))))
+            sys.exit()
 
     logging.warning('\nREFET Run Completed')
     logging.info('\n{} seconds'.format(time.perf_counter()-clock_start))
 
 
+def init_worker(cfg, mnd, output_queue):
+    """Pool initializer, sets worker configuration and output queue
+
+    Parameters
+    ---------
+    cfg :
+        configuration data
+    mnd :
+        MetNodesData instance
+    output_queue : multiprocessing.Queue
+        queue of writer process
+
+    Returns
+    -------
+    None
+
+    """
+    global _worker_cfg, _worker_mnd
+    _worker_cfg = cfg
+    _worker_mnd = mnd
+    ret_writer.set_queue(output_queue)
+
+
 def node_mp(tup):
     """Pool multiprocessing friendly function
     Parameters
@@ -201,7 +275,9 @@ def node_mp(tup):
     Tuple is unpacked and and single processing version of function is called
 
     """
-    return node_sp(*tup)
+    met_node_count, met_node = tup
+    return met_node.met_node_id, node_sp(
+        met_node_count, _worker_cfg, met_node, _worker_mnd)
 
 
 def node_sp(met_node_count, cfg, met_node, mnd):
@@ -219,26 +295,152 @@ def node_sp(met_node_count, cfg, met_node, mnd):
 
     Returns
     -------
-    None
+    : boolean
+        True
+        False
 
     """
 
     if not met_node.read_and_fill_met_data(met_node_count, cfg, mnd):
-        sys.exit()
+        return False
 
     # calculate and post refet et and requested met output
+    # output files are posted to the writer process
 
-    # calculate and post refet et and requested met output
     if cfg.refet_out_flag:
         if not met_node.calculate_and_post_ret_data(cfg):
-            sys.exit()
+            return False
+    del met_node.input_met_df
+    return True
 
-    # setup output met data posting
+def chunk_mp(tup):
+    """Pool multiprocessing friendly version of chunk_sp()"""
+    met_node, window_df, output_period, append_flag = tup
+    return chunk_sp(_worker_cfg, met_node, _worker_mnd, window_df,
+                    output_period, append_flag)
+
+
+def chunk_sp(cfg, met_node, mnd, window_df, output_period, append_flag):
+    """Fill met data and compute output records of one time chunk of node
+
+    Parameters
+    ---------
+    cfg :
+        configuration data
+    met_node :
+        MetNode instance
+    mnd :
+        MetNodesData instance
+    window_df : pandas.DataFrame
+        input met data of chunk with halo time steps
+    output_period : tuple
+        first and last date of chunk output
+    append_flag : boolean
+        True if output is appended to files of previous chunks
+
+    Returns
+    -------
+    : list or None
+        output records, None if chunk could not be processed
+
+    """
+
+    met_node.input_met_df = window_df
+    if not met_node.fill_met_data(cfg, mnd):
+        return None
+    if not cfg.refet_out_flag:
+        return []
+    return met_node.calculate_ret_outputs(cfg, output_period, append_flag)
+
+
+def node_chunks(met_node_count, cfg, met_node, mnd, pool = None,
+                max_pending = 2):
+    """Compute output of node one time chunk at a time
+
+    Parameters
+    ---------
+    met_node_count : int
+        count of node being processed
+    cfg :
+        configuration data
+    met_node :
+        MetNode instance
+    mnd :
+        MetNodesData instance
+    pool : multiprocessing.Pool
+        pool chunks are computed by, chunks are computed in process if None
+    max_pending : int
+        maximum number of chunks being computed by pool
+
+    Returns
+    -------
+    : boolean
+        True
+        False
+
+    Notes
+    -----
+    Chunks are read while earlier chunks are computed and output
+    records are written in time order, so at most max_pending chunks
+    are held in memory.
+
+    """
+
+    logging.debug('Reading and filling meteorological data by time chunk')
+    pending = collections.deque()
+    append_flag = False
+    for chunk in met_node.met_data_chunks(cfg):
+        if chunk is None:
+            logging.error('Unable to read and fill daily input meteorological data.')
+            return False
+        window_df, output_period = chunk
+        logging.debug('  Time chunk {} to {}'.format(*output_period))
+        if pool is None:
+            pending.append(chunk_sp(cfg, met_node, mnd, window_df,
+                                    output_period, append_flag))
+        else:
+            pending.append(pool.apply_async(chunk_mp, (
+                (met_node, window_df, output_period, append_flag),)))
+        append_flag = True
+        while pending and (pool is None or len(pending) >= max_pending):
+            if not write_chunk(pending.popleft(), met_node):
+                return False
+    while pending:
+        if not write_chunk(pending.popleft(), met_node):
+            return False
+    if hasattr(met_node, 'input_met_df'):
+        del met_node.input_met_df
+    return True
+
+
+def write_chunk(result, met_node):
+    """Write output records of a time chunk
+
+    Parameters
+    ---------
+    result : list or multiprocessing.pool.ApplyResult
+        output records of chunk_sp() or pending result of chunk_mp()
+    met_node :
+        MetNode instance
+
+    Returns
+    -------
+    : boolean
+        True
+        False
+
+    """
+
+    if hasattr(result, 'get'):
+        result = result.get()
+    if result is None:
+        logging.error('\nERROR: Unable to process met node {}'.format(
+            met_node.met_node_id))
+        return False
+    for record in result:
+        ret_writer.write_record(record)
+    return True
 
-    if cfg.output_retalt_flag:
-        if not met_node.setup_refetalt_out_data(met_node_count, cfg, mnd):
-            sys.exit()
-    del met_node.input_met_df
 
 def parse_args():
     """initialize parser
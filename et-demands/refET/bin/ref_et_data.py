@@ -8,6 +8,8 @@ import math
 import numpy as np
 import refet
 
+import ret_tables
+
 class refET:
 
     def __init__(self, b0, b1, b2):
@@ -75,6 +77,25 @@ class refET:
         psy = 1013 * pair / 0.622 / lmbda
         return psy
 
+    def _shift_doy(self, lat, doy):
+        """Day of year shifted by half a year in the southern hemisphere
+
+        Parameters
+        ----------
+        lat : scalar or array_like of shape(M, )
+            Latitude [deg].
+        doy : scalar or array_like of shape(M, )
+            Day of year.
+
+        Returns
+        -------
+        j : ndarray
+            Day of year of the equivalent northern hemisphere season.
+
+        """
+
+        return ret_tables.shift_doy(lat, doy)
+
     def et_hargreaves_samani(self, doy, tmax, tmin, latitude):
         """Hargreaves Samani reference ET (https://doi.org/10.13031/2013.26773)
 
@@ -101,16 +122,17 @@ class refET:
         # compute latent heat of vaporization
         lmbda = self._latent_heat_vaporization(tmean)
 
-        # Latutude in radians
-        latRad = latitude * math.pi / 180.0  # Lat is station latitude in degrees
-
-        # Extraterrestrial radiation
-        ra = refet.calcs._ra_daily(latRad, doy, method='refet')
-
-        if tmax < tmin:
-            EToHargSam = 0.0
+        # Extraterrestrial radiation, which depends on latitude only
+        if ret_tables.use_table(latitude, 0, doy):
+            ra = ret_tables.radiation_table(latitude, 0)['ra'][doy]
         else:
-            EToHargSam = 0.0023 * (tmax - tmin)**0.5 * ra * (tmean + 17.8) # same units as Ra
+            # Latutude in radians
+            latRad = latitude * math.pi / 180.0  # Lat is station latitude in degrees
+            ra = refet.calcs._ra_daily(latRad, doy, method='refet')
+
+        EToHargSam = np.where(
+            tmax < tmin, 0.0,
+            0.0023 * np.maximum(tmax - tmin, 0.0)**0.5 * ra * (tmean + 17.8)) # same units as Ra
         EToHargSam = EToHargSam / lmbda * 1000000.0 # mm/day
         return EToHargSam
 
@@ -154,7 +176,7 @@ class refET:
 
 
         EToPen = (((delta / (delta + gamma56) * (Rn56 - G56))) / lmbda * 1000000.0) + ((gamma56 / (delta + gamma56) * (0.26 * (1 + 0.537 * u242)) * ((es * 10) - (ea * 10))))
-        EToPen = max(EToPen, 0.0)
+        EToPen = np.maximum(EToPen, 0.0)
         return(EToPen)
 
     def _et_fao50(self, pair, ea, es, delta, tmean, G56, Rn56, u242):
@@ -188,10 +210,10 @@ class refET:
 
         gamma56 = 0.000665 * pair # kPa/C   May 17 1999
         EToFAO56 = (0.408 * delta * (Rn56 - G56) + gamma56 * 900 / (tmean + 273) * u242 * (es - ea)) / (delta + gamma56 * (1 + 0.34 * u242)) #  may 17 1999 move before ea=fnes(TAvg)
-        EToFAO56 = max(EToFAO56, 0.0)
+        EToFAO56 = np.maximum(EToFAO56, 0.0)
         return(EToFAO56)
 
-    def _et_kimberly_penman(self, lat, doy, ea, es, lmbda, delta, gamma, G82, G82o, Rn82, u242):
+    def _et_kimberly_penman(self, lat, doy, ea, es, lmbda, delta, gamma, G82, G82o, Rn82, u242, table = None):
         """Kimberly Penman 1982 reference ET (https://eprints.nwisrl.ars.usda.gov/id/eprint/382)
 
         Parameters
@@ -218,6 +240,9 @@ class refET:
             Net solar radiation from Wright (1982) [MJ m-2 d-1].
         u242 : scalar or array_like of shape(M, )
             Elevation [m].
+        table : dict, optional
+            ret_tables.radiation_table() of location, coefficients are
+            looked up by doy if given.
 
         Returns
         -------
@@ -231,23 +256,23 @@ class refET:
 
         """
 
-        j = doy
-        if lat < 0:
-            j = doy - 182
-            if j < 1:
-                j = j + 365
-        Awk = 0.4 + 1.4 * math.exp(-((j - 173) / 58) ** 2)
-        Bwk = (0.007 + 0.004 * math.exp(-((j - 243) / 80) ** 2)) * 86.4 # for m/s
+        if table is None:
+            j = self._shift_doy(lat, doy)
+            Awk = 0.4 + 1.4 * np.exp(-((j - 173) / 58) ** 2)
+            Bwk = (0.007 + 0.004 * np.exp(-((j - 243) / 80) ** 2)) * 86.4 # for m/s
+            awkg = 0.3 + 0.58 *  np.exp(-((j - 170) / 45) ** 2) # Wright(1996) for grass
+            bwkg = 0.32 + 0.54 * np.exp(-((j - 228) / 67) ** 2) # for m/s
+        else:
+            Awk, Bwk = table['awk'][doy], table['bwk'][doy]
+            awkg, bwkg = table['awkg'][doy], table['bwkg'][doy]
 
         ETrKimbPen = (delta * (Rn82 - G82) + gamma * 6.43 * (es - ea) * (Awk + Bwk * u242)) / (delta + gamma)
         ETrKimbPen = ETrKimbPen / lmbda * 1000000.0
-        ETrKimbPen = max(ETrKimbPen, 0.0)
+        ETrKimbPen = np.maximum(ETrKimbPen, 0.0)
 
-        awkg = 0.3 + 0.58 *  math.exp(-((j - 170) / 45) ** 2) # Wright(1996) for grass
-        bwkg = 0.32 + 0.54 * math.exp(-((j - 228) / 67) ** 2) # for m/s
         EToKimbPen = (delta * (Rn82 - G82o) + gamma * 6.43 * (es - ea) * (awkg + bwkg * u242)) / (delta + gamma)
         EToKimbPen = EToKimbPen / lmbda * 1000000.0
-        EToKimbPen = max(EToKimbPen, 0.0)
+        EToKimbPen = np.maximum(EToKimbPen, 0.0)
 
         return (EToKimbPen, ETrKimbPen)
 
@@ -281,12 +306,15 @@ class refET:
         # Gamma calculated from FAO56
         gamma56 = 0.000665 * pair # kPa/C   May 17 1999
         EToPriTay = 1.26 * (delta / (delta + gamma56) * (Rn56 - G56)) / lmbda * 1000000.0
-        EToPriTay = max(EToPriTay, 0.0)
+        EToPriTay = np.maximum(EToPriTay, 0.0)
         return(EToPriTay)
 
     def compute_penmans(self, yr, mo, da, doy, time_step, tmax, tmin, tdew, rs, u24, elev, latitude):
         """ Compute reference ET by Penman methods
 
+        Inputs may be scalars of a single time step or arrays of a whole
+        station record of consecutive time steps, computed in one call.
+
         Parameters
         ----------
         yr : scalar or array_like of shape(M, )
@@ -337,14 +365,21 @@ class refET:
         # Latent heat of vaporization
         lmbda = self._latent_heat_vaporization(tmean)
 
+        # Radiation terms of station record are looked up by day of year
+        table = None
+        if ret_tables.use_table(latitude, elev, doy):
+            table = ret_tables.radiation_table(latitude, elev)
+
         # Latutude in radians
         latRad = latitude * math.pi / 180.0  # Lat is station latitude in degrees
 
-        # Extraterrestial radiation
-        ra = refet.calcs._ra_daily(latRad, doy, method="refet")
-
-        # Air pressure from elevation
-        pair = refet.calcs._air_pressure(elev, method="refet")
+        # Extraterrestial radiation and air pressure from elevation
+        if table is None:
+            ra = refet.calcs._ra_daily(latRad, doy, method="refet")
+            pair = refet.calcs._air_pressure(elev, method="refet")
+        else:
+            ra = table['ra'][doy]
+            pair = table['pair']
 
         # Slope of saturation pressure temperature curve
         delta = refet.calcs._es_slope(tmean, method='refet') # kPa/C
@@ -359,10 +394,13 @@ class refET:
         gamma = self._psychro_const(pair, lmbda)
 
         # Clear sky radiation
-        rso = refet.calcs._rso_daily(ra, es, pair, doy, latRad)
+        if table is None:
+            rso = refet.calcs._rso_daily(ra, es, pair, doy, latRad)
+        else:
+            rso = ret_tables.rso_daily(table, doy, es)
 
         # Net radiation from FAO56 and Kimberly (1982)
-        Rn56, Rn82 = self._rn_daily(elev, latitude, doy, ra, rs, rso, tmax, tmin, es)
+        Rn56, Rn82 = self._rn_daily(elev, latitude, doy, ra, rs, rso, tmax, tmin, es, table)
 
         # Soil heat flux
         G56, G56r, G82, G82o = self._soil_heat(da, time_step, tmean, Rn56, Rn82) # modified 6/24/99
@@ -398,19 +436,57 @@ class refET:
         FAO56PM = self._et_fao50(pair, ea, es, delta, tmean, G56, Rn56, u242)
 
         # 1982 Kimberly Penman
-        KimbPeng, KimbPen = self._et_kimberly_penman(latitude, doy, ea, es, lmbda, delta, gamma, G82, G82o, Rn82, u242)
+        KimbPeng, KimbPen = self._et_kimberly_penman(latitude, doy, ea, es, lmbda, delta, gamma, G82, G82o, Rn82, u242, table)
 
         # Priestley Taylor
         PreTay = self._et_priestly_taylor(pair, lmbda, delta, G56, Rn56)
 
         # ASCE-EWRI Penman Monteith
-        ASCEPMstdr = refet.Daily(tmin, tmax, ea, rs, u242, zw, elev, latitude, doy, method='refet').etr()
+        ASCEPMstdr, ASCEPMstdo = self.et_asce(tmin, tmax, ea, rs, u242, elev, latitude, doy)
+        return (Penman, PreTay, KimbPeng, ASCEPMstdr, ASCEPMstdo, FAO56PM, KimbPen)
+
+    def et_asce(self, tmin, tmax, ea, rs, u2, elev, latitude, doy):
+        """ASCE-EWRI standardized reference ET
+
+        Parameters
+        ----------
+        tmin : scalar or array_like
+            Daily minimum air temperature [C].
+        tmax : scalar or array_like
+            Daily maximum air temperature [C].
+        ea : scalar or array_like
+            Actual vapor pressure [kPa].
+        rs : scalar or array_like
+            Incoming solar radiation [MJ m-2 d-1].
+        u2 : scalar or array_like
+            24-hour mean windspeed at 2 m [m s-1]
+        elev : scalar or array_like
+            elevation [m]
+        latitude : scalar or array_like
+            latitude [deg]
+        doy : scalar or array_like
+            day of year
+
+        Returns
+        -------
+        ASCEr : ndarray
+            ASCE-EWRI standardized alfalfa reference ET [mm d-1]
+        ASCEo : ndarray
+            ASCE-EWRI standardized grass reference ET [mm d-1]
+
+        Notes
+        -----
+        Inputs are broadcast, e.g. (time, y, x) cubes with (y, x) latitude
+        and elevation grids and (time, 1, 1) day of year.
+
+        """
+
+        asce = refet.Daily(tmin, tmax, ea, rs, u2, 2, elev, latitude, doy, method='refet')
             # input_units={'tmin': 'C', 'tmax': 'C', 'rs': 'mj m-2 d-1', 'uz': 'm s-1',
             #              'lat': 'deg'}
-        ASCEPMstdo = refet.Daily(tmin, tmax, ea, rs, u242, zw, elev, latitude, doy, method='refet').eto()
-        return (Penman, PreTay, KimbPeng, ASCEPMstdr, ASCEPMstdo, FAO56PM, KimbPen)
+        return asce.etr(), asce.eto()
 
-    def _rn_daily(self, elev, lat, doy, ra, rs, rso, tmax, tmin, es):
+    def _rn_daily(self, elev, lat, doy, ra, rs, rso, tmax, tmin, es, table = None):
         """FAO56 and Kimberly 1982 net radiation
 
         Parameters
@@ -433,6 +509,9 @@ class refET:
             Daily minimum air temperature [C].
         es : scalar or array_like of shape(M, )
             Saturation vapor pressure [kPa].
+        table : dict, optional
+            ret_tables.radiation_table() of location, terms depending only
+            on location and doy are looked up if given.
 
         Returns
         -------
@@ -443,39 +522,30 @@ class refET:
 
         """
 
-        j = doy
-        if lat < 0:
-            j = doy - 182
-            if j < 1:
-                j = j + 365
-        Rna1 = 0.26 + 0.1 * math.exp(-(0.0154 * (j - 180)) ** 2)
-        Rso75 = 0.75 * ra
-        Rso56 = (0.75 + 0.00002 * elev) * ra # 4/6/94
-        if rso > 0:
-            RsRso = rs / rso # 24-hours
-        else:
-            RsRso = 0.7
-        if Rso56:
-            RsRso56 = rs / Rso56 # 24-hours
+        if table is None:
+            j = self._shift_doy(lat, doy)
+            Rna1 = 0.26 + 0.1 * np.exp(-(0.0154 * (j - 180)) ** 2)
+            Rso56 = (0.75 + 0.00002 * elev) * ra # 4/6/94
+            alpha = 0.29 + 0.06 * np.sin((j + 96) / 57.3)
         else:
-            RsRso56 = 0.7
-        RsRso = max(0.2, min(RsRso, 1.0))
-        RsRso56 = max(0.2, min(RsRso56, 1.0))
+            Rna1 = table['rna1'][doy]
+            Rso56 = table['rso56'][doy]
+            alpha = table['alpha'][doy]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            RsRso = np.where(rso > 0, rs / rso, 0.7) # 24-hours
+            RsRso56 = np.where(Rso56 != 0, rs / Rso56, 0.7) # 24-hours
+        RsRso = np.clip(RsRso, 0.2, 1.0)
+        RsRso56 = np.clip(RsRso56, 0.2, 1.0)
         RsRso2use = RsRso # useRso based on sun angle and water vapor as of 9/25/2000
-        if RsRso2use > 0.7:
-            Rna = 1.126
-            Rnb = -0.07
-        else:
-            Rna = 1.017
-            Rnb = -0.06
-        Rbo = 0.000000004903 * 0.5 * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) * (Rna1 - 0.139 * math.sqrt(es))
+        Rna = np.where(RsRso2use > 0.7, 1.126, 1.017)
+        Rnb = np.where(RsRso2use > 0.7, -0.07, -0.06)
+        Rbo = 0.000000004903 * 0.5 * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) * (Rna1 - 0.139 * np.sqrt(es))
         Rb = (Rna * RsRso2use + Rnb) * Rbo
-        alpha = 0.29 + 0.06 * math.sin((j + 96) / 57.3)
         Rn82 = (1 - alpha) * rs - Rb
 
         # FAO 56 Net Radiation computation
 
-        Rbo56 = 0.000000004903 * 0.5 * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) * (0.34 - 0.14 * math.sqrt(es))
+        Rbo56 = 0.000000004903 * 0.5 * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) * (0.34 - 0.14 * np.sqrt(es))
         Rnl56 = (1.35 * RsRso2use - 0.35) * Rbo56
         Rn56 = (1 - 0.23) * rs - Rnl56
         return Rn56, Rn82
@@ -509,6 +579,9 @@ class refET:
 
         """
 
+        if np.ndim(tmean) > 0:
+            return self._soil_heat_array(time_step, tmean, Rn56, Rn82)
+
         # ByRef G82 As Double, ByRef G82o As Double, ByRef G56 As Double, ByRef G56r As Double
         # Static Tp3, Tp1, Tp2 As Double
         # Static ndays, lastDay As Long
@@ -596,5 +669,53 @@ class refET:
                 # End If
         return G56, G56r, G82, G82o
 
+    def _soil_heat_array(self, time_step, tmean, Rn56, Rn82):
+        """FAO56 and Kimberly 1982 soil heat flux of a whole record
+
+        Parameters
+        ----------
+        time_step : str
+            time step
+        tmean : array_like of shape(M, )
+            mean daily temperature [C] of consecutive time steps.
+        Rn56 : array_like of shape(M, )
+            FAO56 net radiation [MJ m-2 d-1].
+        Rn82 : array_like of shape(M, )
+            Kimberly 1892 net radiation [MJ m-2 d-1].
+
+        Returns
+        -------
+        G56, G56r, G82, G82o : ndarray
+            as _soil_heat()
+
+        Notes
+        -----
+        Daily G82 is the difference of tmean and the mean tmean of up to
+        three prior days, as accumulated by the static variables of
+        _soil_heat(), and is zero on the first day of the record.
+
+        """
+
+        tmean = np.asarray(tmean, dtype=np.float64)
+        Rn56 = np.asarray(Rn56, dtype=np.float64)
+        Rn82 = np.asarray(Rn82, dtype=np.float64)
+        if time_step == 'day':
+            # Tp1, Tp2 and Tp3 are tmean of the previous three days
+            tp = np.zeros((3, tmean.size))
+            for lag in range(1, 4):
+                tp[lag - 1, lag:] = tmean[:-lag]
+            ndays = np.minimum(np.arange(tmean.size), 3)
+            G82 = np.zeros(tmean.size)
+            G82[1:] = (tmean[1:] - (tp[2, 1:] + tp[1, 1:] + tp[0, 1:]) / ndays[1:]) * 0.3768 # MJ/m2/d
+            G82o = G82.copy()
+            G56 = np.zeros(tmean.size)
+            G56r = G56.copy()
+        else: # hourly time step (assumed)
+            G82o = np.where(Rn82 >= 0, 0.1 * Rn82, Rn82 * 0.5)
+            G82 = np.where(Rn82 >= 0, 0.04 * Rn82, Rn82 * 0.2)
+            G56 = np.where(Rn56 >= 0, 0.1 * Rn56, Rn56 * 0.5)
+            G56r = np.where(Rn56 >= 0, 0.04 * Rn56, Rn56 * 0.2)
+        return G56, G56r, G82, G82o
+
 ##############
 # removed tests 10/2018
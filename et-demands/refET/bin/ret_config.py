@@ -53,6 +53,7 @@ class RefETConfig():
         input_met_sec = 'INMET'    # required
         output_ret_sec = 'OUTRET'    # required
         output_retalt_sec = 'OUTRETALT'    # not required
+        grid_sec = 'GRID'    # not required, gridded mode
         units_list = (
             ['c', 'f', 'k'] +
             ['mm', 'mm/d', 'mm/day', 'm/s', 'in*100'] +
@@ -65,8 +66,18 @@ class RefETConfig():
 
         # Check that required sections are present
 
+        # Gridded mode only requires project and grid sections
+
+        try:
+            self.grid_flag = config.getboolean(grid_sec, 'grid_flag')
+        except:
+            self.grid_flag = False
         cfgSecs = config.sections()
-        if project_sec not in cfgSecs or meta_sec not in cfgSecs or input_met_sec not in cfgSecs or output_ret_sec not in cfgSecs:
+        if self.grid_flag:
+            if project_sec not in cfgSecs:
+                logging.error('\nERROR:  reference et ini file must have [{}] section'.format(project_sec))
+                sys.exit()
+        elif project_sec not in cfgSecs or meta_sec not in cfgSecs or input_met_sec not in cfgSecs or output_ret_sec not in cfgSecs:
             logging.error(
                 '\nERROR:  reference et ini file must have following sections:\n'+
                 '  [{}], [{}], and [{}]'.format(project_sec, meta_sec, input_met_sec, output_ret_sec))
@@ -136,6 +147,12 @@ class RefETConfig():
         if edt is None: self.end_dt = None
         else: self.end_dt = pd.to_datetime(edt)
 
+        # gridded mode reads met cubes in lieu of met nodes
+
+        if self.grid_flag:
+            self.read_grid_ini(config, grid_sec)
+            return
+
         # Output met flag
 
         try:
@@ -153,6 +170,20 @@ class RefETConfig():
         except:
             self.avg_monthly_flag = False
 
+        # Time chunk of met node records in years, whole record if None
+        # chunked records are read and processed one chunk at a time
+
+        try:
+            self.time_chunk_years = config.getint(project_sec, 'time_chunk_years')
+            if self.time_chunk_years is not None and self.time_chunk_years < 1:
+                self.time_chunk_years = None
+        except:
+            self.time_chunk_years = None
+        if self.time_chunk_years is not None and self.avg_monthly_flag:
+            logging.warning('  Average monthly output needs whole records, '
+                            'time_chunk_years is ignored')
+            self.time_chunk_years = None
+
         # static (aka) meta data specfications
 
         try:
@@ -258,6 +289,17 @@ class RefETConfig():
             sys.exit()
 
         self.input_met['file_type'] = config.get(input_met_sec, 'file_type')
+
+        # Memory mapped climate archive of input met files [Optional]
+        # Stations not in archive are read from input met folder
+
+        try:
+            self.input_met['archive_ws'] = config.get(input_met_sec, 'archive_folder')
+            if self.input_met['archive_ws'] == 'None': self.input_met['archive_ws'] = None
+        except: self.input_met['archive_ws'] = None
+        if (self.input_met['archive_ws'] is not None and
+                not os.path.isabs(self.input_met['archive_ws'])):
+            self.input_met['archive_ws'] = os.path.join(self.project_ws, self.input_met['archive_ws'])
         self.input_met['name_format'] = config.get(input_met_sec, 'name_format')
         self.input_met['header_lines'] = config.getint(input_met_sec, 'header_lines')
         self.input_met['names_line'] = config.getint(input_met_sec, 'names_line')
@@ -1518,6 +1560,82 @@ class RefETConfig():
                         del self.input_met['fields'][k]
                 except: pass
 
+    def read_grid_ini(self, config, grid_sec):
+        """Read gridded mode specifications
+
+        Args:
+            config: configparser.RawConfigParser instance
+            grid_sec: name of grid section
+
+        Returns:
+            None
+        """
+
+        self.grid = {}
+
+        # input met cube (NetCDF or Zarr)
+
+        try:
+            self.grid['met_path'] = config.get(grid_sec, 'grid_met_path')
+            if self.grid['met_path'] == 'None': self.grid['met_path'] = None
+        except:
+            self.grid['met_path'] = None
+        if self.grid['met_path'] is None:
+            logging.error('ERROR:  GRID grid_met_path must be specified')
+            sys.exit()
+        if not os.path.isabs(self.grid['met_path']):
+            self.grid['met_path'] = os.path.join(self.project_ws, self.grid['met_path'])
+        if not os.path.exists(self.grid['met_path']):
+            logging.error('ERROR:  Grid met data {} does not exist'.format(self.grid['met_path']))
+            sys.exit()
+        logging.info('  Grid met data: {}'.format(self.grid['met_path']))
+
+        # output ref et cube, written as NetCDF if name ends with .nc
+
+        try:
+            self.grid['out_path'] = config.get(grid_sec, 'grid_out_path')
+            if self.grid['out_path'] == 'None': self.grid['out_path'] = None
+        except:
+            self.grid['out_path'] = None
+        if self.grid['out_path'] is None:
+            self.grid['out_path'] = 'refet_grid.zarr'
+        if not os.path.isabs(self.grid['out_path']):
+            self.grid['out_path'] = os.path.join(self.project_ws, self.grid['out_path'])
+
+        # static elevation grid, read from met cube if not specified
+
+        try:
+            self.grid['elev_path'] = config.get(grid_sec, 'grid_elev_path')
+            if self.grid['elev_path'] == 'None': self.grid['elev_path'] = None
+        except:
+            self.grid['elev_path'] = None
+        if (self.grid['elev_path'] is not None and
+                not os.path.isabs(self.grid['elev_path'])):
+            self.grid['elev_path'] = os.path.join(self.project_ws, self.grid['elev_path'])
+
+        # variable names in cubes
+
+        grid_vars = {
+            'time': 'time', 'lat': 'lat', 'elev': 'elevation',
+            'tmax': 'tmax', 'tmin': 'tmin', 'tdew': 'tdew', 'rs': 'rs',
+            'wind': 'wind'}
+        self.grid['vars'] = {}
+        for var_key, var_name in grid_vars.items():
+            try:
+                self.grid['vars'][var_key] = config.get(grid_sec, 'grid_{}_var'.format(var_key))
+            except:
+                self.grid['vars'][var_key] = var_name
+
+        # wind speeds measured at heights other than 2m are scaled
+
+        try: self.grid['wind_height'] = config.getfloat(grid_sec, 'grid_wind_height')
+        except: self.grid['wind_height'] = 2.0
+
+        # number of time steps read and computed at once
+
+        try: self.grid['time_chunk'] = config.getint(grid_sec, 'grid_time_chunk')
+        except: self.grid['time_chunk'] = 366
+
 def console_logger(logger = logging.getLogger(''), log_level = logging.INFO):
     # Create console logger
 
@@ -0,0 +1,240 @@
+"""ret_grid.py
+Gridded reference ET from NetCDF/Zarr meteorology cubes
+Input tmax, tmin, tdew, rs and wind cubes (time, y, x) are read in time
+    chunks, ASCE standardized ETr and ETo are computed over the whole grid
+    with the vectorized refET formulas and appended to an output cube with
+    matching coordinates
+Called by mod_ref_et.py
+
+"""
+
+import logging
+import os
+import shutil
+import sys
+
+import numpy as np
+import refet
+
+try:
+    import xarray as xr
+except ImportError:
+    xr = None
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+import ref_et_data
+
+# Input variables and conversion of their units attribute to model units
+met_variables = ['tmax', 'tmin', 'tdew', 'rs', 'wind']
+unit_conversions = {
+    'k': (1.0, -273.15), 'degk': (1.0, -273.15), 'kelvin': (1.0, -273.15),
+    'f': (5.0 / 9.0, -32.0 * 5.0 / 9.0), 'degf': (5.0 / 9.0, -32.0 * 5.0 / 9.0),
+    'w/m2': (0.0864, 0.0), 'w/m^2': (0.0864, 0.0), 'w m-2': (0.0864, 0.0),
+    'langley': (0.041868, 0.0)}
+
+# Output variables
+out_variables = {
+    'etr': 'ASCE standardized alfalfa reference ET',
+    'eto': 'ASCE standardized grass reference ET'}
+
+
+def open_cube(path):
+    """Open NetCDF file or Zarr store without loading values"""
+    if path.rstrip(os.sep).lower().endswith('.zarr') or os.path.isdir(path):
+        return xr.open_zarr(path, chunks=None)
+    return xr.open_dataset(path, chunks=None)
+
+
+def to_model_units(values, units):
+    """Convert values to model units (C, MJ m-2 d-1, m s-1)
+
+    Parameters
+    ---------
+    values : ndarray
+    units : str or None
+        units attribute of cube variable
+
+    Returns
+    -------
+    : ndarray
+
+    """
+    if units is None:
+        return values
+    factor, offset = unit_conversions.get(units.strip().lower(), (1.0, 0.0))
+    if factor == 1.0 and offset == 0.0:
+        return values
+    return values * factor + offset
+
+
+def static_grids(grid, met_ds, template):
+    """Latitude and elevation grids of template (y, x) shape
+
+    Parameters
+    ---------
+    grid : dict
+        grid configuration
+    met_ds : xarray.Dataset
+        met cube
+    template : xarray.DataArray
+        (y, x) slice of a met variable
+
+    Returns
+    -------
+    lat : ndarray
+        latitude [deg]
+    elev : ndarray
+        elevation [m]
+
+    """
+    lat = met_ds[grid['vars']['lat']].broadcast_like(template)
+    if grid['elev_path'] is not None:
+        elev_ds = open_cube(grid['elev_path'])
+    else:
+        elev_ds = met_ds
+    elev = elev_ds[grid['vars']['elev']].squeeze(drop=True)
+    elev = elev.broadcast_like(template)
+    dims = template.dims
+    return (lat.transpose(*dims).values.astype(np.float64),
+            elev.transpose(*dims).values.astype(np.float64))
+
+
+def compute_chunk(grid, met_ds, time_slice, lat, elev, ret_obj):
+    """Compute ETr and ETo of one time chunk
+
+    Returns
+    -------
+    etr, eto : ndarray of shape(time, y, x)
+
+    """
+    time_dim = grid['vars']['time']
+    values = {}
+    for var in met_variables:
+        da = met_ds[grid['vars'][var]].isel({time_dim: time_slice})
+        values[var] = to_model_units(
+            da.values.astype(np.float64), da.attrs.get('units'))
+    if grid['wind_height'] != 2:
+        values['wind'] = refet.calcs._wind_height_adjust(
+            values['wind'], grid['wind_height'])
+    ea = refet.calcs._sat_vapor_pressure(values['tdew'])
+    times = met_ds[time_dim].isel({time_dim: time_slice}).to_index()
+    doy = times.dayofyear.values[:, np.newaxis, np.newaxis]
+    return ret_obj.et_asce(values['tmin'], values['tmax'], ea, values['rs'],
+                           values['wind'], elev, lat, doy)
+
+
+def chunk_dataset(grid, met_ds, time_slice, etr, eto):
+    """Output dataset of one time chunk with coordinates of input cube"""
+    template = met_ds[grid['vars']['tmax']].isel(
+        {grid['vars']['time']: time_slice})
+    out_vars = {}
+    for var, values in [('etr', etr), ('eto', eto)]:
+        da = template.copy(data=values.astype(template.dtype))
+        da.attrs = {'units': 'mm d-1', 'long_name': out_variables[var]}
+        da.encoding = {}
+        out_vars[var] = da
+    return xr.Dataset(out_vars)
+
+
+def append_netcdf(path, grid, chunk_ds):
+    """Append time chunk to NetCDF output"""
+    time_dim = grid['vars']['time']
+    with netCDF4.Dataset(path, 'a') as nc:
+        time_var = nc.variables[time_dim]
+        start = len(time_var)
+        time_var[start:] = netCDF4.date2num(
+            chunk_ds[time_dim].to_index().to_pydatetime(),
+            time_var.units, getattr(time_var, 'calendar', 'standard'))
+        for var in out_variables:
+            nc.variables[var][start:] = chunk_ds[var].values
+
+
+def run_grid(cfg):
+    """Compute reference ET cube
+
+    Parameters
+    ---------
+    cfg :
+        configuration data from INI file
+
+    Returns
+    -------
+    : boolean
+        True
+        False
+
+    """
+    if xr is None:
+        logging.error('\nERROR: xarray is required for gridded reference ET')
+        return False
+    grid = cfg.grid
+    out_path = grid['out_path']
+    nc_flag = out_path.lower().endswith('.nc')
+    if nc_flag and netCDF4 is None:
+        logging.error('\nERROR: netCDF4 is required for NetCDF output, '
+                      'use a .zarr output path')
+        return False
+    try:
+        met_ds = open_cube(grid['met_path'])
+    except Exception:
+        logging.error('\nERROR: {} occurred opening {}'.format(
+            sys.exc_info()[1], grid['met_path']))
+        return False
+    time_dim = grid['vars']['time']
+    for var in ['time'] + met_variables + ['lat']:
+        if grid['vars'][var] not in met_ds.variables:
+            logging.error('\nERROR: Variable "{}" was not found in {}\n'
+                          '    Check grid_{}_var value in INI file'.format(
+                              grid['vars'][var], grid['met_path'], var))
+            return False
+    if met_ds[grid['vars']['tmax']].dims[0] != time_dim:
+        logging.error('\nERROR: Met variables must be (time, y, x) cubes')
+        return False
+
+    # truncate period
+
+    time_index = met_ds[time_dim].to_index()
+    start = 0 if cfg.start_dt is None else time_index.searchsorted(cfg.start_dt)
+    end = (len(time_index) if cfg.end_dt is None else
+           time_index.searchsorted(cfg.end_dt, side='right'))
+    if end <= start:
+        logging.error('No values found reading grid met data')
+        return False
+
+    template = met_ds[grid['vars']['tmax']].isel({time_dim: 0}, drop=True)
+    try:
+        lat, elev = static_grids(grid, met_ds, template)
+    except Exception:
+        logging.error('\nERROR: {} occurred reading latitude and '
+                      'elevation grids'.format(sys.exc_info()[1]))
+        return False
+    logging.info('  Grid: {} time steps, {} cells'.format(
+        end - start, template.size))
+
+    if os.path.isdir(out_path):
+        shutil.rmtree(out_path)
+    elif os.path.isfile(out_path):
+        os.remove(out_path)
+    # Thornton and Running coefficients are not used by ASCE reference ET
+    ret_obj = ref_et_data.refET(None, None, None)
+    for chunk_start in range(start, end, grid['time_chunk']):
+        time_slice = slice(chunk_start, min(chunk_start + grid['time_chunk'], end))
+        logging.debug('  Time steps {} to {}'.format(
+            time_slice.start, time_slice.stop - 1))
+        etr, eto = compute_chunk(grid, met_ds, time_slice, lat, elev, ret_obj)
+        chunk_ds = chunk_dataset(grid, met_ds, time_slice, etr, eto)
+        if chunk_start == start:
+            if nc_flag:
+                chunk_ds.to_netcdf(out_path, unlimited_dims=[time_dim])
+            else:
+                chunk_ds.to_zarr(out_path, mode='w')
+        elif nc_flag:
+            append_netcdf(out_path, grid, chunk_ds)
+        else:
+            chunk_ds.to_zarr(out_path, append_dim=time_dim)
+    met_ds.close()
+    logging.info('  Grid reference ET: {}'.format(out_path))
+    return True
@@ -0,0 +1,130 @@
+"""ret_tables.py
+Day of year lookup tables of radiation terms of a met node location
+Extraterrestrial radiation, clear sky radiation terms and seasonal
+    coefficients depend only on latitude, elevation and day of year, so they
+    are computed once for days 1 to 366 and looked up for whole records
+Called by ref_et_data.py and ret_utils.py
+
+"""
+
+import math
+
+import numpy as np
+import refet
+
+# Tables are used for station records if True
+use_tables = True
+
+# Tables of this process keyed by (latitude, elevation)
+_tables = {}
+
+
+def shift_doy(lat, doy):
+    """Day of year shifted by half a year in the southern hemisphere
+
+    Parameters
+    ----------
+    lat : scalar or array_like of shape(M, )
+        Latitude [deg].
+    doy : scalar or array_like of shape(M, )
+        Day of year.
+
+    Returns
+    -------
+    j : ndarray
+        Day of year of the equivalent northern hemisphere season.
+
+    """
+
+    j = np.where(lat < 0, doy - 182, doy)
+    j = np.where(j < 1, j + 365, j)
+    return j
+
+
+def use_table(latitude, elev, doy):
+    """True if latitude and elevation are scalars and doy is a record"""
+    return (use_tables and np.ndim(latitude) == 0 and np.ndim(elev) == 0 and
+            np.ndim(doy) > 0)
+
+
+def radiation_table(latitude, elev):
+    """Radiation terms of days of year 0 to 366 of a location
+
+    Parameters
+    ----------
+    latitude : float
+        Latitude [deg].
+    elev : float
+        Elevation [m].
+
+    Returns
+    -------
+    table : dict
+        ndarrays indexed by day of year and air pressure 'pair'
+
+    Notes
+    -----
+    Tables are built on first use and kept for the life of the process,
+    so nodes at the same location share one table.
+
+    """
+
+    key = (float(latitude), float(elev))
+    try:
+        return _tables[key]
+    except KeyError:
+        pass
+    doy = np.arange(367)
+    latRad = latitude * math.pi / 180.0
+    table = {}
+
+    # Extraterrestrial radiation and air pressure
+    table['ra'] = refet.calcs._ra_daily(latRad, doy, method='refet')
+    table['pair'] = refet.calcs._air_pressure(elev, method='refet')
+
+    # Sun angle terms of full clear sky solar radiation (refet.calcs._rso_daily)
+    sin_beta_24 = np.sin(
+        0.85 + 0.3 * latRad * np.sin(refet.calcs._doy_fraction(doy) - 1.39) -
+        0.42 * np.power(latRad, 2))
+    table['sin_beta_24'] = np.maximum(sin_beta_24, 0.1)
+    table['kb_pair'] = (-0.00146 * table['pair']) / table['sin_beta_24']
+    table['rso56'] = (0.75 + 0.00002 * elev) * table['ra']
+
+    # Kimberly 1982 seasonal coefficients
+    j = shift_doy(latitude, doy)
+    table['rna1'] = 0.26 + 0.1 * np.exp(-(0.0154 * (j - 180)) ** 2)
+    table['alpha'] = 0.29 + 0.06 * np.sin((j + 96) / 57.3)
+    table['awk'] = 0.4 + 1.4 * np.exp(-((j - 173) / 58) ** 2)
+    table['bwk'] = (0.007 + 0.004 * np.exp(-((j - 243) / 80) ** 2)) * 86.4 # for m/s
+    table['awkg'] = 0.3 + 0.58 *  np.exp(-((j - 170) / 45) ** 2)
+    table['bwkg'] = 0.32 + 0.54 * np.exp(-((j - 228) / 67) ** 2)
+    _tables[key] = table
+    return table
+
+
+def rso_daily(table, doy, ea):
+    """Full daily clear sky solar radiation from table terms
+
+    Parameters
+    ----------
+    table : dict
+        radiation_table() of location
+    doy : array_like of shape(M, )
+        Day of year.
+    ea : array_like of shape(M, )
+        Actual vapor pressure [kPa].
+
+    Returns
+    -------
+    rso : ndarray
+        Daily clear sky solar radiation [MJ m-2 d-1], as
+        refet.calcs._rso_daily()
+
+    """
+
+    sin_beta_24 = table['sin_beta_24'][doy]
+    w = table['pair'] * 0.14 * ea + 2.1
+    kb = (0.98 * np.exp(table['kb_pair'][doy] -
+                        0.075 * np.power((w / sin_beta_24), 0.4)))
+    kd = np.minimum(-0.36 * kb + 0.35, 0.82 * kb + 0.18)
+    return table['ra'][doy] * (kb + kd)
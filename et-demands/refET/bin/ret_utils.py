@@ -13,6 +13,8 @@ import numpy as np
 import math
 import refet
 
+import ret_tables
+
 def valid_date(string_dt):
     """Check that date string is ISO format (YYYY-MM-DD)
 
@@ -202,6 +204,24 @@ def read_average_monthly__text_data(fn, skip_lines = 1, delimiter = ","):
         return True, d
     except: return False, d
 
+def avg_monthly_to_daily(avg_monthly_value, months):
+    """Broadcast average monthly values to daily values
+
+    Parameters
+    ---------
+    avg_monthly_value : array_like of shape(12, )
+        average monthly values, January first
+    months : array_like of shape(M, )
+        month of each day
+
+    Returns
+    -------
+    daily_value : ndarray of shape(M, )
+        average monthly value of each day
+
+    """
+    return np.asarray(avg_monthly_value, dtype=np.float64)[np.asarray(months) - 1]
+
 def fill_from_avg_monthly(daily_value, avg_monthly_value):
     """file daily values from average monthly values
     Args:
@@ -234,11 +254,11 @@ def is_winter(et_cell, foo_day):
 
 def max_max_temp(max_temp):
     """Adjust maximum temperature to be less than 120F"""
-    return min(max_temp, (120.0 - 32.0) * 5.0 / 9.0)
+    return np.minimum(max_temp, (120.0 - 32.0) * 5.0 / 9.0)
 
 def max_min_temp(min_temp):
     """Adjust minimum temperature to be less than 90F"""
-    return min(min_temp, (90.0 - 32.0) * 5.0 / 9.0)
+    return np.minimum(min_temp, (90.0 - 32.0) * 5.0 / 9.0)
 
 def avg_two_arrays(c1, c2):
     """Computes average of two NumPy arrays or df columns
@@ -285,20 +305,23 @@ def rs_daily(doy, tmax, tmin, tdew, elev, latitude, montmax, montmin, TR_b0, TR_
 
     """
 
-    # Latutude in radians
-    latRad = latitude * math.pi / 180.0  # Lat is station latitude in degrees
-
-    # Extraterrestrial radiation
-    ra = refet.calcs._ra_daily(latRad, doy, method="refet")
-
     # Saturation vapor pressure
     es = refet.calcs._sat_vapor_pressure(tdew)
 
-    # Air pressure from elevation
-    pair = refet.calcs._air_pressure(elev, method="refet")
+    # Clear sky solar radiation, looked up by day of year for station records
+    if ret_tables.use_table(latitude, elev, doy):
+        rso = ret_tables.rso_daily(
+            ret_tables.radiation_table(latitude, elev), doy, es)
+    else:
+        # Latutude in radians
+        latRad = latitude * math.pi / 180.0  # Lat is station latitude in degrees
+
+        # Extraterrestrial radiation
+        ra = refet.calcs._ra_daily(latRad, doy, method="refet")
 
-    # Clear sky solar radiation
-    rso = refet.calcs._rso_daily(ra, es, pair, doy, latRad)
+        # Air pressure from elevation
+        pair = refet.calcs._air_pressure(elev, method="refet")
+        rso = refet.calcs._rso_daily(ra, es, pair, doy, latRad)
 
     # Temperature difference
     tdiff = tmax - tmin          # temp difference in C
@@ -307,13 +330,13 @@ def rs_daily(doy, tmax, tmin, tdew, elev, latitude, montmax, montmin, TR_b0, TR_
     montdiff = montmax - montmin # long term monthly temp difference in C
 
     # Temperature difference of at least 0.1
-    tdiff = max(0.1, tdiff)
-    montdiff = max(0.1, montdiff)
+    tdiff = np.fmax(0.1, tdiff)
+    montdiff = np.fmax(0.1, montdiff)
 
     # Thornton and Running parameter
-    BTR = TR_b0 + TR_b1 * math.exp(TR_b2 * montdiff)
+    BTR = TR_b0 + TR_b1 * np.exp(TR_b2 * montdiff)
 
-    rs = rso * (1 - 0.9 * math.exp(-BTR * tdiff ** 1.5))
+    rs = rso * (1 - 0.9 * np.exp(-BTR * tdiff ** 1.5))
     return rs
 
 def tdew_from_avg_monthly_Ko(daily_tdew, daily_tmin, avg_monthly_Ko):
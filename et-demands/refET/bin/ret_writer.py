@@ -0,0 +1,148 @@
+"""ret_writer.py
+Posting of RefET output files, directly or through a writer process
+Met node workers send finished output dataframes to a single writer process
+    over a queue, so file output overlaps computation without contention
+Called by met_nodes.py and mod_ref_et.py
+
+"""
+
+import logging
+import multiprocessing as mp
+import sys
+
+# Output queue of worker, set by set_queue()
+_queue = None
+
+
+def output_record(path, out_cfg, ts_name, df, columns, date_flag,
+                  append_flag=False):
+    """Build output record of one delimited text file
+
+    Parameters
+    ---------
+    path : str
+        output file path
+    out_cfg : dict
+        output configuration (refet_out or refetalt_out)
+    ts_name : str
+        'daily', 'monthly' or 'annual'
+    df : pandas.DataFrame
+        output data
+    columns : list
+        output columns
+    date_flag : boolean
+        True if date index is written
+    append_flag : boolean
+        True if data is appended to file of previous time chunk
+
+    Returns
+    -------
+    : tuple
+        path, header lines, dataframe, to_csv keyword arguments and
+        file mode
+
+    """
+    headers = []
+    if not append_flag:
+        headers.append(out_cfg[ts_name + '_header1'])
+        if out_cfg['header_lines'] == 2:
+            headers.append(out_cfg[ts_name + '_header2'])
+    csv_kwargs = {'sep': out_cfg['delimiter'], 'header': False}
+    if date_flag:
+        csv_kwargs['date_format'] = out_cfg[ts_name + '_date_format']
+    else:
+        csv_kwargs['index'] = False
+    if out_cfg[ts_name + '_float_format'] is not None:
+        # formatted output causes loss of precision in crop et computations
+        csv_kwargs['float_format'] = out_cfg[ts_name + '_float_format']
+    return path, headers, df[columns], csv_kwargs, 'a' if append_flag else 'w'
+
+
+def write_record(record):
+    """Write output record to file"""
+    path, headers, df, csv_kwargs, mode = record
+    with open(path, mode, newline='') as output_f:
+        for header in headers:
+            output_f.write(header + '\n')
+        df.to_csv(output_f, **csv_kwargs)
+
+
+def post_outputs(records):
+    """Post output records of one met node
+
+    Records are sent as one batch to the writer process if a queue was
+    set, otherwise written directly.
+
+    """
+    if not records:
+        return
+    if _queue is not None:
+        _queue.put(records)
+    else:
+        for record in records:
+            write_record(record)
+
+
+def set_queue(output_queue):
+    """Send output records of this process to output_queue"""
+    global _queue
+    _queue = output_queue
+
+
+def writer_main(output_queue):
+    """Writer process, writes record batches until None is received
+
+    Exits with a non zero code if any file could not be written.
+
+    """
+    failed = 0
+    while True:
+        records = output_queue.get()
+        if records is None:
+            break
+        for record in records:
+            try:
+                write_record(record)
+            except Exception:
+                logging.error('\nERROR: {0} occurred writing {1}'.format(
+                    sys.exc_info()[1], record[0]))
+                failed += 1
+    if failed:
+        sys.exit(1)
+
+
+def start_writer(max_batches):
+    """Start writer process
+
+    Parameters
+    ---------
+    max_batches : int
+        maximum number of met node batches waiting in queue, producers
+        block when the writer falls behind
+
+    Returns
+    -------
+    writer : multiprocessing.Process
+    output_queue : multiprocessing.Queue
+
+    """
+    output_queue = mp.Queue(max_batches)
+    writer = mp.Process(target=writer_main, args=(output_queue,),
+                        name='ret_writer', daemon=True)
+    writer.start()
+    return writer, output_queue
+
+
+def stop_writer(writer, output_queue):
+    """Stop writer process once queued records are written
+
+    Returns
+    -------
+    : boolean
+        True if all records were written
+
+    """
+    output_queue.put(None)
+    writer.join()
+    output_queue.close()
+    return writer.exitcode == 0
@@ -0,0 +1,85 @@
+"""benchmark_radiation_tables.py
+Microbenchmark of reference ET and solar radiation estimation of a synthetic
+    met node record with and without day of year radiation tables
+Run from refET/tests: python benchmark_radiation_tables.py [years] [nodes]
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'bin')))
+
+import ref_et_data
+import ret_tables
+import ret_utils
+
+
+def node_record(years, seed):
+    dates = pd.date_range('1900-01-01', periods=int(365.25 * years))
+    rng = np.random.default_rng(seed)
+    tmax = (12 + 14 * np.sin((dates.dayofyear.values - 100) / 58.) +
+            rng.normal(0, 3, dates.size))
+    tmin = tmax - rng.uniform(5, 18, dates.size)
+    return {'year': dates.year.values, 'month': dates.month.values,
+            'day': dates.day.values, 'doy': dates.dayofyear.values,
+            'tmax': tmax, 'tmin': tmin,
+            'tdew': tmin - rng.uniform(0, 5, dates.size),
+            'rs': rng.uniform(2, 30, dates.size),
+            'wind': rng.uniform(0.5, 6, dates.size)}
+
+
+def node_calls(rec):
+    """Radiation dependent calls of one node record"""
+    ret_obj = ref_et_data.refET(0.031, 2.63, -0.05)
+    return {
+        'rs_daily': lambda: ret_utils.rs_daily(
+            rec['doy'], rec['tmax'], rec['tmin'], rec['tdew'], 1200., 42.5,
+            25., 8., 0.031, 2.63, -0.05),
+        'et_hargreaves_samani': lambda: ret_obj.et_hargreaves_samani(
+            rec['doy'], rec['tmax'], rec['tmin'], 42.5),
+        'compute_penmans': lambda: ret_obj.compute_penmans(
+            rec['year'], rec['month'], rec['day'], rec['doy'], 'day',
+            rec['tmax'], rec['tmin'], rec['tdew'], rec['rs'], rec['wind'],
+            1200., 42.5)}
+
+
+def time_calls(records, tables_flag, repeat):
+    """Best time of each call summed over nodes, nodes share one location"""
+    ret_tables.use_tables = tables_flag
+    ret_tables._tables.clear()
+    times = {}
+    for rec in records:
+        for name, call in node_calls(rec).items():
+            best = None
+            for i in range(repeat):
+                clock = time.perf_counter()
+                call()
+                elapsed = time.perf_counter() - clock
+                if best is None or elapsed < best:
+                    best = elapsed
+            times[name] = times.get(name, 0.) + best
+    return times
+
+
+def main(years=200, nodes=4, repeat=5):
+    records = [node_record(years, seed) for seed in range(nodes)]
+    computed = time_calls(records, False, repeat)
+    tables = time_calls(records, True, repeat)
+    ret_tables.use_tables = True
+    print('{} nodes, {} years, {} days per node, best of {}'.format(
+        nodes, years, records[0]['doy'].size, repeat))
+    print('  {:22s} {:>10s} {:>10s} {:>8s}'.format(
+        '', 'computed', 'tables', 'speedup'))
+    for name in computed:
+        print('  {:22s} {:8.4f} s {:8.4f} s {:7.2f}x'.format(
+            name, computed[name], tables[name], computed[name] / tables[name]))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
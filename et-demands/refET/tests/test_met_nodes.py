@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('refet')
+import met_nodes
+import ret_utils
+
+
+def make_met_node(tmp_path, days=365 * 40):
+    dates = pd.date_range('1980-01-01', periods=days)
+    rng = np.random.default_rng(0)
+    tmax = 15 + 15 * np.sin(np.arange(days) / 58.) + rng.normal(0, 2, days)
+    met_df = pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'TMax': tmax, 'TMin': tmax - 12, 'TDew': tmax - 20,
+        'Rs': rng.uniform(5, 25, days), 'Wind': rng.uniform(1, 4, days),
+        'Prcp': rng.uniform(0, 2, days)})
+    met_df.loc[[10, 11], 'TMax'] = np.nan
+    met_df.loc[100:109, 'TMin'] = np.nan
+    met_df.loc[200, 'TMax'] = 60.
+    met_df.loc[300:309, 'TDew'] = np.nan
+    met_df.loc[400:409, 'Rs'] = np.nan
+    met_df.loc[500, 'Prcp'] = np.nan
+    met_df.to_csv(tmp_path / 'STN1.csv', index=False)
+
+    fields = {'date': 'Date', 'tmax': 'TMax', 'tmin': 'TMin',
+              'tdew': 'TDew', 'rs': 'Rs', 'wind': 'Wind', 'ppt': 'Prcp'}
+    cfg = SimpleNamespace(
+        time_step='day', start_dt=None, end_dt=None,
+        input_met={
+            'ws': str(tmp_path), 'name_format': '%s.csv', 'header_lines': 1,
+            'names_line': 1, 'delimiter': ',', 'fields': fields,
+            'fnspec': {k: v for k, v in fields.items()},
+            'units': {k: None for k in fields}, 'wind_height': 2})
+    avg = list(np.arange(12.))
+    mnd = SimpleNamespace(
+        avg_monthly_tmax={'STN1': avg}, avg_monthly_tmin={'STN1': avg},
+        avg_monthly_wind={'STN1': avg}, avg_monthly_Ko={'STN1': [5.] * 12})
+    node = met_nodes.MetNode()
+    node.met_node_id = node.source_met_id = 'STN1'
+    node.wind_id = node.Ko_id = 'STN1'
+    node.met_data_path = None
+    node.elevation, node.latitude = 1000., 40.
+    node.TR_b0, node.TR_b1, node.TR_b2 = 0.031, 2.63, -0.05
+    return node, cfg, mnd, met_df
+
+
+def test_read_and_fill_met_data(tmp_path):
+    node, cfg, mnd, met_df = make_met_node(tmp_path)
+    assert node.read_and_fill_met_data(1, cfg, mnd)
+    df = node.input_met_df
+    assert not df[['tmax', 'tmin', 'tdew', 'rs', 'wind', 'ppt']].isnull().any().any()
+
+    # Short gaps are interpolated, longer gaps filled from monthly averages
+    np.testing.assert_allclose(
+        df['tmax'].values[10:12],
+        met_df['TMax'][9] + np.diff(met_df['TMax'].values[[9, 12]]) * [1 / 3, 2 / 3])
+    np.testing.assert_array_equal(df['tmin'].values[103:107], 3.)
+    assert df['tmax'].values[200] == pytest.approx((120. - 32.) * 5. / 9.)
+    np.testing.assert_allclose(
+        df['tdew'].values[303:307], df['tmin'].values[303:307] - 5.)
+    expected_rs = [ret_utils.rs_daily(
+        dt.dayofyear, df['tmax'][dt], df['tmin'][dt], df['tdew'][dt],
+        1000., 40., dt.month - 1., dt.month - 1., 0.031, 2.63, -0.05)
+        for dt in df.index[400:410]]
+    np.testing.assert_allclose(df['rs'].values[400:410],
+                               np.ravel(expected_rs))
+    assert df['ppt'].values[500] == 0
+
+    assert node.fill_report['tmin'] == {
+        'missing': 10, 'interpolated': 6, 'avg_monthly': 4, 'remaining': 0}
+    assert node.fill_report['rs'] == {
+        'missing': 10, 'estimated': 10, 'remaining': 0}
+    assert node.fill_report['ppt'] == {
+        'missing': 1, 'filled': 1, 'remaining': 0}
+
+
+def test_met_data_chunks(tmp_path):
+    node, cfg, mnd, met_df = make_met_node(tmp_path, days=365 * 4)
+    # gap across the end of a year
+    met_df.loc[360:369, 'TMax'] = np.nan
+    met_df.to_csv(tmp_path / 'STN1.csv', index=False)
+    assert node.read_and_fill_met_data(1, cfg, mnd)
+    expected = node.input_met_df
+
+    cfg.start_dt = cfg.end_dt = None
+    cfg.time_chunk_years = 1
+    filled = []
+    for window_df, (start, end) in node.met_data_chunks(cfg, read_rows=100):
+        node.input_met_df = window_df
+        assert node.fill_met_data(cfg, mnd)
+        filled.append(node.input_met_df.truncate(before=start, after=end))
+    assert [df.index[0].year for df in filled] == [1980, 1981, 1982, 1983]
+    pd.testing.assert_frame_equal(pd.concat(filled), expected)
+    assert cfg.end_dt == expected.index[-1]
+
+
+def test_climate_archive(tmp_path):
+    import climate_archive
+
+    node, cfg, mnd, met_df = make_met_node(tmp_path, days=365 * 4)
+    assert node.read_and_fill_met_data(1, cfg, mnd)
+    expected = node.input_met_df
+
+    archive_ws = str(tmp_path / 'archive')
+    climate_archive.build_archive(
+        archive_ws, climate_archive.station_ids(str(tmp_path), '%s.csv'))
+    (tmp_path / 'STN1.csv').unlink()
+    cfg.input_met['archive_ws'] = archive_ws
+    cfg.start_dt = cfg.end_dt = None
+    assert node.read_and_fill_met_data(1, cfg, mnd)
+    pd.testing.assert_frame_equal(node.input_met_df, expected)
+
+    cfg.start_dt = cfg.end_dt = None
+    cfg.time_chunk_years = 1
+    filled = []
+    for window_df, (start, end) in node.met_data_chunks(cfg, read_rows=100):
+        node.input_met_df = window_df
+        assert node.fill_met_data(cfg, mnd)
+        filled.append(node.input_met_df.truncate(before=start, after=end))
+    pd.testing.assert_frame_equal(pd.concat(filled), expected)
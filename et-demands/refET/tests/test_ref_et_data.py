@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('refet')
+import ref_et_data
+
+
+@pytest.mark.parametrize('latitude', [40.5, -33.0])
+def test_compute_penmans_array(latitude):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2000-12-20', periods=30)
+    tmax = 20 + rng.normal(0, 3, dates.size)
+    tmin = tmax - rng.uniform(-2, 15, dates.size)
+    tdew = tmin - rng.uniform(0, 5, dates.size)
+    rs = rng.uniform(2, 30, dates.size)
+    wind = rng.uniform(0.5, 6, dates.size)
+    tmax[10] = np.nan
+
+    # Scalar calls, one time step at a time
+    ret_obj = ref_et_data.refET(0.031, 2.63, -0.05)
+    expected = []
+    for i, dt in enumerate(dates):
+        penmans = ret_obj.compute_penmans(
+            dt.year, dt.month, dt.day, dt.dayofyear, 'day', tmax[i], tmin[i],
+            tdew[i], rs[i], wind[i], 1200., latitude)
+        harg = ret_obj.et_hargreaves_samani(
+            dt.dayofyear, tmax[i], tmin[i], latitude)
+        expected.append([np.asarray(v).item() for v in penmans + (harg,)])
+
+    # Whole record in one call
+    ret_obj = ref_et_data.refET(0.031, 2.63, -0.05)
+    doy = dates.dayofyear.values
+    penmans = ret_obj.compute_penmans(
+        dates.year.values, dates.month.values, dates.day.values, doy, 'day',
+        tmax, tmin, tdew, rs, wind, 1200., latitude)
+    harg = ret_obj.et_hargreaves_samani(doy, tmax, tmin, latitude)
+    result = np.column_stack(penmans + (harg,))
+
+    assert result.shape == (dates.size, 8)
+    np.testing.assert_allclose(result, np.array(expected), rtol=1e-12)
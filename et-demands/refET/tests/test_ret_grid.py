@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip('xarray')
+pytest.importorskip('zarr')
+pytest.importorskip('refet')
+import ref_et_data
+import ret_grid
+
+
+def make_cube(path):
+    rng = np.random.default_rng(0)
+    shape = (100, 3, 4)
+    time = pd.date_range('2001-03-01', periods=shape[0])
+    tmax = 15 + 10 * rng.random(shape)
+    met_ds = xr.Dataset(
+        {'tmmx': (('day', 'lat', 'lon'), tmax + 273.15, {'units': 'K'}),
+         'tmmn': (('day', 'lat', 'lon'), tmax - 12 + 273.15, {'units': 'K'}),
+         'tdew': (('day', 'lat', 'lon'), tmax - 20),
+         'srad': (('day', 'lat', 'lon'), 100 + 200 * rng.random(shape),
+                  {'units': 'W m-2'}),
+         'vs': (('day', 'lat', 'lon'), 1 + 3 * rng.random(shape)),
+         'elevation': (('lat', 'lon'), 500 + 1000 * rng.random(shape[1:]))},
+        coords={'day': time, 'lat': [46., 45., 44.],
+                'lon': [-112., -111., -110., -109.]})
+    met_ds['tmmx'][5, 1, 2] = np.nan
+    met_ds.to_netcdf(path)
+    return met_ds
+
+
+@pytest.mark.parametrize('out_name', ['refet.zarr', 'refet.nc'])
+def test_run_grid(tmp_path, out_name):
+    if out_name.endswith('.nc'):
+        pytest.importorskip('netCDF4')
+    met_ds = make_cube(str(tmp_path / 'met.nc'))
+    cfg = SimpleNamespace(
+        start_dt=pd.Timestamp('2001-03-11'), end_dt=None,
+        grid={'met_path': str(tmp_path / 'met.nc'),
+              'out_path': str(tmp_path / out_name), 'elev_path': None,
+              'vars': {'time': 'day', 'lat': 'lat', 'elev': 'elevation',
+                       'tmax': 'tmmx', 'tmin': 'tmmn', 'tdew': 'tdew',
+                       'rs': 'srad', 'wind': 'vs'},
+              'wind_height': 2.0, 'time_chunk': 40})
+    assert ret_grid.run_grid(cfg)
+
+    out_ds = ret_grid.open_cube(cfg.grid['out_path'])
+    assert out_ds['etr'].dims == ('day', 'lat', 'lon')
+    np.testing.assert_array_equal(out_ds['day'].values,
+                                  met_ds['day'].values[10:])
+
+    # Each cell matches the station computation of its time series
+    ret_obj = ref_et_data.refET(None, None, None)
+    dates = met_ds['day'].to_index()[10:]
+    for y, x in [(0, 0), (1, 2), (2, 3)]:
+        cell = met_ds.isel(day=slice(10, None), lat=y, lon=x)
+        penmans = ret_obj.compute_penmans(
+            dates.year.values, dates.month.values, dates.day.values,
+            dates.dayofyear.values, 'day', cell['tmmx'].values - 273.15,
+            cell['tmmn'].values - 273.15, cell['tdew'].values,
+            cell['srad'].values * 0.0864, cell['vs'].values,
+            float(cell['elevation']), float(cell['lat']))
+        np.testing.assert_allclose(
+            out_ds['etr'].values[:, y, x], penmans[3], rtol=1e-12)
+        np.testing.assert_allclose(
+            out_ds['eto'].values[:, y, x], penmans[4], rtol=1e-12)
+    out_ds.close()
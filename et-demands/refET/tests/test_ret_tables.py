@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('refet')
+import ret_tables
+import ret_utils
+
+
+@pytest.mark.parametrize('latitude', [46.2, -20.0])
+def test_rs_daily_table(latitude, monkeypatch):
+    rng = np.random.default_rng(0)
+    doy = np.arange(1, 367)
+    tmax = 20 + rng.normal(0, 5, doy.size)
+    tmin = tmax - rng.uniform(0, 15, doy.size)
+    tdew = tmin - rng.uniform(0, 5, doy.size)
+    args = (doy, tmax, tmin, tdew, 850., latitude, 25., 8., 0.031, 2.63, -0.05)
+
+    rs = ret_utils.rs_daily(*args)
+    table = ret_tables.radiation_table(latitude, 850.)
+    assert ret_tables.radiation_table(latitude, 850.) is table
+    assert table['ra'].shape == (367,)
+
+    monkeypatch.setattr(ret_tables, 'use_tables', False)
+    np.testing.assert_allclose(rs, ret_utils.rs_daily(*args), rtol=1e-14)
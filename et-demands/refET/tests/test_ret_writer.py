@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ret_writer
+
+
+def make_records(tmp_path, prefix):
+    out_cfg = {
+        'header_lines': 2, 'delimiter': ',',
+        'daily_header1': 'Date,ETr', 'daily_header2': 'date,mm',
+        'daily_date_format': '%Y-%m-%d', 'daily_float_format': '%.3f',
+        'annual_header1': 'ETr', 'annual_date_format': None,
+        'annual_float_format': None}
+    df = pd.DataFrame(
+        {'ETr': np.linspace(0, 10, 365), 'other': 1.},
+        index=pd.date_range('2001-01-01', periods=365, name='Date'))
+    return [
+        ret_writer.output_record(
+            str(tmp_path / (prefix + '_daily.csv')), out_cfg, 'daily',
+            df, ['ETr'], True),
+        ret_writer.output_record(
+            str(tmp_path / (prefix + '_annual.csv')),
+            dict(out_cfg, header_lines=1), 'annual', df.resample('YS').sum(),
+            ['ETr'], False)]
+
+
+def test_writer_process(tmp_path):
+    ret_writer.post_outputs(make_records(tmp_path, 'direct'))
+    daily = (tmp_path / 'direct_daily.csv').read_text().splitlines()
+    assert daily[:3] == ['Date,ETr', 'date,mm', '2001-01-01,0.000']
+    annual = (tmp_path / 'direct_annual.csv').read_text().splitlines()
+    assert annual[0] == 'ETr' and float(annual[1]) == pytest.approx(1825.)
+
+    writer, output_queue = ret_writer.start_writer(2)
+    ret_writer.set_queue(output_queue)
+    try:
+        for i in range(4):
+            ret_writer.post_outputs(make_records(tmp_path, 'queue{}'.format(i)))
+    finally:
+        ret_writer.set_queue(None)
+    assert ret_writer.stop_writer(writer, output_queue)
+    for i in range(4):
+        for ts in ['daily', 'annual']:
+            assert ((tmp_path / 'queue{}_{}.csv'.format(i, ts)).read_text() ==
+                    (tmp_path / 'direct_{}.csv'.format(ts)).read_text())
+
+    # Write errors are reported by the writer exit code
+    writer, output_queue = ret_writer.start_writer(2)
+    ret_writer.set_queue(output_queue)
+    try:
+        ret_writer.post_outputs(make_records(tmp_path / 'missing', 'error'))
+    finally:
+        ret_writer.set_queue(None)
+    assert not ret_writer.stop_writer(writer, output_queue)
@@ -0,0 +1,107 @@
+import argparse
+import datetime as dt
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                             '..', 'lib')))
+import climate_archive
+
+
+def main(station_ws, name_format, archive_ws, header_lines = 1,
+         names_line = 1, delimiter = ',', date_field = 'Date',
+         ymd_fields = None, dtype = 'float64'):
+    """Build memory mapped climate archive from station files
+
+    Args:
+        station_ws (str): folder of station files
+        name_format (str): station file name format, %s is station id
+        archive_ws (str): archive folder
+        header_lines (int): number of header lines
+        names_line (int): line of field names
+        delimiter (str): field delimiter
+        date_field (str): date field name
+        ymd_fields (list): year, month and day field names if no date field
+        dtype (str): dtype of non integer variables
+
+    Returns:
+        None
+    """
+    logging.info('\nBuilding climate archive')
+    logging.info('  Station files: {}'.format(
+        os.path.join(station_ws, name_format)))
+    logging.info('  Archive:       {}'.format(archive_ws))
+    if '%s' not in name_format:
+        logging.error('  ERROR: name format must include %s station id')
+        sys.exit()
+    station_files = climate_archive.station_ids(station_ws, name_format)
+    if not station_files:
+        logging.error('  ERROR: no station files found')
+        sys.exit()
+    if ymd_fields:
+        date_field = None
+    station_count = climate_archive.build_archive(
+        archive_ws, station_files, dtype = dtype,
+        header_lines = header_lines, names_line = names_line,
+        delimiter = delimiter.replace('\\t', '\t'), date_field = date_field,
+        ymd_fields = ymd_fields)
+    if station_count is None:
+        sys.exit()
+    logging.info('  {} of {} stations archived'.format(
+        station_count, len(station_files)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description = 'Build Memory Mapped Climate Archive',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        'station_ws', type = str, help = 'Folder of station files')
+    parser.add_argument(
+        'name_format', type = str,
+        help = 'Station file name format, %%s is station id')
+    parser.add_argument(
+        'archive_ws', type = str, help = 'Archive folder')
+    parser.add_argument(
+        '--header_lines', default = 1, type = int,
+        help = 'Number of header lines')
+    parser.add_argument(
+        '--names_line', default = 1, type = int,
+        help = 'Line of field names')
+    parser.add_argument(
+        '--delimiter', default = ',', type = str, help = 'Field delimiter')
+    parser.add_argument(
+        '--date_field', default = 'Date', type = str, help = 'Date field')
+    parser.add_argument(
+        '--ymd_fields', default = None, nargs = 3,
+        metavar = ('YEAR', 'MONTH', 'DAY'),
+        help = 'Year, month and day fields used in lieu of date field')
+    parser.add_argument(
+        '--dtype', default = 'float64', choices = ['float64', 'float32'],
+        help = 'Dtype of non integer variables')
+    parser.add_argument(
+        '--debug', default = logging.INFO, const = logging.DEBUG,
+        help = 'Debug level logging', action = "store_const",
+        dest = "loglevel")
+    args = parser.parse_args()
+
+    # Convert relative paths to absolute paths
+
+    args.station_ws = os.path.abspath(args.station_ws)
+    args.archive_ws = os.path.abspath(args.archive_ws)
+    return args
+
+if __name__ == '__main__':
+    args = parse_args()
+    logging.basicConfig(level = args.loglevel, format = '%(message)s')
+    logging.info('\n{0}'.format('#' * 80))
+    log_f = '{0:<20s} {1}'
+    logging.info(log_f.format(
+        'Run Time Stamp:', dt.datetime.now().isoformat(' ')))
+    logging.info(log_f.format('Current Directory:', os.getcwd()))
+    logging.info(log_f.format('Script:', os.path.basename(sys.argv[0])))
+
+    main(args.station_ws, args.name_format, args.archive_ws,
+         header_lines = args.header_lines, names_line = args.names_line,
+         delimiter = args.delimiter, date_field = args.date_field,
+         ymd_fields = args.ymd_fields, dtype = args.dtype)
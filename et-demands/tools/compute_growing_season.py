@@ -9,6 +9,10 @@ import numpy as np
 import pandas as pd
 
 import util
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                             '..', 'lib')))
+import growing_season
+import period_agg
 
 def main(ini_path, start_date = None, end_date = None, crop_str = ''):
     """Compute Growing Season Statistics
@@ -209,7 +213,7 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
         # Build list of unique years
 
         year_array = np.sort(np.unique(
-            np.array(daily_df[year_field]).astype(np.int)))
+            np.array(daily_df[year_field]).astype(int)))
         logging.debug('    All Years: {0}'.format(
             ', '.join(list(util.ranges(year_array.tolist())))))
         # logging.debug('    All Years: {0}'.format(
@@ -243,7 +247,7 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
             daily_df = daily_df[daily_df[year_field] <= year_end]
 
         year_sub_array = np.sort(np.unique(np.array(daily_df[year_field])
-                                           .astype(np.int)))
+                                           .astype(int)))
         logging.debug('    Data Years: {0}'.format(
             ', '.join(list(util.ranges(year_sub_array.tolist())))))
         # logging.debug('    Data Years: {0}'.format(
@@ -252,8 +256,8 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
         # Get separate date related fields
 
         date_array = daily_df.index.date
-        year_array = daily_df[year_field].values.astype(np.int)
-        doy_array = daily_df[doy_field].values.astype(np.int)
+        year_array = daily_df[year_field].values.astype(int)
+        doy_array = daily_df[doy_field].values.astype(int)
 
         # Remove leap days
         # leap_array = (doy_array == 366)
@@ -263,6 +267,12 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
 
         season_array = np.array(daily_df[season_field])
 
+        # Find season transitions of all years at once
+
+        gs_bounds = period_agg.period_bounds(daily_df.index, 'year')
+        gs = growing_season.season_transitions(season_array, gs_bounds)
+        gs_years = gs_bounds.labels.year.values
+
         # Original code from growing_season script
         # Initialize mean annual growing season length variables
 
@@ -280,7 +290,6 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
             year_mask = (year_array == year)
             date_sub_array = date_array[year_mask]
             doy_sub_array = doy_array[year_mask]
-            season_sub_mask = season_array[year_mask]
             field_names=list(daily_df.columns.values)
 
             # Only Run if Cutting in field_names else fill with blanks
@@ -306,7 +315,7 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
             # Track all cutting doy for mean annual by crop
             # Each column is different cutting 1-6)
             cutting_dates_temp=pd.DataFrame(cutting_dates_doy).transpose()
-            all_cuttings=all_cuttings.append(cutting_dates_temp)
+            all_cuttings=pd.concat([all_cuttings, cutting_dates_temp])
 
             
             # print(cutting_dates)
@@ -316,49 +325,30 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
             # Look for transitions in season value
             # Start transitions up day before actual start
             # End transitions down on end date
-
-            try:
-                start_i = np.where(np.diff(season_sub_mask) == 1)[0][0] + 1
-            except:
-                start_i = None
-            try:
-                end_i = np.where(np.diff(season_sub_mask) == -1)[0][0]
-            except:
-                end_i = None
-
-            # If start transition is not found, season starts on DOY 1
-
-            if start_i is None and end_i is not None:
-                start_i = 0
-            # If end transition is not found, season ends on DOY 365/366
-
-            elif start_i is not None and end_i is None:
-                end_i = -1
-
-            # If neither transition is found, season is always on
-            # elif start_i is None and end_i is None:
-            #     , end_i = 0, -1
-
-            # Calculate start and stop day of year
             # Set start/end to 0 if season never gets set to 1
 
-            if not np.any(season_sub_mask):
+            gs_i = np.searchsorted(gs_years, year)
+            gs_length = gs.length[gs_i]
+            if gs_length == 0:
                 skip_str = "  Skipping, season flag was never set to 1"
                 logging.debug(skip_str)
                 baddata_file.write(
                     '{0}  {1} {2}\n'.format(station, year_crop_str, skip_str))
                 start_doy, end_doy = 0, 0
                 start_date, end_date = "", ""
-            elif np.all(season_sub_mask):
-                start_doy, end_doy = doy_sub_array[0], doy_sub_array[-1]
-                start_date = date_sub_array[0].isoformat()
-                end_date = date_sub_array[-1].isoformat()
             else:
-                start_doy, end_doy = doy_sub_array[start_i],\
-                                     doy_sub_array[end_i]
-                start_date = date_sub_array[start_i].isoformat()
-                end_date = date_sub_array[end_i].isoformat()
-            gs_length = sum(season_sub_mask)
+                # If start transition is not found, season starts on DOY 1
+                # If end transition is not found, season ends on DOY 365/366
+
+                start_i = gs.start_i[gs_i]
+                if start_i < 0:
+                    start_i = gs.first_i[gs_i]
+                end_i = gs.end_i[gs_i]
+                if end_i < 0:
+                    end_i = gs.last_i[gs_i]
+                start_doy, end_doy = doy_array[start_i], doy_array[end_i]
+                start_date = date_array[start_i].isoformat()
+                end_date = date_array[end_i].isoformat()
             logging.debug("Start: {0} ({1})  End: {2} ({3})".format(
                 start_doy, start_date, end_doy, end_date))
 
@@ -385,7 +375,7 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
                  cutting_dates[5]])
 
             # Cleanup
-            del year_mask, doy_sub_array, season_sub_mask
+            del year_mask, doy_sub_array, gs_i
             del start_doy, end_doy, start_date, end_date, gs_length
 
         # Calculate mean annual growing season start/end/length
@@ -421,7 +411,7 @@ def main(ini_path, start_date = None, end_date = None, crop_str = ''):
 
         # Cleanup
 
-        del season_array
+        del season_array, gs_bounds, gs, gs_years
         del gs_sum, gs_cnt, gs_mean
         del start_sum, start_cnt, start_mean
         del end_sum, end_cnt, end_mean